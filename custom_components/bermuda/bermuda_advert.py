@@ -20,6 +20,7 @@ from bluetooth_data_tools import monotonic_time_coarse
 
 from .const import (
     _LOGGER,
+    AREA_HIST_WINDOW,
     CONF_ATTENUATION,
     CONF_MAX_VELOCITY,
     CONF_REF_POWER,
@@ -36,6 +37,7 @@ from .util import clean_charbuf, rssi_to_metres
 if TYPE_CHECKING:
     from bleak.backends.scanner import AdvertisementData
 
+    from .bermuda_batch import BermudaBatchEngine
     from .bermuda_device import BermudaDevice
 
 # The if instead of min/max triggers PLR1730, but when
@@ -45,7 +47,7 @@ if TYPE_CHECKING:
 # ruff: noqa: PLR1730
 
 
-class BermudaAdvert(dict):
+class BermudaAdvert:
     """
     Represents details from a scanner relevant to a specific device.
 
@@ -60,8 +62,50 @@ class BermudaAdvert(dict):
     A BermudaDevice's "adverts" property will contain one of these for each
     scanner that has "seen" it.
 
+    There is one of these for every device/scanner pairing we hold, so the
+    attributes live in __slots__ rather than a per-instance __dict__. Any new
+    attribute needs adding here as well.
     """
 
+    __slots__ = (
+        "scanner_address",
+        "device_address",
+        "_device",
+        "ref_power",
+        "name",
+        "scanner_device",
+        "area_id",
+        "area_name",
+        "scanner_sends_stamps",
+        "options",
+        "stamp",
+        "new_stamp",
+        "rssi",
+        "tx_power",
+        "rssi_distance",
+        "rssi_distance_raw",
+        "stale_update_count",
+        "conf_rssi_offset",
+        "conf_ref_power",
+        "conf_attenuation",
+        "conf_max_velocity",
+        "conf_smoothing_samples",
+        "hist_stamp",
+        "hist_rssi",
+        "hist_distance",
+        "hist_distance_by_interval",
+        "hist_interval",
+        "hist_velocity",
+        "hist_distance_by_interval_run",
+        "hist_distance_by_interval_last",
+        "local_name",
+        "manufacturer_data",
+        "service_data",
+        "service_uuids",
+        "_batch",
+        "batch_row",
+    )
+
     def __hash__(self) -> int:
         """The device-mac / scanner mac uniquely identifies a received advertisement pair."""
         return hash((self.device_address, self.scanner_address))
@@ -72,6 +116,7 @@ class BermudaAdvert(dict):
         advertisementdata: AdvertisementData,  # The advertisement info from the device, received by the scanner
         options,
         scanner_device: BermudaDevice,  # The scanner device that "saw" it.
+        batch_engine: BermudaBatchEngine | None = None,  # Does our smoothing if set.
     ) -> None:
         self.scanner_address: Final[str] = scanner_device.address
         self.device_address: Final[str] = parent_device.address
@@ -99,11 +144,22 @@ class BermudaAdvert(dict):
         self.conf_attenuation = self.options.get(CONF_ATTENUATION)
         self.conf_max_velocity = self.options.get(CONF_MAX_VELOCITY)
         self.conf_smoothing_samples = self.options.get(CONF_SMOOTHING_SAMPLES)
+        # How many times in a row we've pushed the same value onto hist_distance_by_interval,
+        # so we can tell when the part of it that area selection looks at has stopped changing.
+        self.hist_distance_by_interval_run: int = 0
+        self.hist_distance_by_interval_last: float | None = None
         self.local_name: list[tuple[str, bytes]] = []
         self.manufacturer_data: list[dict[int, bytes]] = []
         self.service_data: list[dict[str, bytes]] = []
         self.service_uuids: list[str] = []
 
+        # If the batch engine is in use, it owns our smoothing state and does
+        # calculate_data for us. We still keep our own raw histories for dumps etc.
+        self._batch = batch_engine
+        self.batch_row: int | None = None
+        if self._batch is not None:
+            self.batch_row = self._batch.attach(self)
+
         # Just pass the rest on to update...
         self.update_advertisement(advertisementdata, self.scanner_device)
 
@@ -114,6 +170,7 @@ class BermudaAdvert(dict):
             _LOGGER.error("Advert %s received new scanner with wrong address %s", self.__repr__(), scanner_device)
         self.area_id: str | None = scanner_device.area_id
         self.area_name: str | None = scanner_device.area_name
+        self._device.area_dirty = True
         # Only remote scanners log timestamps, local usb adaptors do not.
         self.scanner_sends_stamps = scanner_device.is_remote_scanner
 
@@ -203,6 +260,14 @@ class BermudaAdvert(dict):
             self.stamp = new_stamp or 0
             self.hist_stamp.insert(0, self.stamp)
 
+            if self.batch_row is not None:
+                self._batch.push_reading(self.batch_row, self.rssi_distance_raw, self.stamp)  # type: ignore[union-attr]
+                # calculate_data won't run for us, so trim here instead.
+                del self.hist_distance[HIST_KEEP_COUNT:]
+                del self.hist_interval[HIST_KEEP_COUNT:]
+                del self.hist_rssi[HIST_KEEP_COUNT:]
+                del self.hist_stamp[HIST_KEEP_COUNT:]
+
         # if self.tx_power is not None and scandata.advertisement.tx_power != self.tx_power:
         #     # Not really an erorr, we just don't account for this happening -
         #     # I want to know if it does.
@@ -261,6 +326,8 @@ class BermudaAdvert(dict):
 
         # Finally, save the new advert timestamp.
         self.new_stamp = new_stamp
+        if new_stamp is not None:
+            self._device.area_dirty = True
 
     def _update_raw_distance(self, reading_is_new=True) -> float:
         """
@@ -299,8 +366,12 @@ class BermudaAdvert(dict):
                 self.hist_distance.append(distance)
             if len(self.hist_distance_by_interval) > 0:
                 self.hist_distance_by_interval[0] = distance
+                self.hist_distance_by_interval_run = 0
             # We don't else because we don't want to *add* a hist-by-interval reading, only
             # modify in-place.
+            self._device.area_dirty = True
+        if not reading_is_new and self.batch_row is not None:
+            self._batch.override_distance(self.batch_row, distance)  # type: ignore[union-attr]
         return distance
 
     def set_ref_power(self, value: float) -> float | None:
@@ -364,9 +435,17 @@ class BermudaAdvert(dict):
         "away" from a scanner when it hears no new adverts. DISTANCE_TIMEOUT
         is how we decide how long to wait, and should accommodate for dropped
         packets and for temporary occlusion (dogs' bodies etc)
+
+        If this advert is attached to the BermudaBatchEngine, all of the above
+        is done by the engine's calculate_adverts instead, so we do nothing here.
         """
+        if self.batch_row is not None:
+            return
+
         new_stamp = self.new_stamp  # should have been set by update()
         self.new_stamp = None  # Clear so we know if an update is missed next cycle
+        previous_distance = self.rssi_distance
+        area_changed = False  # True if anything the area contest looks at has changed
 
         if self.rssi_distance is None and new_stamp is not None:
             # DEVICE HAS ARRIVED!
@@ -380,6 +459,9 @@ class BermudaAdvert(dict):
                 # and might have fewer side-effects.
                 self.hist_distance_by_interval.clear()
                 self.hist_distance_by_interval.append(self.rssi_distance_raw)
+                self.hist_distance_by_interval_run = 1
+                self.hist_distance_by_interval_last = self.rssi_distance_raw
+                area_changed = True
 
         elif new_stamp is None and (self.stamp is None or self.stamp < monotonic_time_coarse() - DISTANCE_TIMEOUT):
             # DEVICE IS AWAY!
@@ -388,6 +470,8 @@ class BermudaAdvert(dict):
             # Clear the smoothing history
             if len(self.hist_distance_by_interval) > 0:
                 self.hist_distance_by_interval.clear()
+                self.hist_distance_by_interval_run = 0
+                area_changed = True
 
         else:
             # Add the current reading (whether new or old) to
@@ -446,17 +530,27 @@ class BermudaAdvert(dict):
 
                 # Discard the bogus reading by duplicating the last
                 if len(self.hist_distance_by_interval) > 0:
-                    self.hist_distance_by_interval.insert(0, self.hist_distance_by_interval[0])
+                    interval_distance = self.hist_distance_by_interval[0]
                 else:
                     # If nothing to duplicate, just plug in the raw distance.
-                    self.hist_distance_by_interval.insert(0, self.rssi_distance_raw)
+                    interval_distance = self.rssi_distance_raw
             else:
-                self.hist_distance_by_interval.insert(0, self.rssi_distance_raw)
+                interval_distance = self.rssi_distance_raw
+            self.hist_distance_by_interval.insert(0, interval_distance)
 
             # trim the log to length
             if len(self.hist_distance_by_interval) > self.conf_smoothing_samples:
                 del self.hist_distance_by_interval[self.conf_smoothing_samples :]
 
+            # The newest AREA_HIST_WINDOW entries only stay the same if we keep pushing the same value.
+            if interval_distance == self.hist_distance_by_interval_last:
+                self.hist_distance_by_interval_run += 1
+            else:
+                self.hist_distance_by_interval_run = 1
+                self.hist_distance_by_interval_last = interval_distance
+            if self.hist_distance_by_interval_run <= min(AREA_HIST_WINDOW, self.conf_smoothing_samples):
+                area_changed = True
+
             # Calculate a moving-window average, that only includes
             # historical values if they're "closer" (ie more reliable).
             #
@@ -485,6 +579,10 @@ class BermudaAdvert(dict):
             else:
                 self.rssi_distance = self.rssi_distance_raw
 
+        if area_changed or self.rssi_distance != previous_distance:
+            # Let the coordinator know this device needs a fresh area contest.
+            self._device.area_dirty = True
+
         # Trim our history lists
         del self.hist_distance[HIST_KEEP_COUNT:]
         del self.hist_interval[HIST_KEEP_COUNT:]
@@ -496,9 +594,16 @@ class BermudaAdvert(dict):
         """Convert class to serialisable dict for dump_devices."""
         # using "is" comparisons instead of string matching means
         # linting and typing can catch errors.
+        if self.batch_row is not None:
+            # The batch engine only keeps tracked devices' lists current.
+            self._batch.sync_history(self.batch_row)  # type: ignore[union-attr]
         out = {}
-        for var, val in vars(self).items():
-            if val in [self.options]:
+        for var in self.__slots__:
+            if not hasattr(self, var):
+                # Declared but not yet set, like rssi_distance_raw before the first calculation.
+                continue
+            val = getattr(self, var)
+            if val in [self.options] or (self._batch is not None and val is self._batch):
                 # skip certain vars that we don't want in the dump output.
                 continue
             if val in [self.options, self._device, self.scanner_device]:
@@ -0,0 +1,450 @@
+"""
+Vectorised distance smoothing for all of Bermuda's adverts in a single pass.
+
+BermudaAdvert.calculate_data does its velocity check and "closer-is-truer"
+moving average in pure python, once for every device/scanner pair on every
+update cycle. That's fine for a few dozen adverts, but with lots of proxies and
+a street full of random-MAC phones it becomes the bulk of our update loop.
+
+The BermudaBatchEngine keeps the histories needed for those calculations in
+fixed-size numpy ring buffers (one row per advert), and performs the same
+calculations for every advert at once. The results are written back onto
+each advert so that area selection, sensors and dump_devices see exactly
+what the scalar path would have produced. tools/bermuda_batch_parity.py runs
+both paths side by side to check that they do.
+
+numpy is not a hard requirement of Bermuda, so if it's not available the
+engine simply reports itself as unavailable and the scalar path is used.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from .const import (
+    _LOGGER,
+    AREA_HIST_WINDOW,
+    CONF_MAX_VELOCITY,
+    CONF_SMOOTHING_SAMPLES,
+    DEFAULT_MAX_VELOCITY,
+    DEFAULT_SMOOTHING_SAMPLES,
+    DISTANCE_INFINITE,
+    DISTANCE_TIMEOUT,
+    HIST_KEEP_COUNT,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with most HA installs, but not all.
+    np = None
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .bermuda_advert import BermudaAdvert
+    from .bermuda_device import BermudaDevice
+
+# How many rows to allocate at first, we double whenever we run out.
+BATCH_INITIAL_ROWS = 256
+
+# The scalar path trims the raw histories *after* calculating, so at calculation
+# time they can hold one more entry than HIST_KEEP_COUNT.
+BATCH_HIST_CAPACITY = HIST_KEEP_COUNT + 1
+
+
+def batch_engine_available() -> bool:
+    """Returns True if the batch engine's dependencies are installed."""
+    return np is not None
+
+
+class BermudaBatchEngine:
+    """
+    Holds the smoothing state for every advert, and smooths them all at once.
+
+    Each BermudaAdvert that is attached to the engine gets a row number, which
+    indexes into each of the arrays below. The adverts still record their raw
+    readings as usual, but also push them into the engine via push_reading(),
+    and skip their own calculate_data() since calculate_adverts() does the work.
+
+    The history buffers are stored as (slot, row) so that each slot is one
+    contiguous vector across all adverts. The calculations then walk the
+    (few) slots in python and handle the (many) adverts in numpy, which is
+    much quicker than numpy's reductions along a short trailing axis.
+
+    The raw readings are ring buffers with a per-row head index pointing at the
+    newest entry, so a new reading is an O(1) write rather than the
+    list.insert(0, ...) shuffle that the scalar path does. New readings are
+    queued as they arrive and written into the buffers in bulk at the start of
+    each calculation, since poking numpy arrays one element at a time is slow.
+    """
+
+    def __init__(self, options) -> None:
+        if np is None:
+            msg = "numpy is required for the Bermuda batch engine"
+            raise RuntimeError(msg)
+        self.max_velocity: float = options.get(CONF_MAX_VELOCITY, DEFAULT_MAX_VELOCITY)
+        self.smoothing_samples: int = max(int(options.get(CONF_SMOOTHING_SAMPLES, DEFAULT_SMOOTHING_SAMPLES)), 1)
+
+        self._rows = 0  # allocated rows
+        self._owners: list[BermudaAdvert | None] = []  # advert attached to each row
+        self._free: list[int] = []  # rows available for re-use
+        # Readings not yet written into the buffers
+        self._pending_rows: list[int] = []
+        self._pending_distance: list[float] = []
+        self._pending_stamp: list[float] = []
+
+        # Raw readings, as pushed from update_advertisement. Ring buffers.
+        self._hist_distance = np.empty((BATCH_HIST_CAPACITY, 0))
+        self._hist_stamp = np.empty((BATCH_HIST_CAPACITY, 0))
+        self._hist_head = np.empty(0, dtype=np.intp)
+        self._hist_len = np.empty(0, dtype=np.intp)
+        # Velocity history, purely for diagnostics / dump_devices. Ring buffer.
+        self._velocity = np.empty((HIST_KEEP_COUNT, 0))
+        self._velocity_head = np.empty(0, dtype=np.intp)
+        self._velocity_len = np.empty(0, dtype=np.intp)
+        # Per-interval smoothing history (hist_distance_by_interval). Every active advert
+        # gets an entry on (almost) every pass, and the moving average needs it in order,
+        # so this one is kept newest-first and shifted instead.
+        self._dbi = np.empty((self.smoothing_samples, 0))
+        self._dbi_len = np.empty(0, dtype=np.intp)
+        # Same-value push counting, see BermudaAdvert.hist_distance_by_interval_run
+        self._dbi_run = np.empty(0, dtype=np.intp)
+        self._dbi_last = np.empty(0)
+        self._area_window = min(AREA_HIST_WINDOW, self.smoothing_samples)
+        # Scalar state. NaN stands in for None.
+        self._stamp = np.empty(0)
+        self._raw = np.empty(0)
+        self._distance = np.empty(0)
+        self._new = np.empty(0, dtype=bool)
+
+        self._grow(BATCH_INITIAL_ROWS)
+
+    @property
+    def attached_count(self) -> int:
+        """Number of adverts currently managed by the engine."""
+        return self._rows - len(self._free)
+
+    def _grow(self, rows: int):
+        """Extend all arrays to hold the given number of rows."""
+        extra = rows - self._rows
+
+        def _pad(arr, fill):
+            shape = (*arr.shape[:-1], extra)
+            return np.concatenate((arr, np.full(shape, fill, dtype=arr.dtype)), axis=-1)
+
+        self._hist_distance = _pad(self._hist_distance, np.nan)
+        self._hist_stamp = _pad(self._hist_stamp, np.nan)
+        self._hist_head = _pad(self._hist_head, 0)
+        self._hist_len = _pad(self._hist_len, 0)
+        self._velocity = _pad(self._velocity, np.nan)
+        self._velocity_head = _pad(self._velocity_head, 0)
+        self._velocity_len = _pad(self._velocity_len, 0)
+        self._dbi = _pad(self._dbi, np.nan)
+        self._dbi_len = _pad(self._dbi_len, 0)
+        self._dbi_run = _pad(self._dbi_run, 0)
+        self._dbi_last = _pad(self._dbi_last, np.nan)
+        self._stamp = _pad(self._stamp, 0)
+        self._raw = _pad(self._raw, np.nan)
+        self._distance = _pad(self._distance, np.nan)
+        self._new = _pad(self._new, False)
+
+        self._owners.extend([None] * extra)
+        # Hand out low rows first, it keeps the active part of the arrays dense.
+        self._free.extend(range(rows - 1, self._rows - 1, -1))
+        self._rows = rows
+
+    def attach(self, advert: BermudaAdvert) -> int:
+        """Allocate a row for the given advert and return its index."""
+        if not self._free:
+            self._grow(self._rows * 2)
+        row = self._free.pop()
+        self._owners[row] = advert
+        self._hist_head[row] = 0
+        self._hist_len[row] = 0
+        self._velocity_head[row] = 0
+        self._velocity_len[row] = 0
+        self._dbi_len[row] = 0
+        self._dbi_run[row] = 0
+        self._stamp[row] = 0
+        self._raw[row] = np.nan
+        self._distance[row] = np.nan
+        self._new[row] = False
+        return row
+
+    def detach(self, row: int):
+        """Release a row so it can be re-used by another advert."""
+        advert = self._owners[row]
+        if advert is not None:
+            self._flush_pending()
+            advert.batch_row = None
+            self._owners[row] = None
+            self._free.append(row)
+
+    def push_reading(self, row: int, distance: float | None, stamp: float):
+        """
+        Record a new raw reading for an advert. Equivalent to the scalar hist inserts.
+
+        Note that we only keep one reading more than HIST_KEEP_COUNT. The scalar path
+        would keep more if an advert received several readings between calculations,
+        but the coordinator always calculates after each gather so that doesn't arise.
+        """
+        self._pending_rows.append(row)
+        self._pending_distance.append(np.nan if distance is None else distance)
+        self._pending_stamp.append(stamp)
+
+    def _flush_pending(self):
+        """Write all queued readings into the ring buffers."""
+        if not self._pending_rows:
+            return
+        rows = np.array(self._pending_rows, dtype=np.intp)
+        distances = np.array(self._pending_distance)
+        stamps = np.array(self._pending_stamp)
+        self._pending_rows.clear()
+        self._pending_distance.clear()
+        self._pending_stamp.clear()
+
+        # An advert might get more than one reading between calculations. Each
+        # push has to land in its own slot, so apply them in rounds of unique rows.
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        first = np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(rows)), 0))
+        rounds = np.empty(len(rows), dtype=np.intp)
+        rounds[order] = np.arange(len(rows)) - group_start
+        for push_round in range(int(rounds.max()) + 1):
+            selected = rounds == push_round
+            p_rows = rows[selected]
+            head = (self._hist_head[p_rows] + 1) % BATCH_HIST_CAPACITY
+            self._hist_head[p_rows] = head
+            self._hist_distance[head, p_rows] = distances[selected]
+            self._hist_stamp[head, p_rows] = stamps[selected]
+            self._hist_len[p_rows] = np.minimum(self._hist_len[p_rows] + 1, BATCH_HIST_CAPACITY)
+
+        # Later readings overwrite earlier ones, which is what we want.
+        self._stamp[rows] = stamps
+        self._raw[rows] = distances
+        self._new[rows] = True
+
+    def override_distance(self, row: int, distance: float):
+        """
+        Apply a between-cycles distance override, such as a ref_power change.
+
+        Mirrors the reading_is_new=False branch of BermudaAdvert._update_raw_distance.
+        """
+        self._flush_pending()
+        self._raw[row] = distance
+        if not np.isnan(self._distance[row]):
+            self._distance[row] = distance
+            if self._hist_len[row] > 0:
+                self._hist_distance[self._hist_head[row], row] = distance
+            if self._dbi_len[row] > 0:
+                self._dbi[0, row] = distance
+                self._dbi_run[row] = 0
+
+    def calculate_adverts(self, devices: Iterable[BermudaDevice], nowstamp: float):
+        """
+        Filter and update distance estimates for every attached advert.
+
+        This replicates BermudaAdvert.calculate_data exactly, including the fact
+        that an advert shared between a source device and its metadevice gets
+        calculated once per device that holds it (the second and later passes
+        see no new stamp, just as they do in the scalar path).
+
+        The smoothed rssi_distance is written back to every advert, but the
+        history lists are only written back for devices we create sensors for,
+        since area selection needs them. Everything else gets its lists synced
+        on demand (see sync_history), as building them all is costly.
+        """
+        self._flush_pending()
+        rows_seen: list[int | None] = []
+        rows_tracked: list[int | None] = []
+        for device in devices:
+            if device.create_sensor:
+                rows_tracked.extend(advert.batch_row for advert in device.adverts.values())
+            else:
+                rows_seen.extend(advert.batch_row for advert in device.adverts.values())
+        rows_seen.extend(rows_tracked)
+        # Adverts released by _sweep have no row, they fall back to the scalar path.
+        if None in rows_seen:
+            rows_seen = [row for row in rows_seen if row is not None]
+            rows_tracked = [row for row in rows_tracked if row is not None]
+
+        multiplicity = np.bincount(np.asarray(rows_seen, dtype=np.intp), minlength=self._rows)
+        seen = multiplicity > 0
+        new = self._new & seen
+        self._new &= ~seen
+
+        area_changed = np.zeros(self._rows, dtype=bool)
+        for calc_pass in range(int(multiplicity.max(initial=0))):
+            area_changed |= self._calculate_pass(multiplicity > calc_pass, new, nowstamp)
+            new = np.zeros_like(new)
+
+        self._write_back(np.flatnonzero(seen), np.unique(np.asarray(rows_tracked, dtype=np.intp)))
+        self._mark_area_dirty(np.flatnonzero(area_changed))
+        self._sweep(seen)
+
+    def _calculate_pass(self, active, new, nowstamp: float):
+        """
+        One vectorised call of calculate_data for each active row.
+
+        Works across all allocated rows with masks rather than gathering the
+        active ones, since whole-array operations are far cheaper than fancy
+        indexing. Inactive and free rows are left untouched.
+
+        Returns a mask of the rows whose area contest inputs changed.
+        """
+        distance = self._distance
+        raw = self._raw
+        old_distance = distance.copy()
+        area_changed = np.zeros(self._rows, dtype=bool)
+
+        arrived = active & new & np.isnan(distance)
+        away = active & ~arrived & ~new & (self._stamp < nowstamp - DISTANCE_TIMEOUT)
+        normal = active & ~(arrived | away)
+
+        # DEVICE HAS ARRIVED! Take the reading as-is and restart smoothing history.
+        distance[arrived] = raw[arrived]
+        fresh = arrived & ~np.isnan(raw)
+        self._dbi[0, fresh] = raw[fresh]
+        self._dbi_len[fresh] = 1
+        self._dbi_run[fresh] = 1
+        self._dbi_last[fresh] = raw[fresh]
+        area_changed |= fresh
+
+        # DEVICE IS AWAY! Clear distance and smoothing history.
+        distance[away] = np.nan
+        area_changed |= away & (self._dbi_len > 0)
+        self._dbi_len[away] = 0
+        self._dbi_run[away] = 0
+
+        if normal.any():
+            rownums = np.arange(self._rows)
+            velocity = self._peak_velocities(rownums)
+            n_rows = rownums[normal]
+            v_head = (self._velocity_head[n_rows] + 1) % HIST_KEEP_COUNT
+            self._velocity_head[n_rows] = v_head
+            self._velocity[v_head, n_rows] = velocity[normal]
+            self._velocity_len[n_rows] = np.minimum(self._velocity_len[n_rows] + 1, HIST_KEEP_COUNT)
+
+            # Discard readings that imply an impossible retreat by repeating the last one.
+            dbi = self._dbi
+            dbi_len = self._dbi_len
+            too_fast = normal & (velocity > self.max_velocity)
+            interval_value = np.where(too_fast & (dbi_len > 0), dbi[0], raw)
+            if too_fast.any() and _LOGGER.isEnabledFor(logging.DEBUG):
+                self._log_too_fast(rownums[too_fast], velocity[too_fast])
+
+            # hist_distance_by_interval is kept newest-first, so pushing is a (masked) shift.
+            dbi[1:] = np.where(normal, dbi[:-1], dbi[1:])
+            dbi[0, normal] = interval_value[normal]
+            dbi_len[normal] = np.minimum(dbi_len[normal] + 1, self.smoothing_samples)
+            # The area contest's window is only unchanged if we keep pushing the same value.
+            same = interval_value == self._dbi_last
+            self._dbi_run[normal] = np.where(same, self._dbi_run + 1, 1)[normal]
+            self._dbi_last[normal] = interval_value[normal]
+            area_changed |= normal & (self._dbi_run <= self._area_window)
+
+            # Calculate a moving-window average, that only includes
+            # historical values if they're "closer" (ie more reliable).
+            # Walking the slots in order and adding as we go keeps the
+            # floating point results identical to the scalar loop. fmin
+            # skips NaNs, just as the scalar loop skips Nones.
+            local_min = np.where(np.isnan(raw), DISTANCE_INFINITE, raw)
+            dist_total = np.zeros(self._rows)
+            movavg = local_min.copy()
+            for slot in range(self.smoothing_samples):
+                local_min = np.fmin(local_min, dbi[slot])
+                dist_total += local_min
+                ends_here = dbi_len == slot + 1
+                movavg[ends_here] = dist_total[ends_here] / (slot + 1)
+            smoothed = np.where(np.isnan(raw) | (movavg < raw), movavg, raw)
+            distance[normal] = smoothed[normal]
+
+        # Trim our history lists
+        self._hist_len[active] = np.minimum(self._hist_len[active], HIST_KEEP_COUNT)
+
+        # NaN never equals itself, so check for a None -> None "change" separately.
+        area_changed |= active & (distance != old_distance) & ~(np.isnan(distance) & np.isnan(old_distance))
+        return area_changed
+
+    def _peak_velocities(self, rownums):
+        """
+        Find the peak velocity of each row's newest reading versus its history.
+
+        Same as the scalar loop: the velocity against the second-newest reading,
+        or if that's not an approach, the fastest retreat against any older one.
+        That peak doesn't depend on the order of the older readings, so we can
+        walk the ring buffers in place.
+        """
+        head = self._hist_head
+        hist_len = self._hist_len
+        newest_distance = self._hist_distance[head, rownums]
+        newest_stamp = self._hist_stamp[head, rownums]
+        second = (head - 1) % BATCH_HIST_CAPACITY
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta_t = newest_stamp - self._hist_stamp[second, rownums]
+            peak = np.where(delta_t > 0, (newest_distance - self._hist_distance[second, rownums]) / delta_t, 0.0)
+            retreating = peak >= 0
+            for age in range(2, BATCH_HIST_CAPACITY):
+                slot = (head - age) % BATCH_HIST_CAPACITY
+                delta_t = newest_stamp - self._hist_stamp[slot, rownums]
+                velocity = (newest_distance - self._hist_distance[slot, rownums]) / delta_t
+                faster = retreating & (hist_len > age) & (delta_t > 0) & (velocity > peak)
+                peak[faster] = velocity[faster]
+
+        # With no history, there's no velocity
+        return np.where(hist_len > 1, peak, 0.0)
+
+    def _log_too_fast(self, rows, velocities):
+        """Log discarded readings for tracked devices, as the scalar path does."""
+        for row, velocity in zip(rows.tolist(), velocities.tolist(), strict=True):
+            advert = self._owners[row]
+            # pylint: disable-next=protected-access
+            if advert is not None and advert._device.create_sensor:  # noqa: SLF001
+                _LOGGER.debug(
+                    "This sparrow %s flies too fast (%2fm/s), ignoring",
+                    advert._device.name,  # noqa: SLF001
+                    velocity,
+                )
+
+    def _write_back(self, rows, rows_tracked):
+        """Copy the results back onto each advert."""
+        owners = self._owners
+        for row, distance in zip(rows.tolist(), self._distance[rows].tolist(), strict=True):
+            advert = owners[row]
+            advert.new_stamp = None
+            advert.rssi_distance = None if distance != distance else distance  # NaN check
+        if len(rows_tracked):
+            self._write_back_history(rows_tracked)
+
+    def _mark_area_dirty(self, rows):
+        """Flag the devices of the given rows' adverts for a fresh area contest."""
+        owners = self._owners
+        for row in rows.tolist():
+            owners[row]._device.area_dirty = True  # noqa: SLF001
+
+    def _write_back_history(self, rows):
+        """Replace the hist_distance_by_interval and hist_velocity lists on the given rows' adverts."""
+        dbi = self._dbi[:, rows].T.tolist()
+        dbi_len = self._dbi_len[rows].tolist()
+        # Unroll the velocity rings into newest-first order
+        v_slots = (self._velocity_head[rows] - np.arange(HIST_KEEP_COUNT)[:, None]) % HIST_KEEP_COUNT
+        velocity = self._velocity[v_slots, rows].T.tolist()
+        velocity_len = self._velocity_len[rows].tolist()
+        for i, row in enumerate(rows.tolist()):
+            advert = self._owners[row]
+            advert.hist_distance_by_interval = dbi[i][: dbi_len[i]]
+            advert.hist_velocity = velocity[i][: velocity_len[i]]
+
+    def sync_history(self, row: int):
+        """Bring an advert's history lists up to date, eg before dumping it."""
+        if self._owners[row] is not None:
+            self._write_back_history(np.asarray([row], dtype=np.intp))
+
+    def _sweep(self, seen):
+        """Release rows whose adverts are no longer held by any device (ie, were pruned)."""
+        for row in np.flatnonzero(~seen).tolist():
+            if self._owners[row] is not None:
+                self.detach(row)
@@ -60,7 +60,7 @@ if TYPE_CHECKING:
     from .coordinator import BermudaDataUpdateCoordinator
 
 
-class BermudaDevice(dict):
+class BermudaDevice:
     """
     This class is to represent a single bluetooth "device" tracked by Bermuda.
 
@@ -70,8 +70,69 @@ class BermudaDevice(dict):
 
     We're not storing this as an Entity because we don't want all devices to
     become entities in homeassistant, since there might be a _lot_ of them.
+    For the same reason the attributes live in __slots__ rather than a
+    per-instance __dict__, so any new attribute needs adding here as well.
     """
 
+    __slots__ = (
+        "name",
+        "name_bt_serviceinfo",
+        "name_bt_local_name",
+        "name_devreg",
+        "name_by_user",
+        "address",
+        "address_ble_mac",
+        "address_wifi_mac",
+        "_coordinator",
+        "ref_power",
+        "ref_power_changed",
+        "options",
+        "unique_id",
+        "address_type",
+        "ar",
+        "fr",
+        "area",
+        "area_id",
+        "area_name",
+        "area_icon",
+        "area_last_seen",
+        "area_last_seen_id",
+        "area_last_seen_icon",
+        "area_distance",
+        "area_rssi",
+        "area_advert",
+        "area_dirty",
+        "area_recheck_stamp",
+        "floor",
+        "floor_id",
+        "floor_name",
+        "floor_icon",
+        "floor_level",
+        "zone",
+        "manufacturer",
+        "_hascanner",
+        "_is_scanner",
+        "_is_remote_scanner",
+        "stamps",
+        "metadevice_type",
+        "metadevice_sources",
+        "beacon_unique_id",
+        "beacon_uuid",
+        "beacon_major",
+        "beacon_minor",
+        "beacon_power",
+        "entry_id",
+        "create_sensor",
+        "create_sensor_done",
+        "create_tracker_done",
+        "create_number_done",
+        "create_button_done",
+        "create_all_done",
+        "last_seen",
+        "diag_area_switch",
+        "adverts",
+    )
+
     def __hash__(self) -> int:
         """A BermudaDevice can be uniquely identified by the address used."""
         return hash(self.address)
@@ -109,6 +170,10 @@ class BermudaDevice(dict):
         self.area_distance: float | None = None  # how far this dev is from that area
         self.area_rssi: float | None = None  # rssi from closest scanner
         self.area_advert: BermudaAdvert | None = None  # currently closest BermudaScanner
+        # Set by our adverts when anything the area contest looks at changes, so that
+        # the coordinator can skip devices whose area result can't have changed.
+        self.area_dirty: bool = True
+        self.area_recheck_stamp: float = 0  # Re-run the area contest after this, even if not dirty.
 
         self.floor: fr.FloorEntry | None = None
         self.floor_id: str | None = None
@@ -211,7 +276,7 @@ class BermudaDevice(dict):
                 elif top_bits & 0b01:  # Addresses where the first char will be 4,5,6 or 7
                     _LOGGER.debug("Identified Resolvable Private (potential IRK source) Address on %s", self.address)
                     self.address_type = BDADDR_TYPE_RANDOM_RESOLVABLE
-                    self._coordinator.irk_manager.check_mac(self.address)
+                    self._coordinator.irk_manager.queue_mac(self.address)
                 elif top_bits & 0b10:
                     self.address_type = "reserved"
                     _LOGGER.debug("Hey, got one of those reserved MACs, %s", self.address)
@@ -557,8 +622,7 @@ class BermudaDevice(dict):
         for this IRK.
         """
         address = mac_norm(service_info.address)
-        if address not in self.metadevice_sources:
-            self.metadevice_sources.insert(0, address)
+        if self._coordinator.add_metadevice_source(self, address):
             _LOGGER.debug("Got %s callback for new IRK address on %s of %s", change, self.name, address)
             # Add the new mac/irk pair to our internal tracker so we don't spend
             # time calculating it on the update. Be wary of causing a loop here, should
@@ -617,6 +681,9 @@ class BermudaDevice(dict):
             # gets applied.
             # if nearest_scanner is not None:
             self.apply_scanner_selection(nearest_scanner)
+            self.area_dirty = True
+            # Our sources take on a metadevice's ref_power in update_metadevices.
+            self._coordinator.metadevice_sources_changed.update(self.metadevice_sources)
             # Update the stamp so that the BermudaEntity can clear the cache and show the
             # new measurement(s) immediately.
             self.ref_power_changed = monotonic_time_coarse()
@@ -738,12 +805,26 @@ class BermudaDevice(dict):
                 advertisementdata,
                 self.options,
                 scanner_device,
+                batch_engine=self._coordinator.batch_engine,
             )
 
         # Let's see if we should update our last_seen based on this...
         if device_advert.stamp is not None and self.last_seen < device_advert.stamp:
             self.last_seen = device_advert.stamp
 
+        if device_address in self._coordinator.metadevice_source_index:
+            # Have update_metadevices pass this on to our metadevice(s).
+            self._coordinator.metadevice_sources_changed.add(device_address)
+
+        if (recorder := self._coordinator.trace_recorder) is not None:
+            recorder.record(
+                scanner_address,
+                device_address,
+                advertisementdata.rssi,
+                device_advert.stamp,
+                advertisementdata.manufacturer_data,
+            )
+
     def process_manufacturer_data(self, advert: BermudaAdvert):
         """Parse manufacturer data for maker name and iBeacon etc."""
         # Only override existing manufacturer name if it's "better"
@@ -809,7 +890,8 @@ class BermudaDevice(dict):
     def to_dict(self):
         """Convert class to serialisable dict for dump_devices."""
         out = {}
-        for var, val in vars(self).items():
+        for var in self.__slots__:
+            val = getattr(self, var)
             if val is None:
                 # Catch the Nones first, as otherwise they might match some other objects below if
                 # they are None (like self._hascanner), which will prevent them showing at all.
@@ -828,6 +910,10 @@ class BermudaDevice(dict):
                     advertout[f"{advert.device_address}__{advert.scanner_address}"] = advert.to_dict()
                 out[var] = advertout
                 continue
+            if isinstance(val, BermudaAdvert):
+                # area_advert, which is also in adverts.
+                out[var] = val.__repr__()
+                continue
             out[var] = val
         return out
 
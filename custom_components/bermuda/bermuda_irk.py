@@ -2,24 +2,39 @@
 
 from __future__ import annotations
 
+import binascii
 from collections.abc import Callable
+from itertools import compress
 from math import floor
+from operator import eq
 from typing import TYPE_CHECKING, NamedTuple
 
 from bleak.backends.device import BLEDevice
-from bluetooth_data_tools import get_cipher_for_irk, monotonic_time_coarse, resolve_private_address
+from bluetooth_data_tools import get_cipher_for_irk, monotonic_time_coarse
 from habluetooth import BluetoothServiceInfoBleak
 from homeassistant.components.bluetooth import BluetoothChange
 from homeassistant.const import MAJOR_VERSION, MINOR_VERSION
 
-from .const import _LOGGER, DOMAIN, PRUNE_TIME_KNOWN_IRK, IrkTypes
+from .const import (
+    _LOGGER,
+    DOMAIN,
+    IRK_MAX_RESOLVED_MACS,
+    IRK_MAX_UNRESOLVED_MACS,
+    PRUNE_TIME_KNOWN_IRK,
+    IrkTypes,
+)
 
 if TYPE_CHECKING:
-    from cryptography.hazmat.primitives.ciphers import Cipher
+    from cryptography.hazmat.primitives.ciphers import Cipher, CipherContext
     from homeassistant.components.bluetooth import BluetoothCallback
 
 type Cancellable = Callable[[], None]
 
+# An RPA's prand is padded out to a full AES block before encrypting.
+_RPA_PADDING = b"\x00" * 13
+# RPAs have 0b01 as their top two bits, so start with one of these.
+_RPA_FIRST_CHARS = "4567"
+
 
 class ResolvableMAC(NamedTuple):
     """Stores a mac address along with its IRK and expiry time."""
@@ -34,12 +49,19 @@ class BermudaIrkManager:
     Manager for IRK resolution in Bermuda.
 
     - add_irk() as each IRK is learned
-    - check_mac() whenever (results are cached)
+    - queue_mac() for each new address, then async_resolve_pending() once per
+      update cycle to check them all in a single pass
+    - check_mac() if a result is needed immediately (results are cached)
     """
 
     def __init__(self) -> None:
         self._irks: dict[bytes, Cipher] = {}
-        self._macs: dict[str, ResolvableMAC] = {}
+        # One long-lived encryptor per IRK. ECB mode encrypts each block on its own,
+        # so a single context can be fed any number of addresses, in one call.
+        self._encryptors: dict[bytes, CipherContext] = {}
+        self._macs: dict[str, ResolvableMAC] = {}  # Resolved MACs, least-recently checked first
+        self._unresolved: dict[str, int] = {}  # Expiry of RPAs that match no known IRK, oldest first
+        self._pending: dict[str, None] = {}  # New MACs waiting for async_resolve_pending()
         self._irk_callbacks: dict[bytes, list[BluetoothCallback]] = {}
 
     def add_irk(self, irk: bytes) -> list[str]:
@@ -48,18 +70,19 @@ class BermudaIrkManager:
         if irk not in self._irks:
             # Save new irk and cipher
             self._irks[irk] = cipher = get_cipher_for_irk(irk)
+            self._encryptors[irk] = encryptor = cipher.encryptor()
             # Check any previously unknown MACs for matches and update them.
+            matches = self._resolve_macs(list(self._unresolved), {irk: encryptor})
+            for address in matches:
+                self._save_match(address, irk)
+            macs.extend(matches)
 
-            macs.extend(
-                macirk.mac
-                for macirk in self._macs.values()
-                if (
-                    macirk.irk in IrkTypes.unresolved()
-                    and self._validate_mac_irk(macirk.mac, irk, cipher) not in IrkTypes.unresolved()
-                )
+            _LOGGER.debug(
+                "New IRK %s... matches %d of %d existing MACs",
+                irk.hex()[:4],
+                len(macs),
+                len(self._macs) + len(self._unresolved),
             )
-
-            _LOGGER.debug("New IRK %s... matches %d of %d existing MACs", irk.hex()[:4], len(macs), len(self._macs))
         return macs
 
     def known_macs(self, resolved=True) -> dict[str, ResolvableMAC]:
@@ -70,9 +93,12 @@ class BermudaIrkManager:
         resolved=False will return all learned MACs.
         """
         if resolved:
-            return {macirk.mac: macirk for macirk in self._macs.values() if macirk.irk not in IrkTypes.unresolved()}
+            return self._macs.copy()
         # otherwise, all of 'em
-        return self._macs.copy()
+        no_match = IrkTypes.NO_KNOWN_IRK_MATCH.value
+        macs = {address: ResolvableMAC(address, expires, no_match) for address, expires in self._unresolved.items()}
+        macs.update(self._macs)
+        return macs
 
     def async_prune(self):
         """
@@ -85,8 +111,15 @@ class BermudaIrkManager:
         expired = [macirk.mac for macirk in self._macs.values() if macirk.expires < nowstamp]
         for address in expired:
             del self._macs[address]
-        expired_count = len(expired)
-        _LOGGER.debug("BermudaIrks expired %d of %d MACs from cache", expired_count, expired_count + len(self._macs))
+        expired_unresolved = [address for address, expires in self._unresolved.items() if expires < nowstamp]
+        for address in expired_unresolved:
+            del self._unresolved[address]
+        expired_count = len(expired) + len(expired_unresolved)
+        _LOGGER.debug(
+            "BermudaIrks expired %d of %d MACs from cache",
+            expired_count,
+            expired_count + len(self._macs) + len(self._unresolved),
+        )
 
     def check_mac(self, address: str) -> bytes:
         """
@@ -95,10 +128,38 @@ class BermudaIrkManager:
         Returns either a known IRK or one of IrkTypes.
         """
         # Already exists?
-        if macirk := self._macs.get(address):
+        if (macirk := self._macs.pop(address, None)) is not None:
+            # Re-insert, so the least recently used are always first in line for eviction.
+            self._macs[address] = macirk
             return macirk.irk
+        if address in self._unresolved:
+            return IrkTypes.NO_KNOWN_IRK_MATCH.value
         # Do the math
-        return self._validate_mac(address)
+        self._pending.pop(address, None)
+        if (irk := self._resolve_new([address]).get(address)) is not None:
+            return irk
+        if int(address[0], 16) & 0x04:
+            return IrkTypes.NO_KNOWN_IRK_MATCH.value
+        return IrkTypes.NOT_RESOLVABLE_ADDRESS.value
+
+    def queue_mac(self, address: str) -> None:
+        """
+        Queue a newly-seen MAC to be checked by the next async_resolve_pending().
+
+        MACs that are already known (either way) cost just the dict lookups.
+        """
+        if address not in self._macs and address not in self._unresolved:
+            self._pending[address] = None
+
+    def async_resolve_pending(self) -> None:
+        """Check all the queued MACs against all known IRKs, in one pass."""
+        if self._pending:
+            addresses = list(self._pending)
+            self._pending.clear()
+            matches = self._resolve_new(addresses)
+            _LOGGER.debug(
+                "Checked %d new MACs against %d IRKs, %d matched", len(addresses), len(self._irks), len(matches)
+            )
 
     def add_macirk(self, address: str, irk: bytes) -> bytes:
         """Insert a new IRK and MAC that have already been validated."""
@@ -113,65 +174,71 @@ class BermudaIrkManager:
             )
         return result
 
-    def _validate_mac(self, address: str) -> bytes:
+    def _resolve_new(self, addresses: list[str]) -> dict[str, bytes]:
         """
-        Validate MAC against all known IRKs.
+        Check new MACs against all known IRKs, and save the results.
 
-        Returns the IRK if found, otherwise an IrkType
+        Returns the {mac: irk} of any that matched.
         """
-        for irk, cipher in self._irks.items():
-            result = self._validate_mac_irk(address, irk, cipher)
-            if result == irk:
-                return irk
-        # Failed to match anything, we should save it so we know.
-        return self._update_saved_mac(address, IrkTypes.NO_KNOWN_IRK_MATCH.value)
-
-    def _validate_mac_irk(self, address: str, irk: bytes, cipher: Cipher | None) -> bytes:
+        matches = self._resolve_macs(addresses, self._encryptors)
+        expiry = floor(monotonic_time_coarse() + PRUNE_TIME_KNOWN_IRK)
+        for address in addresses:
+            if (irk := matches.get(address)) is not None:
+                self._save_match(address, irk)
+            elif address[:1] in _RPA_FIRST_CHARS:
+                # Save it so we know, and so a newly added IRK can check it later.
+                self._unresolved[address] = expiry
+                if len(self._unresolved) > IRK_MAX_UNRESOLVED_MACS:
+                    del self._unresolved[next(iter(self._unresolved))]
+        return matches
+
+    @staticmethod
+    def _resolve_macs(addresses: list[str], encryptors: dict[bytes, CipherContext]) -> dict[str, bytes]:
         """
-        Checks address against a given IRK.
+        Find the first of the given IRKs (if any) that each address resolves with.
 
-        Returns the matching IRK on success, or an IrkType
+        This is the same test as bluetooth_data_tools.resolve_private_address, which
+        encrypts the 24bit prand and compares the low 24 bits with the hash in the
+        address. Since ECB encrypts each 16-byte block on its own, we pack every
+        address's block into one buffer, and each IRK encrypts the lot in one call.
         """
-        if not cipher:
-            cipher = self._irks.get(irk, get_cipher_for_irk(irk))
-            if cipher is None:
-                _LOGGER.error(
-                    "_validate_mac_irk called without prepared cipher for %s %s - this is a bug", address, irk.hex()
-                )
-        if resolve_private_address(cipher, address):
-            _LOGGER.debug(
-                "######======---- Found new valid MAC for irk %s - %s. Sending callbacks", irk.hex()[:4], address
-            )
-            result = self._update_saved_mac(address, irk)
-            if result != irk:
-                _LOGGER.error("Something went wrong saving macirk: %s %s is not irk %s", address, result, irk)
-            self.fire_callbacks(irk, address)
-            return result
-        if int(address[0], 16) & 0x04:
-            _LOGGER.debug("IRK does not resolve %s with %s", address, irk.hex()[:4])
-            return self._update_saved_mac(address, IrkTypes.NO_KNOWN_IRK_MATCH.value)
-        else:
-            return self._update_saved_mac(address, IrkTypes.NOT_RESOLVABLE_ADDRESS.value)
-
-    def _update_saved_mac(self, address: str, irk: bytes) -> bytes:
-        """Save an IRK result against the given MAC."""
-        if (macirk := self._macs.get(address, None)) is None:
-            # No existing, save anew.
+        matches: dict[str, bytes] = {}
+        candidates: list[str] = []
+        hashes: list[bytes] = []
+        plaintext = bytearray()
+        for address in addresses:
+            try:
+                rpa = binascii.unhexlify(address.replace(":", ""))
+            except ValueError:
+                continue
+            if len(rpa) != 6 or rpa[0] & 0xC0 != 0x40:
+                # Not a resolvable private address.
+                continue
+            candidates.append(address)
+            hashes.append(rpa[3:])
+            plaintext += _RPA_PADDING
+            plaintext += rpa[:3]
+
+        if candidates:
+            for irk, encryptor in encryptors.items():
+                ciphertext = encryptor.update(plaintext)
+                tails = [ciphertext[offset : offset + 3] for offset in range(13, len(ciphertext), 16)]
+                for index in compress(range(len(candidates)), map(eq, tails, hashes)):
+                    matches.setdefault(candidates[index], irk)
+        return matches
+
+    def _save_match(self, address: str, irk: bytes):
+        """Save a resolved MAC and fire the callbacks for its IRK."""
+        _LOGGER.debug("######======---- Found new valid MAC for irk %s - %s. Sending callbacks", irk.hex()[:4], address)
+        self._unresolved.pop(address, None)
+        if (macirk := self._macs.pop(address, None)) is None:
             expiry = floor(monotonic_time_coarse() + PRUNE_TIME_KNOWN_IRK)
-            self._macs[address] = ResolvableMAC(address, expiry, irk)
-            _LOGGER.debug("Saved NEW Macirk pair: %s %s", address, irk.hex())
-            return irk
-
-        if macirk.irk != irk:
-            _LOGGER.debug(
-                "RE-saving macirk for mac %s, old irk %s, new irk %s", address, macirk.irk.hex()[:4], irk.hex()[:4]
-            )
-            # Replace the entry with a new macirk.
-            self._macs[address] = ResolvableMAC(address, macirk.expires, irk)
-            return irk
         else:
-            _LOGGER.debug("No change to macirk %s %s", macirk.mac, macirk.irk.hex()[:4])
-            return irk
+            expiry = macirk.expires
+        self._macs[address] = ResolvableMAC(address, expiry, irk)
+        if len(self._macs) > IRK_MAX_RESOLVED_MACS:
+            del self._macs[next(iter(self._macs))]
+        self.fire_callbacks(irk, address)
 
     def fire_callbacks(self, irk, mac) -> None:
         """
@@ -231,15 +298,19 @@ class BermudaIrkManager:
         """Return diagnostic info. Make sure to run redactions over the results."""
         nowstamp = monotonic_time_coarse()
         macs = {}
-        for macirk in self._macs.values():
-            if macirk.irk not in [IrkTypes.ADRESS_NOT_EVALUATED.value, IrkTypes.NOT_RESOLVABLE_ADDRESS.value]:
-                if macirk.irk == IrkTypes.NO_KNOWN_IRK_MATCH.value:
-                    irkout = IrkTypes.NO_KNOWN_IRK_MATCH.name
-                else:
-                    irkout = macirk.irk.hex()
-                macs[macirk.mac] = {"irk": irkout, "expires_in": floor(macirk.expires - nowstamp)}
+        for macirk in self.known_macs(resolved=False).values():
+            if macirk.irk == IrkTypes.NO_KNOWN_IRK_MATCH.value:
+                irkout = IrkTypes.NO_KNOWN_IRK_MATCH.name
+            else:
+                irkout = macirk.irk.hex()
+            macs[macirk.mac] = {"irk": irkout, "expires_in": floor(macirk.expires - nowstamp)}
 
         return {
             "irks": [irk.hex() for irk in self._irks],
             "macs": macs,
+            "cache": {
+                "resolved": len(self._macs),
+                "unresolved": len(self._unresolved),
+                "pending": len(self._pending),
+            },
         }
@@ -0,0 +1,58 @@
+"""
+Rolling timing statistics for the phases of Bermuda's update cycle.
+
+The coordinator records how long each phase of every update takes (gathering
+adverts, metadevices, calculate_data, area selection etc). The last
+UPDATE_TIMING_WINDOW cycles are kept for each phase, and summarised as
+p50 / p95 / max for the diagnostic sensors and the diagnostics download.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+from .const import UPDATE_TIMING_WINDOW
+
+# The timings of the whole update cycle are kept under this name.
+CYCLE_PHASE = "cycle"
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Pick the given percentile (0 to 1) from an already-sorted list."""
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+class BermudaUpdateTimings:
+    """Per-phase histories of update durations, in seconds."""
+
+    def __init__(self, window: int = UPDATE_TIMING_WINDOW) -> None:
+        self.window = window
+        self._phases: dict[str, deque[float]] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Record the latest duration for a phase."""
+        try:
+            self._phases[phase].appendleft(seconds)
+        except KeyError:
+            self._phases[phase] = deque((seconds,), maxlen=self.window)
+
+    def percentile(self, phase: str, fraction: float) -> float | None:
+        """Return the given percentile (0 to 1) of a phase's recent durations, or None if none yet."""
+        history = self._phases.get(phase)
+        if not history:
+            return None
+        return _percentile(sorted(history), fraction)
+
+    def as_dict(self) -> dict[str, dict[str, float]]:
+        """Summarise every phase's recent durations, in milliseconds."""
+        summary = {}
+        for phase, history in self._phases.items():
+            ordered = sorted(history)
+            summary[phase] = {
+                "last_ms": round(history[0] * 1000, 3),
+                "p50_ms": round(_percentile(ordered, 0.5) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+                "cycles": len(ordered),
+            }
+        return summary
@@ -0,0 +1,145 @@
+"""
+Recording of the raw adverts Bermuda processes, for replaying later.
+
+A trace is a compact binary file of every (scanner, address, rssi, stamp,
+manufacturer_data) that reached BermudaDevice.process_advertisement while the
+recorder was running. tools/bermuda_replay.py feeds a trace back through the
+coordinator's update loop (without Home Assistant) so that changes to the
+processing can be timed and compared against the same real-world data.
+
+File layout, all little-endian:
+
+    header: TRACE_MAGIC
+    record: stamp (float64), scanner MAC (6 bytes), device MAC (6 bytes),
+            rssi (int8), number of manufacturer_data entries (uint8),
+            then for each entry: company id (uint16), length (uint8), data.
+
+Only MAC-48 addresses are recorded, anything else (eg the UUIDs macOS uses)
+is counted and skipped.
+"""
+
+from __future__ import annotations
+
+import struct
+from typing import TYPE_CHECKING, NamedTuple
+
+from .const import _LOGGER
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+TRACE_MAGIC: bytes = b"BMTRACE\x01"
+# Stop recording when the (in-memory) trace reaches this size.
+TRACE_MAX_BYTES = 32 * 1024 * 1024
+
+_RECORD = struct.Struct("<d6s6sbB")
+_MANUFACTURER = struct.Struct("<HB")
+
+
+class TraceRecord(NamedTuple):
+    """A single advert, as seen by a scanner."""
+
+    scanner: str
+    address: str
+    rssi: int
+    stamp: float
+    manufacturer_data: dict[int, bytes]
+
+
+def _mac_to_bytes(address: str) -> bytes | None:
+    """Pack a colon-separated MAC-48 address into six bytes, or None if it isn't one."""
+    try:
+        packed = bytes.fromhex(address.replace(":", ""))
+    except ValueError:
+        return None
+    return packed if len(packed) == 6 else None
+
+
+def _bytes_to_mac(packed: bytes) -> str:
+    return ":".join(f"{octet:02x}" for octet in packed)
+
+
+class BermudaTraceRecorder:
+    """
+    Collects adverts into an in-memory trace, to be saved when recording ends.
+
+    record() is called from the event loop for every advert processed, so it
+    only packs the data into a buffer. save() does the file I/O and should be
+    run in the executor.
+    """
+
+    def __init__(self, path: str, max_bytes: int = TRACE_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.records = 0
+        self.skipped = 0
+        self._buffer = bytearray(TRACE_MAGIC)
+        # Adverts that haven't changed since last cycle are not worth recording again.
+        self._last_stamps: dict[tuple[str, str], float] = {}
+
+    @property
+    def full(self) -> bool:
+        """True once the trace has reached max_bytes, and is ignoring new adverts."""
+        return len(self._buffer) >= self.max_bytes
+
+    def record(
+        self,
+        scanner_address: str,
+        device_address: str,
+        rssi: int,
+        stamp: float | None,
+        manufacturer_data: dict[int, bytes],
+    ) -> None:
+        """Add an advert to the trace."""
+        if stamp is None or self.full:
+            return
+        key = (scanner_address, device_address)
+        if self._last_stamps.get(key) == stamp:
+            return
+        scanner_mac = _mac_to_bytes(scanner_address)
+        device_mac = _mac_to_bytes(device_address)
+        if scanner_mac is None or device_mac is None:
+            self.skipped += 1
+            return
+        self._last_stamps[key] = stamp
+
+        buffer = self._buffer
+        buffer += _RECORD.pack(stamp, scanner_mac, device_mac, max(-128, min(127, rssi)), len(manufacturer_data))
+        for company_id, data in manufacturer_data.items():
+            payload = data[:255]
+            buffer += _MANUFACTURER.pack(company_id, len(payload))
+            buffer += payload
+        self.records += 1
+
+    def save(self) -> None:
+        """Write the trace out to self.path. This does blocking I/O."""
+        with open(self.path, "wb") as tracefile:
+            tracefile.write(self._buffer)
+        _LOGGER.info(
+            "Saved advert trace of %d records (%d bytes) to %s. %d adverts with non-MAC addresses were skipped.",
+            self.records,
+            len(self._buffer),
+            self.path,
+            self.skipped,
+        )
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    """Yield the records from a saved trace, in the order they were recorded."""
+    with open(path, "rb") as tracefile:
+        data = tracefile.read()
+    if not data.startswith(TRACE_MAGIC):
+        msg = f"{path} is not a Bermuda advert trace"
+        raise ValueError(msg)
+
+    offset = len(TRACE_MAGIC)
+    while offset < len(data):
+        stamp, scanner_mac, device_mac, rssi, manufacturer_count = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        manufacturer_data = {}
+        for _ in range(manufacturer_count):
+            company_id, length = _MANUFACTURER.unpack_from(data, offset)
+            offset += _MANUFACTURER.size
+            manufacturer_data[company_id] = data[offset : offset + length]
+            offset += length
+        yield TraceRecord(_bytes_to_mac(scanner_mac), _bytes_to_mac(device_mac), rssi, stamp, manufacturer_data)
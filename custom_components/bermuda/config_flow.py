@@ -25,6 +25,7 @@ from .const import (
     ADDR_TYPE_PRIVATE_BLE_DEVICE,
     BDADDR_TYPE_RANDOM_RESOLVABLE,
     CONF_ATTENUATION,
+    CONF_BATCH_ENGINE,
     CONF_DEVICES,
     CONF_DEVTRACK_TIMEOUT,
     CONF_MAX_RADIUS,
@@ -35,13 +36,16 @@ from .const import (
     CONF_SCANNER_INFO,
     CONF_SCANNERS,
     CONF_SMOOTHING_SAMPLES,
+    CONF_UPDATE_BUDGET,
     CONF_UPDATE_INTERVAL,
     DEFAULT_ATTENUATION,
+    DEFAULT_BATCH_ENGINE,
     DEFAULT_DEVTRACK_TIMEOUT,
     DEFAULT_MAX_RADIUS,
     DEFAULT_MAX_VELOCITY,
     DEFAULT_REF_POWER,
     DEFAULT_SMOOTHING_SAMPLES,
+    DEFAULT_UPDATE_BUDGET,
     DEFAULT_UPDATE_INTERVAL,
     DISTANCE_INFINITE,
     DOMAIN,
@@ -229,6 +233,14 @@ class BermudaOptionsFlowHandler(OptionsFlowWithConfigEntry):
                 CONF_REF_POWER,
                 default=self.options.get(CONF_REF_POWER, DEFAULT_REF_POWER),
             ): vol.Coerce(float),
+            vol.Required(
+                CONF_BATCH_ENGINE,
+                default=self.options.get(CONF_BATCH_ENGINE, DEFAULT_BATCH_ENGINE),
+            ): vol.Coerce(bool),
+            vol.Required(
+                CONF_UPDATE_BUDGET,
+                default=self.options.get(CONF_UPDATE_BUDGET, DEFAULT_UPDATE_BUDGET),
+            ): vol.Coerce(int),
         }
 
         return self.async_show_form(step_id="globalopts", data_schema=vol.Schema(data_schema))
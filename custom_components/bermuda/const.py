@@ -70,6 +70,13 @@ DISTANCE_INFINITE = 999  # arbitrary distance for infinite/unknown rssi range
 
 AREA_MAX_AD_AGE: Final = max(DISTANCE_TIMEOUT / 3, UPDATE_INTERVAL * 2)
 # Adverts older than this can not win an area contest.
+AREA_HIST_WINDOW: Final = 5
+# How many of the newest hist_distance_by_interval entries an area contest looks at.
+
+UPDATE_TIMING_WINDOW: Final = 300
+# How many update cycles of phase timings to keep for the p50/p95/max statistics.
+SLOW_UPDATE_TOP_DEVICES: Final = 5
+# How many of the most expensive devices to log when an update goes over budget.
 
 # Beacon-handling constants. Source devices are tracked by MAC-address and are the
 # originators of beacon-like data. We then create a "meta-device" for the beacon's
@@ -138,6 +145,10 @@ PRUNE_TIME_DEFAULT = 86400  # Max age of regular device entries (1day)
 PRUNE_TIME_UNKNOWN_IRK = 240  # Resolvable Private addresses change often, prune regularly.
 # see Bluetooth Core Spec, Vol3, Part C, Appendix A, Table A.1: Defined GAP timers
 PRUNE_TIME_KNOWN_IRK: Final[int] = 16 * 60  # spec "recommends" 15 min max address age. Round up to 16 :-)
+# Caps on the IRK manager's caches of checked MACs. Over the cap, the least-recently
+# checked resolved MACs and the oldest unresolved MACs are dropped first.
+IRK_MAX_RESOLVED_MACS: Final[int] = 1000
+IRK_MAX_UNRESOLVED_MACS: Final[int] = 10000
 
 PRUNE_TIME_REDACTIONS: Final[int] = 10 * 60  # when to discard redaction data
 
@@ -194,6 +205,18 @@ DOCS[CONF_SMOOTHING_SAMPLES] = (
     " make for slower distance increases. 10 or 20 seems good."
 )
 
+CONF_BATCH_ENGINE, DEFAULT_BATCH_ENGINE = "batch_engine", False
+DOCS[CONF_BATCH_ENGINE] = (
+    "Smooth the distances of all adverts in a single vectorised pass (requires numpy)."
+    " Results are identical, but it is much cheaper when tracking many devices."
+)
+
+CONF_UPDATE_BUDGET, DEFAULT_UPDATE_BUDGET = "update_budget", 250
+DOCS[CONF_UPDATE_BUDGET] = (
+    "In milliseconds - if an update cycle takes longer than this, log which phases and"
+    " devices it spent the time on."
+)
+
 # Defaults
 DEFAULT_NAME = DOMAIN
 
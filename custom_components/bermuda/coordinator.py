@@ -2,10 +2,12 @@
 
 from __future__ import annotations
 
+import heapq
 import re
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from time import perf_counter
 from typing import TYPE_CHECKING, cast
 
 import aiofiles
@@ -49,19 +51,25 @@ from homeassistant.helpers.device_registry import (
     EventDeviceRegistryUpdatedData,
 )
 from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.util.dt import get_age, now
 
+from .bermuda_batch import BermudaBatchEngine, batch_engine_available
 from .bermuda_device import BermudaDevice
 from .bermuda_irk import BermudaIrkManager
+from .bermuda_timings import CYCLE_PHASE, BermudaUpdateTimings
+from .bermuda_trace import BermudaTraceRecorder
 from .const import (
     _LOGGER,
     _LOGGER_SPAM_LESS,
     ADDR_TYPE_PRIVATE_BLE_DEVICE,
+    AREA_HIST_WINDOW,
     AREA_MAX_AD_AGE,
     BDADDR_TYPE_NOT_MAC48,
     BDADDR_TYPE_RANDOM_RESOLVABLE,
     CONF_ATTENUATION,
+    CONF_BATCH_ENGINE,
     CONF_DEVICES,
     CONF_DEVTRACK_TIMEOUT,
     CONF_MAX_RADIUS,
@@ -69,13 +77,16 @@ from .const import (
     CONF_REF_POWER,
     CONF_RSSI_OFFSETS,
     CONF_SMOOTHING_SAMPLES,
+    CONF_UPDATE_BUDGET,
     CONF_UPDATE_INTERVAL,
     DEFAULT_ATTENUATION,
+    DEFAULT_BATCH_ENGINE,
     DEFAULT_DEVTRACK_TIMEOUT,
     DEFAULT_MAX_RADIUS,
     DEFAULT_MAX_VELOCITY,
     DEFAULT_REF_POWER,
     DEFAULT_SMOOTHING_SAMPLES,
+    DEFAULT_UPDATE_BUDGET,
     DEFAULT_UPDATE_INTERVAL,
     DOMAIN,
     DOMAIN_PRIVATE_BLE_DEVICE,
@@ -92,6 +103,7 @@ from .const import (
     SAVEOUT_COOLDOWN,
     SIGNAL_DEVICE_NEW,
     SIGNAL_SCANNERS_CHANGED,
+    SLOW_UPDATE_TOP_DEVICES,
     UPDATE_INTERVAL,
 )
 from .util import mac_explode_formats, mac_norm
@@ -203,6 +215,13 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         self.pb_state_sources: dict[str, str | None] = {}
 
         self.metadevices: dict[str, BermudaDevice] = {}
+        # Reverse of each metadevice's metadevice_sources: source MAC -> addresses
+        # of the metadevices (iBeacon ids, IRKs) it feeds. Kept up to date by
+        # add_metadevice_source / remove_metadevice_source and pruning.
+        self.metadevice_source_index: dict[str, set[str]] = {}
+        # Sources with new adverts or links since the last update_metadevices,
+        # which only needs to look at these.
+        self.metadevice_sources_changed: set[str] = set()
 
         self._ad_listener_cancel: Cancellable | None = None
 
@@ -229,6 +248,29 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         # any there for us to track.
         self._do_private_device_init = True
 
+        # Area selection only re-runs the contest for devices whose adverts have
+        # changed since the last cycle (see _refresh_areas_by_min_distance).
+        self._area_refresh_all = True  # Ignore the dirty flags for one cycle
+        self.area_stats: dict[str, int] = {
+            "evaluated": 0,  # devices whose area contest ran last cycle
+            "skipped": 0,  # devices whose area result could not have changed
+            "evaluated_total": 0,
+            "skipped_total": 0,
+        }
+        # Remote scanners only have their new adverts fetched (see _async_gather_advert_data).
+        self.advert_stats: dict[str, int] = {
+            "processed": 0,  # adverts passed to our devices last cycle
+            "skipped": 0,  # adverts already processed in an earlier cycle
+            "processed_total": 0,
+            "skipped_total": 0,
+        }
+        # How long each phase of the last update took, in seconds, and the recent history of each.
+        self.update_timings: dict[str, float] = {}
+        self.update_timing_history = BermudaUpdateTimings()
+
+        # Set while the record_trace service is capturing adverts.
+        self.trace_recorder: BermudaTraceRecorder | None = None
+
         # Listen for changes to the device registry and handle them.
         # Primarily for changes to scanners and Private BLE Devices.
         self.config_entry.async_on_unload(
@@ -247,6 +289,8 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         self.options[CONF_SMOOTHING_SAMPLES] = DEFAULT_SMOOTHING_SAMPLES
         self.options[CONF_UPDATE_INTERVAL] = DEFAULT_UPDATE_INTERVAL
         self.options[CONF_RSSI_OFFSETS] = {}
+        self.options[CONF_BATCH_ENGINE] = DEFAULT_BATCH_ENGINE
+        self.options[CONF_UPDATE_BUDGET] = DEFAULT_UPDATE_BUDGET
 
         if hasattr(entry, "options"):
             # Firstly, on some calls (specifically during reload after settings changes)
@@ -263,9 +307,20 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                     CONF_REF_POWER,
                     CONF_SMOOTHING_SAMPLES,
                     CONF_RSSI_OFFSETS,
+                    CONF_BATCH_ENGINE,
+                    CONF_UPDATE_BUDGET,
                 ):
                     self.options[key] = val
 
+        # Optional vectorised smoothing of all adverts. Options changes cause a reload,
+        # so the engine's copy of max_velocity / smoothing_samples stays current.
+        self.batch_engine: BermudaBatchEngine | None = None
+        if self.options.get(CONF_BATCH_ENGINE):
+            if batch_engine_available():
+                self.batch_engine = BermudaBatchEngine(self.options)
+            else:
+                _LOGGER.warning("Batch engine is enabled but numpy is not installed, using standard calculations")
+
         self.devices: dict[str, BermudaDevice] = {}
         # self.updaters: dict[str, BermudaPBDUCoordinator] = {}
 
@@ -283,6 +338,13 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
             ),
             SupportsResponse.ONLY,
         )
+        hass.services.async_register(
+            DOMAIN,
+            "record_trace",
+            self.service_record_trace,
+            vol.Schema({vol.Optional("duration", default=300): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600))}),
+            SupportsResponse.OPTIONAL,
+        )
 
         # Register for newly discovered / changed BLE devices
         if self.config_entry is not None:
@@ -413,6 +475,9 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
 
         device_id = ev.data.get("device_id")
 
+        # Scanners may have moved areas, so every device's area needs a fresh look.
+        self._area_refresh_all = True
+
         if ev.data["action"] in {"create", "update"}:
             if device_id is None:
                 _LOGGER.error("Received Device Registry create/update without a device_id. ev.data: %s", ev.data)
@@ -645,21 +710,38 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
 
         try:  # so we can still clean up update_in_progress
             nowstamp = monotonic_time_coarse()
+            cycle_start = phase_start = perf_counter()
 
             # The main "get all adverts from the backend" part.
             result_gather_adverts = self._async_gather_advert_data()
 
+            # Check any new private addresses against our IRKs, all in one go.
+            self.irk_manager.async_resolve_pending()
+            phase_start = self._end_update_phase("gather", phase_start)
+
             self.update_metadevices()
+            phase_start = self._end_update_phase("metadevices", phase_start)
 
             # Calculate per-device data
             #
             # Scanner entries have been loaded up with latest data, now we can
-            # process data for all devices over all scanners.
-            for device in self.devices.values():
+            # process data for all devices over all scanners. If the batch engine
+            # is enabled it smooths all the adverts first, and the adverts'
+            # own calculate_data() will skip that work.
+            if self.batch_engine is not None:
+                self.batch_engine.calculate_adverts(self.devices.values(), monotonic_time_coarse())
+            # Each device's time is kept in case this turns out to be a slow cycle.
+            calculated_devices = list(self.devices.values())
+            device_timings: list[float] = []
+            for device in calculated_devices:
                 # Recalculate smoothed distances, last_seen etc
+                device_start = perf_counter()
                 device.calculate_data()
+                device_timings.append(perf_counter() - device_start)
+            phase_start = self._end_update_phase("calculate_data", phase_start)
 
             self._refresh_areas_by_min_distance()
+            phase_start = self._end_update_phase("areas", phase_start)
 
             # We might need to freshen deliberately on first start if no new scanners
             # were discovered in the first scan update. This is likely if nothing has changed
@@ -697,9 +779,15 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                         # Note that the below should be OK thread-wise, debugger indicates this is being
                         # called by _run in events.py, so pretty sure we are "in the event loop".
                         async_dispatcher_send(self.hass, SIGNAL_DEVICE_NEW, address)
+            phase_start = self._end_update_phase("entities", phase_start)
 
             # Device Pruning (only runs periodically)
             self.prune_devices()
+            self._end_update_phase("prune", phase_start)
+
+            self._end_update_phase(CYCLE_PHASE, cycle_start)
+            if self.update_timings[CYCLE_PHASE] * 1000 > self.options[CONF_UPDATE_BUDGET]:
+                self._log_slow_update(calculated_devices, device_timings)
 
         finally:
             # end of async update
@@ -710,6 +798,31 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         self.last_update_success = True
         return result_gather_adverts
 
+    def _end_update_phase(self, phase: str, phase_start: float) -> float:
+        """Record how long an update phase took, and return the start time for the next one."""
+        phase_end = perf_counter()
+        self.update_timings[phase] = phase_end - phase_start
+        self.update_timing_history.add(phase, phase_end - phase_start)
+        return phase_end
+
+    def _log_slow_update(self, devices: list[BermudaDevice], device_timings: list[float]):
+        """Log where the time went in an update cycle that exceeded the configured budget."""
+        phases = ", ".join(
+            f"{phase} {elapsed * 1000:.1f}ms" for phase, elapsed in self.update_timings.items() if phase != CYCLE_PHASE
+        )
+        slowest = heapq.nlargest(
+            SLOW_UPDATE_TOP_DEVICES, zip(device_timings, devices, strict=True), key=lambda pair: pair[0]
+        )
+        _LOGGER_SPAM_LESS.warning(
+            "slow_update",
+            "Update took %.1fms (budget %sms) for %d devices. Phases: %s. Slowest calculate_data: %s",
+            self.update_timings[CYCLE_PHASE] * 1000,
+            self.options[CONF_UPDATE_BUDGET],
+            len(devices),
+            phases,
+            ", ".join(f"{device.name} ({device.address}) {elapsed * 1000:.2f}ms" for elapsed, device in slowest),
+        )
+
     def _async_gather_advert_data(self):
         """Perform the gathering of backend Bluetooth Data and updating scanners and devices."""
         nowstamp = monotonic_time_coarse()
@@ -719,6 +832,9 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         if self._scanner_init_pending:
             self._refresh_scanners(force=True)
 
+        _stamp_cutoff = self.stamp_last_update_started - 3
+        processed = skipped = 0
+
         for ha_scanner in self._hascanners:
             # Create / Get the BermudaDevice for this scanner
             scanner_device = self._get_device(ha_scanner.source)
@@ -743,19 +859,34 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
             scanner_device.async_as_scanner_update(ha_scanner)
 
             # Now go through the scanner's adverts and send them to our device objects.
-            for bledevice, advertisementdata in ha_scanner.discovered_devices_and_advertisement_data.values():
-                if adstamp := scanner_device.async_as_scanner_get_stamp(bledevice.address):
-                    if adstamp < self.stamp_last_update_started - 3:
-                        # skip older adverts that should already have been processed
-                        continue
+            if scanner_device.is_remote_scanner and scanner_device.stamps:
+                # Remote scanners stamp every advert, so we can pick out the ones that are new
+                # since our last update, and only fetch those. Older adverts should already
+                # have been processed.
+                fresh_addresses = [
+                    address for address, adstamp in scanner_device.stamps.items() if adstamp >= _stamp_cutoff
+                ]
+                skipped += len(scanner_device.stamps) - len(fresh_addresses)
+                adverts = filter(None, map(ha_scanner.get_discovered_device_advertisement_data, fresh_addresses))
+            else:
+                # Local adaptors don't provide stamps, so every advert gets processed.
+                adverts = ha_scanner.discovered_devices_and_advertisement_data.values()
+
+            for bledevice, advertisementdata in adverts:
                 if advertisementdata.rssi == -127:
                     # BlueZ is pushing bogus adverts for paired but absent devices.
+                    skipped += 1
                     continue
 
                 device = self._get_or_create_device(bledevice.address)
                 device.process_advertisement(scanner_device, advertisementdata)
+                processed += 1
 
         # end of for ha_scanner loop
+        self.advert_stats["processed"] = processed
+        self.advert_stats["skipped"] = skipped
+        self.advert_stats["processed_total"] += processed
+        self.advert_stats["skipped_total"] += skipped
         return True
 
     def prune_devices(self, force_pruning=False):
@@ -794,7 +925,7 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                 # the spec lifetime but are going stale because they're away for a bit.
                 _first = True
                 for address in metadevice.metadevice_sources:
-                    if _device := self._get_device(address):
+                    if (_device := self._get_device(address)) is not None:
                         if _first or _device.last_seen > stamp_known_irk:
                             # The source has been seen within the spec's limits, keep it.
                             metadevice_source_keepers.add(address)
@@ -862,6 +993,9 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Do nothing else at this level without excluding the keepers first.
 
+        # Stale metadevice sources can be listed by both loops above.
+        prune_list = list(dict.fromkeys(prune_list))
+
         prune_quota_shortfall = len(self.devices) - len(prune_list) - PRUNE_MAX_COUNT
         if prune_quota_shortfall > 0:
             # We need to find more addresses to prune. Perhaps we live
@@ -876,7 +1010,7 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                     "Prune quota short by %d. Pruning %d extra devices (down to age %0.2f seconds)",
                     prune_quota_shortfall,
                     cutoff_index,
-                    nowstamp - sorted_addresses[prune_quota_shortfall - 1][0],
+                    nowstamp - sorted_addresses[cutoff_index - 1][0],
                 )
                 # pylint: disable-next=unused-variable
                 for _stamp, address in sorted_addresses[: prune_quota_shortfall - 1]:
@@ -899,34 +1033,37 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         for device_address in prune_list:
             _LOGGER.debug("Acting on prune list for %s", device_address)
             del self.devices[device_address]
-
-        # Clean out the scanners dicts in metadevices and scanners
-        # (scanners will have entries if they are also beacons, although
-        # their addresses should never get stale, but one day someone will
-        # have a beacon that uses randomised source addresses for some reason.
-        #
-        # Just brute-force all devices, because it was getting a bit hairy
-        # ensuring we hit the right ones, and the cost is fairly low and periodic.
-        for device in self.devices.values():
-            # if (
-            #     device.is_scanner
-            #     or METADEVICE_PRIVATE_BLE_DEVICE in device.metadevice_type
-            #     or METADEVICE_IBEACON_DEVICE in device.metadevice_type
-            # ):
-            # clean out the metadevice_sources field
-            for address in prune_list:
-                if address in device.metadevice_sources:
-                    device.metadevice_sources.remove(address)
-
-            # clean out the device/scanner advert pairs
-            for advert_tuple in list(device.adverts.keys()):
-                if device.adverts[advert_tuple].device_address in prune_list:
+            if (metadevice := self.metadevices.pop(device_address, None)) is not None:
+                # An untracked beacon that has gone quiet. It's set up afresh if it returns.
+                for source_address in list(metadevice.metadevice_sources):
+                    self.remove_metadevice_source(metadevice, source_address)
+
+        # Clean out the pruned sources and their adverts from the metadevices that
+        # they fed, which the source index tells us without visiting every device.
+        # Only metadevices hold adverts from other addresses.
+        for device_address in prune_list:
+            self.metadevice_sources_changed.discard(device_address)
+            for metadevice_address in self.metadevice_source_index.pop(device_address, ()):
+                metadevice = self.metadevices[metadevice_address]
+                if device_address in metadevice.metadevice_sources:
+                    metadevice.metadevice_sources.remove(device_address)
+                for advert_tuple in [key for key in metadevice.adverts if key[0] == device_address]:
                     _LOGGER.debug(
                         "Pruning metadevice advert %s aged %ds",
                         advert_tuple,
-                        nowstamp - device.adverts[advert_tuple].stamp,
+                        nowstamp - metadevice.adverts[advert_tuple].stamp,
                     )
-                    del device.adverts[advert_tuple]
+                    del metadevice.adverts[advert_tuple]
+                    metadevice.area_dirty = True
+
+        # Scanners list their own possible BLE MACs as sources, but those aren't indexed.
+        if prune_list:
+            pruned = set(prune_list)
+            for scanner in self._scanners:
+                if not pruned.isdisjoint(scanner.metadevice_sources):
+                    scanner.metadevice_sources = [
+                        address for address in scanner.metadevice_sources if address not in pruned
+                    ]
 
     def discover_private_ble_metadevices(self):
         """
@@ -1007,8 +1144,7 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                             source_device.metadevice_type.add(METADEVICE_TYPE_PRIVATE_BLE_SOURCE)
 
                             # Add source address. Don't remove anything, as pruning takes care of that.
-                            if pb_source_address not in metadevice.metadevice_sources:
-                                metadevice.metadevice_sources.insert(0, pb_source_address)
+                            self.add_metadevice_source(metadevice, pb_source_address)
 
                             # Update state_sources so we can track when it changes
                             self.pb_state_sources[pb_entity.entity_id] = pb_source_address
@@ -1063,15 +1199,38 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
             # #### EXISTING METADEVICE ####
             # (only do things that might have to change when MAC address cycles etc)
 
-            if source_device.address not in metadevice.metadevice_sources:
+            if self.add_metadevice_source(metadevice, source_device.address):
                 # We have a *new* source device.
-                # insert this device as a known source
-                metadevice.metadevice_sources.insert(0, source_device.address)
-
                 # If we have a new / better name, use that..
                 metadevice.name_bt_serviceinfo = metadevice.name_bt_serviceinfo or source_device.name_bt_serviceinfo
                 metadevice.name_bt_local_name = metadevice.name_bt_local_name or source_device.name_bt_local_name
 
+    def add_metadevice_source(self, metadevice: BermudaDevice, source_address: str) -> bool:
+        """
+        Link a source MAC to a metadevice, as its most recent source.
+
+        Returns False if it was already linked. New links are picked up by the
+        next update_metadevices, even if the source has no new adverts.
+        """
+        linked = self.metadevice_source_index.setdefault(source_address, set())
+        if metadevice.address in linked:
+            return False
+        linked.add(metadevice.address)
+        metadevice.metadevice_sources.insert(0, source_address)
+        self.metadevices.setdefault(metadevice.address, metadevice)
+        self.metadevice_sources_changed.add(source_address)
+        return True
+
+    def remove_metadevice_source(self, metadevice: BermudaDevice, source_address: str):
+        """Unlink a source MAC from a metadevice, leaving its adverts in place."""
+        if source_address in metadevice.metadevice_sources:
+            metadevice.metadevice_sources.remove(source_address)
+        linked = self.metadevice_source_index.get(source_address)
+        if linked is not None:
+            linked.discard(metadevice.address)
+            if not linked:
+                del self.metadevice_source_index[source_address]
+
     def update_metadevices(self):
         """
         Create or update iBeacon, Private_BLE and other meta-devices from
@@ -1080,6 +1239,12 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         This must be run on each update cycle, after the calculations for each source
         device is done, since we will copy their results into the metadevice.
 
+        Only sources that received adverts (or were newly linked) since the last
+        run are visited, found through metadevice_source_index, so the cost follows
+        the advert rate rather than the number of MACs a metadevice has rotated through.
+        The adverts themselves are shared objects, so unchanged sources' adverts in
+        the metadevice are already current.
+
         Area matching and trilateration will be performed *after* this, as they need
         to consider the full collection of sources, not just the ones of a single
         source device.
@@ -1093,28 +1258,22 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         # iBeacon devices should already have their metadevices created, so nothing more to
         # set up for them.
 
-        for metadevice in self.metadevices.values():
-            # Find every known source device and copy their adverts in.
-
-            # Keep track of whether we want to recalculate the name fields at the end.
-            _want_name_update = False
-            _sources_to_remove = []
-
-            for source_address in metadevice.metadevice_sources:
-                # Get the BermudaDevice holding those adverts
-                # TODO: Verify it's OK to not create here. Problem is that if we do create,
-                # it causes a binge/purge cycle during pruning since it has no adverts on it.
-                source_device = self._get_device(source_address)
-                if source_device is None:
-                    # No ads current in the backend for this one. Not an issue, the mac might be old
-                    # or now showing up yet.
-                    # _LOGGER_SPAM_LESS.debug(
-                    #     f"metaNoAdsFor_{metadevice.address}_{source_address}",
-                    #     "Metadevice %s: no adverts for source MAC %s found during update_metadevices",
-                    #     metadevice.__repr__(),
-                    #     source_address,
-                    # )
-                    continue
+        changed_sources = self.metadevice_sources_changed
+        self.metadevice_sources_changed = set()
+
+        for source_address in changed_sources:
+            # Get the BermudaDevice holding those adverts
+            # TODO: Verify it's OK to not create here. Problem is that if we do create,
+            # it causes a binge/purge cycle during pruning since it has no adverts on it.
+            source_device = self._get_device(source_address)
+            if source_device is None:
+                # No ads current in the backend for this one. Not an issue, the mac might be old
+                # or now showing up yet.
+                continue
+
+            # Copy, since severing a source below removes it from the index.
+            for metadevice_address in tuple(self.metadevice_source_index.get(source_address, ())):
+                metadevice = self.metadevices[metadevice_address]
 
                 if (
                     METADEVICE_IBEACON_DEVICE in metadevice.metadevice_type
@@ -1140,13 +1299,14 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                     for key_address, key_scanner in list(metadevice.adverts):
                         if key_address == source_device.address:
                             del metadevice.adverts[(key_address, key_scanner)]
-                    if source_device.address in metadevice.metadevice_sources:
-                        # Remove this source from the list once we're done iterating on it
-                        _sources_to_remove.append(source_device.address)
-                    continue  # to next metadevice_source
+                            metadevice.area_dirty = True
+                    self.remove_metadevice_source(metadevice, source_device.address)
+                    continue  # to next metadevice
 
                 # Copy every ADVERT_TUPLE into our metadevice
                 for advert_tuple in source_device.adverts:
+                    if advert_tuple not in metadevice.adverts:
+                        metadevice.area_dirty = True
                     metadevice.adverts[advert_tuple] = source_device.adverts[advert_tuple]
 
                 # Update last_seen if the source is newer.
@@ -1172,42 +1332,6 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                 if source_device.ref_power != metadevice.ref_power:
                     source_device.set_ref_power(metadevice.ref_power)
 
-                # anything that isn't already set to something interesting, overwrite
-                # it with the new device's data.
-                for key, val in source_device.items():
-                    if val is any(
-                        [
-                            source_device.name_bt_local_name,
-                            source_device.name_bt_serviceinfo,
-                            source_device.manufacturer,
-                        ]
-                    ) and metadevice[key] in [None, False]:
-                        metadevice[key] = val
-                        _want_name_update = True
-
-                if _want_name_update:
-                    metadevice.make_name()
-
-                # Anything that's VERY interesting, overwrite it regardless of what's already there:
-                # INTERESTING:
-                for key, val in source_device.items():
-                    if val is any(
-                        [
-                            source_device.beacon_major,
-                            source_device.beacon_minor,
-                            source_device.beacon_power,
-                            source_device.beacon_unique_id,
-                            source_device.beacon_uuid,
-                        ]
-                    ):
-                        metadevice[key] = val
-                        # _want_name_update = True
-            # Done iterating sources, remove any to be dropped
-            for source in _sources_to_remove:
-                metadevice.metadevice_sources.remove(source)
-            if _want_name_update:
-                metadevice.make_name()
-
     def dt_mono_to_datetime(self, stamp) -> datetime:
         """Given a monotonic timestamp, convert to datetime object."""
         age = monotonic_time_coarse() - stamp
@@ -1230,14 +1354,50 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         return None
 
     def _refresh_areas_by_min_distance(self):
-        """Set area for ALL devices based on closest beacon."""
+        """
+        Set area for ALL devices based on closest beacon.
+
+        The contest only looks at each advert's distance, area, stamp and recent
+        distance history, so a device only needs re-checking if its adverts have
+        flagged it as area_dirty, or an advert is due to go stale (area_recheck_stamp).
+        Metadevices hold their source devices' adverts, so they are dirty if any
+        source is.
+        """
+        nowstamp = monotonic_time_coarse()
+        refresh_all = self._area_refresh_all
+        self._area_refresh_all = False
+
+        dirty_addresses = {device.address for device in self.devices.values() if device.area_dirty}
+        dirty_metadevices = {
+            metadevice_address
+            for address in dirty_addresses.intersection(self.metadevice_source_index)
+            for metadevice_address in self.metadevice_source_index[address]
+        }
+        evaluated = skipped = 0
         for device in self.devices.values():
             if (
                 # device.is_scanner is not True  # exclude scanners.
                 device.create_sensor  # include any devices we are tracking
                 # or device.metadevice_type in METADEVICE_SOURCETYPES  # and any source devices for PBLE, ibeacon etc
             ):
-                self._refresh_area_by_min_distance(device)
+                if (
+                    refresh_all
+                    or device.area_dirty
+                    or nowstamp > device.area_recheck_stamp
+                    or device.address in dirty_metadevices
+                ):
+                    self._refresh_area_by_min_distance(device)
+                    evaluated += 1
+                else:
+                    skipped += 1
+
+        for address in dirty_addresses:
+            self.devices[address].area_dirty = False
+
+        self.area_stats["evaluated"] = evaluated
+        self.area_stats["skipped"] = skipped
+        self.area_stats["evaluated_total"] += evaluated
+        self.area_stats["skipped_total"] += skipped
 
     @dataclass
     class AreaTests:
@@ -1313,6 +1473,9 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         tests = self.AreaTests()
         tests.device = device.name
 
+        # The soonest that one of these adverts goes stale, and might change the result.
+        recheck_stamp = float("inf")
+
         _superchatty = False  # Set to true for very verbose logging about area wins
         # if device.name in ("Ash Pixel IRK", "Garage", "Melinda iPhone"):
         #     _superchatty = True
@@ -1327,6 +1490,9 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
             #
             # Every loop, every test is just a two-way race.
 
+            if nowstamp <= (stale_stamp := advert.stamp + AREA_MAX_AD_AGE) < recheck_stamp:
+                recheck_stamp = stale_stamp
+
             # no competing against ourselves...
             if closest_advert is advert:
                 continue
@@ -1463,7 +1629,7 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
 
             # Win by historical min/max. Confirm available history and sufficient %diff.
             min_seconds = 3
-            max_seconds = 5
+            max_seconds = AREA_HIST_WINDOW
             if len(advert.hist_distance_by_interval) > min_seconds:
                 tests.hist_min_max = (
                     min(closest_advert.hist_distance_by_interval[:max_seconds]),  # Oldest min
@@ -1500,6 +1666,12 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
         if device.area_advert != closest_advert and tests.reason is not None:
             device.diag_area_switch = tests.sensortext()
 
+        if device.area_advert is not closest_advert:
+            # The contest depends on the incumbent, so a change of winner can
+            # lead to a different result next time, even with the same adverts.
+            recheck_stamp = 0
+        device.area_recheck_stamp = recheck_stamp
+
         # Apply the newly-found closest scanner (or apply None if we didn't find one)
         device.apply_scanner_selection(closest_advert)
 
@@ -1534,6 +1706,7 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
 
         _LOGGER.debug("HA Base Scanner Set has changed, rebuilding.")
         self._hascanners = _new_ha_scanners
+        self._area_refresh_all = True
 
         self._async_purge_removed_scanners()
 
@@ -1650,6 +1823,31 @@ class BermudaDataUpdateCoordinator(DataUpdateCoordinator):
                 _LOGGER.debug("Dump devices redaction took %2f seconds", _stamp_redact_elapsed)
         return out
 
+    async def service_record_trace(self, call: ServiceCall) -> ServiceResponse:
+        """
+        Record the adverts we process for the next `duration` seconds to a trace file.
+
+        The trace can be replayed with tools/bermuda_replay.py to benchmark the
+        update loop against real data. Returns the path the trace will be saved to.
+        """
+        if self.trace_recorder is not None:
+            _LOGGER.warning("Already recording an advert trace to %s", self.trace_recorder.path)
+            return {"path": self.trace_recorder.path}
+
+        duration = call.data.get("duration", 300)
+        path = self.hass.config.path(f"bermuda_trace_{now().strftime('%Y%m%d_%H%M%S')}.bin")
+        self.trace_recorder = BermudaTraceRecorder(path)
+        _LOGGER.info("Recording advert trace to %s for %d seconds", path, duration)
+
+        async def _async_finish_trace(_now: datetime) -> None:
+            if (recorder := self.trace_recorder) is not None:
+                self.trace_recorder = None
+                await self.hass.async_add_executor_job(recorder.save)
+
+        # Don't leave the timer behind if the integration is unloaded first.
+        self.config_entry.async_on_unload(async_call_later(self.hass, duration, _async_finish_trace))
+        return {"path": path}
+
     def redaction_list_update(self):
         """
         Freshen or create the list of match/replace pairs that we use to
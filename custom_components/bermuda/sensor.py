@@ -11,10 +11,12 @@ from homeassistant.const import (
     STATE_UNAVAILABLE,
     EntityCategory,
     UnitOfLength,
+    UnitOfTime,
 )
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
+from .bermuda_timings import CYCLE_PHASE
 from .const import (
     _LOGGER,
     ADDR_TYPE_IBEACON,
@@ -142,6 +144,9 @@ async def async_setup_entry(
             BermudaActiveProxyCount(coordinator, entry),
             BermudaTotalDeviceCount(coordinator, entry),
             BermudaVisibleDeviceCount(coordinator, entry),
+            BermudaUpdateTime(coordinator, entry, "p50", 0.5),
+            BermudaUpdateTime(coordinator, entry, "p95", 0.95),
+            BermudaUpdateTime(coordinator, entry, "max", 1.0),
         )
     )
 
@@ -589,3 +594,47 @@ class BermudaVisibleDeviceCount(BermudaGlobalSensor):
     def name(self):
         """Gets the name of the sensor."""
         return "Visible device count"
+
+
+class BermudaUpdateTime(BermudaGlobalSensor):
+    """A percentile of how long Bermuda's recent update cycles have taken."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+
+    def __init__(
+        self,
+        coordinator: BermudaDataUpdateCoordinator,
+        config_entry: BermudaConfigEntry,
+        statistic: str,
+        fraction: float,
+    ) -> None:
+        super().__init__(coordinator, config_entry)
+        self._statistic = statistic
+        self._fraction = fraction
+
+    @property
+    def unique_id(self):
+        """
+        "Uniquely identify this sensor so that it gets stored in the entity_registry,
+        and can be maintained / renamed etc by the user.
+        """
+        return f"BERMUDA_GLOBAL_UPDATE_TIME_{self._statistic.upper()}"
+
+    @property
+    def native_value(self) -> float | None:
+        """Gets the update time percentile, in milliseconds."""
+        seconds = self.coordinator.update_timing_history.percentile(CYCLE_PHASE, self._fraction)
+        return self._cached_ratelimit(None if seconds is None else round(seconds * 1000, 1))
+
+    @property
+    def device_class(self):
+        """Return the device class of the sensor."""
+        return SensorDeviceClass.DURATION
+
+    @property
+    def name(self):
+        """Gets the name of the sensor."""
+        return f"Update time {self._statistic}"
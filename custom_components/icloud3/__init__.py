@@ -24,7 +24,7 @@ from .icloud3_main      import iCloud3
 from .startup           import start_ic3
 from .startup           import config_file
 from .startup           import restore_state
-from .support.service_handler import register_icloud3_services
+from .support.service_handler import register_icloud3_services, register_icloud3_websocket_commands
 from .support           import event_log
 from .support           import hacs_ic3
 
@@ -143,6 +143,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             await config_file.async_load_icloud3_configuration_file()
 
             Gb.EvLog = event_log.EventLog()
+            register_icloud3_websocket_commands()
             await Gb.hass.config_entries.async_forward_entry_setups(Gb.config_entry, ['sensor'])
             Gb.EvLog.display_user_message("Waiting for HA Startup to Finish")
             Gb.EvLog.display_user_message("")
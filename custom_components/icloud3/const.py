@@ -271,8 +271,10 @@ ICLOUD3_ERROR_MSG        = "ICLOUD3 ERROR-SEE EVENT LOG"
 # Event Log variables
 EVENT_RECDS_MAX_CNT_BASE = 1500         # Used to calculate the max recds to store
 EVENT_RECDS_MAX_CNT_ZONE = 2000         # Used to calculate the max recds to store
+EVENT_RECDS_MAX_CNT_MONITOR = 1000      # Max monitor recds kept for each device
 EVENT_LOG_CLEAR_SECS     = 900          # Clear event log data interval
 EVENT_LOG_CLEAR_CNT      = 50           # Number of recds to display when clearing event log
+EVENT_LOG_SENSOR_RECDS_CNT = 100        # Newest recds in the EvLog sensor, the card fetches the rest
 
 EVLOG_URL_LIST           =     {'urlConfig': '',
                                 'urlBuyMeACoffee': '',
@@ -481,7 +481,7 @@ SENSOR_TYPE_RECORDER_EXCLUDE_ATTRS = {
                         'user_message', 'devicename', 'fname', 'fnames', 'filtername',
                         'version_ic3', 'version_evlog', 'versionEvLog',
                         'log_level_debug', 'run_mode', 'evlog_btn_urls',
-                        'name', 'names', 'logs',],
+                        'name', 'names', 'logs', 'revision', 'recd_cnt', 'logs_recd_cnt',],
         'alerts':       ['integration', 'sensor_updated', ICON, FRIENDLY_NAME,
                         'update_time', 'apple_account', 'device', 'general', 'operational', 'startup',
                         ]
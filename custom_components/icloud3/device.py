@@ -53,6 +53,7 @@ from .const             import (DEVICE_TRACKER, DEVICE_TRACKER_DOT, CIRCLE_STAR2
 from .const_sensor      import (SENSOR_LIST_ZONE_NAME, SENSOR_ICONS, )
 from .                  import device_fm_zone
 from .tracking          import determine_interval as det_interval
+from .tracking.device_distances import device_distances
 from .startup           import restore_state
 from .startup           import config_file
 from .utils             import entity_io
@@ -1949,12 +1950,13 @@ class iCloud3_Device(TrackerEntity):
         '''
         update_at_time = secs_to_hhmm(self.loc_data_secs)
         self.dist_to_other_devices_secs = self.loc_data_secs
+        DeviceDistances = device_distances()
 
         for _devicename, _Device in Gb.Devices_by_devicename.items():
             if _Device is self:
                 continue
 
-            dist_apart_m     = _Device.distance_m(self.loc_data_latitude, self.loc_data_longitude)
+            dist_apart_m     = DeviceDistances.distance_m(_Device, self)
             min_gps_accuracy = (min(self.loc_data_gps_accuracy, _Device.loc_data_gps_accuracy))
             gps_msg          = f"±{min_gps_accuracy}" if min_gps_accuracy > Gb.gps_accuracy_threshold else ''
             loc_data_time    = secs_to_hhmm(_Device.loc_data_secs)
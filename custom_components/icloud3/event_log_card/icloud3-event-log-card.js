@@ -14,9 +14,15 @@
 //
 //  v3.1.1 - Fixed problem creating btnConfig url
 //  v3.2.0 - Removed references to v2 -> v3 conversion
+//  v3.2.1 - The sensor only has the newest records, get older ones a page at
+//           a time with the 'icloud3/event_log_recds' websocket command when
+//           the table is scrolled to the bottom
 //
 /////////////////////////////////////////////////////////////////////////////
 
+// Older records fetched each time the event log table is scrolled to the bottom
+const EVLOG_OLDER_RECDS_PAGE_CNT = 100
+
 class iCloud3EventLogCard extends HTMLElement {
 
     constructor() {
@@ -25,7 +31,7 @@ class iCloud3EventLogCard extends HTMLElement {
     }
     //---------------------------------------------------------------------------
     setConfig(config) {
-        const version = "3.2.0"
+        const version = "3.2.1"
         const cardTitle = "iCloud3 v3 - Event Log"
 
         const root = this.shadowRoot
@@ -1209,6 +1215,63 @@ class iCloud3EventLogCard extends HTMLElement {
         }
     }
 
+    //---------------------------------------------------------------------------
+    _fetchOlderEventLogRecds() {
+        /* The event log table has been scrolled to the bottom. Get the next page
+        of older records for the sensor's revision and add them to the end of the
+        table. Nothing is returned if a newer revision has been built, the table
+        is rebuilt from the sensor's newest records when the sensor is updated.
+        */
+
+        const evlogAttrs = this._hass.states['sensor.icloud3_event_log'].attributes
+        const revision   = evlogAttrs['revision']
+        const start      = evlogAttrs['logs_recd_cnt'] + this._olderLogsRecdCnt
+
+        if (this._fetchingOlderLogs
+                || this._olderLogsRevision != revision
+                || start >= evlogAttrs['recd_cnt']) {
+            return
+        }
+        this._fetchingOlderLogs = true
+
+        this._hass.callWS({ type: 'icloud3/event_log_recds', revision: revision,
+                            start: start, count: EVLOG_OLDER_RECDS_PAGE_CNT })
+            .then((result) => {
+                this._fetchingOlderLogs = false
+                if (result.logs == null || this._olderLogsRevision != result.revision) {
+                    return
+                }
+                this._olderLogs = this._joinEventLogRecds(this._olderLogs, result.logs)
+                this._olderLogsRecdCnt += Math.min(EVLOG_OLDER_RECDS_PAGE_CNT, result.recd_cnt - start)
+                this._setupEventLogTable('olderRecds')
+            })
+            .catch((err) => {
+                this._fetchingOlderLogs = false
+            })
+    }
+
+    //---------------------------------------------------------------------------
+    _joinEventLogRecds(logs, olderLogs) {
+        /* Add the older records to the end of the logs string, before its Control
+        Record. Both are strings of '[[time, text], ...]' lists ending with the
+        Control Record.
+        */
+
+        if (logs == '') {
+            return olderLogs
+        }
+        return logs.slice(0, logs.lastIndexOf(', [')) + ', ' + olderLogs.slice(1)
+    }
+
+    //---------------------------------------------------------------------------
+    _evlogBodyScrolled(tblEvlogBody) {
+        /* Get the next page of older records when the table is scrolled to the bottom */
+
+        if (tblEvlogBody.scrollTop + tblEvlogBody.clientHeight >= tblEvlogBody.scrollHeight - 50) {
+            this._fetchOlderEventLogRecds()
+        }
+    }
+
     //---------------------------------------------------------------------------
     _setupEventLogTable(devicenameParm) {
         /* Cycle through the sensor.icloud3_event_log attributes and
@@ -1225,8 +1288,22 @@ class iCloud3EventLogCard extends HTMLElement {
         const title        = root.getElementById('title')
         const versionSentFlag = root.getElementById('versionSentFlag')
 
-        var logs = hass.states['sensor.icloud3_event_log'].attributes['logs']
-        var startedTime = hass.states['sensor.icloud3_event_log'].attributes['started_time']
+        const evlogAttrs = hass.states['sensor.icloud3_event_log'].attributes
+        var logs = evlogAttrs['logs']
+        var startedTime = evlogAttrs['started_time']
+
+        /*
+        The sensor only has the newest records when there are a lot of them. Older
+        ones are fetched a page at a time when the table is scrolled to the bottom
+        and added after them. They are dropped when the revision changes.
+        */
+        if (this._olderLogsRevision != evlogAttrs['revision']) {
+            this._olderLogsRevision = evlogAttrs['revision']
+            this._olderLogs = ''
+            this._olderLogsRecdCnt = 0
+        } else if (this._olderLogsRecdCnt > 0) {
+            logs = this._joinEventLogRecds(logs, this._olderLogs)
+        }
 
         /*
         The Evlog table has been built and displayed but Hass usually calls this routine a
@@ -1621,8 +1698,18 @@ class iCloud3EventLogCard extends HTMLElement {
 
         logTableHTML += ''
         logTableHTML += '</tbody></table></div>'
+
+        // Keep the scroll position when older records were added to the end
+        const prevTblEvlogBody = root.getElementById("tblEvlogBody")
+        const scrollTop = (prevTblEvlogBody) ? prevTblEvlogBody.scrollTop : 0
         tblEvlog.innerHTML = logTableHTML
 
+        const tblEvlogBody = root.getElementById("tblEvlogBody")
+        if (devicenameParm == 'olderRecds') {
+            tblEvlogBody.scrollTop = scrollTop
+        }
+        tblEvlogBody.addEventListener("scroll", event => { this._evlogBodyScrolled(tblEvlogBody); })
+
         this._resize_header_width()
         this._set_evlog_body_height()
 
@@ -123,7 +123,7 @@ class GlobalVariables(object):
     HARootLogger        = None   # HA Root Logger (used in messaging.py during initialization)
     HALogger            = None   # HA Log
     iC3Logger           = None   # iCloud3 Log
-    iC3Logger_last_check_exist_secs = 0
+    iC3LogWriter        = None   # Writes the iCloud3 Log records in its own thread (ic3log_writer.py)
     prestartup_log      = ''     # _log calls made before the IC3Logger is set up will be stored here
 
     iC3EntityPlatform   = None   # iCloud3 Entity Platform (homeassistant.helpers.entity_component)
@@ -270,6 +270,9 @@ class GlobalVariables(object):
     StatZones_to_delete             = []  # Stationary Zone  to delete after the devices that we're in it have  been updated
     StatZones_by_zone               = {}  # Stationary Zone objects by their id number (1-10 --> ic3_#_stationary)
     HomeZone                        = None # Home Zone object
+    ZoneIndex                       = None # Grid of the HA Zones used to select the zone (zone_index.py)
+    zone_index_rebuild_flag         = True # A zone was added, changed or removed, rebuild the ZoneIndex
+    DeviceDistances                 = None # Distance between each pair of Devices (device_distances.py)
 
     # HA device_tracker and sensor entity info
     DeviceTrackers_by_devicename    = {}  # HA device_tracker.[devicename] entity objects
@@ -505,6 +505,10 @@ def ha_startup_completed(dummy_parameter):
 
 def ha_stopping(dummy_parameter):
     post_event("HA Shutting Down")
+    if Gb.WazeHist:
+        Gb.WazeHist.write_usage_cnt_updates()
+    if Gb.iC3LogWriter:
+        Gb.iC3LogWriter.flush()
     Gb.EvLog.display_user_message("HA Shutting Down, Waiting for HA Startup to Finish")
 
 def ha_restart(dummp_parameter):
@@ -683,7 +687,7 @@ def set_waze_conf_parameters():
 
     if Gb.WazeHist:
         if Gb.waze_history_database_used and Gb.WazeHist.connection is None:
-            Gb.WazeHist.open_waze_history_database(Gb.wazehist_database_filename)
+            Gb.WazeHist.open_waze_history_database()
         if Gb.waze_history_database_used is False and Gb.WazeHist.connection:
             Gb.WazeHist.close_waze_history_database()
 
@@ -952,6 +956,8 @@ def create_Zones_object():
         if Gb.initial_icloud3_loading_flag:
             event.async_track_state_added_domain(Gb.hass, 'zone', zone_handler.ha_added_zone_entity_id)
             event.async_track_state_removed_domain(Gb.hass, 'zone', zone_handler.ha_removed_zone_entity_id)
+            event.async_track_state_change_filtered(Gb.hass, event.TrackStates(False, set(), {'zone'}),
+                                                    zone_handler.ha_changed_zone_entity_state)
         if Gb.initial_icloud3_loading_flag is False:
             Gb.hass.services.call(ZONE, "reload")
     except:
@@ -1088,6 +1094,7 @@ def create_Waze_object():
                                 Gb.waze_max_distance,
                                 Gb.waze_realtime,
                                 Gb.waze_region)
+            Gb.WazeHist.close_waze_history_database()
             Gb.WazeHist.__init__(
                                 Gb.waze_history_database_used,
                                 Gb.waze_history_max_distance,
@@ -20,6 +20,7 @@ from ..const                import (HOME, HOME_FNAME, TOWARDS,
                                     NBSP, NBSP2, NBSP3, NBSP4, NBSP5, NBSP6, CLOCK_FACE,
                                     EVENT_RECDS_MAX_CNT_BASE, EVENT_LOG_CLEAR_SECS,
                                     EVENT_LOG_CLEAR_CNT, EVENT_RECDS_MAX_CNT_ZONE, EVLOG_URL_LIST,
+                                    EVENT_LOG_SENSOR_RECDS_CNT,
                                     EVLOG_TIME_RECD, EVLOG_HIGHLIGHT, EVLOG_MONITOR, EVLOG_TRACE,
                                     EVLOG_INIT_HDR, EVLOG_UPDATE_START, EVLOG_UPDATE_END,
                                     EVLOG_ALERT, EVLOG_WARNING, EVLOG_ERROR, EVLOG_NOTICE,
@@ -33,9 +34,11 @@ from ..utils.messaging    import (SP, log_exception, log_info_msg, log_warning_m
                                     filter_special_chars, format_header_box, )
 from ..utils.time_util    import (time_to_12hrtime, datetime_now, time_now_secs, datetime_for_filename,
                                     adjust_time_hour_value, adjust_time_hour_values, )
+from .event_log_recds     import EventLogRecds
 
 
 import time
+from itertools import islice
 import homeassistant.util.dt as dt_util
 
 
@@ -85,7 +88,7 @@ class EventLog(object):
 
     def initialize(self):
         self.display_text_as         = {}
-        self.event_recds             = []   # Device event recds
+        self.event_recds             = EventLogRecds()   # Device event recds
         self.startup_event_save_recd_flag = True
         self.startup_event_recds     = []   # All Event recds during startup
         self.event_recds_max_cnt     = EVENT_RECDS_MAX_CNT_BASE
@@ -123,6 +126,8 @@ class EventLog(object):
                                     )}
 
         self.evlog_sensor_state_value       = ''
+        self.evlog_revision                 = 0     # Changes each time the displayed recds are rebuilt
+        self.evlog_revision_recds           = (0, [])   # (revision, all of the displayed [time, text] recds)
         self.evlog_url_list                 = EVLOG_URL_LIST.copy()
         self.evlog_url_list['urlConfig']    = Gb.evlog_btnconfig_url
 
@@ -148,6 +153,9 @@ class EventLog(object):
                                                 "Browser Refresh is Required"}
         self.evlog_attrs["names"]           = browser_refresh_msg
         self.evlog_attrs["logs"]            = []
+        self.evlog_attrs["revision"]        = self.evlog_revision
+        self.evlog_attrs["recd_cnt"]        = 0
+        self.evlog_attrs["logs_recd_cnt"]   = 0
 
         self.devicename_cnts = {}
 
@@ -270,7 +278,8 @@ class EventLog(object):
         # delete the ^s^ header and throw the current record (^c^ header) away.
         try:
             if (devicename.startswith('*') is False and len(self.event_recds) > 8):
-                in_last_few_recds = [v for v in self.event_recds[:8] \
+                recent_recds = list(reversed(self.event_recds.recent_recds))
+                in_last_few_recds = [v for v in recent_recds \
                                         if (v[ELR_DEVICENAME] == devicename \
                                             and v[ELR_TEXT] == event_text \
                                             and v[ELR_TEXT].startswith(EVLOG_TIME_RECD) is False
@@ -282,11 +291,11 @@ class EventLog(object):
                 # If this is an Update Completed msg
                 if event_text.startswith(EVLOG_UPDATE_END):
                     # Drop previous msg if it was an Update Started msg
-                    for idx in range(0, 8):
-                        if self.event_recds[idx][ELR_TEXT].startswith(EVLOG_UPDATE_START):
-                            self.event_recds[idx].pop()
+                    for recent_recd in recent_recds:
+                        if recent_recd[ELR_TEXT].startswith(EVLOG_UPDATE_START):
+                            recent_recd.pop()
                             return
-                        if self.is_monitor_recd(self.event_recds[idx]) is False:
+                        if self.is_monitor_recd(recent_recd) is False:
                             break
         except Exception as err:
             # log_exception(err)
@@ -559,9 +568,6 @@ class EventLog(object):
     def _add_recd_to_event_recds(self, event_recd):
         """Add the event recd into the event table"""
 
-        if self.event_recds is None:
-            self.event_recds = CONTROL_RECD
-
         try:
             if len(event_recd) != 3:
                 log_warning_msg(f"INVALID EVLOG RECD (SHORT)-{event_recd}")
@@ -570,19 +576,14 @@ class EventLog(object):
                 log_warning_msg(f"INVALID EVLOG RECD (EMPTY TEXT)-{event_recd}")
                 return
 
-            evl_table_recd_cnt = len(self.event_recds)
-            if evl_table_recd_cnt >= self.event_recds_max_cnt:
-                self.devicename_cnts = {}
-                for elr_recd in self.event_recds:
-                    self._update_event_recds_device_cnt(elr_recd)
-
+            if len(self.event_recds) >= self.event_recds_max_cnt:
                 self._shrink_event_recds(500)
 
         except Exception as err:
             log_exception(err)
             pass
 
-        self.event_recds.insert(0, event_recd)
+        self.event_recds.add(event_recd)
 
 #------------------------------------------------------
     def _save_startup_log_recd(self, Device, event_recd):
@@ -612,10 +613,9 @@ class EventLog(object):
 #------------------------------------------------------
     def _shrink_event_recds(self, shrink_cnt):
         '''
-        The table has reached the maximun number of records. Remove 40% of the
-        oldest device records and 60% of the monitor type records. Do not delete
-        '*'/system records unles it contains a '#' since it will be a retry or
-        authentication count recd:
+        The table has reached the maximun number of records. Remove the oldest
+        records, 40% of them device records and 60% monitor type records. If
+        there are not enough monitor records, more device records are removed.
 
         Parameters:
             - shrink_cnt: The total number of records to be deleted.
@@ -626,38 +626,13 @@ class EventLog(object):
 
             keep_nonmonitor_recd_pct = .40
 
-            delete_device_recd_cnt = shrink_cnt * keep_nonmonitor_recd_pct
+            delete_device_recd_cnt = int(shrink_cnt * keep_nonmonitor_recd_pct)
             event_recds_recd_cnt   = len(self.event_recds)
-            event_recds_target_cnt = self.event_recds_max_cnt - shrink_cnt
-            delete_cnt = 0
-            delete_reg_cnt = 0
-            delete_mon_cnt = 0
-            self.devicename_cnts = {}
-
-            # Go from end of table to front
-            for x in range(event_recds_recd_cnt-2, 2, -1):
-                elr_recd     = self.event_recds[x]
-                elr_text = elr_recd[ELR_TEXT]
-
-                # Delete monitor recds or 20% of regular device at end of table
-                if (self.is_monitor_recd(elr_text)
-                        or delete_cnt < delete_device_recd_cnt):
-                    delete_cnt += 1
-                    if self.is_monitor_recd(elr_text):
-                        delete_mon_cnt += 1
-                    else:
-                        delete_reg_cnt += 1
-
-                    del self.event_recds[x]
-                    self._update_event_recds_device_cnt(elr_recd)
 
-                    if delete_cnt >= shrink_cnt:
-                        break
-
-            # If not enough recds were deleted, force deleting some
-            if len(self.event_recds) > event_recds_target_cnt:
-                delete_cnt += len(self.event_recds) - event_recds_target_cnt
-                del self.event_recds[event_recds_target_cnt:]
+            delete_reg_cnt, delete_mon_cnt = \
+                    self.event_recds.shrink(shrink_cnt, delete_device_recd_cnt)
+            delete_cnt = delete_reg_cnt + delete_mon_cnt
+            self.devicename_cnts = self.event_recds.recd_cnts()
 
             if delete_cnt > 0:
                 self.post_event(f"{EVLOG_MONITOR}Event Log Table Size Reduced > "
@@ -671,15 +646,6 @@ class EventLog(object):
             # log_exception(err)
             pass
 
-#------------------------------------------------------
-    def _update_event_recds_device_cnt(self, elr_recd):
-        devicename = elr_recd[ELR_DEVICENAME]
-        recd_type  = 'Mon' if self.is_monitor_recd(elr_recd) else 'Reg'
-        devicename_type = f"{devicename}-{recd_type}"
-        if devicename_type not in self.devicename_cnts:
-            self.devicename_cnts[devicename_type] = 0
-        self.devicename_cnts[devicename_type] += 1
-
 #------------------------------------------------------
     def clear_greenbar_msg(self):
 
@@ -698,7 +664,7 @@ class EventLog(object):
 
         if devicename == '':
             devicename = self.devicename
-        time_text_recds = self._extract_filtered_evlog_recds(devicename)
+        time_text_recds = self._extract_filtered_evlog_recds(devicename, max_recds)
 
         if Gb.display_gps_lat_long_flag is False:
             time_text_recds = [self._apply_gps_filter(el_recd) for el_recd in time_text_recds]
@@ -717,8 +683,27 @@ class EventLog(object):
             alert_recd = ['⚠️', alert_msg]
             time_text_recds.insert(0, alert_recd)
 
-        time_text_recds.append(CONTROL_RECD)
-        time_text_recds_str = str(time_text_recds)
+        # The sensor only carries the newest recds. The EvLog card fetches older ones
+        # a page at a time for this revision with the 'icloud3/event_log_recds'
+        # websocket command when it is scrolled to the bottom
+        self.evlog_revision += 1
+        self.evlog_revision_recds = (self.evlog_revision, time_text_recds)
+        sensor_recds = time_text_recds[0:EVENT_LOG_SENSOR_RECDS_CNT]
+
+        self.evlog_attrs['revision']      = self.evlog_revision
+        self.evlog_attrs['recd_cnt']      = len(time_text_recds)
+        self.evlog_attrs['logs_recd_cnt'] = len(sensor_recds)
+
+        return self._evlog_recds_str(sensor_recds)
+
+#--------------------------------------------------------------------
+    @staticmethod
+    def _evlog_recds_str(time_text_recds):
+        '''
+        Convert the [time, text] recds to the string the EvLog card parses. The
+        card needs the Control Record at the end.
+        '''
+        time_text_recds_str = str(time_text_recds + [CONTROL_RECD])
 
         if Gb.evlog_trk_monitors_flag:
             time_text_recds_str = time_text_recds_str.replace(EVLOG_MONITOR, EVLOG_BLUE)
@@ -726,12 +711,42 @@ class EventLog(object):
         return time_text_recds_str
 
 #--------------------------------------------------------------------
-    def _extract_filtered_evlog_recds(self, devicename):
+    def evlog_recds_page(self, revision=None, start=0, count=None):
+        '''
+        Return the displayed recds for the EvLog card's websocket command.
+
+        Parameters:
+            - revision: The revision in the EvLog sensor the card is displaying.
+                    No recds are returned if the recds have been rebuilt since then.
+            - start, count: The recds to return, newest first (all if count is None)
+
+        Return:
+            {'revision', 'recd_cnt', 'start', 'logs'} - logs is None if the
+                    revision has changed
+        '''
+        # Set together by the iCloud3 thread when the displayed recds are rebuilt
+        evlog_revision, time_text_recds = self.evlog_revision_recds
+
+        page = {'revision': evlog_revision,
+                'recd_cnt': len(time_text_recds),
+                'start': start,
+                'logs': None}
+
+        if revision is not None and revision != evlog_revision:
+            return page
+
+        end = len(time_text_recds) if count is None else start + count
+        page['logs'] = self._evlog_recds_str(time_text_recds[start:end])
+
+        return page
+
+#--------------------------------------------------------------------
+    def _extract_filtered_evlog_recds(self, devicename, max_recds=HIGH_INTEGER):
         '''
         Build the event items attribute for the event log sensor. Each item record
         is [device, time, state, zone, interval, travTime, dist, textMsg]
-        Select the items for the device or '*' and return the string of
-        the resulting list to be passed to the Event Log
+        Select the newest max_recds items for the device or '*' and return the
+        string of the resulting list to be passed to the Event Log
         '''
 
         # The evlog_startup_log_flag is set in the service_handler when Show
@@ -756,18 +771,28 @@ class EventLog(object):
             Device = None
             filter_record = False
 
-        # Select devicename recds, keep time & test elements, drop devicename
+        # Select devicename recds, keep time & test elements, drop devicename. Only the
+        # devicename's recds are read, monitor recds are only needed if they are displayed
         try:
             self.dist_to_devices_recd_found_flag = False
             self.apple_acct_auth_cnts_by_owner   = {}
 
-            el_recds = [self._master_reformat_text(el_recd, Device)
-                                            for el_recd in self.event_recds
-                                            if self._master_filter_recd(el_recd, devicename)]
+            # Only merge as many recds as are needed when there is a limit
+            if max_recds < HIGH_INTEGER:
+                device_recds = self.event_recds.iter_recds(el_devicename_check,
+                                                    monitor_recds=Gb.evlog_trk_monitors_flag)
+            else:
+                device_recds = self.event_recds.recds(el_devicename_check,
+                                                    monitor_recds=Gb.evlog_trk_monitors_flag)
+
+            el_recds = list(islice((self._master_reformat_text(el_recd, Device)
+                                            for el_recd in device_recds
+                                            if self._master_filter_recd(el_recd, devicename)),
+                                    max_recds))
             return el_recds
 
         except IndexError:
-            for el_recd in self.event_recds:
+            for el_recd in self.event_recds.recds(el_devicename_check):
                 if el_recd[ELR_DEVICENAME] not in el_devicename_check:
                     continue
                 elif el_recd[ELR_DEVICENAME] in el_devicename_check:
@@ -928,8 +953,9 @@ class EventLog(object):
             export_recd += (f"Startup Events:\n\n")
             export_recd += hdr_recd
 
-            el_nondevice_recds = [el_recd for el_recd in self.event_recds
-                                    if el_recd[ELR_DEVICENAME].startswith("*")]
+            el_nondevice_recds = self.event_recds.recds(
+                                    [devicename for devicename in self.event_recds.devicenames
+                                        if devicename.startswith("*")])
 
             export_recd += self._export_ic3_event_log_reformat_recds('startup', el_nondevice_recds)
 
@@ -941,9 +967,8 @@ class EventLog(object):
                 export_recd += (f"{Device.fname_devicename}:\n\n")
                 export_recd += hdr_recd
 
-                el_recds = [el_recd for el_recd in self.event_recds
-                                    if (len(el_recd) == 3
-                                        and el_recd[ELR_DEVICENAME] == devicename)]
+                el_recds = [el_recd for el_recd in self.event_recds.recds([devicename])
+                                    if len(el_recd) == 3]
 
                 export_recd += self._export_ic3_event_log_reformat_recds(Device.fname_devicename, el_recds)
 
@@ -0,0 +1,200 @@
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+#
+#   EVENT LOG RECORD TABLE - Stores the Event Log records for EventLog
+#           add - Add a [devicename, time, text] recd
+#           recds - Newest-first recds for one or more devicenames
+#           iter_recds - The same, without building the list
+#           recent_recds - The last few recds added, for duplicate checks
+#           shrink - Delete the oldest monitor and device recds
+#
+#   The recds are kept in a deque for each devicename and recd type (monitor
+#   or regular), along with a sequence number so the newest-first order can be
+#   rebuilt across several devicenames by merging their deques. A queue for
+#   each recd type holds the (seq, devicename) of its recds in the order they
+#   were added, so the oldest recds can be removed without searching the
+#   devicenames. Adding a recd, selecting the recds for one device and
+#   removing the oldest recds only touch the deques involved, never the
+#   whole table.
+#
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+from ..const                import (EVLOG_MONITOR, EVENT_RECDS_MAX_CNT_MONITOR, )
+
+from collections            import deque
+from heapq                  import merge
+from itertools              import islice
+from operator               import itemgetter
+
+ELR_DEVICENAME = 0
+ELR_TEXT = 2
+RECENT_RECDS_CNT = 8
+REG = 'Reg'
+MON = 'Mon'
+
+_by_seq = itemgetter(0)
+
+
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+class EventLogRecds(object):
+    def __init__(self, monitor_max_cnt=EVENT_RECDS_MAX_CNT_MONITOR):
+        self.monitor_max_cnt = monitor_max_cnt  # Max monitor recds kept for each devicename
+
+        # (seq, recd) entries, oldest on the left, by devicename and recd type
+        self.recds_by_devicename = {}           # {devicename: {REG: deque, MON: deque}}
+        # (seq, devicename) of each recd by recd type, oldest on the left. A monitor
+        # recd dropped by its devicename's deque stays here until it is skipped.
+        self.seqs_by_type = {REG: deque(), MON: deque()}
+        self.dropped_mon_cnt = 0
+        self.recent_recds = deque(maxlen=RECENT_RECDS_CNT)  # Last recds added, oldest first
+        self.recd_cnt = 0
+        self._seq = 0
+
+    def __len__(self):
+        return self.recd_cnt
+
+    def __repr__(self):
+        return (f"<EventLogRecds: {self.recd_cnt} recds, {self.recd_cnts()}>")
+
+#------------------------------------------------------
+    @staticmethod
+    def recd_type(recd):
+        return MON if recd[ELR_TEXT].startswith(EVLOG_MONITOR) else REG
+
+#------------------------------------------------------
+    @property
+    def devicenames(self):
+        return list(self.recds_by_devicename)
+
+#------------------------------------------------------
+    def add(self, recd):
+        '''
+        Add a [devicename, time, text] recd. A devicename's oldest monitor recd
+        is dropped when it already has monitor_max_cnt of them.
+        '''
+        recds_by_type = self.recds_by_devicename.get(recd[ELR_DEVICENAME])
+        if recds_by_type is None:
+            recds_by_type = self.recds_by_devicename[recd[ELR_DEVICENAME]] = {
+                                REG: deque(), MON: deque(maxlen=self.monitor_max_cnt)}
+
+        recd_type = self.recd_type(recd)
+        type_recds = recds_by_type[recd_type]
+        if len(type_recds) != type_recds.maxlen:
+            self.recd_cnt += 1
+        else:
+            self.dropped_mon_cnt += 1
+            if self.dropped_mon_cnt > len(self.seqs_by_type[MON]) // 2:
+                self._remove_dropped_mon_seqs()
+
+        self._seq += 1
+        type_recds.append((self._seq, recd))
+        self.seqs_by_type[recd_type].append((self._seq, recd[ELR_DEVICENAME]))
+        self.recent_recds.append(recd)
+
+#------------------------------------------------------
+    def _remove_dropped_mon_seqs(self):
+        '''
+        Remove the monitor recds that were dropped by their devicename's deque
+        from the monitor seq queue
+        '''
+        oldest_seqs = {devicename: recds_by_type[MON][0][0]
+                            for devicename, recds_by_type in self.recds_by_devicename.items()
+                            if recds_by_type[MON]}
+        self.seqs_by_type[MON] = deque(
+                        (seq, devicename)
+                            for seq, devicename in self.seqs_by_type[MON]
+                            if seq >= oldest_seqs.get(devicename, seq + 1))
+        self.dropped_mon_cnt = 0
+
+#------------------------------------------------------
+    def recds(self, devicenames=None, monitor_recds=True, max_cnt=None):
+        '''
+        Return a list of the recds for the devicenames (all if None), newest
+        first. Monitor recds are skipped if monitor_recds is False. Only the
+        newest max_cnt recds are returned if it is given.
+        '''
+        if max_cnt is not None:
+            return list(islice(self.iter_recds(devicenames, monitor_recds), max_cnt))
+
+        # Every recd is wanted, so sort them. The deques are already in order and
+        # the sort merges such runs in C, several times faster than heapq.merge
+        seq_recds = [seq_recd
+                        for type_recds in self._type_recds(devicenames, monitor_recds)
+                        for seq_recd in type_recds]
+        seq_recds.sort(key=_by_seq, reverse=True)
+
+        return [recd for _seq, recd in seq_recds]
+
+#------------------------------------------------------
+    def iter_recds(self, devicenames=None, monitor_recds=True):
+        '''
+        Yield the recds for the devicenames (all if None), newest first. The
+        deques are merged, so only as many recds as are taken are looked at.
+        The table must not be changed until the iteration is finished.
+        '''
+        # The seqs are unique, so the (seq, recd) tuples never compare their recds
+        for _seq, recd in merge(*[reversed(type_recds)
+                                    for type_recds in self._type_recds(devicenames, monitor_recds)],
+                                reverse=True):
+            yield recd
+
+#------------------------------------------------------
+    def _type_recds(self, devicenames, monitor_recds):
+        '''
+        Return the non-empty deques for the devicenames (all if None)
+        '''
+        if devicenames is None:
+            devicenames = self.recds_by_devicename
+
+        recd_types = (REG, MON) if monitor_recds else (REG, )
+        return [type_recds
+                    for devicename in dict.fromkeys(devicenames)
+                    if devicename in self.recds_by_devicename
+                    for recd_type in recd_types
+                    if (type_recds := self.recds_by_devicename[devicename][recd_type])]
+
+#------------------------------------------------------
+    def recd_cnts(self):
+        '''
+        Return the number of recds by 'devicename-Reg' and 'devicename-Mon'
+        '''
+        return {f"{devicename}-{recd_type}": len(type_recds)
+                    for devicename, recds_by_type in self.recds_by_devicename.items()
+                    for recd_type, type_recds in recds_by_type.items()
+                    if type_recds}
+
+#------------------------------------------------------
+    def shrink(self, shrink_cnt, delete_reg_cnt):
+        '''
+        Delete shrink_cnt of the oldest recds. Up to delete_reg_cnt of them are
+        regular recds and the rest are monitor recds. If there are not enough
+        monitor recds, more of the oldest regular recds are deleted.
+
+        Return the number of regular and monitor recds deleted.
+        '''
+        delete_reg_cnt = min(delete_reg_cnt, shrink_cnt)
+        deleted_mon_cnt = self._delete_oldest(shrink_cnt - delete_reg_cnt, MON)
+        deleted_reg_cnt = self._delete_oldest(shrink_cnt - deleted_mon_cnt, REG)
+
+        return deleted_reg_cnt, deleted_mon_cnt
+
+#------------------------------------------------------
+    def _delete_oldest(self, delete_cnt, recd_type):
+        '''
+        Delete the oldest recds of the recd_type, across all devicenames, in the
+        order they were added
+        '''
+        type_seqs = self.seqs_by_type[recd_type]
+
+        deleted_cnt = 0
+        while type_seqs and deleted_cnt < delete_cnt:
+            seq, devicename = type_seqs.popleft()
+            type_recds = self.recds_by_devicename[devicename][recd_type]
+            if type_recds and type_recds[0][0] == seq:
+                type_recds.popleft()
+                deleted_cnt += 1
+            else:
+                # Already dropped when the devicename's monitor deque was full
+                self.dropped_mon_cnt -= 1
+
+        self.recd_cnt -= deleted_cnt
+        return deleted_cnt
@@ -32,6 +32,8 @@ from ..tracking          import determine_interval as det_interval
 import asyncio
 import homeassistant.helpers.config_validation as cv
 from homeassistant          import data_entry_flow
+from homeassistant.components import websocket_api
+from homeassistant.core     import callback
 import voluptuous as vol
 
 #--------------------------------------------------------------------
@@ -258,6 +260,44 @@ def register_icloud3_services():
     except Exception as err:
         log_exception(err)
 
+#--------------------------------------------------------------------
+@callback
+def register_icloud3_websocket_commands():
+    '''
+    Register the iCloud3 websocket commands used by the EvLog card. This must
+    be called from the event loop.
+    '''
+
+    try:
+        websocket_api.async_register_command(Gb.hass, websocket_event_log_recds)
+
+        return True
+
+    except Exception as err:
+        log_exception(err)
+
+#--------------------------------------------------------------------
+@websocket_api.websocket_command({
+        vol.Required('type'): 'icloud3/event_log_recds',
+        vol.Optional('revision'): int,
+        vol.Optional('start', default=0): vol.All(int, vol.Range(min=0)),
+        vol.Optional('count'): vol.All(int, vol.Range(min=1)),
+        })
+@callback
+def websocket_event_log_recds(hass, connection, msg):
+    '''
+    Return the Event Log recds being displayed. The sensor.icloud3_event_log
+    'logs' attribute only has the newest recds, the EvLog card uses this to get
+    a page of older ones for the sensor's 'revision' when it is scrolled to the
+    bottom.
+    '''
+    if Gb.EvLog is None:
+        connection.send_error(msg['id'], 'not_loaded', 'The iCloud3 Event Log is not loaded')
+        return
+
+    connection.send_result(msg['id'],
+            Gb.EvLog.evlog_recds_page(msg.get('revision'), msg['start'], msg.get('count')))
+
 
 #<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 #
@@ -449,7 +489,7 @@ def _handle_global_action(global_action, action_option):
                         f"{CRLF_DOT}SELECT AGAIN TO STOP")
             post_event(event_msg)
             Gb.wazehist_recalculate_time_dist_flag = False
-            Gb.WazeHist.wazehist_recalculate_time_dist_all_zones()
+            Gb.WazeHist.start_maintenance_thread(Gb.WazeHist.wazehist_recalculate_time_dist_all_zones)
 
         else:
             Gb.wazehist_recalculate_time_dist_flag = True
@@ -458,7 +498,7 @@ def _handle_global_action(global_action, action_option):
             post_event(event_msg)
 
     elif global_action == CMD_WAZEHIST_TRACK:
-        Gb.WazeHist.wazehist_update_track_sensor()
+        Gb.WazeHist.start_maintenance_thread(Gb.WazeHist.wazehist_update_track_sensor)
         return
 
     elif global_action == 'event_log_version':
@@ -48,6 +48,7 @@ from ..utils.time_util      import (secs_to_time, format_timer, format_time_age,
                                     datetime_now, time_now, time_now_secs, secs_to_hhmm, secs_to_hhmm, )
 from ..utils.dist_util      import (km_to_mi, km_to_um, format_dist_km,  format_dist_m,
                                     km_to_um, m_to_um, m_to_um_ft, )
+from ..tracking.device_distances import device_distances
 
 
 import homeassistant.util.dt as dt_util
@@ -1390,6 +1391,10 @@ def set_dist_to_devices(post_event_msg=False):
         # dev_group = 0
         # ndg_msg = ''
 
+        # The distances are only recalculated for the Devices that moved
+        DeviceDistances = device_distances()
+        DeviceDistances.update()
+
         for devicename_from, Device_from in Gb.Devices_by_devicename.items():
             dist_to_devices_data = []
 
@@ -1400,7 +1405,7 @@ def set_dist_to_devices(post_event_msg=False):
                             or Device_to.loc_data_secs == 0):
                         continue
 
-                    dist_to_m = Device_from.distance_m(Device_to.loc_data_latitude, Device_to.loc_data_longitude)
+                    dist_to_m = DeviceDistances.distance_m(Device_from, Device_to)
                     # if (dist_to_m <= 50
                     #         and Device_to.near_device_group == 0):
                     #     if Device_from.near_device_group > 0:
@@ -1425,7 +1430,7 @@ def set_dist_to_devices(post_event_msg=False):
             try:
                 # dist_to_devices_data.sort()
                 Device_from.dist_to_devices_data = dist_to_devices_data
-                Device_from.dist_to_devices_secs = Device_from.loc_data_sec
+                Device_from.dist_to_devices_secs = Device_from.loc_data_secs
 
                 if post_event_msg and dist_to_devices_data != []:
                     event_msg =(f"DistTo Devices > "
@@ -1627,6 +1632,7 @@ def set_nearby_devices_group():
             Device.near_device_group = 0
         dev_group = 0
         ndg_msg = ''
+        DeviceDistances = device_distances()
 
         # for Device_from in Gb.Devices:
         #     for dist_to_device_data in Device_from.dist_to_devices_data:
@@ -1641,7 +1647,7 @@ def set_nearby_devices_group():
                         or Device_to.loc_data_secs == 0):
                     continue
 
-                dist_to_m = Device_from.distance_m(Device_to.loc_data_latitude, Device_to.loc_data_longitude)
+                dist_to_m = DeviceDistances.distance_m(Device_from, Device_to)
                 if (dist_to_m > NEAR_DEVICE_DISTANCE
                         or Device_to.near_device_group > 0):
                     # _evlog(f"{Device_from}-{Device_to} {int(dist_to_m)}>{NEAR_DEVICE_DISTANCE}, {Device_to.near_device_group}")
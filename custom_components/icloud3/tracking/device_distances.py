@@ -0,0 +1,121 @@
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+#
+#   DEVICE DISTANCES - The distance between each pair of Devices
+#           update - Recalculate the distances for the Devices that moved
+#           update_device - Recalculate the distances for one Device
+#           distance_m - The distance between two Devices
+#
+#   The distances are saved with the location they were calculated from and are
+#   only recalculated for a Device whose location has changed. Each pair is
+#   calculated once and saved for both Devices. They are used by
+#   Device.update_distance_to_other_devices, set_dist_to_devices and
+#   set_nearby_devices_group instead of each calculating the distance to
+#   every other Device.
+#
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+from ..global_variables import GlobalVariables as Gb
+from ..utils.dist_util  import (gps_distance_m, )
+
+
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+class DeviceDistances(object):
+    def __init__(self):
+        self.gps_by_devicename     = {}     # {devicename: (latitude, longitude) the distances are from}
+        self.dist_m_by_devicename  = {}     # {devicename: {devicename: distance_m}}, both directions
+        self.calc_cnt              = 0      # Number of distances calculated
+
+    def __repr__(self):
+        return (f"<DeviceDistances: {len(self.gps_by_devicename)} devices, {self.calc_cnt} calculated>")
+
+#------------------------------------------------------
+    def update(self):
+        '''
+        Recalculate the distances for the Devices that have moved since they
+        were last calculated, and drop the Devices that no longer exist
+        '''
+        for devicename in [devicename for devicename in self.gps_by_devicename
+                                        if devicename not in Gb.Devices_by_devicename]:
+            self._remove_device(devicename)
+
+        moved_Devices = [Device for devicename, Device in Gb.Devices_by_devicename.items()
+                                if self.gps_by_devicename.get(devicename) != Device.loc_data_gps]
+
+        self._update_devices(moved_Devices)
+
+#------------------------------------------------------
+    def update_device(self, Device):
+        '''
+        Recalculate the distances from the Device to all of the other Devices if
+        it has moved. The other Devices' distances to it are updated too.
+        '''
+        if self.gps_by_devicename.get(Device.devicename) != Device.loc_data_gps:
+            self._update_devices([Device])
+
+#------------------------------------------------------
+    def _update_devices(self, moved_Devices):
+        '''
+        Calculate the distances from the moved Devices to all of the other Devices.
+        A pair of moved Devices is only calculated once.
+        '''
+        for Device in moved_Devices:
+            self.gps_by_devicename[Device.devicename] = Device.loc_data_gps
+
+        updated_devicenames = set()
+        for Device in moved_Devices:
+            devicename = Device.devicename
+            gps = self.gps_by_devicename[devicename]
+            updated_devicenames.add(devicename)
+            dist_m_by_devicename = self.dist_m_by_devicename.setdefault(devicename, {})
+
+            for _devicename, _Device in Gb.Devices_by_devicename.items():
+                if _devicename in updated_devicenames:
+                    continue
+
+                dist_m = self._distance_m(gps, self.gps_by_devicename.get(_devicename, _Device.loc_data_gps))
+
+                dist_m_by_devicename[_devicename] = dist_m
+                self.dist_m_by_devicename.setdefault(_devicename, {})[devicename] = dist_m
+                self.calc_cnt += 1
+
+#------------------------------------------------------
+    def distance_m(self, Device_from, Device_to):
+        '''
+        Return the distance between the Devices, the same as
+        Device_from.distance_m(Device_to.loc_data_latitude, Device_to.loc_data_longitude)
+        '''
+        gps_by_devicename = self.gps_by_devicename
+        if (gps_by_devicename.get(Device_from.devicename) != Device_from.loc_data_gps
+                or gps_by_devicename.get(Device_to.devicename) != Device_to.loc_data_gps):
+            self._update_devices([Device for Device in (Device_from, Device_to)
+                                    if gps_by_devicename.get(Device.devicename) != Device.loc_data_gps])
+
+        try:
+            return self.dist_m_by_devicename[Device_from.devicename][Device_to.devicename]
+
+        except KeyError:
+            # A Device that is not in Gb.Devices_by_devicename
+            return self._distance_m(Device_from.loc_data_gps, Device_to.loc_data_gps)
+
+#------------------------------------------------------
+    def _remove_device(self, devicename):
+        self.gps_by_devicename.pop(devicename, None)
+        for _devicename in self.dist_m_by_devicename.pop(devicename, {}):
+            self.dist_m_by_devicename.get(_devicename, {}).pop(devicename, None)
+
+#------------------------------------------------------
+    @staticmethod
+    def _distance_m(from_gps, to_gps):
+        distance = gps_distance_m(from_gps, to_gps)
+        return 0.0 if distance < .002 else distance
+
+
+#--------------------------------------------------------------------
+def device_distances():
+    '''
+    Return the DeviceDistances used by all Devices, creating it the first time
+    '''
+    if Gb.DeviceDistances is None:
+        Gb.DeviceDistances = DeviceDistances()
+
+    return Gb.DeviceDistances
@@ -9,7 +9,7 @@ from ..utils.messaging  import (broadcast_info_msg, format_filename,
                                 post_greenbar_msg,
                                 refresh_event_log, log_info_msg, log_error_msg, log_exception,
                                 _evlog, _log, )
-from ..utils.time_util  import (datetime_now, format_timer, )
+from ..utils.time_util  import (datetime_now, format_timer, time_now_secs, )
 from ..utils.dist_util  import (mi_to_km, gps_distance_km, format_dist_km,)
 
 from ..tracking.waze_route_calc_ic3 import WazeRouteCalculator, WRCError
@@ -20,6 +20,9 @@ import time
 import sqlite3
 from sqlite3 import Error
 import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import Future
 import homeassistant.util.dt as dt_util
 
 
@@ -106,6 +109,20 @@ CREATE_LOCATIONS_TABLE = '''
         usage_cnt    INTEGER DEFAULT (1)
     );'''
 
+# Index used to get the location record for a lat_long_key and zone_id
+CREATE_LOCATIONS_TABLE_INDEX = '''
+    CREATE INDEX IF NOT EXISTS locations_lat_long_key_zone_id
+        ON locations (lat_long_key, zone_id);'''
+
+# Get the location record for a location, location_key [lat_long_key, zone_id]
+GET_LOCATION_RECORD = '''
+    SELECT * FROM locations
+        WHERE lat_long_key = ?
+            AND zone_id = ?
+        ORDER BY usage_cnt DESC
+        LIMIT 1
+    '''
+
 GET_LOCATIONS_TABLE_RECD_COUNT = '''
     SELECT count(*) FROM locations;
     '''
@@ -119,14 +136,19 @@ ADD_LOCATION_RECORD = '''
     VALUES(?,?,?,?,?,?,?,?,?)
     '''
 
-# Update locations table, location_data [last_used, usage_cnt, id]
+# Update locations table, location_data [last_used, usage_cnt added, id]
 UPDATE_LOCATION_USED = '''
     UPDATE locations
         SET last_used = ? ,
-            usage_cnt = ?
+            usage_cnt = usage_cnt + ?
         WHERE loc_id = ?
     '''
 
+LOCATION_CACHE_SIZE  = 1000     # Number of (zone_id, lat_long_key) lookups kept in memory
+USAGE_CNT_WRITE_SECS = 300      # Write the usage counts that have been updated every 5-mins
+RECALC_PROGRESS_SECS = 30       # Post the recalculate time/dist progress at least every 30-secs
+WORKER_STOP          = None     # Request that stops the database worker thread
+
 # DB Maintenance - Update locations table time & distance
 UPDATE_LOCATION_TIME_DISTANCE = '''
     UPDATE locations
@@ -176,8 +198,11 @@ class WazeRouteHistory(object):
         self.sensor_map_recd_cnt  = 0
         self.track_latitude       = 0
         self.track_longitude      = 0
-        self.last_lat_long_key    = ''   # Last lat:long key read
-        self.last_location_recds  = []   # List of the last recds retrieved for the lat:long
+        self.location_cache       = OrderedDict()   # {(zone_id, lat_long_key): (time, distance, loc_id)}, LRU
+        self.location_cache_hit_cnt  = 0
+        self.location_cache_read_cnt = 0
+        self.usage_cnt_updates    = {}   # {loc_id: [last_used, usage_cnt added]} not written to the db yet
+        self.usage_cnt_write_secs = time_now_secs()
 
         self.track_direction_north_south_flag            = track_direction in ['north-south', 'north_south']
         self.is_refreshing_map_sensor                    = False
@@ -186,7 +211,9 @@ class WazeRouteHistory(object):
 
         self.connection = None
         self.cursor     = None
-        self.lock       = None
+        self.worker_thread      = None  # Thread that does all of the database requests
+        self.request_queue      = None  # Requests for the worker_thread - (fct, args, Future)
+        self.maintenance_lock   = threading.Lock()
 
         post_event(f"Waze History Database > {CRLF_DOT}{format_filename(self.wazehist_database)}")
 
@@ -198,6 +225,99 @@ class WazeRouteHistory(object):
     def is_historydb_USED(self):
         return self.use_wazehist_flag
 
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+#
+#   DATABASE WORKER THREAD
+#
+#   The connection is only used by the worker thread. The other threads put their
+#   requests on the request_queue. _run waits for the result, _submit does not.
+#   Long maintenance tasks run in their own thread (start_maintenance_thread) and
+#   send their sql requests to the worker thread one at a time, so the 5-sec
+#   loop's requests are not held up. Closing the database stops a recalculate
+#   task and waits for the maintenance task to finish.
+#
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+    def _start_worker_thread(self):
+        self.request_queue = queue.Queue()
+        self.worker_thread = threading.Thread(target=self._worker_thread,
+                                                args=(self.request_queue, ),
+                                                name='icloud3_wazehist_db',
+                                                daemon=True)
+        self.worker_thread.start()
+
+#--------------------------------------------------------------------
+    def _stop_worker_thread(self):
+        if self.worker_thread is None: return
+
+        self.request_queue.put(WORKER_STOP)
+        self.worker_thread = None
+        self.request_queue = None
+
+#--------------------------------------------------------------------
+    def _worker_thread(self, request_queue):
+        '''
+        Do the database requests on the request_queue. The usage counts are
+        written every 5-mins when there are no requests.
+        '''
+        while True:
+            try:
+                request = request_queue.get(timeout=USAGE_CNT_WRITE_SECS)
+            except queue.Empty:
+                request = ''
+
+            if request is WORKER_STOP:
+                return
+
+            if request:
+                fct, args, future = request
+                try:
+                    future.set_result(fct(*args))
+                except Exception as err:
+                    future.set_exception(err)
+
+            if time_now_secs() >= self.usage_cnt_write_secs + USAGE_CNT_WRITE_SECS:
+                self._write_usage_cnt_updates()
+
+#--------------------------------------------------------------------
+    def _submit(self, fct, *args):
+        '''
+        Put the request on the worker thread's queue and return its Future
+        '''
+        future = Future()
+        if self.worker_thread is None:
+            future.set_result(fct(*args))
+        else:
+            self.request_queue.put((fct, args, future))
+
+        return future
+
+#--------------------------------------------------------------------
+    def _run(self, fct, *args):
+        '''
+        Run the request in the worker thread and wait for the result
+        '''
+        if self.worker_thread is None or threading.current_thread() is self.worker_thread:
+            return fct(*args)
+
+        return self._submit(fct, *args).result()
+
+#--------------------------------------------------------------------
+    def start_maintenance_thread(self, fct, *args):
+        '''
+        Run a maintenance task (recalculate time/distance, end-of-day maintenance, refresh
+        the map sensor) in it's own thread. Only one runs at a time, the others wait.
+        '''
+        def _maintenance_thread():
+            with self.maintenance_lock:
+                try:
+                    fct(*args)
+                except Exception as err:
+                    log_exception(err)
+
+        threading.Thread(target=_maintenance_thread,
+                            name='icloud3_wazehist_maintenance',
+                            daemon=True).start()
+
 #--------------------------------------------------------------------
     def open_waze_history_database(self):
         """
@@ -209,47 +329,69 @@ class WazeRouteHistory(object):
         """
 
         try:
-            self.lock       = threading.Lock()
-            self.lock.acquire(True)
-            self.connection = sqlite3.connect(self.wazehist_database, check_same_thread=False)
-            self.cursor     = self.connection.cursor()
-            self.lock.release()
+            if self.worker_thread is None:
+                self._start_worker_thread()
+
+            self._run(self._open_connection)
 
             self._sql(CREATE_ZONES_TABLE)
             self._sql(CREATE_LOCATIONS_TABLE)
+            self._sql(CREATE_LOCATIONS_TABLE_INDEX)
 
         except:
             post_internal_error(traceback.format_exc)
             self.connection = None
             self.cursor = None
+            self._stop_worker_thread()
 
         return
 
+    def _open_connection(self):
+        self.connection = sqlite3.connect(self.wazehist_database)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.cursor     = self.connection.cursor()
+
 #--------------------------------------------------------------------
     def close_waze_history_database(self):
         '''
-        Close the Waze History Database
+        Close the Waze History Database. A running recalculate time/distance task is
+        stopped and any other maintenance task is waited for so it does not use the
+        connection after it is closed.
         '''
         if self.connection is None: return
 
-        try:
-            self.lock.acquire(True)
-            self.connection.commit()
-            self.connection.close()
-            self.lock.release()
+        self.wazehist_recalculate_time_dist_abort_flag = True
 
-        except:
-            pass
+        with self.maintenance_lock:
+            self.write_usage_cnt_updates()
 
-        self.connection = None
-        self.cursor = None
+            try:
+                self._run(self._close_connection)
+
+            except:
+                pass
+
+            self.connection = None
+            self.cursor = None
+            self._stop_worker_thread()
+            self.wazehist_recalculate_time_dist_abort_flag = False
+
+    def _close_connection(self):
+        self.connection.commit()
+        self.connection.close()
 
 #--------------------------------------------------------------------
-    def _sql(self, sql, data=None, fetchone=False, fetchall=False):
+    def _sql(self, sql, data=None, fetchone=False, fetchall=False, lastrowid=False):
+        '''
+        Run the sql stmt in the worker thread and return the record(s) selected or
+        the id of the added row
+        '''
+        return self._run(self._execute_sql, sql, data, fetchone, fetchall, lastrowid)
+
+    def _execute_sql(self, sql, data, fetchone, fetchall, lastrowid):
         records = None
         try:
-            self.lock.acquire(True)
-
             if data:
                 self.cursor.execute(sql, data)
             else:
@@ -260,18 +402,34 @@ class WazeRouteHistory(object):
                 records = self.cursor.fetchone()
             elif fetchall:
                 records = self.cursor.fetchall()
-
-            self.lock.release()
+            elif lastrowid:
+                records = self.cursor.lastrowid
 
             return records
 
         except Exception as err:
             log_exception(err)
+
+#--------------------------------------------------------------------
+    def _sql_many(self, sql, data_list):
+        '''
+        Run the sql stmt for each item in the data_list and commit them together.
+        This is only called by the worker thread.
+        '''
+        try:
+            self.cursor.executemany(sql, data_list)
+            self.connection.commit()
+
+        except Exception as err:
+            log_exception(err)
+
 #--------------------------------------------------------------------
     def _execute(self, cursor, sql, fetchone=False, fetchall=False):
+        '''
+        Run the sql stmt using another connection's cursor (compress_wazehist_database)
+        '''
         try:
             records = None
-            self.lock.acquire(True)
             cursor.execute(sql)
 
             if fetchone:
@@ -279,12 +437,9 @@ class WazeRouteHistory(object):
             elif fetchall:
                 records = cursor.fetchall()
 
-            self.lock.release()
-
             return records
 
         except Exception as err:
-            self.lock.release()
             log_exception(err)
 
         return None
@@ -298,13 +453,7 @@ class WazeRouteHistory(object):
         :return     rowid   - id of the added row
         '''
         try:
-            self._sql(sql, data=data)
-            # self.lock.acquire(True)
-            # self.cursor.execute(sql, data)
-            # self.connection.commit()
-            # self.lock.release()
-
-            return self.cursor.lastrowid
+            return self._sql(sql, data=data, lastrowid=True)
 
         except Exception as err:
             log_exception(err)
@@ -332,25 +481,29 @@ class WazeRouteHistory(object):
             # post_internal_error(traceback.format_exc)
             return False
 #--------------------------------------------------------------------
-    def _delete_record(self, table, criteria=''):
+    def _delete_record(self, table, criteria='', data=None):
         '''
-        Select a record from a table
+        Delete records from a table
         :param      sql     - sql statement that will select the record
                     criteria- sql select stmt WHERE clause
+                    data    - values for the ? placeholders in the criteria
         '''
         sql = (f"DELETE FROM {table}")
         if criteria:
             sql += (f" WHERE {criteria}")
 
-        self._sql(sql)
+        self._sql(sql, data=data)
+        self.location_cache = OrderedDict()
 
 #--------------------------------------------------------------------
-    def _get_record(self, table, criteria=''):
+    def _get_record(self, table, criteria='', data=None):
         '''
         Select a record from a table
         :param      sql     - sql statement that will select the record
                     criteria- sql select stmt WHERE clause
-                                ("lat_long_key='27.3023:-80.9738'", "location_id=342")
+                                ("lat_long_key=?", "location_id=?")
+                    data    - values for the ? placeholders in the criteria
+                                (['27.3023:-80.9738'], [342])
         '''
         try:
 
@@ -358,7 +511,7 @@ class WazeRouteHistory(object):
             if criteria:
                 sql += (f" WHERE {criteria}")
 
-            record = self._sql(sql, fetchone=True)
+            record = self._sql(sql, data=data, fetchone=True)
 
             try:
                 if table == 'locations':
@@ -376,6 +529,7 @@ class WazeRouteHistory(object):
                                     f"WazeHistDB > Get Record, "
                                     f"Table-{table}, "
                                     f"Criteria-{criteria}, "
+                                    f"{data or ''}, "
                                     f"{monitor_msg}")
             return record
 
@@ -384,12 +538,14 @@ class WazeRouteHistory(object):
             return []
 
 #--------------------------------------------------------------------
-    def _get_all_records(self, table, criteria='', orderby=''):
+    def _get_all_records(self, table, criteria='', orderby='', data=None):
         '''
-        Select a record from a table
+        Select the records from a table
         :param      sql     - sql statement that will select the record
                     criteria- sql select stmt WHERE clause
-                                ("lat_long_key='27.3023:-80.9738'", "location_id=342")
+                                ("lat_long_key=?", "location_id=?")
+                    data    - values for the ? placeholders in the criteria
+                                (['27.3023:-80.9738'], [342])
         '''
         try:
 
@@ -399,11 +555,12 @@ class WazeRouteHistory(object):
             if orderby:
                 sql += (f"ORDER BY {orderby} ")
 
-            records = self._sql(sql, fetchall=True)
+            records = self._sql(sql, data=data, fetchall=True)
 
             post_monitor_msg(   f"WazeHistDB > Get All Records, "
                                 f"Table-{table}, "
                                 f"Criteria-{criteria}, "
+                                f"{data or ''}, "
                                 f"RecdCnt-{len(records)}")
 
             return records
@@ -428,33 +585,70 @@ class WazeRouteHistory(object):
         if self.connection is None: return
 
         try:
-            zone_id = Gb.wazehist_zone_id.get(from_zone, 0)
-            if (Gb.waze_history_database_used is False
-                    or zone_id == 0
-                    or Gb.waze_history_max_distance == 0):
-                return (0, 0, 0)
+            location_key, time_dist_id = self._cached_location_time_dist(from_zone, latitude, longitude)
+            if time_dist_id:
+                return time_dist_id
 
-            lat_long_key = (f"{latitude:.04f}:{longitude:.04f}")
-            if self.last_lat_long_key != lat_long_key:
-                criteria     = (f" lat_long_key='{lat_long_key}'")
-                orderby      = 'zone_id, usage_cnt DESC'
-                self.last_location_recds = self._get_all_records('locations', criteria=criteria, orderby=orderby)
-
-            if self.last_location_recds == []:
-                self.last_lat_long_key = ''
-                return (0, 0, 0)
+            zone_id, lat_long_key = location_key
+            record = self._sql(GET_LOCATION_RECORD, data=[lat_long_key, zone_id], fetchone=True)
 
-            self.last_lat_long_key = lat_long_key
-            for record in self.last_location_recds:
-                if record[LOC_ZONE_ID] == zone_id:
-                    return (record[LOC_TIME], record[LOC_DIST], record[LOC_ID])
-
-            return (0, 0, 0)
+            return self._cache_location_time_dist(location_key, record)
 
         except:
             post_internal_error(traceback.format_exc)
             return (0, 0, 0)
 
+#--------------------------------------------------------------------
+    def _cached_location_time_dist(self, from_zone, latitude, longitude):
+        '''
+        Return the location_key and the location's (time, distance, loc_id) if it
+        is not used or was looked up recently ((0, 0, 0) if it is not in the db).
+        The time_dist_id is None if the location needs to be read from the db.
+        '''
+        zone_id = Gb.wazehist_zone_id.get(from_zone, 0)
+        if (Gb.waze_history_database_used is False
+                or zone_id == 0
+                or Gb.waze_history_max_distance == 0):
+            return None, (0, 0, 0)
+
+        lat_long_key = (f"{latitude:.04f}:{longitude:.04f}")
+        location_key = (zone_id, lat_long_key)
+
+        # The cache is replaced, not cleared, when records are deleted by a maintenance thread
+        location_cache = self.location_cache
+        time_dist_id = location_cache.get(location_key)
+        if time_dist_id:
+            location_cache.move_to_end(location_key)
+            self.location_cache_hit_cnt += 1
+
+        return location_key, time_dist_id
+
+    def _cache_location_time_dist(self, location_key, record):
+        '''
+        Save the (time, distance, loc_id) of the location record read from the db
+        '''
+        self.location_cache_read_cnt += 1
+        if record:
+            time_dist_id = (record[LOC_TIME], record[LOC_DIST], record[LOC_ID])
+        else:
+            time_dist_id = (0, 0, 0)
+
+        location_cache = self.location_cache
+        location_cache[location_key] = time_dist_id
+        if len(location_cache) > LOCATION_CACHE_SIZE:
+            location_cache.popitem(last=False)
+
+        if self.wazehist_recalculate_time_dist_running_flag is False:
+            post_monitor_msg(   Gb.devicename,
+                                f"WazeHistDB > Get Location, "
+                                f"Zone-{location_key[0]}, "
+                                f"LocationKey-{location_key[1]}, "
+                                f"Time-{time_dist_id[0]}, "
+                                f"Dist-{time_dist_id[1]}, "
+                                f"recdId-{time_dist_id[2]}")
+
+        return time_dist_id
+
 #--------------------------------------------------------------------
     def add_location_record(self, zone_id, latitude, longitude, time, distance):
 
@@ -472,6 +666,7 @@ class WazeRouteHistory(object):
                                 time, distance, datetime, datetime, 1]
 
             location_id = self._add_record(ADD_LOCATION_RECORD, location_data)
+            self.location_cache.pop((zone_id, lat_long_key), None)
 
             self._update_sensor_ic3_wazehist_track(latitude, longitude)
 
@@ -484,7 +679,9 @@ class WazeRouteHistory(object):
 #--------------------------------------------------------------------
     def update_usage_cnt(self, location_id):
         '''
-        Update the location record's last_used date & update the usage counter
+        Update the location record's last_used date & update the usage counter.
+        The updates are saved by the worker thread and written to the db together
+        every 5-minutes.
         '''
 
         if self.connection is None: return
@@ -493,41 +690,52 @@ class WazeRouteHistory(object):
             if location_id < 1:
                 return
 
-            sql = (f"SELECT * FROM locations WHERE loc_id={location_id}")
-
-
-            record = self._sql(sql, fetchone=True)
-            # self.lock.acquire(True)
-            # self.cursor.execute(sql)
-            # record = self.cursor.fetchone()
-            # self.lock.release()
-
-            cnt = record[LOC_USAGE_CNT] + 1
-            usage_data = [datetime_now(), cnt, location_id]
-
-            self._update_record(UPDATE_LOCATION_USED, usage_data)
-
-            record = self._sql(sql, fetchone=True)
-            # self.lock.acquire(True)
-            # self.cursor.execute(sql)
-            # record = self.cursor.fetchone()
-            # self.lock.release()
+            self._submit(self._save_usage_cnt_update, location_id, datetime_now())
 
             if self.wazehist_recalculate_time_dist_running_flag is False:
                 post_monitor_msg(   Gb.devicename,
                                     f"WazeHistDB > Update Usage Cnt, "
-                                    f"recdId={location_id}, "
-                                    f"Zone-{record[LOC_ZONE_ID]}, "
-                                    f"Time-{record[LOC_TIME]}, "
-                                    f"Dist-{record[LOC_DIST]}, "
-                                    f"Cnt-{cnt}")
+                                    f"recdId={location_id}")
 
         except:
             post_internal_error(traceback.format_exc)
 
+    def _save_usage_cnt_update(self, location_id, last_used):
+        usage_cnt_update = self.usage_cnt_updates.setdefault(location_id, [None, 0])
+        usage_cnt_update[0] = last_used
+        usage_cnt_update[1] += 1
+
+#--------------------------------------------------------------------
+    def write_usage_cnt_updates(self):
+        '''
+        Write the last_used date & usage counter updates saved by update_usage_cnt
+        '''
+        if self.connection is None: return
+
+        self._run(self._write_usage_cnt_updates)
+
+    def _write_usage_cnt_updates(self):
+        self.usage_cnt_write_secs = time_now_secs()
+
+        if self.connection is None or self.usage_cnt_updates == {}:
+            return
+
+        usage_data_list = [[last_used, usage_cnt_added, location_id]
+                                for location_id, (last_used, usage_cnt_added) in self.usage_cnt_updates.items()]
+        self.usage_cnt_updates = {}
+
+        self._sql_many(UPDATE_LOCATION_USED, usage_data_list)
+
+        if self.wazehist_recalculate_time_dist_running_flag is False:
+            post_monitor_msg(   f"WazeHistDB > Write Usage Cnts, "
+                                f"RecdCnt-{len(usage_data_list)}")
+
 #--------------------------------------------------------------------
     def compress_wazehist_database(self):
-        """ Compress the WazeHist Database """
+        """
+        Compress the WazeHist Database. This runs in the maintenance thread using
+        it's own connection, the worker thread can still read the db (WAL mode).
+        """
 
         if self.connection is None: return
 
@@ -544,6 +752,7 @@ class WazeRouteHistory(object):
                 post_event(f"Waze History Database > Deleted Duplicate Recds, Count-{len(records)}")
 
                 self._execute(vac_cursor, DUPLICATE_LOCATION_RECDS_DELETE)
+                self.location_cache = OrderedDict()
 
             self._execute(vac_cursor, "VACUUM;")
             vac_conn.commit()
@@ -568,9 +777,19 @@ class WazeRouteHistory(object):
 #
 #<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
     def end_of_day_maintenance(self):
+        '''
+        Run the end-of-day maintenance in a maintenance thread so the 5-sec loop
+        is not held up while it runs
+        '''
+        self.start_maintenance_thread(self._end_of_day_maintenance)
+
+    def _end_of_day_maintenance(self):
         try:
             waze_process = ''
 
+            waze_process = 'Write Usage Counts'
+            self.write_usage_cnt_updates()
+
             waze_process = 'Delete Invalid Records'
             self.wazehist_delete_invalid_records()
 
@@ -611,8 +830,7 @@ class WazeRouteHistory(object):
             Gb.wazehist_zone_id = {}
 
             for from_zone, Zone in Gb.TrackedZones_by_zone.items():
-                criteria = f"entity_id='{Zone.zone_entity_id}'"
-                zone_recd = self._get_record('zones', criteria)
+                zone_recd = self._get_record('zones', 'entity_id=?', data=[Zone.zone_entity_id])
 
                 if zone_recd is None:
                     # Add new Tracked From Zone record
@@ -635,8 +853,7 @@ class WazeRouteHistory(object):
 
                 Gb.wazehist_zone_id[from_zone] = zone_recd[ZON_ID]
 
-                criteria  = f"zone_id='{zone_recd[ZON_ID]}'"
-                loc_recds = self._get_all_records('locations', criteria=criteria)
+                loc_recds = self._get_all_records('locations', criteria='zone_id=?', data=[zone_recd[ZON_ID]])
 
                 # If the zone location was changed by more than 100m, all waze distances/times
                 # need to be updated to the new location during the midnight maintenance check
@@ -766,9 +983,8 @@ class WazeRouteHistory(object):
         '''
 
         '''
-        criteria = (f"zone_id={abs(zone_id)}")
         orderby  = "lat_long_key"
-        records  = self._get_all_records('locations', criteria=criteria, orderby=orderby)
+        records  = self._get_all_records('locations', criteria='zone_id=?', orderby=orderby, data=[abs(zone_id)])
 
         self.total_recd_cnt = len(records)
         event_msg =(f"{EVLOG_NOTICE}Waze History > Recalculate Time/Distance Started, "
@@ -784,6 +1000,7 @@ class WazeRouteHistory(object):
         last_recd_lat_long_key = ''
         last_recd_loc_id       = 0
         start_time = time.perf_counter()
+        progress_time = 0
 
         for record in records:
             if self.wazehist_recalculate_time_dist_abort_flag:
@@ -796,8 +1013,7 @@ class WazeRouteHistory(object):
                 # increase the usage count of the last recd and delete this recd
                 if record[LOC_LAT_LONG_KEY] == last_recd_lat_long_key:
                     self.update_usage_cnt(last_recd_loc_id)
-                    criteria = (f"loc_id={record[LOC_ID]};")
-                    self._delete_record('locations', criteria)
+                    self._delete_record('locations', 'loc_id=?', data=[record[LOC_ID]])
                     log_info_msg(   f"Waze History > updated, (#{recd_cnt}), "
                                     f"deleted duplicate record, "
                                     f"LocationKey-{record[LOC_LAT_LONG_KEY]}, "
@@ -823,15 +1039,17 @@ class WazeRouteHistory(object):
                     if update_time_flag or update_dist_flag:
                         update_cnt += 1
 
+                # Post the progress every 100 recds or 30-secs since each Waze request
+                # can take a few seconds
                 running_time = time.perf_counter() - start_time
-                if (recd_cnt % 100) == 0:
+                if (recd_cnt % 100) == 0 or running_time >= progress_time + RECALC_PROGRESS_SECS:
+                    progress_time = running_time
                     post_event( f"Waze History > Recalculate Route Time/Dist > "
                                 f"Zone-{zone_dname}, "
                                 f"Recd-{recd_cnt} of {self.total_recd_cnt}, "
                                 f"Updated-{update_cnt}, "
                                 f"ElapsedTime-{format_timer(running_time)}")
 
-                if (recd_cnt % 100) == 0:
                     # timer = format_timer(running_time).replace(' secs', 's')
                     # timer = timer.replace(' mins', 'm').replace(' min', 'm')
                     # timer = timer.replace(' hrs', 'h').replace(' hr', 'h')
@@ -917,6 +1135,7 @@ class WazeRouteHistory(object):
         route_data = [new_time, new_dist, loc_id]
 
         self._update_record(UPDATE_LOCATION_TIME_DISTANCE, route_data)
+        self.location_cache = OrderedDict()
 
         # log_msg = (f"Waze History > updated (#{recd_cnt}), "
         #             f"Time({current_time:0.1f}{RARROW}{new_time:0.1f}min), "
@@ -940,8 +1159,7 @@ class WazeRouteHistory(object):
 
         for zone_name, zone_id in moved_zones.items():
             try:
-                criteria = f"zone_id='{zone_id}'"
-                zone_recd = self._get_record('zones', criteria)
+                zone_recd = self._get_record('zones', 'zone_id=?', data=[zone_id])
                 Zone = Gb.Zones_by_zone[zone_name]
                 zone_recd_gps = (zone_recd[ZON_LAT], zone_recd[ZON_LONG])
                 zone_distance_check = gps_distance_km(Zone.gps, zone_recd_gps)
@@ -13,6 +13,12 @@
 #           rather than a new object being created each time requiring a second request
 #           to retrieve the distance/time results.
 #
+#       3.  The requests use a requests.Session shared by all WazeRouteCalculators so
+#           the connection to the Waze server is kept open and reused.
+#       4.  The route for the same from/to GPS cordinates (rounded to 4 decimals) is
+#           reused for 2-mins. If it is being requested by another thread, the result
+#           of that request is used.
+#
 #   The original code can be found on Kovács Bálint's GitHub repo at
 #   https://github.com/kovacsbalu/WazeRouteCalculator.
 #
@@ -21,6 +27,9 @@
 import logging
 import requests
 import re
+import time
+import threading
+from concurrent.futures import Future
 
 from ..utils.messaging  import (_log, log_exception, log_warning_msg, log_error_msg, log_info_msg, )
 
@@ -33,6 +42,11 @@ ROUTING_SERVERS = {
     'eu': 'row',
     'au': 'row',
 }
+WAZE_REQUEST_TIMEOUT_SECS = 30      # Waze server request timeout
+WAZE_CONNECTION_POOL_SIZE = 4       # Connections kept open to the Waze server
+ROUTE_CACHE_SECS          = 120     # Reuse a route for 2-mins
+ROUTE_CACHE_GPS_DECIMALS  = 4       # Round the from/to GPS to 4 decimals (11m) for the route cache key
+ROUTE_CACHE_SIZE          = 100     # Number of routes kept
 #<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 class WRCError(Exception):
     def __init__(self, message):
@@ -45,6 +59,7 @@ class WRCError(Exception):
 class WazeRouteCalculator(object):
     """Calculate actual route time and distance with Waze API"""
 
+    Session = None      # requests.Session shared by all WazeRouteCalculators (_session)
 
     HEADERS = {
         "User-Agent": "Mozilla/5.0",
@@ -81,6 +96,30 @@ class WazeRouteCalculator(object):
         self.start_coords = ''
         self.end_coords = ''
 
+        self.route_lock     = threading.Lock()
+        self.route_cache    = {}    # {route_key: (expire_secs, (route_time, route_distance))}
+        self.route_requests = {}    # {route_key: Future} of the requests being made now
+        self.route_cache_hit_cnt = 0
+        self.route_request_cnt   = 0
+
+#--------------------------------------------------------------------
+    @classmethod
+    def _session(cls):
+        '''
+        Return the requests.Session used for all Waze requests. It keeps the
+        connections to the Waze server open so they can be reused.
+        '''
+        if cls.Session is None:
+            Session = requests.Session()
+            Session.headers.update(cls.HEADERS)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                    pool_maxsize=WAZE_CONNECTION_POOL_SIZE)
+            Session.mount('https://', adapter)
+            Session.mount('http://', adapter)
+            cls.Session = Session
+
+        return cls.Session
+
 #--------------------------------------------------------------------
     def get_route(self, from_lat, from_long, to_lat, to_long,):
         """Get route data from waze"""
@@ -99,8 +138,9 @@ class WazeRouteCalculator(object):
             "options": ','.join('%s:t' % route_option for route_option in self.route_options),
         }
 
+        response_json = None
         try:
-            response = requests.get(url, params=url_options, headers=self.HEADERS)
+            response = self._session().get(url, params=url_options, timeout=WAZE_REQUEST_TIMEOUT_SECS)
             response.encoding = 'utf-8'
             response_json = self._check_response(response)
 
@@ -150,6 +190,64 @@ class WazeRouteCalculator(object):
 
 #--------------------------------------------------------------------
     def calc_route_info(self, from_lat, from_long, to_lat, to_long, log_results_flag=True):
+        """
+        Calculate best route info. A route requested in the last 2-mins is reused,
+        and if another thread is requesting the same route, wait for it's result.
+        """
+        try:
+            route_key = tuple(round(float(gps), ROUTE_CACHE_GPS_DECIMALS)
+                                    for gps in (from_lat, from_long, to_lat, to_long))
+            now_secs = time.monotonic()
+
+            with self.route_lock:
+                expire_secs, route_info = self.route_cache.get(route_key, (0, None))
+                if expire_secs > now_secs:
+                    self.route_cache_hit_cnt += 1
+                    return route_info
+
+                route_future = self.route_requests.get(route_key)
+                request_route_flag = route_future is None
+                if request_route_flag:
+                    route_future = self.route_requests[route_key] = Future()
+
+            if request_route_flag is False:
+                self.route_cache_hit_cnt += 1
+                return route_future.result()
+
+        except Exception as err:
+            log_exception(err)
+            return -1, -1
+
+        route_info = (-1, -1)
+        try:
+            self.route_request_cnt += 1
+            route_info = self._calc_route_info(from_lat, from_long, to_lat, to_long, log_results_flag)
+
+        finally:
+            with self.route_lock:
+                self.route_requests.pop(route_key, None)
+                if route_info[0] >= 0:
+                    self._cache_route_info(route_key, route_info)
+
+            route_future.set_result(route_info)
+
+        return route_info
+
+#--------------------------------------------------------------------
+    def _cache_route_info(self, route_key, route_info):
+        '''
+        Save the route, removing the expired ones and the oldest one if the cache is full
+        '''
+        now_secs = time.monotonic()
+        for _route_key, (expire_secs, _route_info) in list(self.route_cache.items()):
+            if expire_secs > now_secs and len(self.route_cache) < ROUTE_CACHE_SIZE:
+                break
+            self.route_cache.pop(_route_key)
+
+        self.route_cache[route_key] = (now_secs + ROUTE_CACHE_SECS, route_info)
+
+#--------------------------------------------------------------------
+    def _calc_route_info(self, from_lat, from_long, to_lat, to_long, log_results_flag=True):
         """Calculate best route info."""
         try:
             from_lat  = float(from_lat)
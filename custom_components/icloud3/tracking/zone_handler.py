@@ -14,6 +14,7 @@
 from ..global_variables import GlobalVariables as Gb
 from ..const            import (HOME, NOT_HOME, NOT_SET, HIGH_INTEGER, RARROW,
                                 GPS, HOME_DISTANCE, ENTER_ZONE, EXIT_ZONE, ZONE, LATITUDE,
+                                LONGITUDE, RADIUS, PASSIVE,
                                 EVLOG_ALERT, )
 
 from ..utils.file_io    import (file_size, file_exists, set_write_permission, )
@@ -28,6 +29,7 @@ from ..utils.dist_util  import (gps_distance_km, format_dist_km, format_dist_m,
                                 km_to_um, m_to_um, )
 
 from ..tracking         import stationary_zone as statzone
+from ..tracking.zone_index import ZoneIndex
 from ..tracking         import determine_interval as det_interval
 from ..utils            import entity_io
 from ..zone             import iCloud3_Zone
@@ -173,16 +175,9 @@ def select_zone(Device, latitude=None, longitude=None):
             and Device.StatZone.distance_m(latitude, longitude) > Device.StatZone.radius_m):
         statzone.exit_statzone(Device)
 
-    zones = [Zone.zone for Zone in Gb.HAZones if (Zone.passive is False)]
-    Zones = [Gb.Zones_by_zone[zone] for zone in set(zones)]
-    zones_data = [[Zone.distance_m(latitude, longitude), Zone, Zone.zone,
-                    Zone.radius_m, Zone.dname]
-                            for Zone in Zones
-                            if (Zone.passive is False)]
-
-    # Select all the zones the device is in
-    inzone_zones = [zone_data   for zone_data in zones_data
-                                if zone_data[ZD_DIST_M] <= zone_data[ZD_RADIUS] + gps_accuracy_adj]
+    # Select all the zones the device is in. Only the zones near the location are checked.
+    zone_index = zone_index_rebuilt()
+    inzone_zones = zone_index.inzone_zones_data(latitude, longitude, gps_accuracy_adj)
 
     for zone_data in inzone_zones:
         if zone_data[ZD_RADIUS] <= zone_data_selected[ZD_RADIUS]:
@@ -205,8 +200,9 @@ def select_zone(Device, latitude=None, longitude=None):
 
     # Build an item for each zone (dist-from-zone|zone_name|display_name-##km)
     zones_distance_list = \
-        [(f"{int(zone_data[ZD_DIST_M]):08}|{zone_data[ZD_NAME]}|{zone_data[ZD_DIST_M]}")
-                for zone_data in zones_data if zone_data[ZD_NAME] != zone_selected]
+        [(f"{int(dist_m):08}|{Zone.zone}|{dist_m}")
+                for dist_m, Zone in zone_index.zones_distance_m(latitude, longitude)
+                if Zone.zone != zone_selected]
     zones_distance_list.sort()
 
     return ZoneSelected, zone_selected, zone_selected_dist_m, zones_distance_list
@@ -288,19 +284,27 @@ def closest_zone(latitude, longitude):
         - Zone, Zone entity, Zone display name, distance (m)
     '''
     try:
-        zones_data = [[Zone.distance_m(latitude, longitude), Zone.zone]
-                            for Zone in Gb.HAZones
-                            if Zone.radius_m > 1]
-        zones_data.sort()
-        zone_dist_m, zone = zones_data[0]
-        Zone = Gb.Zones_by_zone.get(zone)
+        Zone, zone_dist_m = zone_index_rebuilt().closest_zone(latitude, longitude)
+        Zone = Gb.Zones_by_zone.get(Zone.zone)
 
-        return Zone, zone, Zone.dname, zone_dist_m
+        return Zone, Zone.zone, Zone.dname, zone_dist_m
 
     except Exception as err:
         log_exception(err)
         return None, 'unknown', 'Unknown', 0
 
+#--------------------------------------------------------------------
+def zone_index_rebuilt():
+    '''
+    Return the ZoneIndex, rebuilding it first if a zone was added, changed or removed
+    '''
+    if Gb.ZoneIndex is None:
+        Gb.ZoneIndex = ZoneIndex()
+
+    Gb.ZoneIndex.check_rebuild()
+
+    return Gb.ZoneIndex
+
 #--------------------------------------------------------------------
 def is_same_or_overlapping_zone(zone1, zone2):
     '''
@@ -517,6 +521,25 @@ def ha_added_zone_entity_id(event):
         log_exception(err)
         pass
 
+#------------------------------------------------------------------------------
+@callback
+def ha_changed_zone_entity_state(event):
+    '''
+    A zone was moved or its radius or passive setting changed, rebuild the ZoneIndex
+    on the next zone check. The zone's state is the number of persons in it and
+    changes far more often, it does not need a rebuild.
+    '''
+    old_state = event.data.get('old_state')
+    new_state = event.data.get('new_state')
+    if old_state is None or new_state is None:
+        return
+
+    old_attrs = old_state.attributes
+    new_attrs = new_state.attributes
+    if any(old_attrs.get(attr) != new_attrs.get(attr)
+                for attr in (LATITUDE, LONGITUDE, RADIUS, PASSIVE)):
+        Gb.zone_index_rebuild_flag = True
+
 #------------------------------------------------------------------------------
 @callback
 def ha_removed_zone_entity_id(event):
@@ -533,6 +556,7 @@ def ha_removed_zone_entity_id(event):
         Zone = Gb.HAZones_by_zone[zone]
 
         Zone.status = -1
+        Gb.zone_index_rebuild_flag = True
         Gb.HAZones_by_zone_deleted[zone] = Zone
         Gb.Zones   = list_del(Gb.Zones, Zone)
         Gb.HAZones = list_del(Gb.HAZones, Zone)
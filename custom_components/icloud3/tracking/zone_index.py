@@ -0,0 +1,295 @@
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+#
+#   ZONE INDEX - A grid of the HA Zones used to select the zone a Device is in
+#           inzone_zones_data - The active zones a location is in
+#           closest_zone - The zone closest to a location
+#           zones_distance_m - The distance from a location to every active zone
+#
+#   The zone's location, radius and passive status are read from the HA zone
+#   entity when the index is built instead of on every distance calculation.
+#   Each zone is added to the grid cells its radius covers, so an in-zone check
+#   only calculates the distance to the zones in the cells around the location.
+#
+#   The index is rebuilt when Gb.zone_index_rebuild_flag is set by a zone being
+#   added, changed, moved (Stationary Zones) or removed.
+#
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+from ..global_variables import GlobalVariables as Gb
+from ..utils.dist_util  import (gps_distance_m, )
+
+from math               import (asin, cos, floor, radians, sin, sqrt, )
+
+CELL_DEG         = .01      # Grid cell size, about 1.1km of latitude
+MAX_ZONE_CELLS   = 100      # Larger zones are checked for every location instead of added to cells
+MAX_RINGS        = 10       # Cells around the location searched for the closest zone
+M_PER_DEG        = 111195   # Meters in a degree of latitude
+EARTH_RADIUS_M   = 6371000
+# The spherical distance used to find the candidates can be up to .5% shorter or longer
+# than the gps_distance_m distance used to select the zone
+DIST_MARGIN      = 1.01
+
+# zone_recd items
+ZR_ZONE      = 0
+ZR_LATITUDE  = 1
+ZR_LONGITUDE = 2
+ZR_RADIUS    = 3
+ZR_PASSIVE   = 4
+ZR_LAT_RAD   = 5
+ZR_LONG_RAD  = 6
+ZR_COS_LAT   = 7
+
+
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+class ZoneIndex(object):
+    def __init__(self):
+        self.zone_recds      = []   # [Zone, latitude, longitude, radius_m, passive,
+                                    #   lat radians, long radians, cos(lat)] for each HA Zone
+        self.active_recds    = []   # zone_recds for the zones that are not passive
+        self.inzone_cells    = {}   # (lat_cell, long_cell): active zone_recds whose radius covers the cell
+        self.inzone_always   = []   # active zone_recds checked for every location (large or at 0 lat/long)
+        self.center_cells    = {}   # (lat_cell, long_cell): zone_recds with their center in the cell
+        self.build_cnt       = 0
+
+    def __repr__(self):
+        return (f"<ZoneIndex: {len(self.zone_recds)} zones, {len(self.inzone_cells)} cells>")
+
+#------------------------------------------------------
+    def check_rebuild(self):
+        '''
+        Rebuild the index if a zone has been added, changed or removed
+        '''
+        if Gb.zone_index_rebuild_flag:
+            self.rebuild()
+
+#------------------------------------------------------
+    def rebuild(self):
+        '''
+        Read the location, radius and passive status of each HA Zone and
+        add the zone to the grid cells
+        '''
+        # Reset the flag first so a zone changed while the index is being built
+        # is picked up on the next check
+        Gb.zone_index_rebuild_flag = False
+
+        Zones_by_zone = {Zone.zone: Zone for Zone in Gb.HAZones}
+        self.zone_recds = [[Zone, Zone.latitude, Zone.longitude, Zone.radius_m, Zone.passive]
+                                for Zone in Zones_by_zone.values()]
+        for zone_recd in self.zone_recds:
+            lat_rad = radians(zone_recd[ZR_LATITUDE] or 0)
+            zone_recd.extend([lat_rad, radians(zone_recd[ZR_LONGITUDE] or 0), cos(lat_rad)])
+
+        self.active_recds  = [zone_recd for zone_recd in self.zone_recds
+                                        if zone_recd[ZR_PASSIVE] is False]
+        self.inzone_cells  = {}
+        self.inzone_always = []
+        self.center_cells  = {}
+
+        for zone_recd in self.zone_recds:
+            latitude, longitude = zone_recd[ZR_LATITUDE], zone_recd[ZR_LONGITUDE]
+            if latitude and longitude:
+                self.center_cells.setdefault(self._cell(latitude, longitude), []).append(zone_recd)
+
+        for zone_recd in self.active_recds:
+            cells = self._zone_cells(zone_recd)
+            if cells is None:
+                self.inzone_always.append(zone_recd)
+            else:
+                for cell in cells:
+                    self.inzone_cells.setdefault(cell, []).append(zone_recd)
+
+        self.build_cnt += 1
+
+#------------------------------------------------------
+    @staticmethod
+    def _cell(latitude, longitude):
+        return (floor(latitude / CELL_DEG), floor(longitude / CELL_DEG))
+
+#------------------------------------------------------
+    def _zone_cells(self, zone_recd):
+        '''
+        Return the cells covered by the zone's radius or None if it should be
+        checked for every location. gps_distance_m is 0 when a latitude or longitude
+        is 0 so those zones are always checked, as are zones that cross the
+        180° meridian or cover too many cells.
+        '''
+        latitude, longitude = zone_recd[ZR_LATITUDE], zone_recd[ZR_LONGITUDE]
+        if not latitude or not longitude:
+            return None
+
+        lat_span, long_span = self._span_deg(latitude, zone_recd[ZR_RADIUS] * DIST_MARGIN + 1)
+        if long_span is None or abs(longitude) + long_span >= 180:
+            return None
+
+        lat_cell_from, long_cell_from = self._cell(latitude - lat_span, longitude - long_span)
+        lat_cell_to,   long_cell_to   = self._cell(latitude + lat_span, longitude + long_span)
+        if (lat_cell_to - lat_cell_from + 1) * (long_cell_to - long_cell_from + 1) > MAX_ZONE_CELLS:
+            return None
+
+        return [(lat_cell, long_cell)
+                    for lat_cell in range(lat_cell_from, lat_cell_to + 1)
+                    for long_cell in range(long_cell_from, long_cell_to + 1)]
+
+#------------------------------------------------------
+    @staticmethod
+    def _span_deg(latitude, dist_m):
+        '''
+        Return the latitude and longitude degrees that cover dist_m around the
+        latitude. The longitude span is None near the poles.
+        '''
+        lat_span = dist_m / M_PER_DEG
+        min_cos  = cos(radians(min(abs(latitude) + lat_span, 90)))
+        if min_cos < .01:
+            return lat_span, None
+
+        return lat_span, lat_span / min_cos
+
+#------------------------------------------------------
+    def inzone_zones_data(self, latitude, longitude, gps_accuracy_adj):
+        '''
+        Return the active zones the location is in, the same as checking
+        Zone.distance_m <= Zone.radius_m + gps_accuracy_adj for every zone.
+
+        Return:
+            [[distance_m, Zone, zone, radius_m, Zone.dname], ...]
+        '''
+        if not latitude or not longitude:
+            zone_recds = self.active_recds
+
+        else:
+            lat_span, long_span = self._span_deg(latitude, max(gps_accuracy_adj, 0) * DIST_MARGIN + 1)
+            if long_span is None or abs(longitude) + long_span >= 180:
+                zone_recds = self.active_recds
+            else:
+                lat_cell_from, long_cell_from = self._cell(latitude - lat_span, longitude - long_span)
+                lat_cell_to,   long_cell_to   = self._cell(latitude + lat_span, longitude + long_span)
+
+                zone_recds = {id(zone_recd): zone_recd
+                                for lat_cell in range(lat_cell_from, lat_cell_to + 1)
+                                for long_cell in range(long_cell_from, long_cell_to + 1)
+                                for zone_recd in self.inzone_cells.get((lat_cell, long_cell), [])}
+                zone_recds = list(zone_recds.values()) + self.inzone_always
+
+        zones_data = []
+        for Zone, zone_latitude, zone_longitude, radius_m, *_ in zone_recds:
+            distance_m = self._distance_m(zone_latitude, zone_longitude, latitude, longitude)
+            if distance_m <= radius_m + gps_accuracy_adj:
+                zones_data.append([distance_m, Zone, Zone.zone, radius_m, Zone.dname])
+
+        return zones_data
+
+#------------------------------------------------------
+    def closest_zone(self, latitude, longitude, min_radius_m=1):
+        '''
+        Return the zone closest to the location with a radius larger than
+        min_radius_m. The cells around the location are searched a ring at a time
+        until a zone is found that is closer than anything in the next ring.
+        All of the zones are checked if none are found within MAX_RINGS.
+
+        Return:
+            Zone, distance_m or None, 0 if there are no zones
+        '''
+        zone_recds = [zone_recd for zone_recd in self.zone_recds
+                                if zone_recd[ZR_RADIUS] > min_radius_m]
+        if zone_recds == []:
+            return None, 0
+
+        if latitude and longitude:
+            lat_span, long_span = self._span_deg(latitude, (MAX_RINGS + 1) * CELL_DEG * M_PER_DEG)
+
+            if long_span is not None and abs(longitude) + long_span < 180:
+                # A zone outside of the rings searched is at least this far away for
+                # each ring, the width of a cell at the latitude furthest from the equator
+                ring_m = CELL_DEG * M_PER_DEG * lat_span / long_span / DIST_MARGIN
+                lat_cell, long_cell = self._cell(latitude, longitude)
+                candidates = []
+                for ring in range(MAX_RINGS + 1):
+                    candidates.extend(zone_recd
+                                for cell in self._ring_cells(lat_cell, long_cell, ring)
+                                for zone_recd in self.center_cells.get(cell, [])
+                                if zone_recd[ZR_RADIUS] > min_radius_m)
+                    if candidates:
+                        Zone, distance_m = self._closest_zone(candidates, latitude, longitude)
+                        if distance_m <= ring * ring_m:
+                            return Zone, distance_m
+
+        return self._closest_zone(zone_recds, latitude, longitude)
+
+#------------------------------------------------------
+    @staticmethod
+    def _ring_cells(lat_cell, long_cell, ring):
+        if ring == 0:
+            return [(lat_cell, long_cell)]
+
+        cells  = [(lat_cell + lat_step, long_cell + long_step)
+                        for lat_step in (-ring, ring)
+                        for long_step in range(-ring, ring + 1)]
+        cells += [(lat_cell + lat_step, long_cell + long_step)
+                        for long_step in (-ring, ring)
+                        for lat_step in range(-ring + 1, ring)]
+        return cells
+
+#------------------------------------------------------
+    def _closest_zone(self, zone_recds, latitude, longitude):
+        '''
+        Find the closest zone using the spherical distance, then use gps_distance_m
+        for the zones that are about the same distance away
+        '''
+        dists_m = self._sphere_distances_m(zone_recds, latitude, longitude)
+        max_dist_m = min(dists_m) * DIST_MARGIN + 1
+
+        zones_data = [[self._distance_m(zone_recd[ZR_LATITUDE], zone_recd[ZR_LONGITUDE],
+                                        latitude, longitude),
+                        zone_recd[ZR_ZONE].zone, zone_recd[ZR_ZONE]]
+                            for zone_recd, dist_m in zip(zone_recds, dists_m, strict=True)
+                            if dist_m <= max_dist_m]
+        distance_m, _zone, Zone = min(zones_data, key=lambda zone_data: zone_data[0:2])
+
+        return Zone, distance_m
+
+#------------------------------------------------------
+    def zones_distance_m(self, latitude, longitude):
+        '''
+        Return [distance_m, Zone] for every active zone, using the spherical
+        distance. It is used for the Zone Distance messages, gps_distance_m is
+        used for selecting the zone.
+        '''
+        dists_m = self._sphere_distances_m(self.active_recds, latitude, longitude)
+
+        return [[dist_m, zone_recd[ZR_ZONE]]
+                    for zone_recd, dist_m in zip(self.active_recds, dists_m, strict=True)]
+
+#------------------------------------------------------
+    @staticmethod
+    def _sphere_distances_m(zone_recds, latitude, longitude):
+        '''
+        Return the haversine distance from the location to each zone. It is 0 if
+        a latitude or longitude is 0, the same as gps_distance_m.
+        '''
+        if not latitude or not longitude:
+            return [0.0] * len(zone_recds)
+
+        lat_rad  = radians(latitude)
+        long_rad = radians(longitude)
+        cos_lat  = cos(lat_rad)
+
+        dists_m = []
+        for zone_recd in zone_recds:
+            if not zone_recd[ZR_LATITUDE] or not zone_recd[ZR_LONGITUDE]:
+                dists_m.append(0.0)
+                continue
+
+            a = (sin((zone_recd[ZR_LAT_RAD] - lat_rad) / 2) ** 2
+                    + cos_lat * zone_recd[ZR_COS_LAT] * sin((zone_recd[ZR_LONG_RAD] - long_rad) / 2) ** 2)
+            dists_m.append(2 * EARTH_RADIUS_M * asin(min(1, sqrt(a))))
+
+        return dists_m
+
+#------------------------------------------------------
+    @staticmethod
+    def _distance_m(zone_latitude, zone_longitude, latitude, longitude):
+        '''
+        The distance from the zone to the location, the same as Zone.distance_m
+        '''
+        distance = gps_distance_m((zone_latitude, zone_longitude), (latitude, longitude))
+        return 0 if distance < .002 else distance
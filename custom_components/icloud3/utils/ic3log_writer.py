@@ -0,0 +1,246 @@
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+#
+#   ICLOUD3 LOG FILE WRITER
+#
+#   write puts the log record (time, msg) on a queue. The writer thread gets them
+#   in batches, formats them and writes each batch to the icloud3.log file with
+#   one write, so the 5-sec loop and the event loop do not wait for the file
+#   writes or the logging module's record handling.
+#
+#   The writer thread checks that the log file has not been deleted or renamed
+#   (inode check) every 2-secs and recreates it if it was. The file open, close
+#   and flush requests are put on the queue too so they are done in order with
+#   the records. If the log file can not be opened, the records are dropped and
+#   it is opened again at the next 2-sec check.
+#
+#       queue_depth - Records waiting to be written
+#       dropped_cnt - Records dropped because the queue was full or the log file
+#                       could not be opened or written
+#       written_cnt - Records written
+#       batch_cnt   - Writes to the log file
+#
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+
+import os
+import time
+import queue
+import threading
+
+IC3LOG_QUEUE_SIZE       = 20000     # Records waiting to be written before they are dropped
+IC3LOG_BATCH_SIZE       = 500       # Records written together
+IC3LOG_CHECK_FILE_SECS  = 2         # Check the log file exists every 2-secs
+IC3LOG_REQUEST_WAIT_SECS= 10        # Wait for an open/close/flush request to be done
+IC3LOG_DATETIME_FORMAT  = '%m-%d %H:%M:%S'
+
+
+#<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
+class iC3LogWriter(object):
+    def __init__(self, log_filename, filter_log_msg=None, recreated_log_msg=''):
+        self.log_filename       = log_filename
+        self.filter_log_msg     = filter_log_msg        # Function that removes passwords, etc from the msg
+        self.recreated_log_msg  = recreated_log_msg     # Written to the log file when it is recreated
+
+        self.request_queue      = queue.SimpleQueue()   # (secs, log_msg) or (fct, args, Event) requests
+        self.log_file           = None
+        self.log_file_inode     = 0
+        self.open_failed_flag   = False                 # The log file could not be opened, try again
+        self.check_file_secs    = 0
+
+        self.dropped_cnt        = 0
+        self.dropped_cnt_logged = 0
+        self.written_cnt        = 0
+        self.batch_cnt          = 0
+
+        self.writer_thread = threading.Thread(  target=self._writer_thread,
+                                                name='icloud3_log_writer',
+                                                daemon=True)
+        self.writer_thread.start()
+
+    def __repr__(self):
+        return (f"<iC3LogWriter: {self.log_filename}, "
+                f"Queued-{self.queue_depth}, Written-{self.written_cnt}, Dropped-{self.dropped_cnt}>")
+
+#--------------------------------------------------------------------
+    @property
+    def queue_depth(self):
+        return self.request_queue.qsize()
+
+#--------------------------------------------------------------------
+    def write(self, log_msg):
+        '''
+        Queue the log record to be written. It is dropped if the writer thread
+        is too far behind.
+        '''
+        if self.request_queue.qsize() >= IC3LOG_QUEUE_SIZE:
+            self.dropped_cnt += 1
+            return
+
+        self.request_queue.put((time.time(), log_msg))
+
+#--------------------------------------------------------------------
+    def open_log_file(self, filemode='a'):
+        ''' Open the log file ('w'=new file, 'a'=append) after the queued records are written '''
+        self._request(self._open_log_file, filemode)
+
+    def close_log_file(self):
+        ''' Close the log file after the queued records are written '''
+        self._request(self._close_log_file)
+
+    def flush(self):
+        ''' Wait until the queued records are written '''
+        self._request(None)
+
+    def _request(self, fct, *args):
+        '''
+        Put the request on the queue and wait for the writer thread to do it. It is
+        done directly if this is the writer thread.
+        '''
+        if threading.current_thread() is self.writer_thread:
+            if fct: fct(*args)
+            return
+
+        request_done = threading.Event()
+        self.request_queue.put((fct, args, request_done))
+        request_done.wait(IC3LOG_REQUEST_WAIT_SECS)
+
+#--------------------------------------------------------------------
+    def _writer_thread(self):
+        '''
+        Get the records on the queue, write them to the log file in batches and do
+        the open/close/flush requests.
+        '''
+        while True:
+            try:
+                item = self.request_queue.get(timeout=IC3LOG_CHECK_FILE_SECS)
+            except queue.Empty:
+                item = None
+
+            log_recds = []
+            try:
+                while item is not None:
+                    if len(item) == 2:
+                        log_recds.append(item)
+
+                    else:
+                        self._write_log_recds(log_recds)
+                        log_recds = []
+                        self._do_request(*item)
+
+                    if len(log_recds) >= IC3LOG_BATCH_SIZE:
+                        break
+                    try:
+                        item = self.request_queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                self._check_log_file()
+                self._write_log_recds(log_recds)
+
+            except Exception:
+                # The log file could not be opened. Keep going, it is opened again
+                # at the next check.
+                self.dropped_cnt += len(log_recds)
+
+#--------------------------------------------------------------------
+    @staticmethod
+    def _do_request(fct, args, request_done):
+        try:
+            if fct: fct(*args)
+        except Exception:
+            pass
+        finally:
+            request_done.set()
+
+#--------------------------------------------------------------------
+    def _write_log_recds(self, log_recds):
+        if log_recds == []:
+            return
+
+        if self.log_file is None:
+            if self.open_failed_flag:
+                self.dropped_cnt += len(log_recds)
+            return
+
+        log_lines = []
+        last_secs = None
+        for secs, log_msg in log_recds:
+            try:
+                # Format the time once for the records logged in the same second
+                if int(secs) != last_secs:
+                    last_secs = int(secs)
+                    datetime  = time.strftime(IC3LOG_DATETIME_FORMAT, time.localtime(secs))
+                if self.filter_log_msg:
+                    log_msg = self.filter_log_msg(log_msg)
+                log_lines.append(f"{datetime} {log_msg}")
+            except Exception:
+                pass
+
+        dropped_cnt = self.dropped_cnt
+        if dropped_cnt > self.dropped_cnt_logged:
+            log_lines.append(f"{datetime} iCloud3 Log > "
+                            f"{dropped_cnt - self.dropped_cnt_logged} "
+                            f"records were not written, the log queue was full or "
+                            f"the log file could not be opened")
+
+        try:
+            self.log_file.write('\n'.join(log_lines) + '\n')
+            self.log_file.flush()
+            self.written_cnt += len(log_lines)
+            self.batch_cnt   += 1
+            self.dropped_cnt_logged = dropped_cnt
+
+        except Exception:
+            self.dropped_cnt += len(log_recds)
+
+#--------------------------------------------------------------------
+    def _check_log_file(self):
+        '''
+        See if the log file was deleted or renamed (the inode is different or it
+        does not exist). Recreate it if it was. Open it again if that failed.
+        '''
+        if time.monotonic() < self.check_file_secs:
+            return
+
+        if self.log_file is None:
+            if self.open_failed_flag is False:
+                return
+            filemode = 'a'
+
+        else:
+            self.check_file_secs = time.monotonic() + IC3LOG_CHECK_FILE_SECS
+            try:
+                if os.stat(self.log_filename).st_ino == self.log_file_inode:
+                    return
+            except OSError:
+                pass
+            filemode = 'w'
+
+        self._open_log_file(filemode)
+        if self.recreated_log_msg:
+            self.log_file.write(f"{self.recreated_log_msg}\n")
+
+#--------------------------------------------------------------------
+    def _open_log_file(self, filemode):
+        '''
+        Open the log file. If it fails, log_file is left as None and the error is
+        raised, _check_log_file tries again in 2-secs.
+        '''
+        self._close_log_file()
+        self.open_failed_flag = True
+        self.check_file_secs  = time.monotonic() + IC3LOG_CHECK_FILE_SECS
+
+        self.log_file         = open(self.log_filename, filemode, encoding='utf-8')
+        self.log_file_inode   = os.fstat(self.log_file.fileno()).st_ino
+        self.open_failed_flag = False
+
+    def _close_log_file(self):
+        self.open_failed_flag = False
+        if self.log_file is None:
+            return
+
+        try:
+            self.log_file.close()
+        except Exception:
+            pass
+
+        self.log_file = None
@@ -47,12 +47,12 @@ from ..const            import (VERSION, VERSION_BETA, ICLOUD3, ICLOUD3_VERSION,
                                 )
 from ..const_more_info      import more_info_text
 from .utils                 import (obscure_field, instr, is_empty, isnot_empty, list_add, list_del, )
+from .ic3log_writer         import iC3LogWriter
 
 import homeassistant.util.dt   as dt_util
 from homeassistant.components  import persistent_notification
 
 import os
-import time
 import inspect
 import traceback
 import logging
@@ -432,12 +432,13 @@ def open_ic3log_file(new_log_file=False):
             Gb.iC3Logger = logging.getLogger(DOMAIN)
             Gb.iC3Logger.setLevel(logging.INFO)
 
-            handler   = logging.FileHandler(ic3logger_file, mode=filemode, encoding='utf-8')
-            formatter = logging.Formatter('%(asctime)s %(message)s', datefmt='%m-%d %H:%M:%S')
-            handler.setFormatter(formatter)
-            handler.addFilter(LoggerFilter)
+            # The records are written to the log file by the iC3LogWriter's thread
+            if Gb.iC3LogWriter is None:
+                recreated_log_msg = (f"{EVLOG_IC3_STARTING}Recreated iCloud3 Log File: {ic3logger_file}")
+                recreated_log_msg = format_startup_header_box(recreated_log_msg).replace('⡇', '⛔')
+                Gb.iC3LogWriter = iC3LogWriter(ic3logger_file, filter_log_msg, recreated_log_msg)
 
-            Gb.iC3Logger.addHandler(handler)
+            Gb.iC3LogWriter.open_log_file(filemode)
 
         if isnot_empty(Gb.conf_general):
             Gb.iC3Logger.propagate = (Gb.conf_general[CONF_LOG_LEVEL] == 'debug-ha')
@@ -455,64 +456,27 @@ def close_ic3log_file():
 
     if Gb.iC3Logger:
         write_ic3log_recd(f"Close iCloud3 Log File  ({IC3LOG_FILENAME})")
-        Gb.iC3Logger.removeHandler(Gb.iC3Logger.handlers[0])
-        # Gb.iC3Logger.flush()
+        Gb.iC3LogWriter.close_log_file()
 
 #--------------------------------------------------------------------
 def write_ic3log_recd(log_msg):
     '''
-    Check to make sure the icloud3.log file exists if the last write to it
-    was more than 2-secs ago. Recreate it if it does not. This catches deletes
-    and renames while iCloud3 is running
+    Queue the record to be written to the icloud3.log file. The iC3LogWriter
+    thread writes it and recreates the log file if it was deleted or renamed.
+    It is also logged to the HA log file when the log level is 'debug-ha'.
     '''
     try:
-        if Gb.iC3Logger is None:
+        if Gb.iC3LogWriter is None:
             return
 
-        time_now_msecs = time.time()
-        if time_now_msecs - Gb.iC3Logger_last_check_exist_secs > 2:
-            Gb.iC3Logger_last_check_exist_secs = time_now_msecs
+        Gb.iC3LogWriter.write(log_msg)
 
-            check_ic3log_file_exists(Gb.hass.config.path(IC3LOG_FILENAME))
-
-        if Gb.iC3Logger:
-            Gb.iC3Logger.info(log_msg)
-        else:
-            open_ic3log_file(new_log_file=True)
-
-            Gb.iC3Logger.info(log_msg)
+        if Gb.iC3Logger.propagate:
+            Gb.iC3Logger.info(filter_log_msg(log_msg))
 
     except Exception as err:
         return False
 
-#--------------------------------------------------------------------
-def check_ic3log_file_exists(ic3logger_file):
-    '''
-    See if the icloud3-0.log file exists. Recreate it if it does not. This
-    catches deletes and renames while iCloud3 is running
-    '''
-    try:
-        if Gb.iC3Logger is None:
-            open_ic3log_file(new_log_file=True)
-
-        elif Gb.iC3Logger and os.path.isfile(ic3logger_file) is False:
-            Gb.iC3Logger.removeHandler(Gb.iC3Logger.handlers[0])
-            open_ic3log_file(new_log_file=True)
-
-            log_msg = f"{EVLOG_IC3_STARTING}Recreated iCloud3 Log File: {ic3logger_file}"
-            log_msg = f"{format_startup_header_box(log_msg, 20)}"
-            log_msg = log_msg.replace('⡇', '⛔')
-            Gb.iC3Logger.info(log_msg)
-
-        return True
-
-    except IndexError:
-        pass
-    except Exception as err:
-        log_exception_HA(err)
-
-    return False
-
 #--------------------------------------------------------------------
 def archive_ic3log_file():
     '''
@@ -528,13 +492,15 @@ def archive_ic3log_file():
         log_file_1 = f"{Gb.hass.config.path(IC3LOG_FILENAME)}-1.log"
         log_file_2 = f"{Gb.hass.config.path(IC3LOG_FILENAME)}-2.log"
 
-        post_event(f"{ICLOUD3} Log File Archived")
+        post_event( f"{ICLOUD3} Log File Archived, "
+                    f"Written-{Gb.iC3LogWriter.written_cnt}, "
+                    f"Dropped-{Gb.iC3LogWriter.dropped_cnt}")
 
         if os.path.isfile(log_file_2): os.remove(log_file_2)
         if os.path.isfile(log_file_1): os.rename(log_file_1, log_file_2)
 
         if os.path.isfile(log_file_0):
-            Gb.iC3Logger.removeHandler(Gb.iC3Logger.handlers[0])
+            Gb.iC3LogWriter.close_log_file()
             os.rename(log_file_0, log_file_1)
 
         open_ic3log_file(new_log_file=True)
@@ -1408,20 +1374,15 @@ def add_log_file_filter(item, replacement_text=None):
         Gb.upw_filter_items[item] = '*'*8
 
 #--------------------------------------------------------------------
-class LoggerFilter(logging.Filter):
+def filter_log_msg(log_msg):
     '''
-    Filter items from being displayed in the log file (Password)
+    Replace the items that should not be displayed in the log file (Password)
     '''
-    @staticmethod
-    def filter(record):
-        if Gb.disable_upw_filter:
-            return True
-
-        message = record.msg
-        for filtered_item, replacement_text in Gb.upw_filter_items.items():
-            if instr(message, filtered_item):
-                message = message.replace(filtered_item, replacement_text)
-
-        record.msg  = message
-        record.args = []
-        return True
+    if Gb.disable_upw_filter:
+        return log_msg
+
+    for filtered_item, replacement_text in Gb.upw_filter_items.items():
+        if instr(log_msg, filtered_item):
+            log_msg = log_msg.replace(filtered_item, replacement_text)
+
+    return log_msg
@@ -57,6 +57,7 @@ class iCloud3_Zone(object):
         self.is_ha_zone       = self.zone_data.get('ha_zone', True) and zone not in NON_ZONE_ITEM_LIST
         self.status           = 1 if self.is_ha_zone else 0    # changed to -1 when removed from HA
         self.dist_time_history= []   # Entries are a list - [lat, long, distance, travel time]
+        Gb.zone_index_rebuild_flag = True
 
         self.initialize_zone_name(self.zone_data)
         self.setup_zone_display_name()
@@ -106,6 +107,7 @@ class iCloud3_Zone(object):
 
         self.ha_zone_attrs    = ha_zone_attrs
         self.ha_zone_attrs_id = id(ha_zone_attrs)
+        Gb.zone_index_rebuild_flag = True
 
     #---------------------------------------------------------------------
     @property
@@ -377,6 +379,7 @@ class iCloud3_StationaryZone(iCloud3_Zone):
         '''
         try:
             Gb.hass.states.async_set(f"zone.{self.zone}", 0, attrs, force_update=True)
+            Gb.zone_index_rebuild_flag = True
 
         except Exception as err:
             pass
@@ -33,7 +33,7 @@ import homeassistant.helpers.device_registry as dr
 import homeassistant.helpers.config_validation as cv
 
 from .core.const import *
-from .core.utils import DeviceException, wildcard_models
+from .core.utils import DeviceException, wildcard_models, clear_customizes_cache
 from .core import HassEntry, BasicEntity, XEntity # noqa
 from .core.device import Device, AsyncMiIO
 from .core.miot_spec import (
@@ -193,6 +193,7 @@ async def async_setup(hass, hass_config: dict):
             for m, specs in models.items():
                 DEVICE_CUSTOMIZES.setdefault(m, {})
                 DEVICE_CUSTOMIZES[m]['extend_miot_specs'] = specs
+            clear_customizes_cache()
 
     await hass.async_add_executor_job(extend_miot_specs)
 
@@ -319,6 +320,7 @@ async def async_setup_customizes(hass: hass_core.HomeAssistant, config_entry: co
                 continue
             DEVICE_CUSTOMIZES.setdefault(m, {})
             DEVICE_CUSTOMIZES[m].update(cfg)
+        clear_customizes_cache()
     if entry_data:
         _LOGGER.info('Customizing via config flow: %s', entry_data)
 
@@ -427,6 +429,7 @@ async def async_reload_integration_config(hass, config):
                 continue
             DEVICE_CUSTOMIZES.setdefault(m, {})
             DEVICE_CUSTOMIZES[m].update(cus)
+        clear_customizes_cache()
     return config
 
 
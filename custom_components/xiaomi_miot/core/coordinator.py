@@ -31,6 +31,7 @@ class DataCoordinator(DataUpdateCoordinator):
             **kwargs,
         )
         self.device = device
+        self.base_interval = self.update_interval
         if not hasattr(self, 'setup_method'):
             # hass v2024.7-
             self.async_add_listener(self.coordinator_updated)
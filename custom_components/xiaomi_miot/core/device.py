@@ -1,6 +1,8 @@
 import logging
+import asyncio
 import copy
 import re
+import time
 from typing import TYPE_CHECKING, Optional, Callable
 from datetime import timedelta
 from functools import cached_property
@@ -9,6 +11,8 @@ from homeassistant.const import CONF_HOST, CONF_TOKEN, CONF_MODEL, CONF_USERNAME
 from homeassistant.util import dt
 from homeassistant.components import persistent_notification
 from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.device_registry as dr
 
 from .const import (
@@ -45,6 +49,8 @@ from .templates import template
 if TYPE_CHECKING:
     from . import BasicEntity
 
+_LOGGER = logging.getLogger(__name__)
+
 InfoConverter = InfoConv().with_option(
     icon='mdi:information',
     device_class='update',
@@ -162,6 +168,12 @@ class Device(CustomConfigHelper):
     _exclude_miot_properties = None
     _unreadable_properties = None
     _unsub_purge = None
+    _push_mode = False
+    _pushes = 0
+    # lengthen the miot poll interval after the device pushed its properties
+    # this many times without a poll finding a change it didn't push
+    push_proven_after = 3
+    push_interval_factor = 5
 
     def __init__(self, info: DeviceInfo, entry: HassEntry):
         self.data = {}
@@ -173,8 +185,14 @@ class Device(CustomConfigHelper):
         self.entities: dict[str, 'BasicEntity'] = {}
         self.listeners: list[Callable] = []
         self.converters: list[BaseConv] = []
+        self.converters_by_mi: dict[str, list[BaseConv]] = {}
+        self.converters_by_full_name: dict[str, list[BaseConv]] = {}
+        self.converters_by_attr_key: dict[str, list[tuple[int, BaseConv]]] = {}
         self.coordinators: list[DataCoordinator] = []
         self.main_coordinators: list[DataCoordinator] = []
+        self.miot_coordinators: list[DataCoordinator] = []
+        self.notify_values: dict = {}
+        self.update_counts = {'pushed': 0, 'polled': 0, 'missed': 0}
         self.log = logging.getLogger(f'{__name__}.{self.model}')
 
     async def async_init(self):
@@ -199,6 +217,9 @@ class Device(CustomConfigHelper):
         self._exclude_miot_properties = self.custom_config_list('exclude_miot_properties', [])
         self._unreadable_properties = self.custom_config_bool('unreadable_properties')
 
+        if self.spec and self.use_local and not self.miio2miot:
+            self.local.miio.add_listener(self.on_miio_message)
+
         if not self.coordinators:
             await self.init_coordinators()
 
@@ -216,6 +237,11 @@ class Device(CustomConfigHelper):
             self._unsub_purge()
             self._unsub_purge = None
 
+        if self.local:
+            self.local.miio.remove_listener(self.on_miio_message)
+        if self.local and not self._proxy_device:
+            self.local.miio.close()
+
     @cached_property
     def did(self):
         return self.info.did
@@ -300,8 +326,7 @@ class Device(CustomConfigHelper):
         return get_customize_via_model(self.model)
 
     def custom_config(self, key=None, default=None):
-        cfg = self.customizes
-        return cfg if key is None else cfg.get(key, default)
+        return get_customize_via_model(self.model, key, default)
 
     @cached_property
     def extend_miot_specs(self):
@@ -327,8 +352,11 @@ class Device(CustomConfigHelper):
             trans_options = self.custom_config_bool('trans_options', self.entry.get_config('trans_options'))
             urn = await self.get_urn()
             obj = await MiotSpec.async_from_type(self.hass, urn, trans_options=trans_options)
-            dat[self.model] = obj
+            # another device of the model may have got the spec meanwhile
+            obj = dat[self.model] = dat.get(self.model) or obj
         if obj:
+            # the services are created once for the model and shared by its devices
+            obj.init_services()
             self.spec = copy.copy(obj)
             if not self.cloud_only:
                 if ext := self.extend_miot_specs:
@@ -357,11 +385,18 @@ class Device(CustomConfigHelper):
         return None
 
     def add_converter(self, conv: BaseConv, force=False):
-        if conv in self.converters:
+        full_name = conv.full_name
+        if conv in self.converters_by_full_name.get(full_name, []):
             return
-        if not force and self.find_converter(conv.full_name):
-            self.log.info('Converter for %s already exists. Ignored.', conv.full_name)
+        if not force and self.find_converter(full_name):
+            self.log.info('Converter for %s already exists. Ignored.', full_name)
             return
+        self.converters_by_full_name.setdefault(full_name, []).append(conv)
+        if conv.mi:
+            self.converters_by_mi.setdefault(conv.mi, []).append(conv)
+        # indexed by the first key of the attr path, with the position to keep the converters order
+        attr_key = f'{conv.attr}'.split(':')[0]
+        self.converters_by_attr_key.setdefault(attr_key, []).append((len(self.converters), conv))
         self.converters.append(conv)
 
     def add_converter_by_property(self, prop: MiotProperty, domain=None, option=None, cls=None, **kwargs):
@@ -374,9 +409,8 @@ class Device(CustomConfigHelper):
         return conv
 
     def find_converter(self, full_name):
-        for c in self.converters:
-            if c.full_name == full_name:
-                return c
+        if convs := self.converters_by_full_name.get(full_name):
+            return convs[0]
         return None
 
     def init_converters(self):
@@ -571,6 +605,7 @@ class Device(CustomConfigHelper):
                 update_interval=timedelta(seconds=inter),
             )
             lst.append(coo)
+            self.miot_coordinators.append(coo)
             if notify or not self.main_coordinators:
                 self.main_coordinators.append(coo)
 
@@ -582,6 +617,7 @@ class Device(CustomConfigHelper):
                 update_interval=timedelta(seconds=interval),
             )
             lst.append(coo)
+            self.miot_coordinators.append(coo)
             if not self.main_coordinators:
                 self.main_coordinators.append(coo)
         self.log.debug('Miot coordinators: %s', [*chunks, all_mapping])
@@ -648,6 +684,54 @@ class Device(CustomConfigHelper):
         for handler in self.listeners:
             handler(data, only_info=only_info)
 
+    def on_miio_message(self, method, params):
+        """Properties the device pushed to the local miio socket."""
+        if method != 'properties_changed' or not isinstance(params, list):
+            return
+        dids = [self.did]
+        if not self._proxy_device:
+            dids.append(str(self.local.miio.device_id))
+        results = [
+            p for p in params
+            if isinstance(p, dict) and str(p.get('did', self.did)) in dids
+        ]
+        payload = self.decode(results)
+        if not payload:
+            return
+        self.update_notify_values(results)
+        self.update_counts['pushed'] += 1
+        self._pushes += 1
+        if not self._push_mode and self._pushes >= self.push_proven_after:
+            self.set_push_mode(True)
+        MiotResults(results, self.miot_mapping()).to_attributes(self.props)
+        self.props['pushed_updates'] = self.update_counts['pushed']
+        self.data['updated'] = dt.now()
+        self.dispatch(payload)
+
+    def update_notify_values(self, results: list) -> list:
+        """Keeps the values of the properties the device can push, returns those that changed."""
+        changed = []
+        for r in results:
+            if not isinstance(r, dict) or r.get('code', 0) or 'value' not in r:
+                continue
+            mi = MiotSpec.unique_prop(r.get('siid'), piid=r.get('piid'))
+            prop = self.spec.specs.get(mi) if self.spec else None
+            if not prop or 'notify' not in prop.access:
+                continue
+            if mi in self.notify_values and self.notify_values[mi] != r['value']:
+                changed.append(mi)
+            self.notify_values[mi] = r['value']
+        return changed
+
+    def set_push_mode(self, push_mode: bool):
+        self._push_mode = push_mode
+        factor = self.push_interval_factor if push_mode else 1
+        for coo in self.miot_coordinators:
+            coo.update_interval = coo.base_interval * factor
+        if self.miot_coordinators:
+            self.props['poll_interval'] = self.miot_coordinators[-1].update_interval.total_seconds()
+        self.log.info('Device pushes its properties: %s, poll interval: %s', push_mode, self.props.get('poll_interval'))
+
     def dispatch_info(self):
         info = {}
         InfoConverter.decode(self, info, None)
@@ -672,16 +756,20 @@ class Device(CustomConfigHelper):
         piid = value.get('piid')
         if siid and piid:
             mi = MiotSpec.unique_prop(siid, piid=piid)
-            for conv in self.converters:
-                if conv.mi == mi:
-                    conv.decode(self, payload, value.get('value'))
+            for conv in self.converters_by_mi.get(mi, []):
+                conv.decode(self, payload, value.get('value'))
 
     def decode_attrs(self, value: dict):
         if not isinstance(value, dict):
             self.log.warning('Value is not dict: %s', value)
             return
         payload = {}
-        for conv in self.converters:
+        convs = []
+        for key in value:
+            convs.extend(self.converters_by_attr_key.get(f'{key}', []))
+        if len(convs) > 1:
+            convs.sort(key=lambda c: c[0])
+        for _, conv in convs:
             val = get_value(value, conv.attr, None, ':')
             if val is not None:
                 conv.decode(self, payload, val)
@@ -691,9 +779,8 @@ class Device(CustomConfigHelper):
         """Encode data from hass to device."""
         payload = {}
         for k, v in value.items():
-            for conv in self.converters:
-                if conv.full_name == k:
-                    conv.encode(self, payload, v)
+            for conv in self.converters_by_full_name.get(k, []):
+                conv.encode(self, payload, v)
         return payload
 
     async def async_write(self, payload: dict):
@@ -834,6 +921,7 @@ class Device(CustomConfigHelper):
         })
 
         if use_local:
+            chunk_sizes = None
             try:
                 if self.miio2miot:
                     results = await self.miio2miot.async_get_miot_props(self.local, mapping)
@@ -844,7 +932,8 @@ class Device(CustomConfigHelper):
                     if not max_properties:
                         max_properties = self.custom_config_integer('chunk_properties')
                     if not max_properties:
-                        max_properties = self.local.get_max_properties(mapping)
+                        chunk_sizes = await MiotChunkSizes.async_get(self.hass)
+                        max_properties = chunk_sizes.size(self.model, self.local.get_max_properties(mapping))
                     maps = []
                     if chunk_services:
                         for service in self.spec.get_services(excludes=self._exclude_miot_services):
@@ -857,11 +946,19 @@ class Device(CustomConfigHelper):
                     else:
                         maps.append(mapping)
                     for mapp in maps:
-                        res = await self.local.async_get_properties_for_mapping(
-                            max_properties=max_properties,
-                            did=self.did,
-                            mapping=mapp,
-                        )
+                        chunk_stats = {}
+                        try:
+                            res = await self.local.async_get_properties_for_mapping(
+                                max_properties=max_properties,
+                                did=self.did,
+                                mapping=mapp,
+                                chunk_stats=chunk_stats,
+                            )
+                        finally:
+                            if chunk_sizes and chunk_stats:
+                                chunk_sizes.update(self.model, chunk_stats)
+                                self.props['chunk_properties'] = chunk_sizes.size(self.model, max_properties)
+                                self.props['chunk_rtt'] = chunk_sizes.rtt(self.model)
                         results.extend(res)
                 self.available = True
                 self._local_fails = 0
@@ -913,6 +1010,15 @@ class Device(CustomConfigHelper):
                 dev_reg.async_update_device(dev.id, sw_version=self.sw_version)
                 self.log.info('State updater: %s', self.sw_version)
         if results:
+            if missed := self.update_notify_values(results):
+                # the device didn't push these changes
+                self.update_counts['missed'] += 1
+                self._pushes = 0
+                if self._push_mode:
+                    self.log.info('Polled changes that were not pushed: %s', missed)
+                    self.set_push_mode(False)
+            self.update_counts['polled'] += 1
+            self.props['polled_updates'] = self.update_counts['polled']
             self.miot_results.to_attributes(self.props)
             self.data['updated'] = dt.now()
             self.dispatch(self.decode(results))
@@ -1028,6 +1134,10 @@ class Device(CustomConfigHelper):
                 results.append(await self.miio2miot.async_set_property(self.local, siid, piid, param['value']))
         elif self.local:
             results = await self.local.async_send('set_properties', params)
+            # the device may not push the values it was set to
+            if isinstance(results, list):
+                done = [MiotSpec.unique_prop(r) for r in results if isinstance(r, dict) and not r.get('code', 0)]
+                self.update_notify_values([p for p in params if MiotSpec.unique_prop(p) in done])
         if self.cloud and cloud_params:
             if self.custom_config_bool('cloud_set_single'):
                 results.extend([
@@ -1371,12 +1481,38 @@ class MiotDevice():
         except KeyError:
             return resp
 
-    async def async_send_chunk(self, method: str, params: list, chunk: int = 0):
+    async def async_send_timed(self, *args, **kwargs):
+        now = time.monotonic()
+        resp = await self.miio.send(*args, **kwargs)
+        return resp, time.monotonic() - now
+
+    async def async_send_chunk(self, method: str, params: list, chunk: int = 0, chunk_stats: dict = None):
+        """
+        chunk_stats is filled with the chunk size, the number of chunks, the chunks
+        the device didn't answer in full, the chunks sent while it was offline and
+        the average round trip time (ms)
+        """
         if not chunk:
             chunk = 15
         results = []
-        for i in range(0, len(params), chunk):
-            resp = await self.miio.send(method, params[i : i + chunk])
+        # the chunks are sent at the same time, up to AsyncMiIO.max_requests
+        chunks = [params[i : i + chunk] for i in range(0, len(params), chunk)]
+        resps = await asyncio.gather(*[
+            self.async_send_timed(method, pms)
+            for pms in chunks
+        ])
+        if chunk_stats is not None:
+            chunk_stats.update({
+                'size': chunk,
+                'count': len(chunks),
+                'failed': sum(
+                    resp is not None and len(resp.get('result') or []) < len(pms)
+                    for pms, (resp, _) in zip(chunks, resps)
+                ),
+                'offline': sum(resp is None for resp, _ in resps),
+                'rtt': sum(t for _, t in resps) * 1000 / len(resps) if resps else 0,
+            })
+        for resp, _ in resps:
             if not results:
                 self.handle_response(resp)
             try:
@@ -1394,17 +1530,17 @@ class MiotDevice():
     async def async_get_prop(self, properties, *, max_properties=None, property_getter='get_prop'):
         return await self.async_get_properties(properties, max_properties=max_properties, property_getter=property_getter)
 
-    async def async_get_properties(self, properties, *, max_properties=None, property_getter='get_properties'):
-        return await self.async_send_chunk(property_getter, properties, max_properties)
+    async def async_get_properties(self, properties, *, max_properties=None, property_getter='get_properties', **kwargs):
+        return await self.async_send_chunk(property_getter, properties, max_properties, **kwargs)
 
-    async def async_get_properties_for_mapping(self, *, max_properties=None, did=None, mapping=None):
+    async def async_get_properties_for_mapping(self, *, max_properties=None, did=None, mapping=None, **kwargs):
         if mapping is None:
             return None
         properties = [
             {'did': f'prop.{v["siid"]}.{v["piid"]}' if did is None else str(did), **v}
             for k, v in mapping.items()
         ]
-        return await self.async_get_properties(properties, max_properties=max_properties)
+        return await self.async_get_properties(properties, max_properties=max_properties, **kwargs)
 
     def get_max_properties(self, mapping):
         idx = len(mapping)
@@ -1424,6 +1560,73 @@ class MiotDevice():
         return 10 if idx >= len(chunks) else chunks[idx]
 
 
+class MiotChunkSizes:
+    """
+    Learns how many properties each model answers in a local get_properties
+    request. The size grows by one after `grow_after` polls that were answered
+    in full. When a chunk gets no answer, an error or fewer results than it
+    asked for, it goes back to the last size that was answered in full (or is
+    halved). A size that failed is only tried again after `retry_after` good
+    polls. The sizes are saved in HA storage.
+    """
+    max_size = 15  # the request must be less than 1024 bytes
+    grow_after = 5
+    retry_after = 100
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.store = Store(hass, 1, f'{DOMAIN}/chunk_properties.json')
+        self.models: dict[str, dict] = {}
+
+    @staticmethod
+    async def async_get(hass: HomeAssistant) -> 'MiotChunkSizes':
+        if not (chunk_sizes := hass.data[DOMAIN].get('chunk_sizes')):
+            chunk_sizes = hass.data[DOMAIN]['chunk_sizes'] = MiotChunkSizes(hass)
+            await chunk_sizes.async_load()
+        return chunk_sizes
+
+    async def async_load(self):
+        try:
+            models = await self.store.async_load() or {}
+        except (ValueError, HomeAssistantError):
+            await self.store.async_remove()
+            models = {}
+        self.models = {**models, **self.models}
+
+    def size(self, model, default=None):
+        return self.models.get(model, {}).get('size') or default
+
+    def rtt(self, model):
+        return self.models.get(model, {}).get('rtt')
+
+    def update(self, model, chunk_stats: dict):
+        size = chunk_stats['size']
+        if chunk_stats['offline'] or not chunk_stats['count']:
+            return
+        dat = self.models.setdefault(model, {})
+        rtt = chunk_stats['rtt']
+        dat['rtt'] = round(dat['rtt'] * 0.8 + rtt * 0.2 if dat.get('rtt') else rtt, 1)
+
+        if chunk_stats['failed']:
+            dat['failed_size'] = min(size, dat.get('failed_size') or size)
+            ok_size = dat.pop('ok_size', None)
+            dat['size'] = ok_size if ok_size and ok_size < size else max(1, size // 2)
+            dat['successes'] = 0
+            _LOGGER.info('%s: %s of %s chunks of %s properties failed, chunk size: %s', model,
+                         chunk_stats['failed'], chunk_stats['count'], size, dat['size'])
+        else:
+            dat['size'] = dat['ok_size'] = size
+            dat['successes'] = dat.get('successes', 0) + 1
+            if dat.get('failed_size') and dat['successes'] >= self.retry_after:
+                dat.pop('failed_size')
+                dat['successes'] = 0
+            # grow only if the size limited the request
+            if chunk_stats['count'] > 1 and dat['successes'] % self.grow_after == 0:
+                if size < self.max_size and size + 1 < (dat.get('failed_size') or self.max_size + 2):
+                    dat['size'] = size + 1
+        self.store.async_delay_save(lambda: self.models, 60)
+
+
 class MiioInfo(dict):
     def __getattr__(self, item):
         return self.get(item)
@@ -9,7 +9,7 @@ import time
 from asyncio import DatagramProtocol, Future
 from asyncio.protocols import BaseProtocol
 from asyncio.transports import DatagramTransport
-from typing import Union
+from typing import Callable, Union
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
@@ -55,14 +55,11 @@ class BasemiIO:
         return unpadder.update(padded_plaintext) + unpadder.finalize()
 
     def _pack_raw(self, msg_id: int, method: str, params: Union[dict, list] = None):
+        return self._pack_payload({"id": msg_id, "method": method, "params": params or []})
+
+    def _pack_payload(self, payload: dict):
         # latest zero unnecessary
-        payload = (
-            json.dumps(
-                {"id": msg_id, "method": method, "params": params or []},
-                separators=(",", ":"),
-            ).encode()
-            + b"\x00"
-        )
+        payload = json.dumps(payload, separators=(",", ":")).encode() + b"\x00"
 
         data = self._encrypt(payload)
 
@@ -205,23 +202,76 @@ class SyncMiIO(BasemiIO):
 
 # noinspection PyUnusedLocal
 class AsyncSocket(DatagramProtocol):
-    timeout = 0
+    """A long-lived UDP socket to one miIO device. The responses are matched
+    to the requests waiting for them by the message id, so more than one
+    request can be sent at a time. Messages the device sends on its own (with
+    a method, like properties_changed) are passed to `on_message`.
+    """
+
     transport: DatagramTransport = None
-    response: Future = None
+    on_message: Callable[[dict], None] = None
+
+    def __init__(self, unpack):
+        self.unpack = unpack
+        self.requests: dict[int, Future] = {}
+        self.hello: Future = None
+        self.recv_time = 0
 
-    def __init__(self):
-        self.response = asyncio.get_event_loop().create_future()
+    @property
+    def closed(self) -> bool:
+        return self.transport is None or self.transport.is_closing()
 
     def connection_made(self, transport: DatagramTransport):
-        # _LOGGER.debug(f"connection_made {transport}")
         self.transport = transport
 
+    def connection_lost(self, exc):
+        self.error_received(exc or ConnectionError("Socket closed"))
+
+    def error_received(self, exc: Exception):
+        # OSError: [Errno 111] Connection refused (ICMP port unreachable)
+        for fut in [self.hello, *self.requests.values()]:
+            if fut and not fut.done():
+                fut.set_exception(exc)
+
     def datagram_received(self, data: bytes, addr):
-        # _LOGGER.debug(f"datagram_received {data}")
-        self.response.set_result(data)
+        if data[:2] != b"\x21\x31":
+            return
+        self.recv_time = time.monotonic()
+
+        if len(data) == 32:
+            # answer on ping (hello)
+            if self.hello and not self.hello.done():
+                self.hello.set_result(data)
+            return
+
+        try:
+            data = self.unpack(data).rstrip(b"\x00")
+        except Exception:
+            return
 
-    def settimeout(self, value: int):
-        self.timeout = value
+        if data == b"":
+            # mgl03 fw 1.4.6_0012 without Internet respond on miIO.info
+            # command with empty answer, it can only be matched if it is the
+            # only request waiting
+            if len(self.requests) == 1:
+                fut = next(iter(self.requests.values()))
+                if not fut.done():
+                    fut.set_result(data)
+            return
+
+        try:
+            resp = json.loads(data)
+            if "method" in resp:
+                if self.on_message:
+                    self.on_message(resp)
+                return
+            fut = self.requests.get(resp["id"])
+        except Exception:
+            return
+        if fut and not fut.done():
+            fut.set_result(resp)
+        else:
+            _LOGGER.debug(f"{self.transport.get_extra_info('peername')} | wrong answer ID")
 
     def sendto(self, data: bytes):
         self.transport.sendto(data)
@@ -234,31 +284,59 @@ class AsyncSocket(DatagramProtocol):
         except Exception as e:
             _LOGGER.error("Error when closing async socket", exc_info=e)
 
-    async def connect(self, addr: tuple[str, int]):
+    async def connect(self, addr: tuple[str, int], timeout: float = 0):
         coro = asyncio.get_event_loop().create_datagram_endpoint(
             lambda: self, remote_addr=addr
         )
-        if self.timeout:
-            await asyncio.wait_for(coro, self.timeout)
+        if timeout:
+            await asyncio.wait_for(coro, timeout)
         else:
             await coro
 
-    async def recv(self, *args):
-        self.response = asyncio.get_event_loop().create_future()
-        if self.timeout:
-            return await asyncio.wait_for(self.response, self.timeout)
-        return await self.response
+    async def ping(self, timeout: float) -> bytes:
+        self.hello = asyncio.get_event_loop().create_future()
+        self.sendto(HELLO)
+        return await asyncio.wait_for(self.hello, timeout)
+
+    async def request(self, msg_id: int, raw: bytes, timeout: float):
+        fut = self.requests[msg_id] = asyncio.get_event_loop().create_future()
+        try:
+            self.sendto(raw)
+            return await asyncio.wait_for(fut, timeout)
+        finally:
+            self.requests.pop(msg_id, None)
 
 
 # noinspection PyMethodMayBeStatic,PyTypeChecker
 class AsyncMiIO(BasemiIO, BaseProtocol):
+    """Asynchronous miIO protocol. The socket to the device is kept open
+    between requests (and closed when it has not been used for a while), the
+    device_id and delta_ts from the ping are kept until the device stops
+    answering and up to `max_requests` requests are sent at a time.
+
+    The messages the device sends on its own are acknowledged and passed to
+    the listeners as (method, params), the socket isn't closed when idle while
+    there are listeners.
+    """
+
+    sock: AsyncSocket = None
+    ping_failed_time = 0
+    max_requests = 4
+    idle_close_secs = 600
+
+    def __init__(self, host: str, token: str, timeout: float = 3):
+        super().__init__(host, token, timeout)
+        self.lock = asyncio.Lock()
+        self.semaphore = asyncio.Semaphore(self.max_requests)
+        self.idle_close = None
+        self.listeners: list[Callable] = []
+
     async def ping(self, sock: AsyncSocket) -> bool:
         """Returns `true` if the connection to the miio device is working. The
         token is not verified at this stage.
         """
         try:
-            sock.sendto(HELLO)
-            raw = await sock.recv(1024)
+            raw = await sock.ping(self.timeout)
             if raw[:2] == b"\x21\x31":
                 self.device_id = int.from_bytes(raw[8:12], "big")
                 self.delta_ts = time.time() - int.from_bytes(raw[12:16], "big")
@@ -267,6 +345,64 @@ class AsyncMiIO(BasemiIO, BaseProtocol):
             pass
         return False
 
+    async def connect(self, try_time: float) -> AsyncSocket | None:
+        """Open the socket and ping the device if it's needed. Returns None if
+        the device doesn't answer on ping. The requests waiting here while
+        another request pings the device use its ping.
+        """
+        async with self.lock:
+            if self.sock is None or self.sock.closed:
+                self.delta_ts = None
+                self.sock = AsyncSocket(self._unpack_raw)
+                self.sock.on_message = self._on_message
+                await self.sock.connect(self.addr, self.timeout)
+
+            if self.delta_ts is None:
+                if self.ping_failed_time > try_time:
+                    return None
+                if not await self.ping(self.sock):
+                    self.ping_failed_time = time.monotonic()
+                    return None
+
+            return self.sock
+
+    def close(self):
+        if self.idle_close:
+            self.idle_close.cancel()
+            self.idle_close = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def add_listener(self, handler: Callable):
+        if handler not in self.listeners:
+            self.listeners.append(handler)
+
+    def remove_listener(self, handler: Callable):
+        if handler in self.listeners:
+            self.listeners.remove(handler)
+
+    def _on_message(self, msg: dict):
+        if self.sock and self.delta_ts is not None and "id" in msg:
+            self.sock.sendto(self._pack_payload({"id": msg["id"], "result": ["ok"]}))
+        if self.debug:
+            _LOGGER.debug(f"{self.addr[0]} | message: {msg}")
+        for handler in self.listeners:
+            try:
+                handler(msg["method"], msg.get("params"))
+            except Exception as e:
+                _LOGGER.warning(f"{self.addr[0]} | Error handling {msg['method']}", exc_info=e)
+
+    def _close_when_idle(self):
+        if self.idle_close:
+            self.idle_close.cancel()
+            self.idle_close = None
+        if self.listeners:
+            return
+        self.idle_close = asyncio.get_event_loop().call_later(
+            self.idle_close_secs, self.close
+        )
+
     async def send(self, method: str, params: Union[dict, list] = None, tries=3):
         """Send command to miIO device and get result from it. Params can be
         dict or list depend on command.
@@ -277,50 +413,51 @@ class AsyncMiIO(BasemiIO, BaseProtocol):
         - {'id':123,'result':...} - device answered on cmd with good result
         - {'id':123,'error':...}
         """
+        async with self.semaphore:
+            try:
+                return await self._send(method, params, tries)
+            finally:
+                self._close_when_idle()
+
+    async def _send(self, method: str, params: Union[dict, list] = None, tries=3):
         offline = False
         for _ in range(0, tries):
-            sock = AsyncSocket()
-            sock.settimeout(self.timeout)
+            try_time = time.monotonic()
+            sock = None
             try:
-                # create socket every time for reset connection, because we can
-                # reseive answer on previous request or request from another
-                # thread
-                await sock.connect(self.addr)
-
                 # need device_id for send command, can get it from ping cmd
-                if self.delta_ts is None and not await self.ping(sock):
+                sock = await self.connect(try_time)
+                if sock is None:
                     # device doesn't answered on ping
                     offline = True
                     continue
 
                 # pack each time for new message id
                 msg_id = random.randint(100000000, 999999999)
+                while msg_id in sock.requests:
+                    msg_id = random.randint(100000000, 999999999)
                 raw_send = self._pack_raw(msg_id, method, params)
-                sock.sendto(raw_send)
                 # can receive more than 1024 bytes (1056 approximate maximum)
-                raw_recv = await sock.recv(10240)
-                data = self._unpack_raw(raw_recv).rstrip(b"\x00")
+                data = await sock.request(msg_id, raw_send, self.timeout)
 
                 if data == b"":
                     # mgl03 fw 1.4.6_0012 without Internet respond on miIO.info
                     # command with empty answer
                     continue
 
-                data = json.loads(data)
-                # check if we received response for our cmd
-                if data["id"] != msg_id:
-                    _LOGGER.debug(f"{self.addr[0]} | wrong answer ID")
-                    continue
-
                 return data
 
-            except (asyncio.TimeoutError, OSError):
+            except asyncio.TimeoutError:
+                # ping again only if the device didn't answer on anything else
+                # (the other requests) while waiting
+                if self.sock and self.sock.recv_time > try_time:
+                    continue
+            except OSError:
                 # OSError: [Errno 101] Network unreachable
-                pass
+                if sock and sock is self.sock:
+                    self.close()
             except Exception as e:
                 _LOGGER.debug(f"{self.addr[0]} | {method}", exc_info=e)
-            finally:
-                sock.close()
 
             # init ping again
             self.delta_ts = None
@@ -334,14 +471,18 @@ class AsyncMiIO(BasemiIO, BaseProtocol):
 
     async def send_bulk(self, method: str, params: list, chunk: int = 0) -> list:
         """Sends a command with a large number of parameters. Splits into
-        multiple requests when the size of one request is exceeded.
+        multiple requests when the size of one request is exceeded. The
+        requests are sent at the same time (up to `max_requests`).
         """
         if not chunk:
             chunk = 15
         try:
+            resps = await asyncio.gather(*[
+                self.send(method, params[i : i + chunk])
+                for i in range(0, len(params), chunk)
+            ])
             result = []
-            for i in range(0, len(params), chunk):
-                resp = await self.send(method, params[i : i + chunk])
+            for resp in resps:
                 result += resp["result"]
             return result
         except Exception:
@@ -76,6 +76,58 @@ SPEC_ERRORS = {
 }
 
 
+class MiotSpecCache:
+    """
+    The spec files in HA storage (instances.json, the specs and their
+    translations) are parsed once and the data is shared by all the devices,
+    devices setting up at the same time wait for the same load. Saving a file
+    replaces its cached data. The data is dropped `keep_secs` after it was
+    loaded, so instances.json isn't kept in memory after the startup.
+    """
+    keep_secs = 600
+
+    def __init__(self, hass: HomeAssistant):
+        self.hass = hass
+        self.files: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def get(hass: HomeAssistant) -> 'MiotSpecCache':
+        dat = hass.data.setdefault(DOMAIN, {})
+        if not (spec_cache := dat.get('spec_cache')):
+            spec_cache = dat['spec_cache'] = MiotSpecCache(hass)
+        return spec_cache
+
+    async def async_load(self, fnm: str) -> dict:
+        """A copy of the file's data, the values are shared and must not be changed."""
+        fut = self.files.get(fnm)
+        if fut is None:
+            loop = asyncio.get_running_loop()
+            fut = self.files[fnm] = loop.create_task(self._async_load(fnm))
+            loop.call_later(self.keep_secs, self.files.pop, fnm, None)
+        try:
+            dat = await asyncio.shield(fut)
+        except Exception:
+            if self.files.get(fnm) is fut:
+                self.files.pop(fnm)
+            raise
+        return {**dat}
+
+    async def _async_load(self, fnm: str) -> dict:
+        store = Store(self.hass, 1, fnm)
+        try:
+            return await store.async_load() or {}
+        except (ValueError, HomeAssistantError):
+            await store.async_remove()
+            return {}
+
+    async def async_save(self, fnm: str, dat: dict):
+        loop = asyncio.get_running_loop()
+        fut = self.files[fnm] = loop.create_future()
+        fut.set_result(dat)
+        loop.call_later(self.keep_secs, self.files.pop, fnm, None)
+        await Store(self.hass, 1, fnm).async_save(dat)
+
+
 # https://iot.mi.com/new/doc/tools-and-resources/design/spec/overall
 # https://iot.mi.com/new/doc/tools-and-resources/design/spec/xiaoai
 # https://iot.mi.com/new/doc/tools-and-resources/design/spec/shortcut
@@ -163,13 +215,24 @@ class MiotSpec(MiotSpecInstance):
         self.trans_options = trans_options
         self.spec_translations = translations or {}
         super().__init__(dat)
+        self.custom_mapping = None
+        self.custom_mapping_names = {}
+
+    def __getattr__(self, name):
+        # the services are only created when they are first used
+        if name in ('services', 'services_count', 'services_properties', 'specs'):
+            self.init_services()
+            return self.__dict__[name]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def init_services(self):
+        if 'services' in self.__dict__:
+            return
         self.services = {}
         self.services_count = {}
         self.services_properties = {}
         self.specs = {}
-        self.custom_mapping = None
-        self.custom_mapping_names = {}
-        self.extend_specs(services=dat.get('services') or [])
+        self.extend_specs(services=self.raw.get('services') or [])
 
     def extend_specs(self, services: list):
         for s in (services or []):
@@ -291,12 +354,8 @@ class MiotSpec(MiotSpecInstance):
         if not model:
             return None
         fnm = f'{DOMAIN}/instances.json'
-        store = Store(hass, 1, fnm)
-        try:
-            cached = await store.async_load() or {}
-        except (ValueError, HomeAssistantError):
-            await store.async_remove()
-            cached = {}
+        spec_cache = MiotSpecCache.get(hass)
+        cached = await spec_cache.async_load(fnm)
         now = int(time.time())
         dat = {}
         if not use_remote:
@@ -322,8 +381,8 @@ class MiotSpec(MiotSpecInstance):
                                 continue
                         v.pop('model', None)
                         sdt[m] = v
-                    await store.async_save(sdt)
-                    dat = sdt
+                    await spec_cache.async_save(fnm, sdt)
+                    dat = {**sdt}
                     _LOGGER.info(
                         'Renew miot spec instances: %s, count: %s, model: %s',
                         fnm, len(sdt) - 1, model,
@@ -350,13 +409,9 @@ class MiotSpec(MiotSpecInstance):
         fnm = f'{DOMAIN}/{typ}.json'
         if platform.system() == 'Windows':
             fnm = fnm.replace(':', '_')
-        store = Store(hass, 1, fnm)
-        try:
-            cached = await store.async_load() or {}
-        except (ValueError, HomeAssistantError):
-            await store.async_remove()
-            cached = {}
-        dat = cached
+        spec_cache = MiotSpecCache.get(hass)
+        cached = await spec_cache.async_load(fnm)
+        dat = {**cached}
         ptm = dat.pop('_updated_time', 0)
         now = int(time.time())
         ttl = 60
@@ -369,7 +424,7 @@ class MiotSpec(MiotSpecInstance):
                 url = f'/miot-spec-v2/instance?type={typ}'
                 dat = await MiotSpec.async_download_miot_spec(hass, url, tries=3)
                 dat['_updated_time'] = now
-                await store.async_save(dat)
+                await spec_cache.async_save(fnm, dat)
             except (TypeError, ValueError, BaseException) as exc:
                 if cached:
                     dat = cached
@@ -379,7 +434,7 @@ class MiotSpec(MiotSpecInstance):
                         'exception': f'{exc}',
                         '_updated_time': now,
                     }
-                    await store.async_save(dat)
+                    await spec_cache.async_save(fnm, dat)
                     _LOGGER.warning('Get miot-spec for %s failed: %s', typ, exc)
 
         translations = await MiotSpec.async_get_langs(hass, typ)
@@ -422,13 +477,9 @@ class MiotSpec(MiotSpecInstance):
         fnm = f'{DOMAIN}/spec-langs/{typ}.json'
         if platform.system() == 'Windows':
             fnm = fnm.replace(':', '_')
-        store = Store(hass, 1, fnm)
-        try:
-            cached = await store.async_load() or {}
-        except (ValueError, HomeAssistantError):
-            await store.async_remove()
-            cached = {}
-        dat = cached
+        spec_cache = MiotSpecCache.get(hass)
+        cached = await spec_cache.async_load(fnm)
+        dat = {**cached}
         ptm = dat.pop('_updated_time', 0)
         now = int(time.time())
         ttl = 60
@@ -441,7 +492,7 @@ class MiotSpec(MiotSpecInstance):
                 url = f'/instance/v2/multiLanguage?urn={typ}'
                 dat = await MiotSpec.async_download_miot_spec(hass, url, tries=3)
                 dat['_updated_time'] = now
-                await store.async_save(dat)
+                await spec_cache.async_save(fnm, dat)
             except (TypeError, ValueError, BaseException) as exc:
                 if cached:
                     dat = cached
@@ -451,7 +502,7 @@ class MiotSpec(MiotSpecInstance):
                         'exception': f'{exc}',
                         '_updated_time': now,
                     }
-                    await store.async_save(dat)
+                    await spec_cache.async_save(fnm, dat)
                     _LOGGER.warning('Get miot-spec langs for %s failed: %s', typ, exc)
         return dat.get('data') or {}
 
@@ -34,15 +34,31 @@ def get_value(obj, key, def_value=None, sep='.'):
     return result
 
 
+# merged DEVICE_CUSTOMIZES for each model (and entity customize keys),
+# cleared by clear_customizes_cache when DEVICE_CUSTOMIZES is changed
+CUSTOMIZES_CACHE = {}
+WILDCARD_MODELS_CACHE = {}
+
+
+def clear_customizes_cache():
+    CUSTOMIZES_CACHE.clear()
+
+
+def get_customizes_via_models(models: tuple):
+    """Merged customizes of the models, the first one has the highest priority."""
+    cfg = CUSTOMIZES_CACHE.get(models)
+    if cfg is None:
+        cfg = {}
+        for m in reversed(models):
+            if cus := DEVICE_CUSTOMIZES.get(m):
+                cfg.update(cus)
+        CUSTOMIZES_CACHE[models] = cfg
+    return cfg
+
+
 def get_customize_via_model(model, key=None, default=None):
-    cfg = {}
-    for m in wildcard_models(model):
-        cus = DEVICE_CUSTOMIZES.get(m) or {}
-        if key is not None and key not in cus:
-            continue
-        if cus:
-            cfg = {**cus, **cfg}
-    return cfg if key is None else cfg.get(key, default)
+    cfg = get_customizes_via_models(tuple(wildcard_models(model)))
+    return {**cfg} if key is None else cfg.get(key, default)
 
 
 def get_customize_via_entity(entity, key=None, default=None):
@@ -61,12 +77,11 @@ def get_customize_via_entity(entity, key=None, default=None):
     mls = []
     if model := getattr(entity, 'model', None):
         if hasattr(entity, 'customize_keys'):
-            mls.extend(entity.customize_keys)
-        mls.append(model)
-    for mod in mls:
-        cus = get_customize_via_model(mod)
-        cfg = {**cus, **cfg}
-    return cfg if key is None else cfg.get(key, default)
+            for mod in entity.customize_keys:
+                mls.extend(wildcard_models(mod))
+        mls.extend(wildcard_models(model))
+    cus = get_customizes_via_models(tuple(mls))
+    return {**cus, **cfg} if key is None else cus.get(key, default)
 
 
 class CustomConfigHelper:
@@ -158,13 +173,15 @@ def wildcard_models(model):
         return []
     if ':' in model:
         return [model]
-    wil = re.sub(r'\.[^.]+$', '.*', model)
-    return [
-        model,
-        wil,
-        re.sub(r'^[^.]+\.', '*.', wil),
-        '*',
-    ]
+    if not (mls := WILDCARD_MODELS_CACHE.get(model)):
+        wil = re.sub(r'\.[^.]+$', '.*', model)
+        mls = WILDCARD_MODELS_CACHE[model] = (
+            model,
+            wil,
+            re.sub(r'^[^.]+\.', '*.', wil),
+            '*',
+        )
+    return list(mls)
 
 
 def convert_globs_to_pattern(globs: list[str] | None):
@@ -73,6 +73,7 @@ class MiotCloud(micloud.MiCloud):
         self.login_times = 0
         self.cookies = {}
         self.attrs = {}
+        self.props_batch = MiotCloudPropsBatch(self)
 
     @property
     def unique_id(self):
@@ -89,7 +90,7 @@ class MiotCloud(micloud.MiCloud):
             p = v.get('piid')
             pms.append({'did': str(did), 'siid': s, 'piid': p})
             rmp[f'prop.{s}.{p}'] = k
-        rls = await self.async_get_props(pms)
+        rls = await self.props_batch.async_get_props(pms)
         if not rls:
             return None
         dls = []
@@ -958,6 +959,120 @@ class MiotCloud(micloud.MiCloud):
         return ''.join((random.choice(seq) for _ in range(length)))
 
 
+class MiotCloudPropsBatch:
+    """
+    Collects the prop/get requests of all the devices of the account for `delay`
+    seconds and sends them together, up to `max_props` properties in a request.
+    The results are given back to each device by did, siid and piid.
+    """
+    delay = 0.5
+    max_props = 150
+
+    def __init__(self, cloud: MiotCloud):
+        self.cloud = cloud
+        self.pending: list[tuple[list, asyncio.Future, float]] = []
+        self.task: Optional[asyncio.Task] = None
+        self.device_requests = 0
+        self.requests = 0
+        self.latency_total = 0
+        self.latency_max = 0
+
+    @property
+    def requests_saved(self):
+        return self.device_requests - self.requests
+
+    @property
+    def latency_avg(self):
+        return self.latency_total / self.device_requests if self.device_requests else 0
+
+    @property
+    def stats(self):
+        return {
+            'device_requests': self.device_requests,
+            'requests': self.requests,
+            'requests_saved': self.requests_saved,
+            'latency_avg': round(self.latency_avg, 3),
+            'latency_max': round(self.latency_max, 3),
+        }
+
+    @staticmethod
+    def prop_key(prop: dict):
+        return str(prop.get('did')), prop.get('siid'), prop.get('piid')
+
+    async def async_get_props(self, params: list):
+        """Same as MiotCloud.async_get_props, for the properties of one device."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self.pending.append((params, fut, time.monotonic()))
+        if not self.task:
+            self.task = loop.create_task(self.async_send_pending())
+        return await fut
+
+    async def async_send_pending(self):
+        await asyncio.sleep(self.delay)
+        pending, self.pending = self.pending, []
+        self.task = None
+
+        # the properties of a device are kept in the same request
+        batches = []
+        batch = []
+        props = 0
+        for item in pending:
+            if batch and props + len(item[0]) > self.max_props:
+                batches.append(batch)
+                batch = []
+                props = 0
+            batch.append(item)
+            props += len(item[0])
+        if batch:
+            batches.append(batch)
+
+        try:
+            await asyncio.gather(*[self.async_send_batch(b) for b in batches])
+        finally:
+            for _, fut, _ in pending:
+                if not fut.done():
+                    fut.cancel()
+
+    async def async_send_batch(self, batch: list):
+        params = []
+        keys = set()
+        for pms, _, _ in batch:
+            for p in pms:
+                if (key := self.prop_key(p)) not in keys:
+                    keys.add(key)
+                    params.append(p)
+        try:
+            rls = await self.cloud.async_get_props(params)
+        except Exception as exc:
+            rls = exc
+        self.requests += 1
+        _LOGGER.debug('Batched cloud properties: %s devices, %s properties', len(batch), len(params))
+
+        results = {}
+        if isinstance(rls, list):
+            for v in rls:
+                if isinstance(v, dict):
+                    results.setdefault(self.prop_key(v), v)
+        now = time.monotonic()
+        for pms, fut, start in batch:
+            self.device_requests += 1
+            self.latency_total += now - start
+            self.latency_max = max(self.latency_max, now - start)
+            if fut.done():
+                continue
+            if isinstance(rls, Exception):
+                fut.set_exception(rls)
+            elif not rls:
+                fut.set_result(rls)
+            else:
+                fut.set_result([
+                    {**results[key]}
+                    for p in pms
+                    if (key := self.prop_key(p)) in results
+                ] or None)
+
+
 class MiCloudNeedVerify(MiCloudException):
     url = None
 
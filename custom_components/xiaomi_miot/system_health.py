@@ -2,6 +2,7 @@
 from homeassistant.components import system_health
 from homeassistant.core import HomeAssistant, callback
 
+from .core.hass_entry import HassEntry
 from .core.utils import async_get_manifest
 from .core.xiaomi_cloud import MiotCloud
 
@@ -18,10 +19,21 @@ async def system_health_info(hass):
     uas = {}
     uds = {}
     all_devices = {}
+    batch = {'device_requests': 0, 'requests': 0, 'latency_total': 0}
     for mic in MiotCloud.all_clouds(hass):
         uas[mic.user_id] = mic
         uds[mic.unique_id] = await mic.async_get_devices_by_key('did') or {}
         all_devices.update(uds[mic.unique_id])
+        batch['device_requests'] += mic.props_batch.device_requests
+        batch['requests'] += mic.props_batch.requests
+        batch['latency_total'] += mic.props_batch.latency_total
+
+    local = {'pushed': 0, 'polled': 0, 'push_devices': 0}
+    for entry in HassEntry.ALL.values():
+        for device in entry.devices.values():
+            local['pushed'] += device.update_counts['pushed']
+            local['polled'] += device.update_counts['polled']
+            local['push_devices'] += device.update_counts['pushed'] > 0
 
     api = mic.get_api_url('') if mic else 'https://api.io.mi.com'
     api_spec = 'https://miot-spec.org/miot-spec-v2/spec/services'
@@ -35,6 +47,11 @@ async def system_health_info(hass):
         ),
         'logged_accounts': len(uas),
         'total_devices': len(all_devices),
+        'cloud_props_requests': '{requests}/{device_requests}, {latency:.2f}s'.format(
+            latency=batch['latency_total'] / batch['device_requests'] if batch['device_requests'] else 0,
+            **batch,
+        ),
+        'miot_updates': '{pushed}/{polled}, {push_devices} devices pushing'.format(**local),
     }
 
     return data
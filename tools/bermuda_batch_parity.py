@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Check that the batch engine smooths adverts exactly as BermudaAdvert.calculate_data does.
+
+Creates two coordinators on the same fake backend as bermuda_replay.py, one with
+the batch_engine option and one without, and feeds them the same adverts from the
+same fake scanners, cycle by cycle:
+
+    python tools/bermuda_batch_parity.py
+    python tools/bermuda_batch_parity.py --devices 500 --cycles 300 --seed 7
+
+The adverts are random walks in rssi, with sudden drops (retreats too fast to be
+believed, which the velocity check must discard) and devices that go quiet for
+longer than DISTANCE_TIMEOUT before coming back. Some of the devices are tracked
+(configured), so that both the tracked and the on-demand history write-backs are
+covered, and some devices get their ref_power changed between cycles.
+
+After every cycle each advert's rssi_distance, hist_distance_by_interval and
+hist_velocity, and each device's area, must be identical in both coordinators.
+The script stops at the first difference with a non-zero exit status, and
+otherwise reports how many discarded readings and timeouts the run exercised.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+
+from bermuda_replay import BLUETOOTH_MANAGER, CLOCK, DEFAULT_BERMUDA_DIR, build_coordinator, load_bermuda
+
+SCANNER_COUNT = 8
+SCANNERS_PER_DEVICE = 4
+TRACKED_FRACTION = 0.25
+
+
+class _Walker:
+    """The rssi one device is heard at by each of its scanners, and when it goes quiet."""
+
+    def __init__(self, randomiser: random.Random, address: str, scanners: list[str]) -> None:
+        self.address = address
+        self.rssi = {scanner: randomiser.uniform(-90, -50) for scanner in scanners}
+        self.quiet_until = 0.0
+
+
+def _compare(scalar, batch) -> str | None:
+    """Return a description of the first difference between the two coordinators, if any."""
+    if scalar.devices.keys() != batch.devices.keys():
+        return f"devices differ: {sorted(scalar.devices.keys() ^ batch.devices.keys())}"
+    engine = batch.batch_engine
+    for address, device in scalar.devices.items():
+        other = batch.devices[address]
+        if device.area_id != other.area_id:
+            return f"{address} area: {device.area_id} != {other.area_id}"
+        if device.adverts.keys() != other.adverts.keys():
+            return f"{address} adverts differ"
+        for key, advert in device.adverts.items():
+            batch_advert = other.adverts[key]
+            if batch_advert.batch_row is not None:
+                engine.sync_history(batch_advert.batch_row)
+            for name in ("rssi_distance", "hist_distance_by_interval", "hist_velocity"):
+                expected = getattr(advert, name)
+                got = getattr(batch_advert, name)
+                if expected != got:
+                    return f"{advert!r} {name}: scalar {expected} != batch {got}"
+    return None
+
+
+def check(bermuda_dir: Path, device_count: int, cycles: int, seed: int) -> int:
+    """Run both coordinators side by side, return the exit status."""
+    coordinator_module, trace_module, const = load_bermuda(bermuda_dir)
+    if not coordinator_module.batch_engine_available():
+        print("numpy is not installed, so the batch engine can't be checked.")  # noqa: T201
+        return 1
+    randomiser = random.Random(seed)
+
+    scanner_addresses = [f"aa:bb:cc:{number * 16:02x}:00:00" for number in range(SCANNER_COUNT)]
+    walkers = [
+        _Walker(
+            randomiser,
+            # Random static addresses, so they aren't queued for IRK checks.
+            f"c{randomiser.randrange(16):x}:" + ":".join(f"{randomiser.randrange(256):02x}" for _ in range(5)),
+            randomiser.sample(scanner_addresses, SCANNERS_PER_DEVICE),
+        )
+        for _ in range(device_count)
+    ]
+    tracked = [walker.address.upper() for walker in walkers[: int(device_count * TRACKED_FRACTION)]]
+    mfr_data = {0x004C: bytes(4)}
+
+    CLOCK.now = 1000.0
+    options = {const.CONF_DEVICES: tracked}
+    scalar, scanners = build_coordinator(coordinator_module, bermuda_dir, scanner_addresses, options)
+    # The second coordinator reads the same scanners, so gets exactly the same adverts.
+    batch, _ = build_coordinator(coordinator_module, bermuda_dir, [], {**options, const.CONF_BATCH_ENGINE: True})
+    BLUETOOTH_MANAGER.scanners = list(scanners.values())
+    if batch.batch_engine is None:
+        print("The batch engine didn't start.")  # noqa: T201
+        return 1
+    for coordinator in (scalar, batch):
+        # Keep every device, so that their adverts can be compared to the end.
+        coordinator.prune_devices = lambda force_pruning=False: None
+
+    too_fast = timeouts = 0
+    last = {}  # each advert's rssi_distance and stamp after the last cycle
+    for cycle in range(cycles):
+        CLOCK.now += const.UPDATE_INTERVAL
+        for walker in walkers:
+            if walker.quiet_until > CLOCK.now:
+                continue
+            if randomiser.random() < 0.002:
+                walker.quiet_until = CLOCK.now + const.DISTANCE_TIMEOUT + randomiser.uniform(1, 20)
+                continue
+            for scanner, rssi in walker.rssi.items():
+                if randomiser.random() < 0.3:
+                    continue  # not heard by this scanner this cycle
+                if randomiser.random() < 0.03:
+                    rssi -= randomiser.uniform(15, 30)  # a sudden, unbelievable retreat
+                else:
+                    rssi = min(max(rssi + randomiser.gauss(0, 3), -100), -35)
+                walker.rssi[scanner] = rssi
+                scanners[scanner].receive(
+                    trace_module.TraceRecord(
+                        scanner, walker.address, round(rssi), CLOCK.now - randomiser.random(), mfr_data
+                    )
+                )
+
+        if cycle % 25 == 24:
+            # A ref_power change between cycles, as from the calibration number entity.
+            address = randomiser.choice(walkers).address.upper()
+            ref_power = randomiser.uniform(-70, -50)
+            for coordinator in (scalar, batch):
+                if device := coordinator.devices.get(address.lower()):
+                    device.set_ref_power(ref_power)
+
+        for coordinator in (scalar, batch):
+            coordinator._async_update_data_internal()  # noqa: SLF001
+
+        if difference := _compare(scalar, batch):
+            print(f"Cycle {cycle}: {difference}")  # noqa: T201
+            return 1
+        for device in scalar.devices.values():
+            for key, advert in device.adverts.items():
+                distance, stamp = last.get((device.address, key), (None, None))
+                if advert.stamp != stamp and advert.rssi_distance is not None and advert.hist_velocity:
+                    too_fast += advert.hist_velocity[0] > advert.conf_max_velocity
+                timeouts += advert.rssi_distance is None and distance is not None
+                last[(device.address, key)] = (advert.rssi_distance, advert.stamp)
+
+    advert_count = sum(len(device.adverts) for device in scalar.devices.values())
+    print(  # noqa: T201
+        f"{cycles} cycles, {len(scalar.devices)} devices, {advert_count} adverts "
+        f"({len(tracked)} devices tracked): scalar and batch results identical.\n"
+        f"Readings discarded as too fast: {too_fast}, adverts timed out: {timeouts}."
+    )
+    if not (too_fast and timeouts):
+        print("The run didn't exercise both the velocity check and the timeouts, use more cycles.")  # noqa: T201
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=100, help="how many devices to create")
+    parser.add_argument("--cycles", type=int, default=200, help="how many update cycles to run")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random adverts")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    sys.exit(check(args.bermuda.resolve(), args.devices, args.cycles, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Measure the update cost and memory of Bermuda's advert histories, as lists and as ring buffers.
+
+Creates 1,000 devices each heard by 20 scanners (20,000 BermudaAdverts), then runs
+update cycles in which every advert gets a new reading, calling
+update_advertisement and calculate_data on each as the coordinator does:
+
+    python tools/bermuda_history_bench.py
+    python tools/bermuda_history_bench.py --devices 200 --cycles 20
+
+The adverts are run three times on the same readings: with their hist_* lists as
+they are, with each history swapped for a fixed-size ring buffer over an
+array('d') (None stored as NaN), and with each swapped for a ring buffer over a
+preallocated list. The rings take the lists' insert(0, ...) and del [n:] as a
+push and a trim, so calculate_data runs unchanged on all three.
+
+Reported are the time per advert for update_advertisement + calculate_data once
+the histories are full, the memory per advert (tracemalloc, in a second run with
+the same readings, as it slows everything down), and how many distances differ
+from the plain lists.
+
+Only the integration's advert module and the modules it imports are used, with
+simple stand-ins for the devices and scanners. bluetooth_data_tools needs to be
+installed, as it is in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import importlib
+import random
+import sys
+import tracemalloc
+import types
+from array import array
+from math import isnan
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_BERMUDA_DIR = Path(__file__).resolve().parents[1] / "custom_components" / "bermuda"
+WARMUP_CYCLES = 25  # enough for every history to fill up
+RSSI_RANGE = range(-95, -39)
+HISTORIES = ("hist_stamp", "hist_rssi", "hist_distance", "hist_interval", "hist_velocity")
+
+
+class _Clock:
+    """Stands in for monotonic_time_coarse, so that every run sees the same stamps."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+CLOCK = _Clock()
+
+
+# ---------------------------------------------------------------------------
+# The ring buffers under test
+# ---------------------------------------------------------------------------
+
+
+class _ArrayRing:
+    """A newest-first circular buffer over an array of floats, with None stored as NaN."""
+
+    __slots__ = ("_buf", "_capacity", "_head", "_len")
+
+    def __init__(self, capacity: int, values) -> None:
+        self._capacity = capacity
+        self._buf = array("d", bytes(8 * capacity))
+        self._head = 0
+        self._len = 0
+        for value in reversed(values[:capacity]):
+            self.insert(0, value)
+
+    def insert(self, index: int, value) -> None:
+        if index != 0:
+            raise IndexError(index)
+        head = self._head - 1
+        if head < 0:
+            head = self._capacity - 1
+        self._head = head
+        self._buf[head] = float("nan") if value is None else value
+        if self._len < self._capacity:
+            self._len += 1
+
+    def append(self, value) -> None:
+        if self._len < self._capacity:
+            self._len += 1
+            self[self._len - 1] = value
+
+    def clear(self) -> None:
+        self._len = 0
+
+    def tolist(self) -> list:
+        head = self._head
+        end = head + self._len
+        if end <= self._capacity:
+            values = self._buf[head:end].tolist()
+        else:
+            values = self._buf[head:].tolist() + self._buf[: end - self._capacity].tolist()
+        return [None if isnan(value) else value for value in values]
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        value = self._buf[(self._head + index) % self._capacity]
+        return None if isnan(value) else value
+
+    def __setitem__(self, index: int, value) -> None:
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        self._buf[(self._head + index) % self._capacity] = float("nan") if value is None else value
+
+    def __delitem__(self, index: slice) -> None:
+        if index.stop is not None or index.step is not None:
+            raise IndexError(index)
+        if index.start < self._len:
+            self._len = max(index.start, 0)
+
+
+class _ListRing(_ArrayRing):
+    """The same circular buffer over a preallocated list, so nothing is boxed or unboxed."""
+
+    __slots__ = ()
+
+    def __init__(self, capacity: int, values) -> None:
+        self._capacity = capacity
+        self._buf = [None] * capacity
+        self._head = 0
+        self._len = 0
+        for value in reversed(values[:capacity]):
+            self.insert(0, value)
+
+    def insert(self, index: int, value) -> None:
+        if index != 0:
+            raise IndexError(index)
+        head = self._head - 1
+        if head < 0:
+            head = self._capacity - 1
+        self._head = head
+        self._buf[head] = value
+        if self._len < self._capacity:
+            self._len += 1
+
+    def tolist(self) -> list:
+        head = self._head
+        end = head + self._len
+        if end <= self._capacity:
+            return self._buf[head:end]
+        return self._buf[head:] + self._buf[: end - self._capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.tolist()[index]
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        return self._buf[(self._head + index) % self._capacity]
+
+    def __setitem__(self, index: int, value) -> None:
+        if not 0 <= index < self._len:
+            raise IndexError(index)
+        self._buf[(self._head + index) % self._capacity] = value
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins and loading
+# ---------------------------------------------------------------------------
+
+
+class _Device:
+    """Stands in for a BermudaDevice, as both the advert's parent device and its scanner."""
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self.name = address
+        self.ref_power = 0
+        self.area_id = "area"
+        self.area_name = "Area"
+        self.is_remote_scanner = True
+        self.last_seen = 0.0
+        self.name_bt_local_name = None
+        self.create_sensor = False
+        self.area_dirty = False
+        self.stamps: dict[str, float] = {}
+
+    def async_as_scanner_get_stamp(self, address: str) -> float | None:
+        return self.stamps.get(address)
+
+    def process_manufacturer_data(self, _advert) -> None:
+        pass
+
+    def make_name(self) -> None:
+        pass
+
+
+def _load_advert_module(bermuda_dir: Path):
+    """Import the integration's bermuda_advert (and what it imports), without the rest of the package."""
+    import bluetooth_data_tools  # noqa: PLC0415
+
+    # Imported by name, so this must happen before the modules load.
+    bluetooth_data_tools.monotonic_time_coarse = CLOCK
+    try:
+        import homeassistant.const  # noqa: F401, PLC0415
+    except ImportError:
+        ha_const = types.ModuleType("homeassistant.const")
+        ha_const.Platform = types.SimpleNamespace(SENSOR="sensor", DEVICE_TRACKER="device_tracker", NUMBER="number")
+        sys.modules["homeassistant"] = types.ModuleType("homeassistant")
+        sys.modules["homeassistant.const"] = ha_const
+    package = types.ModuleType("bermuda")
+    package.__path__ = [str(bermuda_dir)]
+    sys.modules["bermuda"] = package
+    return importlib.import_module("bermuda.bermuda_advert"), importlib.import_module("bermuda.const")
+
+
+# ---------------------------------------------------------------------------
+# The benchmark
+# ---------------------------------------------------------------------------
+
+
+class _Run:
+    """One set of adverts, with their histories as the given kind, and their timings."""
+
+    def __init__(self, name: str, ring_class, modules, device_count: int, scanner_count: int) -> None:
+        self.name = name
+        self.ring_class = ring_class
+        advert_module, const = modules
+        self.keep = const.HIST_KEEP_COUNT
+        self.options = {
+            const.CONF_MAX_VELOCITY: const.DEFAULT_MAX_VELOCITY,
+            const.CONF_SMOOTHING_SAMPLES: const.DEFAULT_SMOOTHING_SAMPLES,
+            const.CONF_REF_POWER: const.DEFAULT_REF_POWER,
+            const.CONF_ATTENUATION: const.DEFAULT_ATTENUATION,
+            const.CONF_RSSI_OFFSETS: {},
+        }
+        self.advert_class = advert_module.BermudaAdvert
+        self.scanners = [_Device(f"AA:BB:CC:00:00:{number:02X}") for number in range(scanner_count)]
+        self.devices = [
+            _Device(f"C1:00:00:00:{number // 256:02X}:{number % 256:02X}") for number in range(device_count)
+        ]
+        for scanner in self.scanners:
+            scanner.stamps = dict.fromkeys((device.address for device in self.devices), 0.0)
+        self.adverts: list = []
+        self.update_secs = 0.0
+        self.updates = 0
+
+    def create(self, readings) -> None:
+        for device in self.devices:
+            for scanner in self.scanners:
+                scanner.stamps[device.address] = CLOCK.now
+                advert = self.advert_class(device, next(readings), self.options, scanner)
+                if self.ring_class is not None:
+                    # One more than is kept, for the reading that arrives before the trim.
+                    for name in HISTORIES:
+                        setattr(advert, name, self.ring_class(self.keep + 1, getattr(advert, name)))
+                    advert.hist_distance_by_interval = self.ring_class(
+                        advert.conf_smoothing_samples + 1, advert.hist_distance_by_interval
+                    )
+                self.adverts.append(advert)
+
+    def cycle(self, readings, *, timed: bool) -> None:
+        stamp = CLOCK.now - 0.5
+        for scanner in self.scanners:
+            for device in self.devices:
+                scanner.stamps[device.address] = stamp
+        adverts = self.adverts
+        start = perf_counter()
+        for advert in adverts:
+            advert.update_advertisement(next(readings), advert.scanner_device)
+            advert.calculate_data()
+        if timed:
+            self.update_secs += perf_counter() - start
+            self.updates += len(adverts)
+
+    def distances(self) -> list:
+        return [advert.rssi_distance for advert in self.adverts]
+
+
+def _readings(seed: int):
+    """An endless, repeatable stream of advertisement data with random rssi."""
+    # One object per rssi value, so that they don't count towards the adverts' memory.
+    pool = {
+        rssi: types.SimpleNamespace(
+            rssi=rssi, tx_power=None, local_name=None, manufacturer_data={}, service_data={}, service_uuids=[]
+        )
+        for rssi in RSSI_RANGE
+    }
+    randomiser = random.Random(seed)
+    while True:
+        yield pool[randomiser.choice(RSSI_RANGE)]
+
+
+def _run_all(runs: list[_Run], cycles: int) -> None:
+    """Create each run's adverts and put them all through the same readings."""
+    CLOCK.now = 1000.0
+    for bench in runs:
+        bench.create(_readings(1))
+    streams = [_readings(2) for _ in runs]
+    for cycle in range(WARMUP_CYCLES + cycles):
+        CLOCK.now += 1.05
+        for bench, readings in zip(runs, streams, strict=True):
+            bench.cycle(readings, timed=cycle >= WARMUP_CYCLES)
+
+
+def run(bermuda_dir: Path, device_count: int, scanner_count: int, cycles: int) -> None:
+    """Run the adverts with each kind of history through the same readings, and print the results."""
+    modules = _load_advert_module(bermuda_dir)
+    kinds = [("lists", None), ("array ring", _ArrayRing), ("list ring", _ListRing)]
+
+    runs = [_Run(name, ring_class, modules, device_count, scanner_count) for name, ring_class in kinds]
+    _run_all(runs, cycles)
+    memory = []
+    for name, ring_class in kinds:
+        # tracemalloc slows everything down, so the memory is measured in a run of its own.
+        bench = _Run(name, ring_class, modules, device_count, scanner_count)
+        gc.collect()
+        tracemalloc.start()
+        _run_all([bench], 0)
+        memory.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        del bench
+
+    advert_count = device_count * scanner_count
+    expected = runs[0].distances()
+    print(  # noqa: T201
+        f"{device_count} devices x {scanner_count} scanners = {advert_count} adverts, "
+        f"{cycles} timed cycles after {WARMUP_CYCLES} to fill the histories:\n"
+    )
+    print(f"  {'':<12}{'us/advert update+calculate':>28}{'bytes/advert':>14}{'distances differ':>18}")  # noqa: T201
+    for bench, used in zip(runs, memory, strict=True):
+        differ = sum(a != b for a, b in zip(expected, bench.distances(), strict=True))
+        print(  # noqa: T201
+            f"  {bench.name:<12}{bench.update_secs / bench.updates * 1e6:>28.2f}"
+            f"{used / advert_count:>14.0f}{differ:>18}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=1000, help="how many devices")
+    parser.add_argument("--scanners", type=int, default=20, help="how many scanners hear each device")
+    parser.add_argument("--cycles", type=int, default=10, help="how many update cycles to time")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.bermuda.resolve(), args.devices, args.scanners, args.cycles)
+
+
+if __name__ == "__main__":
+    main()
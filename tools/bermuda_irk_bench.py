@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Time Bermuda's IRK resolution of a stream of new MACs, batched against checking each MAC on its own.
+
+Makes up 50 IRKs and a stream of 10,000 new MACs (about 5% of them resolvable
+private addresses of those IRKs, 75% other RPAs and the rest non-resolvable
+addresses), followed by 10,000 repeats of MACs already in the stream, as adverts
+from devices already seen. Then replays the stream:
+
+    python tools/bermuda_irk_bench.py
+    python tools/bermuda_irk_bench.py --irks 100 --macs 50000 --cycle 500
+
+- the way BermudaIrkManager did before: each new MAC checked against each IRK
+  with bluetooth_data_tools.resolve_private_address, and the result saved
+  after each IRK,
+- through BermudaIrkManager.check_mac, one MAC at a time,
+- through BermudaIrkManager.queue_mac, with async_resolve_pending once every
+  --cycle MACs, as the coordinator does once per update.
+
+All three must resolve the same MACs to the same IRKs. Then the first quarter of
+the stream is fed to a manager with no IRKs, and the IRKs are added afterwards,
+which must also match the same MACs as checking them the way it was done before.
+
+Bermuda's requirements (bluetooth_data_tools etc) need to be installed, as they
+are in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from math import floor
+from pathlib import Path
+from time import perf_counter
+
+from bermuda_replay import BERMUDA_PACKAGE, DEFAULT_BERMUDA_DIR, load_bermuda
+
+
+def _make_rpa(get_cipher_for_irk, irk: bytes, randomiser: random.Random) -> str:
+    """Make a resolvable private address for the IRK, as a phone would."""
+    prand = bytes([0x40 | randomiser.randrange(0x40), randomiser.randrange(256), randomiser.randrange(256)])
+    encryptor = get_cipher_for_irk(irk).encryptor()
+    ciphertext = encryptor.update(b"\x00" * 13 + prand) + encryptor.finalize()
+    return ":".join(f"{byte:02x}" for byte in prand + ciphertext[13:])
+
+
+def make_stream(get_cipher_for_irk, irk_count: int, mac_count: int, seed: int) -> tuple[list[bytes], list[str]]:
+    """Return the IRKs, and the stream of MACs."""
+    randomiser = random.Random(seed)
+    irks = [randomiser.randbytes(16) for _ in range(irk_count)]
+    macs = []
+    for _ in range(mac_count):
+        kind = randomiser.random()
+        if kind < 0.05:
+            macs.append(_make_rpa(get_cipher_for_irk, randomiser.choice(irks), randomiser))
+        elif kind < 0.8:
+            prefix = bytes([0x40 | randomiser.randrange(0x40)])
+            macs.append(":".join(f"{byte:02x}" for byte in prefix + randomiser.randbytes(5)))
+        else:
+            macs.append(":".join(f"{byte:02x}" for byte in randomiser.randbytes(6)))
+    macs += [randomiser.choice(macs) for _ in range(mac_count)]
+    return irks, macs
+
+
+# ---------------------------------------------------------------------------
+# BermudaIrkManager.check_mac the way it was before
+# ---------------------------------------------------------------------------
+
+
+class IrkManagerBefore:
+    """Each new MAC checked against each IRK in turn, saving the result after each one."""
+
+    def __init__(self, irk_module, resolve_private_address) -> None:
+        self.irk_module = irk_module
+        self.resolve_private_address = resolve_private_address
+        self.ciphers: dict[bytes, object] = {}
+        self.macs: dict[str, object] = {}
+
+    def add_irk(self, irk: bytes) -> list[str]:
+        macs = []
+        if irk not in self.ciphers:
+            self.ciphers[irk] = cipher = self.irk_module.get_cipher_for_irk(irk)
+            unresolved = self.irk_module.IrkTypes.unresolved()
+            for macirk in list(self.macs.values()):
+                if macirk.irk in unresolved and self._check_irk(macirk.mac, irk, cipher) == irk:
+                    macs.append(macirk.mac)
+        return macs
+
+    def check_mac(self, address: str) -> bytes:
+        if macirk := self.macs.get(address):
+            return macirk.irk
+        for irk, cipher in self.ciphers.items():
+            if self._check_irk(address, irk, cipher) == irk:
+                return irk
+        return self._save(address, self.irk_module.IrkTypes.NO_KNOWN_IRK_MATCH.value)
+
+    def _check_irk(self, address: str, irk: bytes, cipher) -> bytes:
+        if self.resolve_private_address(cipher, address):
+            return self._save(address, irk)
+        if int(address[0], 16) & 0x04:
+            return self._save(address, self.irk_module.IrkTypes.NO_KNOWN_IRK_MATCH.value)
+        return self._save(address, self.irk_module.IrkTypes.NOT_RESOLVABLE_ADDRESS.value)
+
+    def _save(self, address: str, irk: bytes) -> bytes:
+        if (macirk := self.macs.get(address)) is None:
+            expiry = floor(self.irk_module.monotonic_time_coarse() + self.irk_module.PRUNE_TIME_KNOWN_IRK)
+            self.macs[address] = self.irk_module.ResolvableMAC(address, expiry, irk)
+        elif macirk.irk != irk:
+            self.macs[address] = self.irk_module.ResolvableMAC(address, macirk.expires, irk)
+        return irk
+
+    def resolved(self) -> dict[str, bytes]:
+        unresolved = self.irk_module.IrkTypes.unresolved()
+        return {mac: macirk.irk for mac, macirk in self.macs.items() if macirk.irk not in unresolved}
+
+
+# ---------------------------------------------------------------------------
+
+
+def _resolved(manager) -> dict[str, bytes]:
+    return {mac: macirk.irk for mac, macirk in manager.known_macs().items()}
+
+
+def run(bermuda_dir: Path, irk_count: int, mac_count: int, cycle: int, seed: int) -> int:
+    """Replay the stream each way, print the timings, and return the exit status."""
+    load_bermuda(bermuda_dir)
+    irk_module = sys.modules[f"{BERMUDA_PACKAGE}.bermuda_irk"]
+    from bluetooth_data_tools import resolve_private_address  # noqa: PLC0415
+
+    irks, macs = make_stream(irk_module.get_cipher_for_irk, irk_count, mac_count, seed)
+
+    before = IrkManagerBefore(irk_module, resolve_private_address)
+    for irk in irks:
+        before.add_irk(irk)
+    start = perf_counter()
+    for mac in macs:
+        before.check_mac(mac)
+    before_secs = perf_counter() - start
+
+    single = irk_module.BermudaIrkManager()
+    for irk in irks:
+        single.add_irk(irk)
+    start = perf_counter()
+    for mac in macs:
+        single.check_mac(mac)
+    single_secs = perf_counter() - start
+
+    batched = irk_module.BermudaIrkManager()
+    for irk in irks:
+        batched.add_irk(irk)
+    start = perf_counter()
+    for first in range(0, len(macs), cycle):
+        for mac in macs[first : first + cycle]:
+            batched.queue_mac(mac)
+        batched.async_resolve_pending()
+    batched_secs = perf_counter() - start
+
+    expected = before.resolved()
+    status = 0
+    for name, manager in (("check_mac", single), ("batched", batched)):
+        if _resolved(manager) != expected:
+            print(f"{name} resolved different MACs to the way it was before!")  # noqa: T201
+            status = 1
+
+    # IRKs learned after their MACs were first seen.
+    late_before = IrkManagerBefore(irk_module, resolve_private_address)
+    late = irk_module.BermudaIrkManager()
+    for mac in macs[: len(macs) // 4]:
+        late_before.check_mac(mac)
+        late.queue_mac(mac)
+    late.async_resolve_pending()
+    late_matches = [sorted(late.add_irk(irk)) for irk in irks]
+    if late_matches != [sorted(late_before.add_irk(irk)) for irk in irks] or _resolved(late) != late_before.resolved():
+        print("IRKs added after their MACs were seen matched different MACs to the way it was before!")  # noqa: T201
+        status = 1
+
+    print(  # noqa: T201
+        f"{len(macs)} MACs ({len(set(macs))} different) against {irk_count} IRKs, {len(expected)} resolved, "
+        f"{sum(map(len, late_matches))} by IRKs added later:\n"
+    )
+    print(f"  {'':<28}{'ms':>8}{'us/MAC':>9}")  # noqa: T201
+    for name, secs in (
+        ("before", before_secs),
+        ("check_mac", single_secs),
+        (f"batched, {cycle} MACs a cycle", batched_secs),
+    ):
+        print(f"  {name:<28}{secs * 1000:>8.0f}{secs / len(macs) * 1e6:>9.2f}")  # noqa: T201
+    return status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--irks", type=int, default=50, help="how many IRKs")
+    parser.add_argument("--macs", type=int, default=10000, help="how many new MACs in the stream")
+    parser.add_argument("--cycle", type=int, default=100, help="how many MACs arrive in each update cycle")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random stream")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    sys.exit(run(args.bermuda.resolve(), args.irks, args.macs, args.cycle, args.seed))
+
+
+if __name__ == "__main__":
+    main()
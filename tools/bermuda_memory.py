@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure how much memory Bermuda's device and advert objects take.
+
+Creates a coordinator on the same fake backend as bermuda_replay.py, then feeds
+it adverts for lots of random-MAC devices (50,000 by default, each heard by 3 of
+6 scanners) for a few update cycles so that their histories fill up, and reports
+the process RSS before and after:
+
+    python tools/bermuda_memory.py
+    python tools/bermuda_memory.py --devices 20000 --cycles 10
+
+Pruning is switched off, so that every device is still held at the end, as they
+would be on a busy street between prune runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import resource
+from pathlib import Path
+
+from bermuda_replay import CLOCK, DEFAULT_BERMUDA_DIR, build_coordinator, load_bermuda
+
+SCANNER_COUNT = 6
+SCANNERS_PER_DEVICE = 3
+
+
+def rss_mb() -> float:
+    """Return the current resident set size of this process, in MB."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux, so settle for the peak.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(bermuda_dir: Path, device_count: int, cycles: int) -> None:
+    """Build the devices and print the memory used."""
+    coordinator_module, trace_module, const = load_bermuda(bermuda_dir)
+    randomiser = random.Random(1)
+
+    scanner_addresses = [f"aa:bb:cc:{number * 16:02x}:00:00" for number in range(SCANNER_COUNT)]
+    device_addresses = [
+        # Random static addresses, so they aren't queued for IRK checks.
+        f"c{randomiser.randrange(16):x}:" + ":".join(f"{randomiser.randrange(256):02x}" for _ in range(5))
+        for _ in range(device_count)
+    ]
+    device_scanners = [randomiser.sample(scanner_addresses, SCANNERS_PER_DEVICE) for _ in device_addresses]
+    manufacturer_data = [{0x0006: randomiser.randbytes(24)} for _ in device_addresses]
+
+    CLOCK.now = 1000.0
+    coordinator, scanners = build_coordinator(coordinator_module, bermuda_dir, scanner_addresses, {})
+    coordinator.prune_devices = lambda force_pruning=False: None
+    coordinator._async_update_data_internal()  # noqa: SLF001
+    gc.collect()
+    rss_before = rss_mb()
+
+    for _ in range(cycles):
+        CLOCK.now += const.UPDATE_INTERVAL
+        for address, advert_scanners, mfr_data in zip(device_addresses, device_scanners, manufacturer_data, strict=True):
+            for scanner in advert_scanners:
+                scanners[scanner].receive(
+                    trace_module.TraceRecord(
+                        scanner, address, randomiser.randint(-95, -50), CLOCK.now - randomiser.random(), mfr_data
+                    )
+                )
+        coordinator._async_update_data_internal()  # noqa: SLF001
+    # The fake scanners hold the latest advert for every device too, which isn't ours to count.
+    for scanner in scanners.values():
+        scanner.discovered_devices_and_advertisement_data.clear()
+        scanner.discovered_device_timestamps.clear()
+    gc.collect()
+    rss_after = rss_mb()
+
+    advert_count = sum(len(device.adverts) for device in coordinator.devices.values())
+    print(  # noqa: T201
+        f"{len(coordinator.devices)} devices, {advert_count} adverts after {cycles} update cycles.\n"
+        f"RSS before: {rss_before:.1f} MB, after: {rss_after:.1f} MB, "
+        f"used: {rss_after - rss_before:.1f} MB ({(rss_after - rss_before) * 1024 * 1024 / device_count:.0f} bytes/device)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=50000, help="how many devices to create")
+    parser.add_argument("--cycles", type=int, default=5, help="how many update cycles to run")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    measure(args.bermuda.resolve(), args.devices, args.cycles)
+
+
+if __name__ == "__main__":
+    main()
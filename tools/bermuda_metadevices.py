@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Time Bermuda's metadevice updates while rotating-MAC sources pile up.
+
+Creates a coordinator on the same fake backend as bermuda_replay.py, with a
+number of iBeacons and Private BLE (IRK) devices that each move to a new MAC
+address every so often, as phones and many beacons do. Every old address stays
+in Bermuda as a source of its metadevice until it is pruned, so the number of
+devices grows for the first PRUNE_TIME_KNOWN_IRK seconds. The time taken by
+the metadevices phase (and the whole cycle) is printed for each minute, so you
+can see whether it grows along with them:
+
+    python tools/bermuda_metadevices.py
+    python tools/bermuda_metadevices.py --ibeacons 500 --irks 500 --rotate 30
+
+Pass --bermuda to time another copy of the integration, eg an older checkout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from collections import defaultdict
+from pathlib import Path
+
+from bermuda_replay import CLOCK, DEFAULT_BERMUDA_DIR, build_coordinator, load_bermuda
+from bluetooth_data_tools import get_cipher_for_irk
+
+SCANNER_COUNT = 6
+SCANNERS_PER_DEVICE = 3
+APPLE = 0x004C
+# An RPA's prand is padded out to a full AES block before encrypting.
+_RPA_PADDING = b"\x00" * 13
+
+
+def _mac(octets: bytes) -> str:
+    return ":".join(f"{octet:02x}" for octet in octets)
+
+
+class _RotatingSource:
+    """A device that moves to a new MAC every `rotate` seconds, as an iBeacon or an IRK's RPAs."""
+
+    def __init__(self, randomiser: random.Random, scanners: list[str], rotate: float, irk: bytes | None) -> None:
+        self.randomiser = randomiser
+        self.scanners = randomiser.sample(scanners, SCANNERS_PER_DEVICE)
+        self.rotate = rotate
+        self.next_rotation = 0.0
+        self.address = ""
+        if irk is None:
+            self.encryptor = None
+            self.manufacturer_data = {
+                APPLE: b"\x02\x15" + randomiser.randbytes(16) + randomiser.randbytes(4) + b"\xc5"
+            }
+        else:
+            self.encryptor = get_cipher_for_irk(irk).encryptor()
+            self.manufacturer_data = {}
+
+    def current_address(self, now: float) -> str:
+        """Return the address to advertise with, picking a new one if it's time."""
+        if now >= self.next_rotation:
+            # Spread the rotations out, so the devices don't all move in the same cycle.
+            self.next_rotation = now + self.rotate * self.randomiser.uniform(0.5, 1.5)
+            if self.encryptor is None:
+                # Random static address
+                self.address = _mac(bytes([0xC0 | self.randomiser.randrange(64)]) + self.randomiser.randbytes(5))
+            else:
+                # Resolvable private address: prand with 0b01 top bits, then the hash of it.
+                prand = bytes([0x40 | self.randomiser.randrange(64)]) + self.randomiser.randbytes(2)
+                self.address = _mac(prand + self.encryptor.update(_RPA_PADDING + prand)[13:])
+        return self.address
+
+
+def run(bermuda_dir: Path, ibeacons: int, irks: int, rotate: float, duration: float) -> None:
+    """Run the rotating devices through the update cycle, and print the timings per minute."""
+    coordinator_module, trace_module, const = load_bermuda(bermuda_dir)
+    randomiser = random.Random(1)
+
+    scanner_addresses = [f"aa:bb:cc:{number * 16:02x}:00:00" for number in range(SCANNER_COUNT)]
+    CLOCK.now = 1000.0
+    coordinator, scanners = build_coordinator(coordinator_module, bermuda_dir, scanner_addresses, {})
+    coordinator._async_update_data_internal()  # noqa: SLF001
+
+    sources = [_RotatingSource(randomiser, scanner_addresses, rotate, None) for _ in range(ibeacons)]
+    for _ in range(irks):
+        irk = randomiser.randbytes(16)
+        # As discover_private_ble_metadevices does for devices set up in Private BLE Device.
+        metadevice = coordinator._get_or_create_device(irk.hex())  # noqa: SLF001
+        metadevice.create_sensor = True
+        coordinator.metadevices[metadevice.address] = metadevice
+        sources.append(_RotatingSource(randomiser, scanner_addresses, rotate, irk))
+
+    minutes: dict[int, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    start = CLOCK.now
+    while CLOCK.now - start < duration:
+        CLOCK.now += const.UPDATE_INTERVAL
+        for source in sources:
+            address = source.current_address(CLOCK.now)
+            for scanner in source.scanners:
+                if randomiser.random() < 0.8:
+                    scanners[scanner].receive(
+                        trace_module.TraceRecord(
+                            scanner,
+                            address,
+                            randomiser.randint(-95, -50),
+                            CLOCK.now - randomiser.random(),
+                            source.manufacturer_data,
+                        )
+                    )
+        coordinator._async_update_data_internal()  # noqa: SLF001
+        minute = minutes[int((CLOCK.now - start) // 60)]
+        minute["devices"].append(len(coordinator.devices))
+        minute["sources"].append(sum(len(meta.metadevice_sources) for meta in coordinator.metadevices.values()))
+        for phase, elapsed in coordinator.update_timings.items():
+            minute[phase].append(elapsed * 1000)
+
+    print(  # noqa: T201
+        f"{ibeacons} iBeacons and {irks} IRK devices, each changing MAC about every {rotate:.0f}s, "
+        f"heard by {SCANNERS_PER_DEVICE} of {SCANNER_COUNT} scanners.\n"
+    )
+    print(f"{'minute':>6}{'devices':>10}{'sources':>10}{'metadevices ms':>16}{'cycle ms':>10}")  # noqa: T201
+    for minute, values in minutes.items():
+        print(  # noqa: T201
+            f"{minute:>6}{values['devices'][-1]:>10}{values['sources'][-1]:>10}"
+            f"{sum(values['metadevices']) / len(values['metadevices']):>16.3f}"
+            f"{sum(values['cycle']) / len(values['cycle']):>10.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ibeacons", type=int, default=300, help="how many iBeacons to create")
+    parser.add_argument("--irks", type=int, default=300, help="how many Private BLE (IRK) devices to create")
+    parser.add_argument("--rotate", type=float, default=60, help="average seconds between MAC changes")
+    parser.add_argument("--duration", type=float, default=1200, help="seconds of adverts to run through")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.bermuda.resolve(), args.ibeacons, args.irks, args.rotate, args.duration)
+
+
+if __name__ == "__main__":
+    main()
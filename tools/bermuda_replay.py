@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Replay a Bermuda advert trace through the coordinator's update loop, and time it.
+
+Record a trace with the bermuda.record_trace service, then from the config dir:
+
+    python tools/bermuda_replay.py bermuda_trace_20250101_120000.bin
+    python tools/bermuda_replay.py trace.bin --option batch_engine=true
+
+Home Assistant itself is not needed. The parts of it (and of the bluetooth stack)
+that the coordinator talks to are replaced with simple fakes, and the trace's
+adverts are fed in through fake remote scanners, one update interval at a time,
+as fast as the update loop will go. Each scanner is given its own area. Bermuda's
+other requirements (bluetooth_data_tools, voluptuous, pyyaml, aiofiles) need to be
+installed, as they are in any HA development environment.
+
+The output is the time taken by each phase of the update (gather, metadevices,
+calculate_data, areas, entities, prune) and by the whole cycle, so that changes
+to the processing can be compared against the same real-world data.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import re
+import sys
+import types
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+BERMUDA_PACKAGE = "custom_components.bermuda"
+DEFAULT_BERMUDA_DIR = Path(__file__).resolve().parents[1] / "custom_components" / "bermuda"
+
+
+class _Clock:
+    """Stands in for monotonic_time_coarse, so the trace's stamps are "now" as it replays."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+CLOCK = _Clock()
+
+
+# ---------------------------------------------------------------------------
+# Fake Home Assistant / bluetooth backend
+# ---------------------------------------------------------------------------
+
+
+class _Anything:
+    """Accepts any call or attribute access, for the HA names we only need to exist."""
+
+    def __init__(self, *_args, **_kwargs) -> None:
+        pass
+
+    def __call__(self, *_args, **_kwargs) -> _Anything:
+        return _Anything()
+
+    def __getattr__(self, _name: str) -> _Anything:
+        return _Anything()
+
+
+class _FakeModule(types.ModuleType):
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return _Anything()
+
+
+def _fake_module(name: str, **attrs) -> _FakeModule:
+    module = _FakeModule(name)
+    module.__path__ = []  # Let submodules be "imported" from it.
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+def _noop(*_args, **_kwargs) -> None:
+    return None
+
+
+def _slugify(text: str | None, *, separator: str = "_") -> str:
+    return re.sub(r"[^a-z0-9]+", separator, (text or "").lower()).strip(separator)
+
+
+class BLEDevice(NamedTuple):
+    address: str
+    name: str | None = None
+    details: object = None
+    rssi: int = 0
+
+
+class BluetoothServiceInfoBleak:
+    """Just enough of one for the IRK manager's callbacks."""
+
+    def __init__(self, name: str, address: str, *_args) -> None:
+        self.name = name
+        self.address = address
+
+
+class AdvertisementData(NamedTuple):
+    local_name: str | None = None
+    manufacturer_data: dict = {}  # noqa: RUF012
+    service_data: dict = {}  # noqa: RUF012
+    service_uuids: list = []  # noqa: RUF012
+    tx_power: int | None = None
+    rssi: int = -127
+    platform_data: tuple = ()
+
+
+class AreaEntry(NamedTuple):
+    id: str
+    name: str
+    icon: str | None = None
+    floor_id: str | None = None
+
+
+class DeviceEntry(NamedTuple):
+    id: str
+    name: str
+    connections: set
+    area_id: str | None
+    name_by_user: str | None = None
+
+
+class BaseHaScanner:
+    pass
+
+
+class BaseHaRemoteScanner(BaseHaScanner):
+    pass
+
+
+class ReplayScanner(BaseHaRemoteScanner):
+    """A remote scanner whose adverts come from the trace."""
+
+    def __init__(self, source: str, name: str) -> None:
+        self.source = source
+        self.name = name
+        self.discovered_device_timestamps: dict[str, float] = {}
+        self._discovered_device_timestamps = self.discovered_device_timestamps
+        self.discovered_devices_and_advertisement_data: dict[str, tuple[BLEDevice, AdvertisementData]] = {}
+        self._last_detection = 0.0
+
+    def __hash__(self) -> int:
+        # The coordinator keeps its scanners in a set, so hash by address rather than
+        # id() to keep the processing order the same from one run to the next.
+        return hash(self.source)
+
+    def time_since_last_detection(self) -> float:
+        return CLOCK() - self._last_detection
+
+    def get_discovered_device_advertisement_data(self, address: str):
+        return self.discovered_devices_and_advertisement_data.get(address)
+
+    def receive(self, record) -> None:
+        address = record.address.upper()
+        self.discovered_devices_and_advertisement_data[address] = (
+            BLEDevice(address),
+            AdvertisementData(manufacturer_data=record.manufacturer_data, rssi=record.rssi),
+        )
+        self.discovered_device_timestamps[address] = record.stamp
+        self._last_detection = max(self._last_detection, record.stamp)
+
+
+class _FakeBluetoothManager:
+    def __init__(self) -> None:
+        self.scanners: list[ReplayScanner] = []
+
+    def async_current_scanners(self) -> list[ReplayScanner]:
+        return self.scanners
+
+
+class _FakeAreaRegistry:
+    def __init__(self) -> None:
+        self.areas: dict[str, AreaEntry] = {}
+
+    def async_list_areas(self):
+        return self.areas.values()
+
+    def async_get_area(self, area_id: str) -> AreaEntry | None:
+        return self.areas.get(area_id)
+
+
+class _FakeDeviceEntries:
+    def __init__(self) -> None:
+        self.entries: list[DeviceEntry] = []
+
+    def get_entries(self, _identifiers, connections):
+        return [entry for entry in self.entries if entry.connections & connections]
+
+
+class _FakeDeviceRegistry:
+    def __init__(self) -> None:
+        self.devices = _FakeDeviceEntries()
+
+    def async_get(self, _device_id: str) -> None:
+        return None
+
+
+class _FakeDataUpdateCoordinator:
+    def __init__(self, hass, logger, *, name, update_interval, **_kwargs) -> None:
+        self.hass = hass
+        self.logger = logger
+        self.name = name
+        self.update_interval = update_interval
+        self.last_update_success = True
+
+
+class _FakeConfigEntry:
+    def __init__(self, options: dict) -> None:
+        self.entry_id = "bermuda_replay"
+        self.options = options
+        self.data = {}
+        self.background_tasks = []
+
+    def async_on_unload(self, _func) -> None:
+        pass
+
+    def async_create_background_task(self, _hass, coro, _name, **_kwargs) -> None:
+        self.background_tasks.append(coro)
+
+
+AREA_REGISTRY = _FakeAreaRegistry()
+DEVICE_REGISTRY = _FakeDeviceRegistry()
+BLUETOOTH_MANAGER = _FakeBluetoothManager()
+
+
+def _install_fakes() -> None:
+    """Put the fake HA and bluetooth modules in place of the real ones."""
+    import bluetooth_data_tools  # noqa: PLC0415
+
+    # Every Bermuda module imports it by name, so this must happen before they load.
+    bluetooth_data_tools.monotonic_time_coarse = CLOCK
+
+    habluetooth = _fake_module(
+        "habluetooth",
+        BaseHaScanner=BaseHaScanner,
+        BaseHaRemoteScanner=BaseHaRemoteScanner,
+        BluetoothServiceInfoBleak=BluetoothServiceInfoBleak,
+    )
+    _fake_module("bleak")
+    _fake_module("bleak.backends")
+    _fake_module("bleak.backends.device", BLEDevice=BLEDevice)
+
+    _fake_module("homeassistant")
+    _fake_module(
+        "homeassistant.const",
+        MAJOR_VERSION=2025,
+        MINOR_VERSION=6,
+        STATE_HOME="home",
+        STATE_NOT_HOME="not_home",
+        Platform=types.SimpleNamespace(SENSOR="sensor", DEVICE_TRACKER="device_tracker", NUMBER="number"),
+    )
+    _fake_module("homeassistant.core", callback=lambda func: func)
+    _fake_module("homeassistant.components")
+    _fake_module(
+        "homeassistant.components.bluetooth",
+        BaseHaScanner=habluetooth.BaseHaScanner,
+        BaseHaRemoteScanner=habluetooth.BaseHaRemoteScanner,
+        async_register_callback=lambda *_args, **_kwargs: _noop,
+    )
+    _fake_module("homeassistant.components.bluetooth.api", _get_manager=lambda _hass: BLUETOOTH_MANAGER)
+    _fake_module("homeassistant.components.private_ble_device")
+    _fake_module("homeassistant.components.private_ble_device.coordinator")
+    _fake_module("homeassistant.helpers")
+    _fake_module("homeassistant.helpers.area_registry", async_get=lambda _hass: AREA_REGISTRY)
+    _fake_module("homeassistant.helpers.config_validation")
+    _fake_module("homeassistant.helpers.device_registry", async_get=lambda _hass: DEVICE_REGISTRY)
+    _fake_module(
+        "homeassistant.helpers.entity_registry",
+        async_get=lambda _hass: types.SimpleNamespace(
+            entities=types.SimpleNamespace(get_entries_for_config_entry_id=lambda _entry_id: [])
+        ),
+    )
+    _fake_module(
+        "homeassistant.helpers.floor_registry",
+        async_get=lambda _hass: types.SimpleNamespace(async_get_floor=lambda _floor_id: None),
+    )
+    _fake_module("homeassistant.helpers.issue_registry", async_create_issue=_noop, async_delete_issue=_noop)
+    _fake_module("homeassistant.helpers.dispatcher", async_dispatcher_send=_noop)
+    _fake_module("homeassistant.helpers.event", async_call_later=lambda *_args, **_kwargs: _noop)
+    _fake_module("homeassistant.helpers.update_coordinator", DataUpdateCoordinator=_FakeDataUpdateCoordinator)
+    _fake_module("homeassistant.util", slugify=_slugify)
+    _fake_module(
+        "homeassistant.util.dt",
+        now=lambda: datetime.now(UTC),
+        get_age=lambda date: str(datetime.now(UTC) - date),
+    )
+
+
+def load_bermuda(bermuda_dir: Path):
+    """Install the fakes, and import the integration's coordinator, trace and const modules."""
+    _install_fakes()
+    # Skip the package's own __init__, which is all HA setup.
+    for name, path in (("custom_components", bermuda_dir.parent), (BERMUDA_PACKAGE, bermuda_dir)):
+        package = types.ModuleType(name)
+        package.__path__ = [str(path)]
+        sys.modules[name] = package
+    coordinator = importlib.import_module(f"{BERMUDA_PACKAGE}.coordinator")
+    trace = importlib.import_module(f"{BERMUDA_PACKAGE}.bermuda_trace")
+    const = importlib.import_module(f"{BERMUDA_PACKAGE}.const")
+    return coordinator, trace, const
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[round(fraction * (len(ordered) - 1))]
+
+
+def _parse_options(pairs: list[str]) -> dict:
+    options = {}
+    for pair in pairs:
+        key, _, value = pair.partition("=")
+        try:
+            options[key] = json.loads(value)
+        except json.JSONDecodeError:
+            options[key] = value
+    return options
+
+
+def build_coordinator(coordinator_module, bermuda_dir: Path, scanner_addresses, options: dict):
+    """
+    Create a coordinator on the fake backend, with a scanner (in its own area) for each address.
+
+    Returns the coordinator, and the scanners by (lower-case) address.
+    """
+    scanners: dict[str, ReplayScanner] = {}
+    for address in scanner_addresses:
+        if address not in scanners:
+            number = len(scanners) + 1
+            scanners[address] = ReplayScanner(address.upper(), f"Scanner {number}")
+            AREA_REGISTRY.areas[f"area_{number}"] = AreaEntry(f"area_{number}", f"Area {number}")
+            DEVICE_REGISTRY.devices.entries.append(
+                DeviceEntry(f"scanner_{number}", f"Scanner {number}", {("bluetooth", address.upper())}, f"area_{number}")
+            )
+    BLUETOOTH_MANAGER.scanners = list(scanners.values())
+
+    config_dir = bermuda_dir.parents[1]
+    hass = types.SimpleNamespace(
+        config=types.SimpleNamespace(path=lambda *parts: str(config_dir.joinpath(*parts))),
+        bus=types.SimpleNamespace(async_listen=lambda *_args, **_kwargs: _noop),
+        services=types.SimpleNamespace(async_register=_noop),
+        config_entries=types.SimpleNamespace(async_entries=lambda *_args, **_kwargs: []),
+        states=types.SimpleNamespace(get=lambda _entity_id: None),
+    )
+    entry = _FakeConfigEntry(options)
+    coordinator = coordinator_module.BermudaDataUpdateCoordinator(hass, entry)
+    for task in entry.background_tasks:
+        # Loads the manufacturer names.
+        asyncio.run(task)
+    return coordinator, scanners
+
+
+def replay(trace_path: str, bermuda_dir: Path, options: dict) -> None:
+    """Run the trace through a fresh coordinator, and print the timings."""
+    coordinator_module, trace_module, const = load_bermuda(bermuda_dir)
+
+    records = sorted(trace_module.read_trace(trace_path), key=lambda record: record.stamp)
+    if not records:
+        print(f"{trace_path} has no adverts in it.")  # noqa: T201
+        return
+
+    CLOCK.now = records[0].stamp
+    coordinator, scanners = build_coordinator(
+        coordinator_module, bermuda_dir, (record.scanner for record in records), options
+    )
+
+    interval = const.UPDATE_INTERVAL
+    timings: dict[str, list[float]] = defaultdict(list)
+    cycles = 0
+    next_record = 0
+    wall_start = perf_counter()
+    while next_record < len(records):
+        CLOCK.now += interval
+        while next_record < len(records) and records[next_record].stamp <= CLOCK.now:
+            record = records[next_record]
+            scanners[record.scanner].receive(record)
+            next_record += 1
+
+        coordinator._async_update_data_internal()  # noqa: SLF001
+        cycles += 1
+        for phase, elapsed in coordinator.update_timings.items():
+            timings[phase].append(elapsed)
+    wall_time = perf_counter() - wall_start
+
+    trace_time = records[-1].stamp - records[0].stamp
+    print(  # noqa: T201
+        f"Replayed {len(records)} adverts from {len(scanners)} scanners, {trace_time:.1f}s of trace in "
+        f"{wall_time:.2f}s ({trace_time / wall_time:.0f}x real time).\n"
+        f"{cycles} update cycles, {len(coordinator.devices)} devices at the end.\n"
+    )
+    print(f"{'phase':<16}{'total ms':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")  # noqa: T201
+    for phase, values in timings.items():
+        print(  # noqa: T201
+            f"{phase:<16}{sum(values) * 1000:>10.1f}{sum(values) * 1000 / len(values):>10.3f}"
+            f"{_percentile(values, 0.5) * 1000:>10.3f}{_percentile(values, 0.95) * 1000:>10.3f}"
+            f"{max(values) * 1000:>10.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", help="trace file saved by the bermuda.record_trace service")
+    parser.add_argument(
+        "--option",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Bermuda option to set, value as JSON (eg batch_engine=true). Can be repeated.",
+    )
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    parser.add_argument("--debug", action="store_true", help="show Bermuda's debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+    replay(args.trace, args.bermuda.resolve(), _parse_options(args.option))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Compare the areas trilateration would pick against Bermuda's closest-scanner contest, for accuracy and CPU time.
+
+Simulates a two-storey house of 3 x 3 rooms, each 4m square and 3m high, with
+one scanner somewhere in each room (18 scanners, with their positions
+configured). Devices walk slowly around the house, and each scanner hears them
+at the rssi of the log-distance model Bermuda itself uses (the default
+ref_power and attenuation), plus gaussian noise and a loss through the floor:
+
+    python tools/bermuda_trilateration_bench.py
+    python tools/bermuda_trilateration_bench.py --devices 1000 --noise 6
+
+A coordinator on the same fake backend as bermuda_replay.py picks each
+device's area with the contest. After each update, Trilateration below (a
+batched numpy least-squares fit of each device's position to its distances
+from the positioned scanners) estimates where the devices are, and the area
+trilateration would pick is that of the scanner nearest the estimate.
+Reported for each method are:
+
+- how often the device's area is the room it is really in, counted after
+  --warmup cycles so that the distances have settled,
+- the mean time each method takes per update.
+
+This is why Bermuda doesn't have a trilateration option: it was no more
+accurate than the contest with little rssi noise, much worse with realistic
+noise, and took about twice the CPU time. Needs numpy.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+from bermuda_replay import CLOCK, DEFAULT_BERMUDA_DIR, build_coordinator, load_bermuda
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ROOM_SIZE = 4.0  # metres
+ROOMS = 3  # in each direction, on each floor
+FLOORS = 2
+FLOOR_HEIGHT = 3.0
+FLOOR_LOSS = 12  # dB lost through each floor
+HEARING_RANGE = 15.0  # metres, devices further than this from a scanner aren't heard
+WALK_STEP = 0.3  # metres a device can move in each direction, each cycle
+
+# Fewer positioned scanners than this and there's no point trying.
+TRILATERATION_MIN_SCANNERS = 3
+# Gauss-Newton steps from the weighted-centroid starting point.
+TRILATERATION_ITERATIONS = 4
+# Strength of the pull towards the weighted centroid, for when the scanners can't
+# pin down every axis (eg all on one floor).
+TRILATERATION_PRIOR_WEIGHT = 0.1
+# Don't trust a solution whose distances are further out than this on average.
+TRILATERATION_MAX_RESIDUAL = 3.0  # metres
+
+
+class Trilateration:
+    """Estimates device positions from the scanners with known coordinates, all devices at once."""
+
+    def __init__(self, scanner_positions: dict[str, tuple[float, float, float]], max_age: float, max_radius: float):
+        self.scanner_positions = scanner_positions
+        self.max_age = max_age
+        self.max_radius = max_radius
+        self._scanner_rows = {address: row for row, address in enumerate(scanner_positions)}
+        self._scanner_array = np.array(list(scanner_positions.values()), dtype=float).reshape(-1, 3)
+
+    def _anchor_adverts(self, device, nowstamp: float) -> list:
+        """Return the freshest usable advert from each positioned scanner."""
+        freshest = {}
+        stamp_cutoff = nowstamp - self.max_age
+        for advert in device.adverts.values():
+            if (
+                advert.rssi_distance is not None
+                and advert.stamp >= stamp_cutoff
+                and advert.area_id is not None
+                and advert.scanner_address in self.scanner_positions
+            ):
+                current = freshest.get(advert.scanner_address)
+                if current is None or advert.stamp > current.stamp:
+                    freshest[advert.scanner_address] = advert
+        return list(freshest.values())
+
+    def locate_devices(self, devices, nowstamp: float) -> list:
+        """Return (device, advert of the scanner nearest its estimated position) for the devices located."""
+        candidates = []
+        for device in devices:
+            adverts = self._anchor_adverts(device, nowstamp)
+            if len(adverts) >= TRILATERATION_MIN_SCANNERS:
+                candidates.append((device, adverts))
+        if not candidates:
+            return []
+
+        # Pack everything into (device, scanner) arrays, padding the devices that
+        # have fewer scanners with zero-weight entries.
+        counts = np.array([len(adverts) for _device, adverts in candidates])
+        rows = np.repeat(np.arange(len(candidates)), counts)
+        cols = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        flat_adverts = [advert for _device, adverts in candidates for advert in adverts]
+
+        shape = (len(candidates), counts.max())
+        scanner_rows = np.zeros(shape, dtype=np.intp)
+        measured = np.ones(shape)
+        valid = np.zeros(shape, dtype=bool)
+        scanner_rows[rows, cols] = [self._scanner_rows[advert.scanner_address] for advert in flat_adverts]
+        measured[rows, cols] = [advert.rssi_distance for advert in flat_adverts]
+        valid[rows, cols] = True
+        anchors = self._scanner_array[scanner_rows]
+
+        # Longer distances are much noisier, so they count for less.
+        weights = np.zeros_like(measured)
+        np.divide(1.0, np.maximum(measured, 0.1) ** 2, out=weights, where=valid)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        positions, residuals = self._solve(anchors, measured, weights)
+
+        scanner_distances = np.linalg.norm(anchors - positions[:, None, :], axis=2)
+        scanner_distances[~valid] = np.inf
+        nearest = np.argmin(scanner_distances, axis=1)
+        nearest_distance = scanner_distances[np.arange(len(candidates)), nearest]
+        good = (residuals <= TRILATERATION_MAX_RESIDUAL) & (nearest_distance <= self.max_radius)
+        return [(candidates[row][0], candidates[row][1][nearest[row]]) for row in np.flatnonzero(good).tolist()]
+
+    @staticmethod
+    def _solve(anchors, measured, weights):
+        """Weighted least-squares fit of (devices, 3) positions, and the weighted RMS error of each fit."""
+        centroid = np.einsum("ds,dsk->dk", weights, anchors)
+        position = centroid.copy()
+        identity = np.eye(3)
+        for _ in range(TRILATERATION_ITERATIONS):
+            offsets = position[:, None, :] - anchors
+            ranges = np.maximum(np.linalg.norm(offsets, axis=2), 1e-6)
+            jacobian = offsets / ranges[..., None]
+            errors = ranges - measured
+            weighted_jacobian = jacobian * weights[..., None]
+            normal = np.einsum("dsi,dsj->dij", weighted_jacobian, jacobian) + TRILATERATION_PRIOR_WEIGHT * identity
+            gradient = np.einsum("dsi,ds->di", weighted_jacobian, errors) + TRILATERATION_PRIOR_WEIGHT * (
+                position - centroid
+            )
+            position -= np.linalg.solve(normal, gradient[..., None])[..., 0]
+
+        errors = np.linalg.norm(position[:, None, :] - anchors, axis=2) - measured
+        residuals = np.sqrt(np.sum(weights * errors**2, axis=1))
+        return position, residuals
+
+
+def _room(position: tuple[float, float, float]) -> int:
+    """The number of the room the position is in, the same as its scanner's place in the list."""
+    floor_number = min(FLOORS - 1, int(position[2] // FLOOR_HEIGHT))
+    i = min(ROOMS - 1, int(position[0] // ROOM_SIZE))
+    j = min(ROOMS - 1, int(position[1] // ROOM_SIZE))
+    return (floor_number * ROOMS + i) * ROOMS + j
+
+
+def run(bermuda_dir: Path, device_count: int, cycles: int, warmup: int, noise: float, seed: int) -> None:
+    """Run the contest and trilateration side by side, and print the results."""
+    if np is None:
+        print("numpy is not installed, so trilateration can't be compared.")  # noqa: T201
+        sys.exit(1)
+    coordinator_module, trace_module, const = load_bermuda(bermuda_dir)
+    randomiser = random.Random(seed)
+
+    scanner_positions = {}
+    for floor_number in range(FLOORS):
+        for i in range(ROOMS):
+            for j in range(ROOMS):
+                # Far enough apart that Bermuda doesn't take them for the wifi / ethernet MACs of each other.
+                address = f"aa:bb:cc:{len(scanner_positions) * 16:02x}:00:00"
+                scanner_positions[address] = (
+                    (i + randomiser.uniform(0.1, 0.9)) * ROOM_SIZE,
+                    (j + randomiser.uniform(0.1, 0.9)) * ROOM_SIZE,
+                    floor_number * FLOOR_HEIGHT + 1.0,
+                )
+    scanner_addresses = list(scanner_positions)
+    walkers = {
+        # Random static addresses, so they aren't queued for IRK checks.
+        f"c{randomiser.randrange(16):x}:" + ":".join(f"{randomiser.randrange(256):02x}" for _ in range(5)): [
+            randomiser.uniform(0, ROOMS * ROOM_SIZE),
+            randomiser.uniform(0, ROOMS * ROOM_SIZE),
+            randomiser.randrange(FLOORS) * FLOOR_HEIGHT + 1.0,
+        ]
+        for _ in range(device_count)
+    }
+    mfr_data = {0x004C: bytes(4)}
+
+    CLOCK.now = 1000.0
+    options = {const.CONF_DEVICES: [address.upper() for address in walkers]}
+    coordinator, scanners = build_coordinator(coordinator_module, bermuda_dir, scanner_addresses, options)
+    trilateration = Trilateration(scanner_positions, const.AREA_MAX_AD_AGE, const.DEFAULT_MAX_RADIUS)
+    area_ids = [f"area_{number}" for number in range(1, len(scanner_addresses) + 1)]
+
+    correct = {"closest scanner": 0, "trilateration": 0}
+    contest_secs = trilateration_secs = 0.0
+    located = checked = 0
+    edge = ROOMS * ROOM_SIZE - 0.1
+    for cycle in range(cycles):
+        CLOCK.now += const.UPDATE_INTERVAL
+        for address, position in walkers.items():
+            position[0] = min(edge, max(0.1, position[0] + randomiser.uniform(-WALK_STEP, WALK_STEP)))
+            position[1] = min(edge, max(0.1, position[1] + randomiser.uniform(-WALK_STEP, WALK_STEP)))
+            for scanner, scanner_position in scanner_positions.items():
+                distance = math.dist(scanner_position, position)
+                if distance > HEARING_RANGE or randomiser.random() < 0.3:
+                    continue  # not heard by this scanner this cycle
+                floors_between = round(abs(scanner_position[2] - position[2]) / FLOOR_HEIGHT)
+                rssi = (
+                    const.DEFAULT_REF_POWER
+                    - 10 * const.DEFAULT_ATTENUATION * math.log10(max(distance, 0.1))
+                    - FLOOR_LOSS * floors_between
+                    + randomiser.gauss(0, noise)
+                )
+                scanners[scanner].receive(
+                    trace_module.TraceRecord(scanner, address, round(rssi), CLOCK.now - randomiser.random(), mfr_data)
+                )
+
+        coordinator._async_update_data_internal()  # noqa: SLF001
+        # Trilateration is given every device. They all move each cycle, so the
+        # contest has checked (nearly) all of them too.
+        devices = [coordinator.devices[address] for address in walkers]
+        start = perf_counter()
+        located_devices = trilateration.locate_devices(devices, CLOCK.now)
+        locate_secs = perf_counter() - start
+        if cycle < warmup:
+            continue
+        nearest_areas = {device.address: advert.area_id for device, advert in located_devices}
+        contest_secs += coordinator.update_timings["areas"]
+        trilateration_secs += locate_secs
+        located += len(located_devices)
+        checked += len(devices)
+        for address, position in walkers.items():
+            device = coordinator.devices[address]
+            room = area_ids[_room(position)]
+            correct["closest scanner"] += device.area_id == room
+            # Devices it couldn't locate would be left to the contest.
+            correct["trilateration"] += nearest_areas.get(address, device.area_id) == room
+
+    timed = cycles - warmup
+    print(  # noqa: T201
+        f"{device_count} devices, {len(scanner_addresses)} scanners, {timed} cycles after {warmup} to settle, "
+        f"rssi noise {noise} dB. Trilateration located {located} of the {checked} devices it was given:\n"
+    )
+    print(f"  {'':<16}{'right room':>11}{'ms/update':>11}")  # noqa: T201
+    for name, secs in (("closest scanner", contest_secs), ("trilateration", trilateration_secs)):
+        print(f"  {name:<16}{correct[name] / (timed * device_count):>11.1%}{secs / timed * 1000:>11.2f}")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=300, help="how many devices")
+    parser.add_argument("--cycles", type=int, default=120, help="how many update cycles to run")
+    parser.add_argument("--warmup", type=int, default=20, help="cycles before the areas are counted")
+    parser.add_argument("--noise", type=float, default=4.0, help="standard deviation of the rssi noise, in dB")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random house and walks")
+    parser.add_argument("--bermuda", type=Path, default=DEFAULT_BERMUDA_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.bermuda.resolve(), args.devices, args.cycles, args.warmup, args.noise, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Time iCloud3's device-to-device distances with DeviceDistances against recalculating them.
+
+Sets up 20 devices around a city, moves a few of them each cycle and then gets
+the distance between every pair of devices, once for set_dist_to_devices and
+once for set_nearby_devices_group, both the way they did before (calculating
+each distance from both devices' locations) and with tracking/device_distances.py:
+
+    python tools/icloud3_device_distances_bench.py
+    python tools/icloud3_device_distances_bench.py --devices 50 --moved 5
+
+The distances are compared as well, and any that differ are counted.
+
+Home Assistant is not needed. If it is not installed, a haversine distance is
+used in place of its homeassistant.util.location.distance (Vincenty), so both
+sides are timed with a cheaper distance than they use in HA.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from icloud3_zone_bench import CITY, DEFAULT_ICLOUD3_DIR, SPREAD_DEG, load_icloud3_module  # noqa: E402
+
+CYCLES = 50
+
+
+class _Device:
+    """The parts of iCloud3_Device that the distances use."""
+
+    def __init__(self, devicename: str, dist_util) -> None:
+        self.devicename = devicename
+        self.dist_util = dist_util
+        self.loc_data_latitude = self.loc_data_longitude = 0.0
+
+    @property
+    def loc_data_gps(self) -> tuple[float, float]:
+        return (self.loc_data_latitude, self.loc_data_longitude)
+
+    def distance_m(self, to_latitude: float, to_longitude: float) -> float:
+        distance = self.dist_util.gps_distance_m(self.loc_data_gps, (to_latitude, to_longitude))
+        return 0 if distance < 0.002 else distance
+
+
+def all_distances_calc(devices: list[_Device]) -> list[float]:
+    return [
+        Device_from.distance_m(Device_to.loc_data_latitude, Device_to.loc_data_longitude)
+        for Device_from in devices
+        for Device_to in devices
+        if Device_to is not Device_from
+    ]
+
+
+def all_distances_cached(device_distances, devices: list[_Device]) -> list[float]:
+    return [
+        device_distances.distance_m(Device_from, Device_to)
+        for Device_from in devices
+        for Device_to in devices
+        if Device_to is not Device_from
+    ]
+
+
+def run(icloud3_dir: Path, device_cnt: int, moved_cnt: int) -> None:
+    device_distances = load_icloud3_module(icloud3_dir, "tracking.device_distances")
+    dist_util = load_icloud3_module(icloud3_dir, "utils.dist_util")
+    gb = load_icloud3_module(icloud3_dir, "global_variables").GlobalVariables
+    randomiser = random.Random(1)
+
+    devices = [_Device(f"device_{number}", dist_util) for number in range(device_cnt)]
+    gb.Devices_by_devicename = {Device.devicename: Device for Device in devices}
+    gb.DeviceDistances = None
+    DeviceDistances = device_distances.device_distances()
+
+    def _move(Device: _Device) -> None:
+        Device.loc_data_latitude = CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG)
+        Device.loc_data_longitude = CITY[1] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG)
+
+    for Device in devices:
+        _move(Device)
+    moves = [randomiser.sample(devices, moved_cnt) for _cycle in range(CYCLES)]
+
+    calc_ms = cached_ms = 0.0
+    diffs = 0
+    for moved in moves:
+        for Device in moved:
+            _move(Device)
+
+        start = perf_counter()
+        calc = all_distances_calc(devices)
+        calc += all_distances_calc(devices)
+        calc_ms += perf_counter() - start
+
+        start = perf_counter()
+        DeviceDistances.update()
+        cached = all_distances_cached(DeviceDistances, devices)
+        cached += all_distances_cached(DeviceDistances, devices)
+        cached_ms += perf_counter() - start
+
+        diffs += sum(calc_m != cached_m for calc_m, cached_m in zip(calc, cached))
+
+    print(  # noqa: T201
+        f"{device_cnt} devices, {moved_cnt} moved each cycle, {CYCLES} cycles. "
+        f"ms per cycle of set_dist_to_devices and set_nearby_devices_group:\n"
+    )
+    print(f"  {'':<30}{'calculated':>12}{'cached':>10}{'differ':>8}")  # noqa: T201
+    print(  # noqa: T201
+        f"  {'distance between all pairs':<30}{calc_ms * 1000 / CYCLES:>12.3f}"
+        f"{cached_ms * 1000 / CYCLES:>10.3f}{diffs:>8}"
+    )
+    print(f"\n  Distances calculated by DeviceDistances: {DeviceDistances.calc_cnt}")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=20, help="how many devices to track")
+    parser.add_argument("--moved", type=int, default=3, help="how many devices move each cycle")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.icloud3.resolve(), args.devices, min(args.moved, args.devices))
+
+
+if __name__ == "__main__":
+    main()
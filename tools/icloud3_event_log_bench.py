@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Time iCloud3's Event Log record table against the list it replaced.
+
+Fills a table with 10,000 and 50,000 records for 8 devices (half of them
+monitor records, as when "Show Tracking Monitors" is used), then times adding
+records, selecting one device's records the way an EvLog refresh does (all
+of them, and just the newest 100 the EvLog sensor carries), and shrinking
+the table by 500 records:
+
+    python tools/icloud3_event_log_bench.py
+    python tools/icloud3_event_log_bench.py --records 10000 50000 200000
+
+The list version is the algorithm EventLog used before: insert at the front,
+filter the whole table for every refresh, and delete from the middle while
+walking back from the oldest record. Both must select the same records.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import random
+import sys
+import types
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_ICLOUD3_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "icloud3"
+DEVICE_CNT = 8
+MONITOR = "^m^"
+
+
+def load_event_log_recds(icloud3_dir: Path):
+    """Import the record table module, without Home Assistant or the rest of iCloud3."""
+    homeassistant = types.ModuleType("homeassistant")
+    ha_const = types.ModuleType("homeassistant.const")
+    ha_const.STATE_HOME, ha_const.STATE_NOT_HOME = "home", "not_home"
+    homeassistant.const = ha_const
+    sys.modules.setdefault("homeassistant", homeassistant)
+    sys.modules.setdefault("homeassistant.const", ha_const)
+    for name, path in (
+        ("custom_components", icloud3_dir.parent),
+        ("custom_components.icloud3", icloud3_dir),
+        ("custom_components.icloud3.support", icloud3_dir / "support"),
+    ):
+        package = types.ModuleType(name)
+        package.__path__ = [str(path)]
+        sys.modules[name] = package
+    return importlib.import_module("custom_components.icloud3.support.event_log_recds")
+
+
+def make_recds(cnt: int, randomiser: random.Random) -> list[list[str]]:
+    devicenames = [f"device_{number}" for number in range(DEVICE_CNT)] + ["*"]
+    recds = []
+    for number in range(cnt):
+        devicename = randomiser.choice(devicenames)
+        monitor = MONITOR if randomiser.random() < 0.5 else ""
+        recds.append([devicename, "10:15:32a", f"{monitor}Event text number {number} for {devicename}, with details"])
+    return recds
+
+
+# ---------------------------------------------------------------------------
+# The list table that EventLog used before
+# ---------------------------------------------------------------------------
+
+
+def list_add(table: list, recd: list) -> None:
+    table.insert(0, recd)
+
+
+def list_select(table: list, devicename: str, monitors: bool) -> list:
+    devicenames = ["*", "**", "nodevices", devicename]
+    return [
+        recd[1:3]
+        for recd in table
+        if recd[0] in devicenames and (monitors or not recd[2].startswith(MONITOR))
+    ]
+
+
+def list_shrink(table: list, shrink_cnt: int) -> None:
+    delete_device_recd_cnt = shrink_cnt * 0.40
+    target_cnt = len(table) - shrink_cnt
+    delete_cnt = 0
+    for x in range(len(table) - 2, 2, -1):
+        monitor = table[x][2].startswith(MONITOR)
+        if monitor or delete_cnt < delete_device_recd_cnt:
+            delete_cnt += 1
+            del table[x]
+            if delete_cnt >= shrink_cnt:
+                break
+    if len(table) > target_cnt:
+        del table[target_cnt:]
+
+
+# ---------------------------------------------------------------------------
+
+
+def _time(func, repeat: int) -> float:
+    """Return the mean ms for a call of func."""
+    start = perf_counter()
+    for _ in range(repeat):
+        func()
+    return (perf_counter() - start) * 1000 / repeat
+
+
+def bench(module, cnt: int, randomiser: random.Random) -> None:
+    recds = make_recds(cnt, randomiser)
+    extra = make_recds(1000, randomiser)
+
+    table: list = []
+    store = module.EventLogRecds(monitor_max_cnt=cnt)
+    add_list = _time(lambda: [list_add(table, recd) for recd in recds], 1) * 1000 / cnt
+    add_store = _time(lambda: [store.add(recd) for recd in recds], 1) * 1000 / cnt
+
+    # Adding to a full table, as happens for every record once it has filled up
+    add_full_list = _time(lambda: [list_add(table, recd) for recd in extra], 1) * 1000 / len(extra)
+    add_full_store = _time(lambda: [store.add(recd) for recd in extra], 1) * 1000 / len(extra)
+
+    select_list = _time(lambda: list_select(table, "device_3", False), 20)
+    select_store = _time(
+        lambda: [recd[1:3] for recd in store.recds(["*", "**", "nodevices", "device_3"], monitor_recds=False)], 20
+    )
+    select_mon_list = _time(lambda: list_select(table, "device_3", True), 20)
+    select_mon_store = _time(lambda: [recd[1:3] for recd in store.recds(["*", "**", "nodevices", "device_3"])], 20)
+    select_100_list = _time(lambda: list_select(table, "device_3", False)[:100], 20)
+    select_100_store = _time(
+        lambda: [recd[1:3] for recd in store.recds(["*", "**", "nodevices", "device_3"], False, max_cnt=100)], 20
+    )
+    if [recd[1:3] for recd in store.recds(["*", "**", "nodevices", "device_3"])] != list_select(table, "device_3", True):
+        print("The store selected different records to the list!")  # noqa: T201
+        sys.exit(1)
+
+    shrink_list = _time(lambda: list_shrink(table, 500), 5)
+    shrink_store = _time(lambda: store.shrink(500, 200), 5)
+
+    print(f"\n{cnt} records, {DEVICE_CNT} devices:")  # noqa: T201
+    print(f"  {'':<34}{'list ms':>10}{'store ms':>10}")  # noqa: T201
+    for name, list_ms, store_ms in (
+        ("add 1000 records", add_list, add_store),
+        ("add 1000 records (full table)", add_full_list, add_full_store),
+        ("select one device", select_list, select_store),
+        ("select one device, with monitors", select_mon_list, select_mon_store),
+        ("select one device, newest 100", select_100_list, select_100_store),
+        ("shrink by 500", shrink_list, shrink_store),
+    ):
+        print(f"  {name:<34}{list_ms:>10.3f}{store_ms:>10.3f}")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, nargs="+", default=[10000, 50000], help="table sizes to time")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    module = load_event_log_recds(args.icloud3.resolve())
+    randomiser = random.Random(1)
+    for cnt in args.records:
+        bench(module, cnt, randomiser)
+
+
+if __name__ == "__main__":
+    main()
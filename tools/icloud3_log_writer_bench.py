@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Time writing iCloud3 log records with the iC3LogWriter thread against writing each one to the log file.
+
+Logs 50,000 debug-sized records (about what rawdata logging writes in a busy
+hour) from the calling thread and times how long the caller is held up,
+first the way write_ic3log_recd did before (a logging.FileHandler writing and
+flushing each record, checking the file exists every 2-secs) and then with
+utils/ic3log_writer.py. The log file is renamed part way through, the way it
+is deleted or archived while iCloud3 is running, and the records in the old
+and new log files are counted.
+
+iCloud3 drops records when the writer's queue is full (on a busy machine the
+writer thread may not keep up with this many records at once). The bench
+waits for the queue instead, counting the wait in the caller's time, so the
+log files always have all of the records and the writes are compared on the
+same records.
+
+    python tools/icloud3_log_writer_bench.py
+    python tools/icloud3_log_writer_bench.py --records 200000
+
+Home Assistant is not needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from icloud3_zone_bench import DEFAULT_ICLOUD3_DIR, load_icloud3_module  # noqa: E402
+
+RECORD = "Device Monitor > iPhone, LocData-(27.72683, -80.39055), Accuracy-5m, Located-12:34:56 " * 3
+FORMAT = "%(asctime)s %(message)s"
+DATEFMT = "%m-%d %H:%M:%S"
+
+
+def _filter_log_msg(log_msg: str) -> str:
+    """Does the same work as messaging.filter_log_msg, hiding a password."""
+    return log_msg.replace("secret-password", "********")
+
+
+class _LoggerFilter(logging.Filter):
+    """The logging.Filter write_ic3log_recd used before."""
+
+    @staticmethod
+    def filter(record):
+        record.msg = _filter_log_msg(record.msg)
+        record.args = []
+        return True
+
+
+def _line_cnt(filename: Path) -> int:
+    return sum(1 for _line in open(filename, encoding="utf-8")) if filename.exists() else 0
+
+
+def _file_handler(log_filename: Path, filemode: str) -> logging.FileHandler:
+    handler = logging.FileHandler(log_filename, mode=filemode, encoding="utf-8")
+    handler.setFormatter(logging.Formatter(FORMAT, datefmt=DATEFMT))
+    handler.addFilter(_LoggerFilter)
+    return handler
+
+
+class _Before:
+    """write_ic3log_recd before, a logging.FileHandler and a 2-sec check that the file exists."""
+
+    def __init__(self, log_filename: Path) -> None:
+        self.log_filename = log_filename
+        self.check_exist_secs = time.time()
+        self.logger = logging.getLogger("icloud3_bench_before")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(_file_handler(log_filename, "w"))
+
+    def write(self, log_msg: str) -> None:
+        if time.time() - self.check_exist_secs > 2:
+            self.check_exist_secs = time.time()
+            if os.path.isfile(self.log_filename) is False:
+                self.close()
+                self.logger.addHandler(_file_handler(self.log_filename, "w"))
+                self.logger.info("Recreated")
+        self.logger.info(log_msg)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
+
+
+class _Writer:
+    """write_ic3log_recd with the iC3LogWriter."""
+
+    def __init__(self, log_filename: Path, ic3log_writer) -> None:
+        self.LogWriter = ic3log_writer.iC3LogWriter(str(log_filename), _filter_log_msg, "Recreated")
+        self.LogWriter.open_log_file("w")
+        self.queue_size = ic3log_writer.IC3LOG_QUEUE_SIZE
+        self.flush = self.LogWriter.flush
+        self.wait_cnt = 0
+
+    def write(self, log_msg: str) -> None:
+        # Wait for the writer thread to catch up instead of dropping the record
+        while self.LogWriter.queue_depth >= self.queue_size:
+            self.wait_cnt += 1
+            time.sleep(0.001)
+        self.LogWriter.write(log_msg)
+
+    def close(self) -> None:
+        self.LogWriter.close_log_file()
+
+
+def run(icloud3_dir: Path, record_cnt: int) -> None:
+    ic3log_writer = load_icloud3_module(icloud3_dir, "utils.ic3log_writer")
+    half_cnt = record_cnt // 2
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in ("before", "writer thread"):
+            log_filename = Path(temp_dir) / f"{name.replace(' ', '_')}.log"
+            log = _Before(log_filename) if name == "before" else _Writer(log_filename, ic3log_writer)
+
+            # Log half of the records, rename the log file and wait for the 2-sec
+            # file check to come around (not timed), then log the rest
+            caller_secs = 0.0
+            for numbers in (range(half_cnt), range(half_cnt, record_cnt)):
+                start = perf_counter()
+                for number in numbers:
+                    log.write(f"{number} {RECORD}")
+                caller_secs += perf_counter() - start
+                if number < half_cnt:
+                    log.flush()
+                    os.rename(log_filename, f"{log_filename}-1.log")
+                    time.sleep(2.1)
+
+            start = perf_counter()
+            log.flush()
+            written_secs = caller_secs + perf_counter() - start
+            log.close()
+
+            line_cnts = (_line_cnt(Path(f"{log_filename}-1.log")), _line_cnt(log_filename))
+            extra = ""
+            if name != "before":
+                extra = (
+                    f", {log.LogWriter.batch_cnt} writes, waited for a full queue {log.wait_cnt} times, "
+                    f"dropped-{log.LogWriter.dropped_cnt}"
+                )
+            results.append((name, caller_secs, written_secs, line_cnts, extra))
+
+    print(f"{record_cnt} records, the log file is renamed after {half_cnt}:\n")  # noqa: T201
+    print(f"  {'':<16}{'caller us/recd':>16}{'all written ms':>16}{'lines in old, new file':>26}")  # noqa: T201
+    for name, caller_secs, written_secs, line_cnts, extra in results:
+        print(  # noqa: T201
+            f"  {name:<16}{caller_secs * 1e6 / record_cnt:>16.2f}{written_secs * 1000:>16.0f}"
+            f"{str(line_cnts):>26}{extra}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--records", type=int, default=50000, help="how many records to log")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.icloud3.resolve(), args.records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Time iCloud3's Waze History Database lookups with the location cache against the way they were done before.
+
+Creates a Waze History Database with 100,000 locations for 3 tracked from
+zones, then looks up locations the way devices do, mostly going back to places
+they have been recently, and updates the usage count when the location is found.
+The lookups are done the way get_location_time_dist and update_usage_cnt did
+before (a SELECT built from the lat_long_key without an index, and a SELECT,
+UPDATE and commit for every usage count update) and with
+tracking/waze_history.py (the lat_long_key/zone_id index, the location cache
+and the usage counts written together):
+
+    python tools/icloud3_waze_history_bench.py
+    python tools/icloud3_waze_history_bench.py --locations 250000 --lookups 5000
+
+The results are compared as well, and any that differ are counted. Then the
+database is compressed (VACUUM), as it is each night. It is timed on its own,
+which is how long the 5-sec loop was held up before, and again in the
+maintenance thread while locations are being looked up, with the longest time
+a lookup waited.
+
+Home Assistant and requests are not needed. The Event Log monitor messages
+posted by waze_history.py are dropped, so only the database work is timed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import types
+from pathlib import Path
+from time import perf_counter, sleep
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from icloud3_zone_bench import CITY, DEFAULT_ICLOUD3_DIR, load_icloud3_module  # noqa: E402
+
+ZONES = {"home": 1, "work": 2, "school": 3}
+SPREAD_DEG = 0.15
+HOT_LOCATION_CNT = 200
+
+
+class _Quiet:
+    """Stands in for the Event Log and loggers, dropping everything."""
+
+    def __getattr__(self, name: str):
+        return lambda *args, **kwargs: None
+
+
+def _lat_long_key(latitude: float, longitude: float) -> str:
+    return f"{latitude:.04f}:{longitude:.04f}"
+
+
+def _create_database(waze_history, filename: Path, location_cnt: int, randomiser: random.Random) -> list:
+    connection = sqlite3.connect(filename)
+    connection.execute(waze_history.CREATE_ZONES_TABLE)
+    connection.execute(waze_history.CREATE_LOCATIONS_TABLE)
+    locations = []
+    for _number in range(location_cnt):
+        latitude = round(CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG), 4)
+        longitude = round(CITY[1] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG), 4)
+        locations.append((latitude, longitude))
+        connection.execute(
+            waze_history.ADD_LOCATION_RECORD,
+            [
+                randomiser.choice(list(ZONES.values())),
+                _lat_long_key(latitude, longitude),
+                latitude,
+                longitude,
+                round(randomiser.uniform(1, 40), 2),
+                round(randomiser.uniform(1, 30), 3),
+                "2024-01-01 00:00:00",
+                "2024-01-01 00:00:00",
+                randomiser.randint(1, 20),
+            ],
+        )
+    connection.commit()
+    connection.close()
+    return locations
+
+
+# ---------------------------------------------------------------------------
+# Looking up the location the way get_location_time_dist and update_usage_cnt did before
+# ---------------------------------------------------------------------------
+
+
+class _OldWazeHistory:
+    def __init__(self, filename: Path, waze_history) -> None:
+        self.waze_history = waze_history
+        self.connection = sqlite3.connect(filename)
+        self.cursor = self.connection.cursor()
+        self.last_lat_long_key = ""
+        self.last_location_recds = []
+
+    def _sql(self, sql, data=None, fetchone=False, fetchall=False):
+        if data:
+            self.cursor.execute(sql, data)
+        else:
+            self.cursor.execute(sql)
+        self.connection.commit()
+        if fetchone:
+            return self.cursor.fetchone()
+        if fetchall:
+            return self.cursor.fetchall()
+        return None
+
+    def get_location_time_dist(self, zone_id: int, latitude: float, longitude: float):
+        wh = self.waze_history
+        lat_long_key = _lat_long_key(latitude, longitude)
+        if self.last_lat_long_key != lat_long_key:
+            self.last_location_recds = self._sql(
+                f"SELECT * FROM locations WHERE lat_long_key='{lat_long_key}' ORDER BY zone_id, usage_cnt DESC ",
+                fetchall=True,
+            )
+        if self.last_location_recds == []:
+            self.last_lat_long_key = ""
+            return (0, 0, 0)
+        self.last_lat_long_key = lat_long_key
+        for record in self.last_location_recds:
+            if record[wh.LOC_ZONE_ID] == zone_id:
+                return (record[wh.LOC_TIME], record[wh.LOC_DIST], record[wh.LOC_ID])
+        return (0, 0, 0)
+
+    def update_usage_cnt(self, location_id: int) -> None:
+        sql = f"SELECT * FROM locations WHERE loc_id={location_id}"
+        record = self._sql(sql, fetchone=True)
+        self._sql(
+            "UPDATE locations SET last_used = ? , usage_cnt = ? WHERE loc_id = ?",
+            ["2024-01-02 00:00:00", record[self.waze_history.LOC_USAGE_CNT] + 1, location_id],
+        )
+        self._sql(sql, fetchone=True)
+
+
+# ---------------------------------------------------------------------------
+
+
+def _time_lookups(get_location_time_dist, update_usage_cnt, lookups) -> tuple[float, list]:
+    results = []
+    start = perf_counter()
+    for zone, latitude, longitude in lookups:
+        result = get_location_time_dist(zone, latitude, longitude)
+        if result[2] > 0:
+            update_usage_cnt(result[2])
+        results.append(result)
+    return perf_counter() - start, results
+
+
+def run(icloud3_dir: Path, location_cnt: int, lookup_cnt: int) -> None:
+    try:
+        import requests  # noqa: F401
+    except ImportError:
+        sys.modules["requests"] = types.ModuleType("requests")
+    waze_history = load_icloud3_module(icloud3_dir, "tracking.waze_history")
+    gb = load_icloud3_module(icloud3_dir, "global_variables").GlobalVariables
+    gb.EvLog = gb.HALogger = gb.iC3Logger = _Quiet()
+    waze_history.post_monitor_msg = _Quiet().post_monitor_msg
+    randomiser = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        old_filename = Path(temp_dir) / "old.db"
+        new_filename = Path(temp_dir) / "new.db"
+        locations = _create_database(waze_history, old_filename, location_cnt, randomiser)
+        shutil.copyfile(old_filename, new_filename)
+
+        # Devices mostly go back to places they have been recently
+        hot_locations = randomiser.sample(locations, HOT_LOCATION_CNT)
+        lookups = []
+        for _lookup in range(lookup_cnt):
+            chance = randomiser.random()
+            if chance < 0.8:
+                latitude, longitude = randomiser.choice(hot_locations)
+            elif chance < 0.9:
+                latitude, longitude = randomiser.choice(locations)
+            else:
+                latitude = CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG)
+                longitude = CITY[1] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG)
+            lookups.append((randomiser.choice(list(ZONES)), latitude, longitude))
+
+        old = _OldWazeHistory(old_filename, waze_history)
+        old_secs, old_results = _time_lookups(
+            lambda zone, latitude, longitude: old.get_location_time_dist(ZONES[zone], latitude, longitude),
+            old.update_usage_cnt,
+            lookups,
+        )
+        old.connection.close()
+
+        gb.wazehist_database_filename = str(new_filename)
+        gb.waze_history_database_used = True
+        gb.waze_history_max_distance = 20
+        gb.wazehist_zone_id = dict(ZONES)
+        start = perf_counter()
+        WazeHist = waze_history.WazeRouteHistory(True, 20, "north-south")
+        open_secs = perf_counter() - start
+        new_secs, new_results = _time_lookups(WazeHist.get_location_time_dist, WazeHist.update_usage_cnt, lookups)
+        start = perf_counter()
+        WazeHist.write_usage_cnt_updates()
+        write_secs = perf_counter() - start
+        cache_cnts = (WazeHist.location_cache_hit_cnt, WazeHist.location_cache_read_cnt)
+
+        usage_cnt_sql = "SELECT sum(usage_cnt) FROM locations"
+        usage_cnts = [sqlite3.connect(filename).execute(usage_cnt_sql).fetchone()[0] for filename in (old_filename, new_filename)]
+
+        start = perf_counter()
+        WazeHist.compress_wazehist_database()
+        compress_secs = perf_counter() - start
+
+        # Look up locations that are not cached while the db is compressed again
+        WazeHist.start_maintenance_thread(WazeHist.compress_wazehist_database)
+        sleep(0.01)
+        lookup_wait_secs = []
+        while WazeHist.maintenance_lock.locked():
+            latitude = CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG)
+            start = perf_counter()
+            WazeHist.get_location_time_dist("home", latitude, CITY[1])
+            lookup_wait_secs.append(perf_counter() - start)
+            sleep(0.001)
+        WazeHist.close_waze_history_database()
+
+    diffs = sum(old_ != new_ for old_, new_ in zip(old_results, new_results))
+    found_cnt = sum(result[2] > 0 for result in old_results)
+    print(  # noqa: T201
+        f"{location_cnt} locations, {lookup_cnt} lookups ({found_cnt} found in the history). "
+        f"ms per lookup, with the usage count update:\n"
+    )
+    print(f"  {'':<34}{'before':>10}{'cached':>10}{'differ':>8}")  # noqa: T201
+    print(  # noqa: T201
+        f"  {'get_location_time_dist':<34}{old_secs * 1000 / lookup_cnt:>10.3f}"
+        f"{new_secs * 1000 / lookup_cnt:>10.3f}{diffs:>8}"
+    )
+    print(  # noqa: T201
+        f"\n  Cache hits-{cache_cnts[0]}, db reads-{cache_cnts[1]}"
+        f"\n  Creating the index when the db is opened: {open_secs * 1000:.1f}ms"
+        f"\n  Writing the usage counts: {write_secs * 1000:.1f}ms"
+        f"\n  Compressing the db: {compress_secs * 1000:.1f}ms, longest lookup while it runs in the "
+        f"maintenance thread: {max(lookup_wait_secs, default=0) * 1000:.1f}ms ({len(lookup_wait_secs)} lookups)"
+        f"\n  Usage counts match: {usage_cnts[0] == usage_cnts[1]} ({usage_cnts[0]}, {usage_cnts[1]})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--locations", type=int, default=100000, help="how many locations are in the history")
+    parser.add_argument("--lookups", type=int, default=2000, help="how many locations to look up")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.icloud3.resolve(), args.locations, args.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Time iCloud3's Waze route requests with the shared session and route cache against a new connection for each request.
+
+Starts a stub Waze routing server on localhost that takes 50ms to answer and
+calculates the route from the from/to GPS. Then 4 devices travel together for
+20 update cycles, each getting the route home every cycle, first one after the
+other (the 5-sec loop) and then all at once from their own threads. The routes
+are requested the way WazeRouteCalculator did before (requests.get, a new
+connection for each route) and with tracking/waze_route_calc_ic3.py:
+
+    python tools/icloud3_waze_route_bench.py
+    python tools/icloud3_waze_route_bench.py --devices 8 --latency 100
+
+The route times/distances are compared as well, and any that differ are
+counted. The stub server does not use https, so the time saved by not setting up
+a TLS connection for each request is not included.
+
+requests must be installed. Home Assistant is not needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import perf_counter, sleep
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from icloud3_zone_bench import CITY, DEFAULT_ICLOUD3_DIR, _haversine_m, load_icloud3_module  # noqa: E402
+
+CYCLES = 20
+HOME = (CITY[0] + 0.1, CITY[1] + 0.1)
+
+
+class _StubWazeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency_secs: float) -> None:
+        super().__init__(("127.0.0.1", 0), _StubWazeHandler)
+        self.latency_secs = latency_secs
+        self.request_cnt = 0
+        self.connection_cnt = 0
+        self.cnt_lock = threading.Lock()
+
+
+class _StubWazeHandler(BaseHTTPRequestHandler):
+    """Answers a routingRequest with one segment, its length 1.3 times the straight line distance."""
+
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1  # Send the headers and body together
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.cnt_lock:
+            self.server.connection_cnt += 1
+
+    def do_GET(self) -> None:  # noqa: N802
+        with self.server.cnt_lock:
+            self.server.request_cnt += 1
+        sleep(self.server.latency_secs)
+
+        query = parse_qs(urlparse(self.path).query)
+        (from_long, from_lat), (to_long, to_lat) = (
+            [float(value[2:]) for value in query[end][0].split()] for end in ("from", "to")
+        )
+        length = int(_haversine_m(from_lat, from_long, to_lat, to_long) * 1.3)
+        segment = {"length": length, "crossTime": length // 12, "crossTimeWithoutRealTime": length // 14}
+        body = json.dumps({"response": {"results": [segment]}}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _old_calculator(waze_route_calc, requests):
+    """A WazeRouteCalculator that requests the routes the way it did before."""
+
+    class _OldWazeRouteCalculator(waze_route_calc.WazeRouteCalculator):
+        def get_route(self, from_lat, from_long, to_lat, to_long):
+            url = f"{waze_route_calc.WAZE_URL_BASE}{self.region}{waze_route_calc.WAZE_URL_ENDPOINT}"
+            url_options = {
+                "from": f"x:{from_long} y:{from_lat}",
+                "to": f"x:{to_long} y:{to_lat}",
+                "at": 0,
+                "returnJSON": "true",
+                "returnGeometries": "true",
+                "returnInstructions": "true",
+                "timeout": 60000,
+                "nPaths": 1,
+                "options": ",".join("%s:t" % route_option for route_option in self.route_options),
+            }
+            response = requests.get(url, params=url_options, headers=self.HEADERS)
+            response.encoding = "utf-8"
+            return self._check_response(response)["response"]
+
+        def calc_route_info(self, *args, **kwargs):
+            return self._calc_route_info(*args, **kwargs)
+
+    return _OldWazeRouteCalculator("us", False)
+
+
+def _device_locations(device_cnt: int, randomiser: random.Random) -> list[list[tuple[float, float]]]:
+    """The devices' locations each cycle. They travel together, so most of them are within a few meters."""
+    locations = []
+    latitude, longitude = CITY
+    for _cycle in range(CYCLES):
+        latitude += randomiser.uniform(0, 0.005)
+        longitude += randomiser.uniform(0, 0.005)
+        cycle_locations = [(round(latitude, 5), round(longitude, 5))] * (device_cnt - 1)
+        cycle_locations.append((round(latitude + 0.01, 5), round(longitude, 5)))
+        locations.append(cycle_locations)
+    return locations
+
+
+def _run_cycles(WazeRouteCalc, locations, server: _StubWazeServer, threaded: bool):
+    server.request_cnt = server.connection_cnt = 0
+    results = []
+    start = perf_counter()
+    for cycle_locations in locations:
+        cycle_results = [None] * len(cycle_locations)
+
+        def _route(device: int, location=None, cycle_results=cycle_results) -> None:
+            cycle_results[device] = WazeRouteCalc.calc_route_info(*location, *HOME, log_results_flag=False)
+
+        if threaded:
+            threads = [
+                threading.Thread(target=_route, args=(device, location))
+                for device, location in enumerate(cycle_locations)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            for device, location in enumerate(cycle_locations):
+                _route(device, location)
+        results.extend(cycle_results)
+    return (perf_counter() - start) * 1000 / CYCLES, server.request_cnt, server.connection_cnt, results
+
+
+def run(icloud3_dir: Path, device_cnt: int, latency_ms: int) -> None:
+    import requests
+
+    waze_route_calc = load_icloud3_module(icloud3_dir, "tracking.waze_route_calc_ic3")
+    server = _StubWazeServer(latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    waze_route_calc.WAZE_URL_BASE = f"http://127.0.0.1:{server.server_address[1]}/"
+    waze_route_calc.WAZE_URL_ENDPOINT = "/RoutingManager/routingRequest"
+
+    locations = _device_locations(device_cnt, random.Random(1))
+    print(  # noqa: T201
+        f"{device_cnt} devices travelling together, {CYCLES} cycles, the server takes {latency_ms}ms. "
+        f"Per cycle of all devices:\n"
+    )
+    print(f"  {'':<30}{'ms':>9}{'requests':>10}{'connections':>13}{'differ':>8}")  # noqa: T201
+    for threaded in (False, True):
+        old = _run_cycles(_old_calculator(waze_route_calc, requests), locations, server, threaded)
+        new = _run_cycles(waze_route_calc.WazeRouteCalculator("us", False), locations, server, threaded)
+        diffs = sum(old_ != new_ for old_, new_ in zip(old[3], new[3]))
+        for name, (cycle_ms, request_cnt, connection_cnt, _results) in (("before", old), ("session/cache", new)):
+            label = f"{'at once' if threaded else 'one at a time'}, {name}"
+            print(  # noqa: T201
+                f"  {label:<30}{cycle_ms:>9.1f}{request_cnt / CYCLES:>10.1f}{connection_cnt / CYCLES:>13.2f}"
+                f"{diffs if name != 'before' else '':>8}"
+            )
+    server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=4, help="how many devices travel together")
+    parser.add_argument("--latency", type=int, default=50, help="ms the stub Waze server takes to answer")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.icloud3.resolve(), max(args.devices, 2), args.latency)
+
+
+if __name__ == "__main__":
+    main()
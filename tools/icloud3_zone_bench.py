@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Time iCloud3's zone selection with the ZoneIndex against checking every zone.
+
+Sets up 200 zones around a city and 20 devices moving around it, then times
+selecting the zone each device is in and finding its closest zone, both the
+way select_zone did before (reading each zone's location from the HA state and
+calculating the distance to every zone) and with tracking/zone_index.py:
+
+    python tools/icloud3_zone_bench.py
+    python tools/icloud3_zone_bench.py --zones 1000 --devices 50
+
+The selections are compared as well, and any that differ are counted.
+
+Home Assistant is not needed. If it is not installed, a haversine distance is
+used in place of its homeassistant.util.location.distance (Vincenty), so both
+sides are timed with a cheaper distance than they use in HA.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import random
+import sys
+import types
+from math import asin, cos, radians, sin, sqrt
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_ICLOUD3_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "icloud3"
+CITY = (40.7128, -74.0060)
+SPREAD_DEG = 0.3
+CYCLES = 50
+
+
+def _haversine_m(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    a = sin(radians(lat2 - lat1) / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(
+        radians(long2 - long1) / 2
+    ) ** 2
+    return 2 * 6371000 * asin(min(1, sqrt(a)))
+
+
+def _fake_module(name: str, **attrs) -> types.ModuleType:
+    module = sys.modules.get(name) or types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def load_icloud3_module(icloud3_dir: Path, name: str) -> types.ModuleType:
+    """Import an iCloud3 module (eg "tracking.zone_index"), with fakes for the parts of Home Assistant it reaches."""
+    try:
+        import homeassistant.util.location  # noqa: F401
+    except ImportError:
+        _fake_module("homeassistant", __path__=[])
+        _fake_module("homeassistant.const", STATE_HOME="home", STATE_NOT_HOME="not_home")
+        _fake_module("homeassistant.util", __path__=[])
+        _fake_module("homeassistant.util.dt")
+        _fake_module("homeassistant.util.location", distance=_haversine_m)
+        _fake_module("homeassistant.components", __path__=[])
+        _fake_module("homeassistant.components.persistent_notification")
+    for package, path in (
+        ("custom_components", icloud3_dir.parent),
+        ("custom_components.icloud3", icloud3_dir),
+        ("custom_components.icloud3.tracking", icloud3_dir / "tracking"),
+        ("custom_components.icloud3.utils", icloud3_dir / "utils"),
+    ):
+        _fake_module(package, __path__=[str(path)])
+    return importlib.import_module(f"custom_components.icloud3.{name}")
+
+
+class _States:
+    """Stands in for hass.states, holding the zone attributes."""
+
+    def __init__(self) -> None:
+        self.attributes_by_entity_id: dict[str, dict] = {}
+
+    def get(self, entity_id: str) -> types.SimpleNamespace:
+        return types.SimpleNamespace(attributes=self.attributes_by_entity_id[entity_id])
+
+
+class _Zone:
+    """The parts of iCloud3_Zone that zone selection uses, read from the HA state like the real one."""
+
+    def __init__(self, zone: str, states: _States, dist_util) -> None:
+        self.zone = self.dname = zone
+        self.zone_entity_id = f"zone.{zone}"
+        self.states = states
+        self.dist_util = dist_util
+
+    @property
+    def latitude(self) -> float:
+        return self.states.get(self.zone_entity_id).attributes["latitude"]
+
+    @property
+    def longitude(self) -> float:
+        return self.states.get(self.zone_entity_id).attributes["longitude"]
+
+    @property
+    def radius_m(self) -> int:
+        return int(self.states.get(self.zone_entity_id).attributes["radius"])
+
+    @property
+    def passive(self) -> bool:
+        return self.states.get(self.zone_entity_id).attributes["passive"]
+
+    def distance_m(self, to_latitude: float, to_longitude: float) -> float:
+        distance = self.dist_util.gps_distance_m((self.latitude, self.longitude), (to_latitude, to_longitude))
+        return 0 if distance < 0.002 else distance
+
+
+# ---------------------------------------------------------------------------
+# Selecting the zone the way select_zone and closest_zone did before
+# ---------------------------------------------------------------------------
+
+
+def select_zone_all(zones: list[_Zone], latitude: float, longitude: float, gps_accuracy_adj: int):
+    zones_data = [
+        [Zone.distance_m(latitude, longitude), Zone, Zone.zone, Zone.radius_m, Zone.dname]
+        for Zone in zones
+        if Zone.passive is False
+    ]
+    selected = [None, None, "", 10**9]
+    for zone_data in zones_data:
+        if zone_data[0] <= zone_data[3] + gps_accuracy_adj and zone_data[3] <= selected[3]:
+            selected = zone_data
+    zones_distance_list = sorted(
+        f"{int(zone_data[0]):08}|{zone_data[2]}|{zone_data[0]}" for zone_data in zones_data if zone_data[2] != selected[2]
+    )
+    return selected[2], zones_distance_list
+
+
+def closest_zone_all(zones: list[_Zone], latitude: float, longitude: float):
+    zones_data = sorted([Zone.distance_m(latitude, longitude), Zone.zone] for Zone in zones if Zone.radius_m > 1)
+    return zones_data[0][1]
+
+
+def select_zone_index(index, latitude: float, longitude: float, gps_accuracy_adj: int):
+    index.check_rebuild()
+    selected = [None, None, "", 10**9]
+    for zone_data in index.inzone_zones_data(latitude, longitude, gps_accuracy_adj):
+        if zone_data[3] <= selected[3]:
+            selected = zone_data
+    zones_distance_list = sorted(
+        f"{int(dist_m):08}|{Zone.zone}|{dist_m}"
+        for dist_m, Zone in index.zones_distance_m(latitude, longitude)
+        if Zone.zone != selected[2]
+    )
+    return selected[2], zones_distance_list
+
+
+# ---------------------------------------------------------------------------
+
+
+def run(icloud3_dir: Path, zone_cnt: int, device_cnt: int) -> None:
+    zone_index = load_icloud3_module(icloud3_dir, "tracking.zone_index")
+    dist_util = load_icloud3_module(icloud3_dir, "utils.dist_util")
+    gb = load_icloud3_module(icloud3_dir, "global_variables").GlobalVariables
+    randomiser = random.Random(1)
+
+    states = _States()
+    zones = []
+    for number in range(zone_cnt):
+        zone = f"zone_{number}"
+        states.attributes_by_entity_id[f"zone.{zone}"] = {
+            "latitude": CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG),
+            "longitude": CITY[1] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG),
+            "radius": randomiser.choice([50, 100, 100, 150, 250, 500, 2000]),
+            "passive": randomiser.random() < 0.1,
+        }
+        zones.append(_Zone(zone, states, dist_util))
+    gb.HAZones = zones
+    gb.zone_index_rebuild_flag = True
+    index = zone_index.ZoneIndex()
+
+    # Devices are placed near a zone most of the time, so some of them are in one
+    locations = []
+    for _cycle in range(CYCLES):
+        for _device in range(device_cnt):
+            if randomiser.random() < 0.5:
+                attrs = states.attributes_by_entity_id[randomiser.choice(zones).zone_entity_id]
+                offset = attrs["radius"] * 1.5 / 111195
+                location = (
+                    attrs["latitude"] + randomiser.uniform(-offset, offset),
+                    attrs["longitude"] + randomiser.uniform(-offset, offset),
+                )
+            else:
+                location = (
+                    CITY[0] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG),
+                    CITY[1] + randomiser.uniform(-SPREAD_DEG, SPREAD_DEG),
+                )
+            locations.append((*location, randomiser.choice([0, 5, 10, 25, 50])))
+
+    start = perf_counter()
+    selected_all = [select_zone_all(zones, *location) for location in locations]
+    select_all_ms = (perf_counter() - start) * 1000 / CYCLES
+
+    start = perf_counter()
+    selected_index = [select_zone_index(index, *location) for location in locations]
+    select_index_ms = (perf_counter() - start) * 1000 / CYCLES
+
+    start = perf_counter()
+    closest_all = [closest_zone_all(zones, *location[0:2]) for location in locations]
+    closest_all_ms = (perf_counter() - start) * 1000 / CYCLES
+
+    start = perf_counter()
+    closest_index = [index.closest_zone(*location[0:2])[0].zone for location in locations]
+    closest_index_ms = (perf_counter() - start) * 1000 / CYCLES
+
+    start = perf_counter()
+    index.rebuild()
+    rebuild_ms = (perf_counter() - start) * 1000
+
+    zone_diffs = sum(all_[0] != index_[0] for all_, index_ in zip(selected_all, selected_index))
+    closest_diffs = sum(all_ != index_ for all_, index_ in zip(closest_all, closest_index))
+    inzone_cnt = sum(bool(selected[0]) for selected in selected_all)
+    print(  # noqa: T201
+        f"{zone_cnt} zones, {device_cnt} devices, {CYCLES} cycles ({inzone_cnt} of "
+        f"{len(locations)} locations are in a zone). ms per cycle of all devices:\n"
+    )
+    print(f"  {'':<40}{'all zones':>10}{'index':>10}{'differ':>8}")  # noqa: T201
+    print(f"  {'select_zone (with distance list)':<40}{select_all_ms:>10.3f}{select_index_ms:>10.3f}{zone_diffs:>8}")  # noqa: T201
+    print(f"  {'closest_zone':<40}{closest_all_ms:>10.3f}{closest_index_ms:>10.3f}{closest_diffs:>8}")  # noqa: T201
+    print(f"\n  Index rebuild (after a zone changes): {rebuild_ms:.3f}ms")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--zones", type=int, default=200, help="how many zones to create")
+    parser.add_argument("--devices", type=int, default=20, help="how many devices to locate each cycle")
+    parser.add_argument("--icloud3", type=Path, default=DEFAULT_ICLOUD3_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.icloud3.resolve(), args.zones, args.devices)
+
+
+if __name__ == "__main__":
+    main()
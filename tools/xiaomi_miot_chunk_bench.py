@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Poll a local miIO device with the sizes MiotChunkSizes learns against the fixed get_max_properties table.
+
+Starts a fake miIO device on localhost with 40 properties whose firmware
+does not answer a get_properties request for more than --firmware-limit
+properties, then polls it through MiotDevice.async_get_properties_for_mapping,
+with the chunk size from get_max_properties (before), with the
+chunk_properties: 1 customization users fall back to, and with the sizes
+learned by MiotChunkSizes:
+
+    python tools/xiaomi_miot_chunk_bench.py
+    python tools/xiaomi_miot_chunk_bench.py --properties 60 --firmware-limit 12
+
+This imports the real core/device.py, so Home Assistant and the integration's
+requirements need to be installed, as they are in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import types
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from xiaomi_miot_decode_bench import DEFAULT_XIAOMI_MIOT_DIR, load_xiaomi_miot_module  # noqa: E402
+from xiaomi_miot_miio_bench import _FakeDevice  # noqa: E402
+
+MODEL = "bench.device.v1"
+TOKEN = "00112233445566778899aabbccddeeff"
+POLLS = 40
+
+
+class _LimitedDevice(_FakeDevice):
+    """A fake miIO device that doesn't answer requests for more than `limit` properties."""
+
+    limit = 8
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if len(data) > 32:
+            request = json.loads(self.miio._unpack_raw(data).rstrip(b"\x00"))
+            if len(request["params"]) > self.limit:
+                self.request_cnt += 1
+                return
+        super().datagram_received(data, addr)
+
+
+class _Store:
+    """Stands in for homeassistant.helpers.storage.Store."""
+
+    def __init__(self, *args) -> None:
+        pass
+
+    async def async_load(self) -> dict:
+        return {}
+
+    def async_delay_save(self, data_func, delay) -> None:
+        pass
+
+
+async def _run(device_module, mini_miio, property_cnt: int, firmware_limit: int) -> None:
+    loop = asyncio.get_running_loop()
+    fake = _LimitedDevice(mini_miio, TOKEN, 10001, 0.01, 0.002)
+    fake.limit = firmware_limit
+    transport, _ = await loop.create_datagram_endpoint(lambda: fake, local_addr=("127.0.0.1", 0))
+    mapping = {
+        f"service_{2 + p // 10}.prop_{1 + p % 10}": {"siid": 2 + p // 10, "piid": 1 + p % 10}
+        for p in range(property_cnt)
+    }
+
+    device_module.Store = _Store
+    hass = types.SimpleNamespace(data={device_module.DOMAIN: {}})
+
+    rows = []
+    for name in ("table", "chunk_properties: 1", "learned"):
+        miio = mini_miio.AsyncMiIO("127.0.0.1", TOKEN, timeout=0.2)
+        miio.addr = transport.get_extra_info("sockname")
+        local = device_module.MiotDevice(hass, miio)
+        hass.data[device_module.DOMAIN].pop("chunk_sizes", None)
+        chunk_sizes = await device_module.MiotChunkSizes.async_get(hass)
+        fake.request_cnt = 0
+        answered = 0
+        sizes = []
+
+        start = perf_counter()
+        for _poll in range(POLLS):
+            if name == "table":
+                size = local.get_max_properties(mapping)
+            elif name == "learned":
+                size = chunk_sizes.size(MODEL, local.get_max_properties(mapping))
+            else:
+                size = 1
+            sizes.append(size)
+            chunk_stats = {}
+            try:
+                results = await local.async_get_properties_for_mapping(
+                    max_properties=size, did="10001", mapping=mapping, chunk_stats=chunk_stats,
+                )
+                answered += len(results) == len(mapping)
+            except device_module.DeviceException:
+                pass
+            if name == "learned":
+                chunk_sizes.update(MODEL, chunk_stats)
+        secs = perf_counter() - start
+        miio.close()
+        rows.append((name, answered, fake.request_cnt / POLLS, secs * 1000 / POLLS, sizes[-1], chunk_sizes.rtt(MODEL)))
+
+    transport.close()
+    print(  # noqa: T201
+        f"{property_cnt} properties, the firmware answers up to {firmware_limit} in a request, {POLLS} polls:\n"
+    )
+    print(  # noqa: T201
+        f"  {'':<22}{'answered':>9}{'packets/poll':>14}{'ms/poll':>9}{'last size':>11}{'rtt ms':>8}"
+    )
+    for name, answered, packets, poll_ms, size, rtt in rows:
+        print(  # noqa: T201
+            f"  {name:<22}{answered:>9}{packets:>14.1f}{poll_ms:>9.0f}{size:>11}{rtt or '':>8}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--properties", type=int, default=40, help="how many properties the device has")
+    parser.add_argument("--firmware-limit", type=int, default=8, help="most properties the device answers at a time")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    device_module = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.device")
+    mini_miio = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.mini_miio")
+    asyncio.run(_run(device_module, mini_miio, args.properties, args.firmware_limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Time updating cloud xiaomi_miot devices with MiotCloud's batched prop/get requests against a request for each device.
+
+Sets up an account with 60 devices of 20 properties each and polls them the
+way the coordinators do (each device at its own time, spread over a couple of
+seconds), calling MiotCloud.async_get_properties_for_mapping for each device,
+both the way it was before (a prop/get request for each device) and with
+MiotCloudPropsBatch:
+
+    python tools/xiaomi_miot_cloud_batch_bench.py
+    python tools/xiaomi_miot_cloud_batch_bench.py --devices 200 --spread-secs 5
+
+The Xiaomi API is replaced by a fake MiotCloud.async_request_api, answering
+prop/get after --rtt-ms plus --prop-ms for each property. The results are
+compared as well, and any that differ are counted.
+
+This imports the real core/xiaomi_cloud.py, so Home Assistant and the
+integration's requirements need to be installed, as they are in any HA
+development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import random
+import sys
+import types
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_XIAOMI_MIOT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "xiaomi_miot"
+
+
+def load_xiaomi_miot_module(xiaomi_miot_dir: Path, name: str) -> types.ModuleType:
+    """Import a xiaomi_miot module (eg "core.xiaomi_cloud") from the integration's directory."""
+    sys.path.insert(0, str(xiaomi_miot_dir.parent.parent))
+    return importlib.import_module(f"custom_components.{xiaomi_miot_dir.name}.{name}")
+
+
+class _FakeApi:
+    """Answers miotspec/prop/get like the Xiaomi API, counting the requests."""
+
+    def __init__(self, rtt_secs: float, prop_secs: float) -> None:
+        self.rtt_secs = rtt_secs
+        self.prop_secs = prop_secs
+        self.request_cnt = 0
+        self.prop_cnt = 0
+
+    async def async_request_api(self, api, data, method="POST", crypt=True, debug=True, **kwargs):
+        params = data["params"]
+        self.request_cnt += 1
+        self.prop_cnt += len(params)
+        await asyncio.sleep(self.rtt_secs + self.prop_secs * len(params))
+        return {
+            "code": 0,
+            "result": [
+                {**param, "code": 0, "value": int(param["did"]) % 1000 + param["siid"] * 10 + param["piid"]}
+                for param in params
+            ],
+        }
+
+
+async def _run(xiaomi_cloud, domain: str, args) -> None:
+    randomiser = random.Random(1)
+    mappings = {}
+    for number in range(args.devices):
+        did = str(100000000 + number)
+        mappings[did] = {
+            f"service_{2 + p // 10}.prop_{1 + p % 10}": {"siid": 2 + p // 10, "piid": 1 + p % 10}
+            for p in range(args.properties)
+        }
+    offsets = {did: randomiser.uniform(0, args.spread_secs) for did in mappings}
+
+    rows = []
+    results = []
+    for name in ("each device", "batched"):
+        hass = types.SimpleNamespace(data={domain: {}}, config=types.SimpleNamespace(time_zone="UTC"))
+        cloud = xiaomi_cloud.MiotCloud(hass, "bench@example.com", "password")
+        api = _FakeApi(args.rtt_ms / 1000, args.prop_ms / 1000)
+        cloud.service_token = "token"
+        cloud.async_request_api = api.async_request_api
+        if name == "each device":
+            # async_get_properties_for_mapping before, a request for each device
+            cloud.props_batch = types.SimpleNamespace(async_get_props=cloud.async_get_props)
+
+        latencies = []
+
+        async def update(did: str) -> list:
+            await asyncio.sleep(offsets[did])
+            start = perf_counter()
+            result = await cloud.async_get_properties_for_mapping(did, mappings[did])
+            latencies.append(perf_counter() - start)
+            return result
+
+        start = perf_counter()
+        device_results = await asyncio.gather(*[update(did) for did in mappings])
+        total_secs = perf_counter() - start
+        results.append(device_results)
+        rows.append((name, api.request_cnt, sum(latencies) / len(latencies), max(latencies), total_secs))
+
+    diffs = sum(before != after for before, after in zip(*results))
+    print(  # noqa: T201
+        f"{args.devices} devices, {args.properties} properties each, updated over {args.spread_secs}s, "
+        f"api {args.rtt_ms:.0f}ms + {args.prop_ms:.1f}ms per property, {diffs} results differ:\n"
+    )
+    print(f"  {'':<14}{'requests':>10}{'avg secs':>10}{'max secs':>10}{'all secs':>10}")  # noqa: T201
+    for name, request_cnt, latency_avg, latency_max, total_secs in rows:
+        print(  # noqa: T201
+            f"  {name:<14}{request_cnt:>10}{latency_avg:>10.3f}{latency_max:>10.3f}{total_secs:>10.3f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=60, help="how many cloud devices the account has")
+    parser.add_argument("--properties", type=int, default=20, help="how many properties each device has")
+    parser.add_argument("--spread-secs", type=float, default=2, help="the devices are updated over this time")
+    parser.add_argument("--rtt-ms", type=float, default=150, help="time the api takes to answer a request")
+    parser.add_argument("--prop-ms", type=float, default=0.5, help="extra time for each property in a request")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    xiaomi_cloud = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.xiaomi_cloud")
+    const = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.const")
+    asyncio.run(_run(xiaomi_cloud, const.DOMAIN, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Time the customization lookups of xiaomi_miot entities at startup with the cached resolver against merging DEVICE_CUSTOMIZES for each lookup.
+
+Sets up 300 entities (30 devices with models from DEVICE_CUSTOMIZES, 10
+entities each, with the customize keys of their properties), then looks up
+the customizations an entity reads while it is added (icon, device_class,
+unit_of_measurement, ...), both the way core/utils.py did before (the
+wildcard models and the merged dict built again for each lookup) and with
+the merged customizes cached for each model:
+
+    python tools/xiaomi_miot_customize_bench.py
+    python tools/xiaomi_miot_customize_bench.py --devices 100 --entities 20
+
+The first startup (an empty cache) is timed apart from the next ones. The
+results are compared as well, and any that differ are counted.
+
+This imports the real core/utils.py, so Home Assistant and the integration's
+requirements need to be installed, as they are in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+from functools import cached_property
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from xiaomi_miot_decode_bench import DEFAULT_XIAOMI_MIOT_DIR, load_xiaomi_miot_module  # noqa: E402
+
+STARTUPS = 20
+KEYS = (
+    "icon",
+    "device_class",
+    "unit_of_measurement",
+    "state_class",
+    "entity_category",
+    "value_ratio",
+    "chunk_properties",
+    "interval_seconds",
+    "exclude_miot_properties",
+    "sensor_properties",
+)
+
+
+# ---------------------------------------------------------------------------
+# The lookups the way core/utils.py did before
+# ---------------------------------------------------------------------------
+
+
+def wildcard_models_before(model):
+    if not model:
+        return []
+    if ":" in model:
+        return [model]
+    wil = re.sub(r"\.[^.]+$", ".*", model)
+    return [
+        model,
+        wil,
+        re.sub(r"^[^.]+\.", "*.", wil),
+        "*",
+    ]
+
+
+def customize_via_model_before(customizes: dict, model, key=None, default=None):
+    cfg = {}
+    for m in wildcard_models_before(model):
+        cus = customizes.get(m) or {}
+        if key is not None and key not in cus:
+            continue
+        if cus:
+            cfg = {**cus, **cfg}
+    return cfg if key is None else cfg.get(key, default)
+
+
+def customize_via_entity_before(customizes: dict, entity, key=None, default=None):
+    cfg = {}
+    mls = [*entity.customize_keys_before, entity.model]
+    for mod in mls:
+        cus = customize_via_model_before(customizes, mod)
+        cfg = {**cus, **cfg}
+    return cfg if key is None else cfg.get(key, default)
+
+
+# ---------------------------------------------------------------------------
+
+
+def _entity_class(utils):
+    class BenchEntity(utils.Entity):
+        """An entity of a miot property, with the customize keys of BasicEntity."""
+
+        hass = None
+        entity_id = None
+
+        def __init__(self, model: str, prop: str) -> None:
+            self.model = model
+            self.prop = prop
+
+        def _customize_keys(self, wildcard_models) -> list:
+            keys = []
+            for mod in wildcard_models(self.model):
+                keys.append(f"{mod}:{self.prop}")
+                keys.append(f"{mod}:{self.prop.split('.')[-1]}")
+            return keys
+
+        @cached_property
+        def customize_keys_before(self) -> list:
+            return self._customize_keys(wildcard_models_before)
+
+        @cached_property
+        def customize_keys(self) -> list:
+            return self._customize_keys(utils.wildcard_models)
+
+    return BenchEntity
+
+
+def _startup_before(customizes: dict, entities: list) -> list:
+    results = []
+    for entity in entities:
+        results.append([customize_via_model_before(customizes, entity.model, key) for key in KEYS])
+        results.append([customize_via_entity_before(customizes, entity, key) for key in KEYS])
+    return results
+
+
+def _startup_cached(utils, entities: list) -> list:
+    results = []
+    for entity in entities:
+        results.append([utils.get_customize_via_model(entity.model, key) for key in KEYS])
+        results.append([utils.get_customize_via_entity(entity, key) for key in KEYS])
+    return results
+
+
+def _time_ms(fct, *args) -> tuple[float, list]:
+    start = perf_counter()
+    result = fct(*args)
+    return (perf_counter() - start) * 1000, result
+
+
+def run(xiaomi_miot_dir: Path, device_cnt: int, entity_cnt: int) -> None:
+    utils = load_xiaomi_miot_module(xiaomi_miot_dir, "core.utils")
+    customizes = utils.DEVICE_CUSTOMIZES
+    randomiser = random.Random(1)
+    models = randomiser.sample(sorted(m for m in customizes if "*" not in m and ":" not in m), device_cnt)
+    props = sorted({k.split(":", 1)[1] for k in customizes if ":" in k})
+    entity_class = _entity_class(utils)
+    entities = [
+        entity_class(model, randomiser.choice(props))
+        for model in models
+        for _number in range(entity_cnt)
+    ]
+
+    # the customize keys are built once for each entity, as BasicEntity does
+    for entity in entities:
+        assert entity.customize_keys == entity.customize_keys_before
+    first_before_ms, before = _time_ms(_startup_before, customizes, entities)
+    utils.clear_customizes_cache()
+    first_cached_ms, cached = _time_ms(_startup_cached, utils, entities)
+    diffs = sum(b != c for b, c in zip(before, cached))
+
+    before_ms = sum(_time_ms(_startup_before, customizes, entities)[0] for _startup in range(STARTUPS)) / STARTUPS
+    cached_ms = sum(_time_ms(_startup_cached, utils, entities)[0] for _startup in range(STARTUPS)) / STARTUPS
+
+    print(  # noqa: T201
+        f"{len(entities)} entities of {device_cnt} devices, {len(KEYS) * 2} lookups each, "
+        f"{len(customizes)} customizes, {diffs} results differ, ms per startup:\n"
+    )
+    print(f"  {'':<16}{'before':>10}{'cached':>10}")  # noqa: T201
+    print(f"  {'first startup':<16}{first_before_ms:>10.2f}{first_cached_ms:>10.2f}")  # noqa: T201
+    print(f"  {'next startups':<16}{before_ms:>10.2f}{cached_ms:>10.2f}")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=30, help="how many devices")
+    parser.add_argument("--entities", type=int, default=10, help="how many entities each device has")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.xiaomi_miot.resolve(), args.devices, args.entities)
+
+
+if __name__ == "__main__":
+    main()
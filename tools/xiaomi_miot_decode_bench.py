@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Time xiaomi_miot's Device.decode, decode_attrs and encode with the converter indexes against scanning every converter.
+
+Sets up a device with 200 properties (a converter each, plus a sensor for some
+of them and a few attribute converters), then decodes a get_properties result
+for all of them, decodes attributes and encodes a set of values, both the way
+Device did before (checking every converter for every value) and with the
+indexes kept by Device.add_converter:
+
+    python tools/xiaomi_miot_decode_bench.py
+    python tools/xiaomi_miot_decode_bench.py --properties 500
+
+The payloads are compared as well, and any that differ are counted.
+
+This imports the real core/device.py, so Home Assistant and the integration's
+requirements need to be installed, as they are in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import logging
+import sys
+import types
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_XIAOMI_MIOT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "xiaomi_miot"
+CYCLES = 200
+
+
+def load_xiaomi_miot_module(xiaomi_miot_dir: Path, name: str) -> types.ModuleType:
+    """Import a xiaomi_miot module (eg "core.device") from the integration's directory."""
+    sys.path.insert(0, str(xiaomi_miot_dir.parent.parent))
+    return importlib.import_module(f"custom_components.{xiaomi_miot_dir.name}.{name}")
+
+
+# ---------------------------------------------------------------------------
+# Decoding and encoding the way Device did before
+# ---------------------------------------------------------------------------
+
+
+def decode_before(device, data: list, miot_spec) -> dict:
+    payload = {}
+    for value in data:
+        if value.get("code", 0):
+            continue
+        siid = value.get("siid")
+        piid = value.get("piid")
+        if siid and piid:
+            mi = miot_spec.MiotSpec.unique_prop(siid, piid=piid)
+            for conv in device.converters:
+                if conv.mi == mi:
+                    conv.decode(device, payload, value.get("value"))
+    return payload
+
+
+def decode_attrs_before(device, value: dict, utils) -> dict:
+    payload = {}
+    for conv in device.converters:
+        val = utils.get_value(value, conv.attr, None, ":")
+        if val is not None:
+            conv.decode(device, payload, val)
+    return payload
+
+
+def encode_before(device, value: dict) -> dict:
+    payload = {}
+    for k, v in value.items():
+        for conv in device.converters:
+            if conv.full_name == k:
+                conv.encode(device, payload, v)
+    return payload
+
+
+# ---------------------------------------------------------------------------
+
+
+def _time_ms(fct, *args) -> tuple[float, object]:
+    start = perf_counter()
+    for _cycle in range(CYCLES):
+        result = fct(*args)
+    return (perf_counter() - start) * 1000 / CYCLES, result
+
+
+def run(xiaomi_miot_dir: Path, property_cnt: int) -> None:
+    device_module = load_xiaomi_miot_module(xiaomi_miot_dir, "core.device")
+    converters = load_xiaomi_miot_module(xiaomi_miot_dir, "core.converters")
+    miot_spec = load_xiaomi_miot_module(xiaomi_miot_dir, "core.miot_spec")
+    utils = load_xiaomi_miot_module(xiaomi_miot_dir, "core.utils")
+    logging.getLogger(device_module.__name__).setLevel(logging.WARNING)
+
+    info = device_module.DeviceInfo({"did": "123456789", "model": "bench.device.v1", "name": "Bench"})
+    device = device_module.Device(info, types.SimpleNamespace(hass=None, cloud=None))
+    device.add_converter(device_module.InfoConverter)
+
+    mis = []
+    for number in range(property_cnt):
+        siid, piid = 2 + number // 20, 1 + number % 20
+        mi = miot_spec.MiotSpec.unique_prop(siid, piid=piid)
+        mis.append((siid, piid))
+        device.add_converter(converters.MiotPropConv(f"service_{siid}.prop_{piid}", "sensor", mi=mi))
+        if number % 4 == 0:
+            device.add_converter(converters.MiotPropConv(f"service_{siid}.prop_{piid}", "number", mi=mi))
+    for number in range(20):
+        device.add_converter(converters.AttrConv(f"props:attr_{number}", "sensor"))
+        device.add_converter(converters.AttrConv(f"attr_{number}", "binary_sensor"))
+
+    results = [{"did": "123456789", "siid": siid, "piid": piid, "code": 0, "value": siid * piid} for siid, piid in mis]
+    attrs = {"props": {f"attr_{number}": number for number in range(20)}, "attr_3": True, "other": 1}
+    values = {f"number.service_{siid}.prop_{piid}": siid + piid for siid, piid in mis[0:property_cnt:4]}
+
+    rows = []
+    for name, fct_before, fct_index, args_before, args_index in (
+        ("decode (get_properties result)", decode_before, device.decode, (device, results, miot_spec), (results,)),
+        ("decode_attrs", decode_attrs_before, device.decode_attrs, (device, attrs, utils), (attrs,)),
+        ("encode", encode_before, device.encode, (device, values), (values,)),
+    ):
+        before_ms, before = _time_ms(fct_before, *args_before)
+        index_ms, index = _time_ms(fct_index, *args_index)
+        diffs = sum(before.get(key) != index.get(key) for key in before.keys() | index.keys())
+        diffs += list(before) != list(index)
+        rows.append((name, before_ms, index_ms, diffs))
+
+    print(  # noqa: T201
+        f"{property_cnt} properties, {len(device.converters)} converters, ms per call:\n"
+    )
+    print(f"  {'':<34}{'all convs':>10}{'index':>10}{'differ':>8}")  # noqa: T201
+    for name, before_ms, index_ms, diffs in rows:
+        print(f"  {name:<34}{before_ms:>10.3f}{index_ms:>10.3f}{diffs:>8}")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--properties", type=int, default=200, help="how many properties the device has")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    run(args.xiaomi_miot.resolve(), args.properties)
+
+
+if __name__ == "__main__":
+    main()
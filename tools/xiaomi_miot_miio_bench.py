@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Time polling local miIO devices with AsyncMiIO's long-lived socket against a new socket for each request.
+
+Starts fake miIO devices on localhost (UDP, each with its own token), then
+polls get_properties for all of them at the same time, the way the
+coordinators do, both the way AsyncMiIO.send did before (a new datagram
+endpoint for each request and the chunks sent one after the other) and with
+core/mini_miio.py (one socket per device, the chunks sent at the same time):
+
+    python tools/xiaomi_miot_miio_bench.py
+    python tools/xiaomi_miot_miio_bench.py --devices 40 --properties 60 --rtt-ms 20
+
+The fake devices answer one request at a time, taking --process-ms for each,
+and the network delay (--rtt-ms) is added to each answer. The results are
+compared as well, and any that differ are counted.
+
+Only the cryptography package is needed (a requirement of the integration),
+Home Assistant is not.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import random
+import time
+import types
+from pathlib import Path
+from time import perf_counter
+
+DEFAULT_XIAOMI_MIOT_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "xiaomi_miot"
+ROUNDS = 5
+
+
+def load_mini_miio(xiaomi_miot_dir: Path) -> types.ModuleType:
+    """Import core/mini_miio.py on its own, without the integration (and Home Assistant)."""
+    spec = importlib.util.spec_from_file_location("mini_miio", xiaomi_miot_dir / "core" / "mini_miio.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _FakeDevice(asyncio.DatagramProtocol):
+    """A miIO device answering ping and get_properties, one request at a time."""
+
+    def __init__(self, mini_miio, token: str, device_id: int, rtt_secs: float, process_secs: float) -> None:
+        self.miio = mini_miio.BasemiIO("127.0.0.1", token)
+        self.device_id = device_id
+        self.rtt_secs = rtt_secs
+        self.process_secs = process_secs
+        self.busy_until = 0.0
+        self.ping_cnt = 0
+        self.request_cnt = 0
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def _header(self, length: int) -> bytes:
+        return (
+            b"\x21\x31"
+            + length.to_bytes(2, "big")
+            + b"\x00\x00\x00\x00"
+            + self.device_id.to_bytes(4, "big")
+            + int(time.time()).to_bytes(4, "big")
+        )
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        loop = asyncio.get_running_loop()
+        if len(data) == 32:
+            self.ping_cnt += 1
+            answer = self._header(32) + b"\xff" * 16
+            loop.call_later(self.rtt_secs, self.transport.sendto, answer, addr)
+            return
+
+        self.request_cnt += 1
+        request = json.loads(self.miio._unpack_raw(data).rstrip(b"\x00"))
+        result = [{**param, "code": 0, "value": param["siid"] * 100 + param["piid"]} for param in request["params"]]
+        payload = json.dumps({"id": request["id"], "result": result}, separators=(",", ":")).encode() + b"\x00"
+        encrypted = self.miio._encrypt(payload)
+        answer = self._header(32 + len(encrypted)) + b"\x00" * 16 + encrypted
+
+        # the device handles one request at a time
+        self.busy_until = max(self.busy_until, loop.time() + self.rtt_secs / 2) + self.process_secs
+        loop.call_at(self.busy_until + self.rtt_secs / 2, self.transport.sendto, answer, addr)
+
+
+def _before_class(mini_miio) -> type:
+    class AsyncSocketBefore(asyncio.DatagramProtocol):
+        """mini_miio.AsyncSocket before, one for each request."""
+
+        timeout = 0
+        transport = None
+
+        def __init__(self):
+            self.response = asyncio.get_event_loop().create_future()
+
+        def connection_made(self, transport):
+            self.transport = transport
+
+        def datagram_received(self, data: bytes, addr):
+            self.response.set_result(data)
+
+        def sendto(self, data: bytes):
+            self.transport.sendto(data)
+
+        def close(self):
+            if self.transport:
+                self.transport.close()
+
+        async def connect(self, addr):
+            coro = asyncio.get_event_loop().create_datagram_endpoint(lambda: self, remote_addr=addr)
+            await asyncio.wait_for(coro, self.timeout)
+
+        async def recv(self, *args):
+            self.response = asyncio.get_event_loop().create_future()
+            return await asyncio.wait_for(self.response, self.timeout)
+
+    class AsyncMiIOBefore(mini_miio.BasemiIO):
+        """AsyncMiIO.send and send_bulk before."""
+
+        async def ping(self, sock) -> bool:
+            try:
+                sock.sendto(mini_miio.HELLO)
+                raw = await sock.recv(1024)
+                if raw[:2] == b"\x21\x31":
+                    self.device_id = int.from_bytes(raw[8:12], "big")
+                    self.delta_ts = time.time() - int.from_bytes(raw[12:16], "big")
+                    return True
+            except Exception:
+                pass
+            return False
+
+        async def send(self, method: str, params=None, tries=3):
+            offline = False
+            for _ in range(0, tries):
+                sock = AsyncSocketBefore()
+                sock.timeout = self.timeout
+                try:
+                    await sock.connect(self.addr)
+                    if self.delta_ts is None and not await self.ping(sock):
+                        offline = True
+                        continue
+                    msg_id = random.randint(100000000, 999999999)
+                    sock.sendto(self._pack_raw(msg_id, method, params))
+                    data = self._unpack_raw(await sock.recv(10240)).rstrip(b"\x00")
+                    if data == b"":
+                        continue
+                    data = json.loads(data)
+                    if data["id"] != msg_id:
+                        continue
+                    return data
+                except (asyncio.TimeoutError, OSError):
+                    pass
+                finally:
+                    sock.close()
+                self.delta_ts = None
+            return None if offline else {}
+
+        async def send_bulk(self, method: str, params: list, chunk: int = 0) -> list:
+            result = []
+            for i in range(0, len(params), chunk or 15):
+                resp = await self.send(method, params[i : i + (chunk or 15)])
+                result += resp["result"]
+            return result
+
+    return AsyncMiIOBefore
+
+
+async def _run(mini_miio, device_cnt: int, property_cnt: int, rtt_secs: float, process_secs: float) -> None:
+    loop = asyncio.get_running_loop()
+    randomiser = random.Random(1)
+    devices = []
+    for number in range(device_cnt):
+        token = randomiser.randbytes(16).hex()
+        device = _FakeDevice(mini_miio, token, 10000 + number, rtt_secs, process_secs)
+        transport, _ = await loop.create_datagram_endpoint(lambda device=device: device, local_addr=("127.0.0.1", 0))
+        devices.append((token, device, transport.get_extra_info("sockname")))
+    params = [
+        {"did": f"prop.{2 + number // 10}.{1 + number % 10}", "siid": 2 + number // 10, "piid": 1 + number % 10}
+        for number in range(property_cnt)
+    ]
+
+    # count the sockets the clients open
+    create_datagram_endpoint = loop.create_datagram_endpoint
+    socket_cnt = 0
+
+    def counted_create_datagram_endpoint(*args, **kwargs):
+        nonlocal socket_cnt
+        socket_cnt += 1
+        return create_datagram_endpoint(*args, **kwargs)
+
+    loop.create_datagram_endpoint = counted_create_datagram_endpoint
+
+    rows = []
+    results = []
+    for name, cls in (("new socket each", _before_class(mini_miio)), ("long-lived", mini_miio.AsyncMiIO)):
+        clients = []
+        for token, _device, addr in devices:
+            client = cls("127.0.0.1", token)
+            client.addr = addr
+            clients.append(client)
+        for _token, device, _addr in devices:
+            device.ping_cnt = device.request_cnt = 0
+        socket_cnt = 0
+
+        poll_secs = []
+
+        async def poll(client) -> list:
+            start = perf_counter()
+            result = await client.send_bulk("get_properties", params, 15)
+            poll_secs.append(perf_counter() - start)
+            return result
+
+        start = perf_counter()
+        for _round in range(ROUNDS):
+            round_results = await asyncio.gather(*[poll(client) for client in clients])
+        round_ms = (perf_counter() - start) * 1000 / ROUNDS
+        results.append(round_results)
+
+        for client in clients:
+            if hasattr(client, "close"):
+                client.close()
+        rows.append(
+            (
+                name,
+                round_ms,
+                sum(poll_secs) * 1000 / len(poll_secs),
+                socket_cnt,
+                sum(device.ping_cnt for _token, device, _addr in devices),
+                sum(device.request_cnt for _token, device, _addr in devices) / ROUNDS,
+            )
+        )
+
+    loop.create_datagram_endpoint = create_datagram_endpoint
+    diffs = sum(before != after for before, after in zip(*results))
+
+    print(  # noqa: T201
+        f"{device_cnt} devices, {property_cnt} properties each (chunks of 15), rtt {rtt_secs * 1000:.0f}ms, "
+        f"{process_secs * 1000:.0f}ms to answer, {ROUNDS} rounds, {diffs} results differ:\n"
+    )
+    print(  # noqa: T201
+        f"  {'':<18}{'round ms':>10}{'poll ms':>10}{'sockets':>9}{'pings':>7}{'requests/round':>16}"
+    )
+    for name, round_ms, poll_ms, sockets, pings, requests in rows:
+        print(  # noqa: T201
+            f"  {name:<18}{round_ms:>10.1f}{poll_ms:>10.1f}{sockets:>9}{pings:>7}{requests:>16.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--devices", type=int, default=40, help="how many devices to poll")
+    parser.add_argument("--properties", type=int, default=60, help="how many properties each device has")
+    parser.add_argument("--rtt-ms", type=float, default=20, help="network round trip time")
+    parser.add_argument("--process-ms", type=float, default=5, help="time the device takes to answer a request")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    mini_miio = load_mini_miio(args.xiaomi_miot.resolve())
+    asyncio.run(_run(mini_miio, args.devices, args.properties, args.rtt_ms / 1000, args.process_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Time how long xiaomi_miot takes to see changes of a local device that pushes its properties against polling it only.
+
+Starts a fake miIO device on localhost whose properties change every
+--change-secs (on average), then updates it the way the miot coordinator does
+(Device.update_miot_status every --interval-secs) for --run-secs, with
+Device.on_miio_message listening on the device's AsyncMiIO socket:
+
+    python tools/xiaomi_miot_push_bench.py
+    python tools/xiaomi_miot_push_bench.py --interval-secs 1 --run-secs 60
+
+The device doesn't push (only polling), pushes every change (the poll
+interval is lengthened after Device.push_proven_after pushes), or misses one
+change in --miss-every (the poll interval goes back when a poll finds a
+change that wasn't pushed). Reported are how long after a change the new
+value was dispatched (for the properties that can be pushed and the others),
+how many get_properties requests were sent, the Device.update_counts and
+the poll interval at the end.
+
+This imports the real core/device.py, so Home Assistant and the integration's
+requirements need to be installed, as they are in any HA development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import types
+from datetime import timedelta
+from pathlib import Path
+from time import monotonic
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from xiaomi_miot_decode_bench import DEFAULT_XIAOMI_MIOT_DIR, load_xiaomi_miot_module  # noqa: E402
+from xiaomi_miot_miio_bench import _FakeDevice  # noqa: E402
+
+MODEL = "bench.push.v1"
+TOKEN = "00112233445566778899aabbccddeeff"
+DID = "10001"
+PROPERTIES = 8  # prop.2.1 to prop.2.8, the even ones can be pushed (notify)
+
+
+class _PushingDevice(_FakeDevice):
+    """A fake miIO device with changing properties, pushing properties_changed to the client."""
+
+    push = True
+    miss_every = 0
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.values = {piid: 0 for piid in range(1, PROPERTIES + 1)}
+        self.client = None
+        self.change_cnt = 0
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.client = addr
+        if len(data) > 32:
+            request = json.loads(self.miio._unpack_raw(data).rstrip(b"\x00"))
+            if "method" not in request:
+                return  # the ack of a push
+        super().datagram_received(data, addr)
+
+    def answer_values(self, request: dict) -> list:
+        return [{**param, "code": 0, "value": self.values[param["piid"]]} for param in request["params"]]
+
+    def change(self, piid: int) -> None:
+        self.values[piid] += 1
+        self.change_cnt += 1
+        if not (self.push and self.client and piid % 2 == 0):
+            return
+        if self.miss_every and self.change_cnt % self.miss_every == 0:
+            return
+        msg = {
+            "id": random.randint(1, 999999),
+            "method": "properties_changed",
+            "params": [{"did": DID, "siid": 2, "piid": piid, "value": self.values[piid]}],
+        }
+        payload = self.miio._encrypt(json.dumps(msg).encode() + b"\x00")
+        self.transport.sendto(self._header(32 + len(payload)) + b"\x00" * 16 + payload, self.client)
+
+
+def _answer(self, data: bytes, addr) -> None:
+    """_FakeDevice.datagram_received with the device's current values."""
+    loop = asyncio.get_running_loop()
+    if len(data) == 32:
+        self.ping_cnt += 1
+        loop.call_later(self.rtt_secs, self.transport.sendto, self._header(32) + b"\xff" * 16, addr)
+        return
+    self.request_cnt += 1
+    request = json.loads(self.miio._unpack_raw(data).rstrip(b"\x00"))
+    payload = json.dumps({"id": request["id"], "result": self.answer_values(request)}).encode() + b"\x00"
+    encrypted = self.miio._encrypt(payload)
+    loop.call_later(self.rtt_secs, self.transport.sendto, self._header(32 + len(encrypted)) + b"\x00" * 16 + encrypted, addr)
+
+
+_FakeDevice.datagram_received = _answer
+
+
+class _Entry:
+    """Stands in for HassEntry."""
+
+    def __init__(self, hass) -> None:
+        self.hass = hass
+        self.cloud = None
+
+    def get_config(self, key=None, default=None):
+        return default
+
+
+def _spec_dict() -> dict:
+    return {
+        "type": "urn:miot-spec-v2:device:bench:0000A001:bench-push:1",
+        "description": "Bench",
+        "services": [
+            {
+                "iid": 2,
+                "type": "urn:miot-spec-v2:service:bench:00007801:bench-push:1",
+                "description": "Bench",
+                "properties": [
+                    {
+                        "iid": piid,
+                        "type": f"urn:miot-spec-v2:property:prop-{piid}:000000{piid:02}:bench-push:1",
+                        "description": f"Prop {piid}",
+                        "format": "uint32",
+                        "access": ["read", "notify"] if piid % 2 == 0 else ["read"],
+                    }
+                    for piid in range(1, PROPERTIES + 1)
+                ],
+            }
+        ],
+    }
+
+
+async def _run_mode(modules, mode: str, args) -> dict:
+    device_module, mini_miio, miot_spec, converters, const = modules
+    loop = asyncio.get_running_loop()
+    randomiser = random.Random(1)
+    fake = _PushingDevice(mini_miio, TOKEN, int(DID), 0.005, 0.001)
+    fake.push = mode != "poll only"
+    fake.miss_every = args.miss_every if mode == "misses some" else 0
+    transport, _ = await loop.create_datagram_endpoint(lambda: fake, local_addr=("127.0.0.1", 0))
+
+    hass = types.SimpleNamespace(data={const.DOMAIN: {}}, config=types.SimpleNamespace(language="en"))
+    info = device_module.DeviceInfo({"did": DID, "model": MODEL, "name": "Bench", "localip": "127.0.0.1", "token": TOKEN})
+    device = device_module.Device(info, _Entry(hass))
+    device.data["updater"] = "local"
+    device.spec = miot_spec.MiotSpec(hass, _spec_dict())
+    miio = mini_miio.AsyncMiIO("127.0.0.1", TOKEN, timeout=0.5)
+    miio.addr = transport.get_extra_info("sockname")
+    device.local = device_module.MiotDevice(hass, miio)
+    props_by_name = {}
+    for prop in device.spec.get_properties():
+        conv = converters.MiotPropConv(prop.full_name, "sensor", prop=prop)
+        device.add_converter(conv)
+        props_by_name[conv.full_name] = prop
+    device.local.miio.add_listener(device.on_miio_message)
+    interval = timedelta(seconds=args.interval_secs)
+    coo = types.SimpleNamespace(base_interval=interval, update_interval=interval)
+    device.miot_coordinators.append(coo)
+
+    # when the changes were seen
+    changed_at = {}
+    lags = {"notify": [], "other": []}
+
+    def on_update(data: dict, only_info=False) -> None:
+        now = monotonic()
+        for name, value in data.items():
+            if not (prop := props_by_name.get(name)):
+                continue
+            if (prop.iid, value) in changed_at:
+                lags["notify" if prop.iid % 2 == 0 else "other"].append(now - changed_at.pop((prop.iid, value)))
+
+    device.add_listener(on_update)
+
+    async def change() -> None:
+        while True:
+            await asyncio.sleep(randomiser.expovariate(1 / args.change_secs))
+            piid = randomiser.randint(1, PROPERTIES)
+            # only the latest value of a property can be seen
+            for key in [key for key in changed_at if key[0] == piid]:
+                changed_at.pop(key)
+            fake.change(piid)
+            changed_at[(piid, fake.values[piid])] = monotonic()
+
+    async def poll() -> None:
+        while True:
+            await device.update_miot_status(device.miot_mapping())
+            await asyncio.sleep(coo.update_interval.total_seconds())
+
+    fake.request_cnt = 0
+    tasks = [loop.create_task(change()), loop.create_task(poll())]
+    await asyncio.sleep(args.run_secs)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    miio.close()
+    transport.close()
+    return {
+        "changes": fake.change_cnt,
+        **{f"lag_{kind}": sum(secs) / len(secs) if secs else 0 for kind, secs in lags.items()},
+        "requests": fake.request_cnt,
+        "interval": coo.update_interval.total_seconds(),
+        **device.update_counts,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--interval-secs", type=float, default=0.5, help="the miot poll interval")
+    parser.add_argument("--change-secs", type=float, default=0.3, help="average time between changes")
+    parser.add_argument("--run-secs", type=float, default=20, help="how long each mode runs")
+    parser.add_argument("--miss-every", type=int, default=25, help="the device doesn't push one change in this many")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    directory = args.xiaomi_miot.resolve()
+    modules = (
+        load_xiaomi_miot_module(directory, "core.device"),
+        load_xiaomi_miot_module(directory, "core.mini_miio"),
+        load_xiaomi_miot_module(directory, "core.miot_spec"),
+        load_xiaomi_miot_module(directory, "core.converters"),
+        load_xiaomi_miot_module(directory, "core.const"),
+    )
+    modules[4].DEVICE_CUSTOMIZES[MODEL] = {"miot_local": True, "chunk_properties": 15}
+    logging.getLogger(modules[0].__name__).setLevel(logging.WARNING)
+
+    rows = [(mode, asyncio.run(_run_mode(modules, mode, args))) for mode in ("poll only", "pushes", "misses some")]
+    print(  # noqa: T201
+        f"poll interval {args.interval_secs}s (x{modules[0].Device.push_interval_factor} once the device pushes), "
+        f"a change every {args.change_secs}s, {args.run_secs}s each, half of the properties can be pushed:\n"
+    )
+    print(  # noqa: T201
+        f"  {'':<13}{'changes':>8}{'lag notify':>12}{'lag other':>11}{'requests':>10}"
+        f"{'pushed':>8}{'polled':>8}{'missed':>8}{'interval':>10}"
+    )
+    for mode, row in rows:
+        print(  # noqa: T201
+            f"  {mode:<13}{row['changes']:>8}{row['lag_notify']:>12.3f}{row['lag_other']:>11.3f}{row['requests']:>10}"
+            f"{row['pushed']:>8}{row['polled']:>8}{row['missed']:>8}{row['interval']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Time and measure loading the miot specs of xiaomi_miot devices at startup with MiotSpecCache against loading the files for each device.
+
+Writes a fake instances.json (20000 models), the specs and their translations
+of 10 models to a temporary directory, then sets up 50 devices (5 of each
+model, all at the same time, like at HA startup), getting each device's spec
+the way Device.get_spec does, both the way core/miot_spec.py did before (each
+device reading and parsing instances.json, its spec and its translations, and
+creating all the services of the spec) and with MiotSpecCache (each file read
+once, the services created once for each model):
+
+    python tools/xiaomi_miot_spec_cache_bench.py
+    python tools/xiaomi_miot_spec_cache_bench.py --models 20 --devices 200
+
+The peak memory (tracemalloc, in a second run) is measured while the devices
+are set up. The specs are compared as well (their
+properties and actions), and any that differ are counted.
+
+This imports the real core/miot_spec.py, so Home Assistant and the
+integration's requirements need to be installed, as they are in any HA
+development environment.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from xiaomi_miot_decode_bench import DEFAULT_XIAOMI_MIOT_DIR, load_xiaomi_miot_module  # noqa: E402
+
+INSTANCES = 20000
+
+
+def _spec(number: int) -> dict:
+    services = [
+        {
+            "iid": 1,
+            "type": "urn:miot-spec-v2:service:device-information:00007801:miot:1",
+            "description": "Device Information",
+            "properties": [
+                {
+                    "iid": piid,
+                    "type": f"urn:miot-spec-v2:property:{name}:0000000{piid}:miot:1",
+                    "description": name,
+                    "format": "string",
+                    "access": ["read"],
+                }
+                for piid, name in enumerate(("manufacturer", "model", "serial-number", "firmware-revision"), 1)
+            ],
+        }
+    ]
+    for siid in range(2, 12):
+        properties = []
+        for piid in range(1, 11):
+            prop = {
+                "iid": piid,
+                "type": f"urn:miot-spec-v2:property:prop-{siid}-{piid}:0000{siid:02}{piid:02}:miot:1",
+                "description": f"Property {piid}",
+                "format": "uint8",
+                "access": ["read", "write", "notify"],
+            }
+            if piid % 3:
+                prop["value-range"] = [0, 100, 1]
+            else:
+                prop["value-list"] = [{"value": value, "description": f"Mode {value}"} for value in range(5)]
+            properties.append(prop)
+        actions = [
+            {
+                "iid": 1,
+                "type": "urn:miot-spec-v2:action:toggle:00002811:miot:1",
+                "description": "Toggle",
+                "in": [],
+                "out": [],
+            }
+        ]
+        services.append(
+            {
+                "iid": siid,
+                "type": f"urn:miot-spec-v2:service:service-{siid}:0000{siid:04}:miot:1",
+                "description": f"Service {siid}",
+                "properties": properties,
+                "actions": actions,
+            }
+        )
+    return {
+        "type": f"urn:miot-spec-v2:device:bench-{number}:0000A0{number:02}:bench:1",
+        "description": f"Bench {number}",
+        "services": services,
+    }
+
+
+def _langs(spec: dict) -> dict:
+    data = {}
+    for srv in spec["services"]:
+        data[f"service:{srv['iid']:03}"] = f"{srv['description']} zh"
+        for prop in srv.get("properties", []):
+            data[f"service:{srv['iid']:03}:property:{prop['iid']:03}"] = f"{prop['description']} zh"
+    return {"type": spec["type"], "data": {"zh_cn": data}}
+
+
+class _Store:
+    """Stands in for homeassistant.helpers.storage.Store, reading and parsing a JSON file like it does."""
+
+    path: Path = None
+    executor: ThreadPoolExecutor = None
+    load_cnt = 0
+
+    def __init__(self, hass, version, key) -> None:
+        self.file = self.path / key
+
+    async def async_load(self) -> dict | None:
+        _Store.load_cnt += 1
+        if not self.file.exists():
+            return None
+        # HA reads and parses the file in the executor
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, lambda: json.loads(self.file.read_text())["data"]
+        )
+
+    async def async_save(self, data: dict) -> None:
+        raise AssertionError("the specs are cached, nothing is downloaded")
+
+    async def async_remove(self) -> None:
+        pass
+
+
+def _write_files(path: Path, domain: str, model_cnt: int) -> tuple[list, dict]:
+    randomiser = random.Random(1)
+    now = int(time.time())
+    instances = {"_updated_time": now}
+    for number in range(INSTANCES):
+        instances[f"vendor{number % 500}.type{number % 37}.v{number}"] = {
+            "status": "released",
+            "type": f"urn:miot-spec-v2:device:other-{number}:0000A0{number % 100:02}:vendor{number % 500}:1",
+            "version": 1,
+            "ts": now - randomiser.randint(0, 10**7),
+        }
+    models = []
+    for number in range(model_cnt):
+        model = f"bench.device.v{number}"
+        spec = _spec(number)
+        instances[model] = {"status": "released", "type": spec["type"], "version": 1, "ts": now}
+        models.append(model)
+        for key, dat in ((f"{domain}/{spec['type']}.json", spec), (f"{domain}/spec-langs/{spec['type']}.json", _langs(spec))):
+            (path / key).parent.mkdir(parents=True, exist_ok=True)
+            (path / key).write_text(json.dumps({"version": 1, "key": key, "data": {**dat, "_updated_time": now}}))
+    (path / domain / "instances.json").write_text(json.dumps({"version": 1, "data": instances}))
+    return models
+
+
+# ---------------------------------------------------------------------------
+# Loading the specs the way core/miot_spec.py did before
+# ---------------------------------------------------------------------------
+
+
+async def _load_before(miot_spec, hass, fnm: str) -> dict:
+    return await miot_spec.Store(hass, 1, fnm).async_load() or {}
+
+
+async def get_model_type_before(miot_spec, hass, domain: str, model: str):
+    dat = await _load_before(miot_spec, hass, f"{domain}/instances.json")
+    dat.pop("_updated_time", 0)
+    return dat[model].get("type") if model in dat else None
+
+
+async def from_type_before(miot_spec, hass, domain: str, typ: str):
+    dat = await _load_before(miot_spec, hass, f"{domain}/{typ}.json")
+    dat.pop("_updated_time", 0)
+    langs = await _load_before(miot_spec, hass, f"{domain}/spec-langs/{typ}.json")
+    obj = miot_spec.MiotSpec(hass, dat, langs.get("data") or {})
+    obj.init_services()  # the services were created with the spec
+    return obj
+
+
+async def get_spec_before(miot_spec, hass, domain: str, model: str):
+    dat = hass.data[domain]["miot_specs"]
+    obj = dat.get(model)
+    if not obj:
+        urn = await get_model_type_before(miot_spec, hass, domain, model)
+        obj = await from_type_before(miot_spec, hass, domain, urn)
+        dat[model] = obj
+    return copy.copy(obj)
+
+
+# ---------------------------------------------------------------------------
+
+
+async def get_spec_cached(miot_spec, hass, domain: str, model: str):
+    """Device.get_spec"""
+    dat = hass.data[domain]["miot_specs"]
+    obj = dat.get(model)
+    if not obj:
+        urn = await miot_spec.MiotSpec.async_get_model_type(hass, model)
+        obj = await miot_spec.MiotSpec.async_from_type(hass, urn)
+        obj = dat[model] = dat.get(model) or obj
+    obj.init_services()
+    return copy.copy(obj)
+
+
+def _summary(spec) -> tuple:
+    return (
+        spec.type,
+        tuple((p.full_name, p.friendly_desc) for s in spec.services.values() for p in s.properties.values()),
+        tuple(a.full_name for s in spec.services.values() for a in s.actions.values()),
+    )
+
+
+async def _setup(get_spec, miot_spec, domain: str, devices: list, trace: bool) -> dict:
+    hass = types.SimpleNamespace(data={domain: {"miot_specs": {}}}, config=types.SimpleNamespace(language="en"))
+    _Store.load_cnt = 0
+    _Store.executor = ThreadPoolExecutor()
+    gc.collect()
+    if trace:
+        tracemalloc.start()
+    start = perf_counter()
+    specs = await asyncio.gather(*[get_spec(miot_spec, hass, domain, model) for model in devices])
+    row = {"ms": (perf_counter() - start) * 1000, "loads": _Store.load_cnt, "specs": [_summary(s) for s in specs]}
+    _Store.executor.shutdown()
+    if trace:
+        row["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return row
+
+
+async def _run(miot_spec, domain: str, model_cnt: int, device_cnt: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _Store.path = Path(tmp)
+        models = _write_files(_Store.path, domain, model_cnt)
+        miot_spec.Store = _Store
+        devices = [models[number % model_cnt] for number in range(device_cnt)]
+
+        rows = []
+        for name, get_spec in (("file each device", get_spec_before), ("MiotSpecCache", get_spec_cached)):
+            row = await _setup(get_spec, miot_spec, domain, devices, trace=False)
+            row.update(await _setup(get_spec, miot_spec, domain, devices, trace=True))
+            rows.append((name, row))
+
+    diffs = sum(before != cached for before, cached in zip(rows[0][1]["specs"], rows[1][1]["specs"]))
+    print(  # noqa: T201
+        f"{device_cnt} devices of {model_cnt} models set up at the same time, "
+        f"instances.json with {INSTANCES} models, {diffs} specs differ:\n"
+    )
+    print(f"  {'':<18}{'ms':>8}{'files read':>12}{'peak MB':>10}")  # noqa: T201
+    for name, row in rows:
+        print(f"  {name:<18}{row['ms']:>8.0f}{row['loads']:>12}{row['peak_mb']:>10.1f}")  # noqa: T201
+    print("\n  (ms and files read without tracemalloc)")  # noqa: T201
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", type=int, default=10, help="how many models the devices are")
+    parser.add_argument("--devices", type=int, default=50, help="how many devices")
+    parser.add_argument("--xiaomi-miot", type=Path, default=DEFAULT_XIAOMI_MIOT_DIR, help="path to the integration")
+    args = parser.parse_args()
+    miot_spec = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.miot_spec")
+    const = load_xiaomi_miot_module(args.xiaomi_miot.resolve(), "core.const")
+    asyncio.run(_run(miot_spec, const.DOMAIN, args.models, args.devices))
+
+
+if __name__ == "__main__":
+    main()